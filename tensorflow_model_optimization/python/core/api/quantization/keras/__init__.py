@@ -16,6 +16,7 @@
 # pylint: disable=g-bad-import-order
 
 # submodules
+from tensorflow_model_optimization.python.core.api.quantization.keras import calibration
 from tensorflow_model_optimization.python.core.api.quantization.keras import quantizers
 
 # quantize all layers with default quantization implementation.
@@ -26,6 +27,15 @@ from tensorflow_model_optimization.python.core.quantization.keras.quantize impor
 from tensorflow_model_optimization.python.core.quantization.keras.quantize import quantize_annotate_model
 from tensorflow_model_optimization.python.core.quantization.keras.quantize import quantize_apply
 
+# store weights as integers for inference, keeping activations in float.
+from tensorflow_model_optimization.python.core.quantization.keras.quantize import quantize_weights_only
+
+# set quantization ranges from a representative dataset, without training.
+from tensorflow_model_optimization.python.core.quantization.keras.calibration import calibrate
+
+# update quantization ranges with one all-reduce under tf.distribute.
+from tensorflow_model_optimization.python.core.quantization.keras.range_sync import synchronize_ranges
+
 # quantize with custom quantization parameterization or implementation, or
 # handle custom Keras layers.
 from tensorflow_model_optimization.python.core.quantization.keras.quantize_config import QuantizeConfig
@@ -0,0 +1,23 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Module containing observers used for post-training calibration."""
+
+# pick quantization ranges from statistics of a representative dataset.
+from tensorflow_model_optimization.python.core.quantization.keras.calibration import KLDivergenceObserver
+from tensorflow_model_optimization.python.core.quantization.keras.calibration import MinMaxObserver
+from tensorflow_model_optimization.python.core.quantization.keras.calibration import MovingAverageObserver
+from tensorflow_model_optimization.python.core.quantization.keras.calibration import MseObserver
+from tensorflow_model_optimization.python.core.quantization.keras.calibration import Observer
+from tensorflow_model_optimization.python.core.quantization.keras.calibration import PercentileObserver
@@ -54,6 +54,7 @@ def cluster_scope():
 def cluster_weights(to_cluster,
                     number_of_clusters,
                     cluster_centroids_init,
+                    preserve_sparsity=False,
                     **kwargs):
   """Modify a keras layer or model to be clustered during training.
 
@@ -114,6 +115,12 @@ def cluster_weights(to_cluster,
           values are obtained and used to initialize clusters centroids.
           3. 'linear' : cluster centroids are evenly spaced between the minimum
           and maximum values of a given weight
+      preserve_sparsity: whether to keep the zero weights of a pruned model at
+        zero. If True, one of the number_of_clusters centroids is reserved for
+        the value zero, the others are initialized from the nonzero weights
+        only, and the pruned positions are masked during training. Use
+        `ClusterWeights.get_sparse_clustered_weights` to export the result in
+        a form that combines sparse indices with a codebook.
       **kwargs: Additional keyword arguments to be passed to the keras layer.
         Ignored when to_cluster is not a keras layer.
 
@@ -138,6 +145,7 @@ def cluster_weights(to_cluster,
     return cluster_wrapper.ClusterWeights(layer,
                                           number_of_clusters,
                                           cluster_centroids_init,
+                                          preserve_sparsity,
                                           **kwargs)
 
   def _wrap_list(layers):
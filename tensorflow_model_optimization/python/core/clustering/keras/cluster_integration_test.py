@@ -76,6 +76,37 @@ class ClusterIntegrationTest(test.TestCase):
     unique_weights = set(weights_as_list)
     self.assertLessEqual(len(unique_weights), number_of_clusters)
 
+  @tf_test_util.run_in_graph_and_eager_modes
+  def testSparsityIsPreservedDuringTraining(self):
+    """
+    Verifies that training a sparsity preserving clustered model does not
+    revive the pruned weights.
+    """
+    original_model = keras.Sequential([
+        layers.Dense(5, input_shape=(5,)),
+        layers.Dense(5),
+    ])
+    first_kernel, first_bias = original_model.layers[0].get_weights()
+    first_kernel[np.triu_indices(5)] = 0.0
+    original_model.layers[0].set_weights([first_kernel, first_bias])
+
+    clustered_model = cluster.cluster_weights(
+        original_model,
+        number_of_clusters=4,
+        cluster_centroids_init='density-based',
+        preserve_sparsity=True
+    )
+    clustered_model.compile(loss='mse', optimizer='adam')
+    x_train = np.random.uniform(size=(20, 5)).astype(np.float32)
+    y_train = np.random.uniform(size=(20, 5)).astype(np.float32)
+    clustered_model.fit(x_train, y_train, epochs=3, batch_size=5, verbose=0)
+
+    stripped_model = cluster.strip_clustering(clustered_model)
+    stripped_kernel = stripped_model.layers[0].get_weights()[0]
+    self.assertAllEqual(first_kernel == 0, stripped_kernel == 0)
+    self.assertLessEqual(
+        len(set(stripped_kernel[stripped_kernel != 0].tolist())), 3)
+
 
 if __name__ == '__main__':
   test.main()
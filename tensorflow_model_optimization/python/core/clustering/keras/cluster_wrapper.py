@@ -14,6 +14,7 @@
 # ==============================================================================
 """Keras ClusterWeights wrapper API."""
 
+import numpy as np
 import tensorflow.compat.v1 as tf
 from tensorflow.python.keras import initializers, backend as k
 from tensorflow.python.keras.layers import Wrapper
@@ -45,12 +46,19 @@ class ClusterWeights(Wrapper):
   are initialized are passed in the wrapper's constructor.
 
   The initial values of cluster centroids are fine-tuned during the training.
+
+  If `preserve_sparsity` is set, the wrapper assumes the weights come from a
+  pruned model. Index 0 of the lookup table is then reserved for a zero
+  centroid that all pruned (zero) weights are pulled from, the remaining
+  centroids are initialized from the nonzero weights only and a mask of the
+  pruned positions is kept, so that training never revives them.
   """
 
   def __init__(self,
                layer,
                number_of_clusters,
                cluster_centroids_init,
+               preserve_sparsity=False,
                **kwargs):
     if not isinstance(layer, Layer):
       raise ValueError(
@@ -96,6 +104,9 @@ class ClusterWeights(Wrapper):
     # The number of cluster centroids
     self.number_of_clusters = number_of_clusters
 
+    # Whether the zero weights of a pruned layer must stay zero
+    self.preserve_sparsity = preserve_sparsity
+
     # Stores the pairs of weight names and references to their tensors
     self.clustered_vars = []
 
@@ -111,6 +122,10 @@ class ClusterWeights(Wrapper):
     # cluster centroids lookup tables
     self.cluster_centroids_tf = {}
 
+    # A dictionary that stores pairs of weight names and their respective
+    # masks of nonzero positions. Only populated if sparsity is preserved
+    self.sparsity_masks = {}
+
     # A list for restoring the original order of weights later on, see the
     # comments in the code for usage explanations
     self.restore = []
@@ -171,12 +186,25 @@ class ClusterWeights(Wrapper):
 
       # Build initial cluster centroids for a given tensor. Factory returns a
       # class and we init an object immediately
-      centroid_initializer = clustering_centroids.CentroidsInitializerFactory.\
-          get_centroid_initializer(
+      centroid_initializer_cls = clustering_centroids.\
+          CentroidsInitializerFactory.get_centroid_initializer(
               self.cluster_centroids_init
-          )(weight, self.number_of_clusters)
+          )
 
-      cluster_centroids = centroid_initializer.get_cluster_centroids()
+      if self.preserve_sparsity:
+        # The pruned weights must not influence where the nonzero centroids
+        # are placed, and one centroid is reserved for them at index 0.
+        sparsity_mask = tf.math.not_equal(weight, 0)
+        nonzero_centroids = centroid_initializer_cls(
+            tf.boolean_mask(weight, sparsity_mask),
+            self.number_of_clusters - 1
+        ).get_cluster_centroids()
+        cluster_centroids = tf.concat(
+            [tf.zeros((1,), dtype=weight.dtype), nonzero_centroids], axis=0)
+      else:
+        cluster_centroids = centroid_initializer_cls(
+            weight, self.number_of_clusters
+        ).get_cluster_centroids()
 
       # Use k.batch_get_value since we need to initialize the variables with an
       # initial value taken from a Tensor object. For each weight there is a
@@ -202,8 +230,28 @@ class ClusterWeights(Wrapper):
       # We find the nearest cluster centroids and store them so that ops can
       # build their weights upon it. These indices are calculated once and
       # stored forever. We use to make look-ups from self.cluster_centroids_tf
-      pulling_indices = self.clustering_impl[weight_name].\
-          get_pulling_indices(weight)
+      if self.preserve_sparsity:
+        # Nonzero weights are only ever pulled from the nonzero centroids,
+        # so the search is done on the table without the reserved entry.
+        pulling_indices = tf.where(
+            sparsity_mask,
+            clustering_impl_cls(nonzero_centroids).get_pulling_indices(
+                weight) + 1,
+            tf.zeros_like(sparsity_mask, dtype=tf.int64)
+        )
+        self.sparsity_masks[weight_name] = self.add_weight(
+            'sparsity_mask',
+            shape=weight.shape,
+            dtype=weight.dtype,
+            trainable=False,
+            initializer=initializers.Constant(
+                value=k.batch_get_value(
+                    [tf.cast(sparsity_mask, weight.dtype)])[0]
+            )
+        )
+      else:
+        pulling_indices = self.clustering_impl[weight_name].\
+            get_pulling_indices(weight)
       self.pulling_indices_tf[weight_name] = self.add_weight(
           'pulling_indices_tf',
           shape=pulling_indices.shape,
@@ -221,9 +269,7 @@ class ClusterWeights(Wrapper):
     # in future and it would return the latest version of clustered weights
     def get_updater(for_weight_name):
       def fn():
-        return self.clustering_impl[for_weight_name].get_clustered_weight(
-            self.pulling_indices_tf[for_weight_name]
-        )
+        return self._get_clustered_weight(for_weight_name)
 
       return fn
 
@@ -239,18 +285,67 @@ class ClusterWeights(Wrapper):
       else:
         self.restore.append((name, weight))
 
+  def _get_clustered_weight(self, weight_name):
+    """Builds the clustered version of the given weight.
+
+    Args:
+      weight_name: Human readable name of a clusterable weight.
+
+    Returns:
+      Tensor of the weight's shape populated from the cluster centroids.
+    """
+    clustered_weight = self.clustering_impl[weight_name].get_clustered_weight(
+        self.pulling_indices_tf[weight_name]
+    )
+    if self.preserve_sparsity:
+      # Multiplying by the mask also stops the gradients from ever reaching
+      # the reserved zero centroid, so it stays at exactly zero.
+      clustered_weight = clustered_weight * self.sparsity_masks[weight_name]
+    return clustered_weight
+
   def call(self, inputs):
     # Go through all tensors and replace them with their clustered copies.
     for weight_name, _ in self.clustered_vars:
-      setattr(
-          self.layer, weight_name,
-          self.clustering_impl[weight_name].get_clustered_weight(
-              self.pulling_indices_tf[weight_name]
-          )
-      )
+      setattr(self.layer, weight_name, self._get_clustered_weight(weight_name))
 
     return self.layer.call(inputs)
 
+  def get_sparse_clustered_weights(self):
+    """Exports the clustered weights in a sparse, palettized form.
+
+    Each clustered weight is described by the coordinates of its nonzero
+    elements, the index of the codebook entry each of them takes its value from
+    and the codebook itself. Zero weights are not stored at all, so the
+    exported form benefits from both sparsity and clustering. The reserved zero
+    centroid is dropped from the codebook and the indices are shifted
+    accordingly when sparsity is preserved.
+
+    Returns:
+      A dictionary mapping the names of the clustered weights to dictionaries
+      with the keys 'indices' (int64 array of shape [nnz, rank]),
+      'codebook_indices' (int32 array of shape [nnz]), 'codebook' (array of
+      shape [number_of_clusters] or [number_of_clusters - 1] when sparsity is
+      preserved) and 'dense_shape'.
+    """
+    sparse_weights = {}
+    for weight_name, _ in self.clustered_vars:
+      pulling_indices, cluster_centroids, clustered_weight = k.batch_get_value([
+          self.pulling_indices_tf[weight_name],
+          self.cluster_centroids_tf[weight_name],
+          self._get_clustered_weight(weight_name)
+      ])
+      if self.preserve_sparsity:
+        cluster_centroids = cluster_centroids[1:]
+        pulling_indices = pulling_indices - 1
+      nonzero = np.nonzero(clustered_weight)
+      sparse_weights[weight_name] = {
+          'indices': np.stack(nonzero, axis=-1).astype(np.int64),
+          'codebook_indices': pulling_indices[nonzero].astype(np.int32),
+          'codebook': cluster_centroids,
+          'dense_shape': clustered_weight.shape,
+      }
+    return sparse_weights
+
   def compute_output_shape(self, input_shape):
     return self.layer.compute_output_shape(input_shape)
 
@@ -259,6 +354,7 @@ class ClusterWeights(Wrapper):
     config = {
         'number_of_clusters': self.number_of_clusters,
         'cluster_centroids_init': self.cluster_centroids_init,
+        'preserve_sparsity': self.preserve_sparsity,
     }
     return dict(list(base_config.items()) + list(config.items()))
 
@@ -167,6 +167,59 @@ class ClusterWeightsTest(test.TestCase, parameterized.TestCase):
     # Make sure that the stripped layer is the Dense one
     self.assertIsInstance(stripped_model.layers[0], layers.Dense)
 
+  @parameterized.parameters(('linear'), ('random'), ('density-based'))
+  def testZeroWeightsArePreservedAfterStripping(self, cluster_centroids_init):
+    """
+    Verifies that when sparsity is preserved, the pruned weights remain zero
+    and do not count towards the nonzero clusters.
+    """
+    original_model = tf.keras.Sequential([
+        layers.Dense(32, input_shape=(10,)),
+    ])
+    kernel, bias = original_model.get_weights()
+    kernel[:, ::2] = 0.0
+    original_model.set_weights([kernel, bias])
+
+    clustered_model = cluster.cluster_weights(
+        original_model,
+        number_of_clusters=4,
+        cluster_centroids_init=cluster_centroids_init,
+        preserve_sparsity=True
+    )
+    stripped_model = cluster.strip_clustering(clustered_model)
+    stripped_kernel = stripped_model.get_weights()[0]
+
+    self.assertAllEqual(kernel == 0, stripped_kernel == 0)
+    self.assertLessEqual(len(set(stripped_kernel[:, 1::2].reshape(-1))), 3)
+
+  def testSparseClusteredWeightsReconstructClusteredWeight(self):
+    """
+    Verifies that the exported sparse indices and codebook reconstruct the
+    clustered weight exactly.
+    """
+    layer = layers.Dense(8, input_shape=(6,))
+    model = tf.keras.Sequential([layer])
+    kernel, bias = model.get_weights()
+    kernel[kernel < 0] = 0.0
+    model.set_weights([kernel, bias])
+
+    clustered_model = cluster.cluster_weights(
+        model,
+        number_of_clusters=5,
+        cluster_centroids_init='linear',
+        preserve_sparsity=True
+    )
+    sparse_kernel = clustered_model.layers[0].get_sparse_clustered_weights()[
+        'kernel']
+    stripped_kernel = cluster.strip_clustering(clustered_model).get_weights()[0]
+
+    self.assertEqual(4, sparse_kernel['codebook'].shape[0])
+    self.assertEqual(np.count_nonzero(kernel), len(sparse_kernel['indices']))
+    dense_kernel = np.zeros(sparse_kernel['dense_shape'])
+    dense_kernel[tuple(sparse_kernel['indices'].T)] = (
+        sparse_kernel['codebook'][sparse_kernel['codebook_indices']])
+    self.assertAllClose(stripped_kernel, dense_kernel)
+
 
 if __name__ == '__main__':
   tf.disable_v2_behavior()
@@ -113,7 +113,7 @@ class TFCumulativeDistributionFunction:
   def get_cdf_value(self, given_weight):
     mask = tf.less_equal(self.weights, given_weight)
     less_than = tf.cast(tf.math.count_nonzero(mask), dtype=tf.float32)
-    return less_than / tf.size(self.weights, out_type=tf.float32)
+    return less_than / tf.cast(tf.size(self.weights), dtype=tf.float32)
 
 
 class DensityBasedCentroidsInitialisation(AbstractCentroidsInitialisation):
@@ -17,6 +17,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core.accumulator import Accumulator
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.core.core_encoder import Encoder
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.core.core_encoder import EncoderComposer
 
@@ -27,4 +28,5 @@ from tensorflow_model_optimization.python.core.internal.tensor_encoding.core.enc
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.core.encoding_stage import tf_style_encoding_stage
 
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.core.gather_encoder import GatherEncoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core.nest_gather_encoder import NestGatherEncoder
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.core.simple_encoder import SimpleEncoder
@@ -0,0 +1,170 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Streaming aggregation of values encoded by a `GatherEncoder`."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import encoding_stage
+
+
+def _uses_tensorflow(values):
+  return any(tf.is_tensor(value) for value in values)
+
+
+def _reduce(mode, a, b):
+  """Aggregates `a` and `b` in the SUM, MIN or MAX `mode`."""
+  if mode == encoding_stage.StateAggregationMode.SUM:
+    return a + b
+  elif mode == encoding_stage.StateAggregationMode.MIN:
+    if _uses_tensorflow([a, b]):
+      return tf.minimum(a, b)
+    return np.minimum(a, b)
+  elif mode == encoding_stage.StateAggregationMode.MAX:
+    if _uses_tensorflow([a, b]):
+      return tf.maximum(a, b)
+    return np.maximum(a, b)
+  raise ValueError('Unknown StateAggregationMode: %s' % mode)
+
+
+def _stack(values):
+  if _uses_tensorflow(values):
+    return tf.stack(values)
+  return np.stack(values)
+
+
+class Accumulator(object):
+  """Aggregates values encoded by a `GatherEncoder` one at a time.
+
+  An `Accumulator` realizes the steps 6, 7 and 9 of the pattern of usage
+  described in the `GatherEncoder` class without collecting all of the encoded
+  values first. Every `encoded_x` passed to the `accumulate` method is
+  immediately partially decoded and added to a running sum, and the
+  `state_update_tensors` are folded into running aggregates according to the
+  `state_update_aggregation_modes` of the encoder. The memory used is thus
+  independent of the number of accumulated values, except for state update
+  tensors aggregated in the `STACK` mode, which necessarily keep every value.
+
+  Accumulators of intermediary nodes in a multi-tier aggregation architecture
+  can be combined using the `merge` method. All merged accumulators must be
+  created with the same encoder and `decode_before_sum_params`.
+
+  The values are combined using numpy if all of them are numpy values, and
+  using TensorFlow otherwise. The methods are not thread-safe.
+  """
+
+  def __init__(self, encoder, decode_before_sum_params):
+    """Creates an empty `Accumulator`.
+
+    Args:
+      encoder: A `GatherEncoder` or `NestGatherEncoder`, or any object
+        providing the `decode_before_sum` method and the
+        `state_update_aggregation_modes` property.
+      decode_before_sum_params: The `decode_before_sum_params` returned by the
+        `get_params` method of `encoder`.
+    """
+    self._encoder = encoder
+    self._decode_before_sum_params = decode_before_sum_params
+    self._modes = list(encoder.state_update_aggregation_modes)
+    self._part_decoded_sum = None
+    self._state_update_tensors = None
+    self._num_summands = 0
+
+  @property
+  def num_summands(self):
+    """The number of encoded values accumulated so far."""
+    return self._num_summands
+
+  def accumulate(self, encoded_x, state_update_tensors):
+    """Adds a single encoded value to the accumulator.
+
+    Args:
+      encoded_x: The `encoded_x` returned by the `encode` method of the
+        encoder.
+      state_update_tensors: The `state_update_tensors` returned together with
+        `encoded_x` by the `encode` method of the encoder.
+    """
+    part_decoded_x = self._encoder.decode_before_sum(
+        encoded_x, self._decode_before_sum_params)
+    state_update_tensors = [
+        [t] if mode == encoding_stage.StateAggregationMode.STACK else t
+        for t, mode in zip(state_update_tensors, self._modes)
+    ]
+    self._add(part_decoded_x, state_update_tensors, 1)
+
+  def merge(self, other):
+    """Adds all values accumulated by `other` to this accumulator.
+
+    Args:
+      other: An `Accumulator` created with the same encoder and
+        `decode_before_sum_params`.
+
+    Raises:
+      ValueError: If `other` aggregates state update tensors in different
+        modes.
+    """
+    # pylint: disable=protected-access
+    if other._modes != self._modes:
+      raise ValueError(
+          'The merged accumulator must use the same '
+          'state_update_aggregation_modes. Provided: %s, expected: %s.' %
+          (other._modes, self._modes))
+    if other.num_summands:
+      self._add(other._part_decoded_sum, other._state_update_tensors,
+                other.num_summands)
+    # pylint: enable=protected-access
+
+  def result(self):
+    """Returns the aggregated values.
+
+    Returns:
+      A tuple `(part_decoded_sum, state_update_tensors, num_summands)`, where
+      `part_decoded_sum` is the sum of the partially decoded values, to be
+      passed to the `decode_after_sum` method of the encoder together with
+      `num_summands`, and `state_update_tensors` are the aggregated values to
+      be passed to its `update_state` method.
+
+    Raises:
+      ValueError: If no value has been accumulated.
+    """
+    if not self._num_summands:
+      raise ValueError('No value has been accumulated.')
+    state_update_tensors = tuple(
+        _stack(t) if mode == encoding_stage.StateAggregationMode.STACK else t
+        for t, mode in zip(self._state_update_tensors, self._modes))
+    return self._part_decoded_sum, state_update_tensors, self._num_summands
+
+  def _add(self, part_decoded_x, state_update_tensors, num_summands):
+    if not self._num_summands:
+      self._part_decoded_sum = part_decoded_x
+      # Copies the lists of stacked values, which are extended later.
+      self._state_update_tensors = [
+          list(t) if mode == encoding_stage.StateAggregationMode.STACK else t
+          for t, mode in zip(state_update_tensors, self._modes)
+      ]
+    else:
+      self._part_decoded_sum = tf.nest.map_structure(
+          lambda a, b: a + b, self._part_decoded_sum, part_decoded_x)
+      for i, mode in enumerate(self._modes):
+        if mode == encoding_stage.StateAggregationMode.STACK:
+          # Stacked values are kept in a list, and only stacked in the result.
+          self._state_update_tensors[i].extend(state_update_tensors[i])
+        else:
+          self._state_update_tensors[i] = _reduce(
+              mode, self._state_update_tensors[i], state_update_tensors[i])
+    self._num_summands += num_summands
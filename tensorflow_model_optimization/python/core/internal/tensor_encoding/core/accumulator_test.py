@@ -0,0 +1,145 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import accumulator
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import core_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import encoding_stage
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import gather_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.testing import test_utils
+
+
+def _gather_encoder(stage):
+  return gather_encoder.GatherEncoder.from_encoder(
+      core_encoder.EncoderComposer(stage).make(),
+      tf.TensorSpec((3,), tf.float32))
+
+
+class _NumpyIdentityEncoder(object):
+  """An encoder-like object sending the values as they are."""
+
+  def __init__(self, state_update_aggregation_modes):
+    self.state_update_aggregation_modes = state_update_aggregation_modes
+
+  def decode_before_sum(self, encoded_x, decode_before_sum_params):
+    del decode_before_sum_params  # Unused.
+    return encoded_x
+
+
+class AccumulatorTest(tf.test.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters(test_utils.TimesTwoEncodingStage,
+                            test_utils.SignIntFloatEncodingStage,
+                            test_utils.PlusOneOverNEncodingStage)
+  def test_decodes_sum(self, stage_class):
+    encoder = _gather_encoder(stage_class())
+    values = [tf.constant([1.0, -2.0, 3.5]) * i for i in range(4)]
+    state = encoder.initial_state()
+    _, decode_before_sum_params, decode_after_sum_params = (
+        encoder.get_params(state))
+
+    acc = accumulator.Accumulator(encoder, decode_before_sum_params)
+    for x in values:
+      encode_params, _, _ = encoder.get_params(state)
+      acc.accumulate(*encoder.encode(x, encode_params))
+    part_decoded_sum, state_update_tensors, num_summands = acc.result()
+    decoded_sum = encoder.decode_after_sum(part_decoded_sum,
+                                           decode_after_sum_params,
+                                           num_summands)
+    updated_state = encoder.update_state(state, state_update_tensors)
+
+    self.assertEqual(4, num_summands)
+    self.assertEqual(4, acc.num_summands)
+    decoded_sum, expected_sum = self.evaluate([decoded_sum, tf.add_n(values)])
+    self.assertAllClose(expected_sum, decoded_sum)
+    self.evaluate(updated_state)
+
+  def test_merge_equals_accumulate(self):
+    encoder = _gather_encoder(test_utils.StateUpdateTensorsEncodingStage())
+    values = [tf.constant([1.0, -2.0, 3.5]) + i for i in range(6)]
+    encode_params, decode_before_sum_params, _ = encoder.get_params(
+        encoder.initial_state())
+    encoded = [encoder.encode(x, encode_params) for x in values]
+
+    acc = accumulator.Accumulator(encoder, decode_before_sum_params)
+    for encoded_x, state_update_tensors in encoded:
+      acc.accumulate(encoded_x, state_update_tensors)
+    merged_acc = accumulator.Accumulator(encoder, decode_before_sum_params)
+    for i in range(0, 6, 2):
+      child_acc = accumulator.Accumulator(encoder, decode_before_sum_params)
+      for encoded_x, state_update_tensors in encoded[i:i + 2]:
+        child_acc.accumulate(encoded_x, state_update_tensors)
+      merged_acc.merge(child_acc)
+    # Merging an empty accumulator does not change the result.
+    merged_acc.merge(
+        accumulator.Accumulator(encoder, decode_before_sum_params))
+
+    self.assertEqual(6, merged_acc.num_summands)
+    result, merged_result = self.evaluate(
+        [acc.result()[:2], merged_acc.result()[:2]])
+    self.assertAllClose(result, merged_result)
+
+  def test_state_update_tensors_numpy(self):
+    modes = [
+        encoding_stage.StateAggregationMode.SUM,
+        encoding_stage.StateAggregationMode.MIN,
+        encoding_stage.StateAggregationMode.MAX,
+        encoding_stage.StateAggregationMode.STACK
+    ]
+    encoder = _NumpyIdentityEncoder(modes)
+    values = np.random.normal(size=(5, 3)).astype(np.float32)
+
+    acc = accumulator.Accumulator(encoder, None)
+    for x in values[:2]:
+      acc.accumulate({'x': x}, [x, x, x, x])
+    other_acc = accumulator.Accumulator(encoder, None)
+    for x in values[2:]:
+      other_acc.accumulate({'x': x}, [x, x, x, x])
+    acc.merge(other_acc)
+    part_decoded_sum, state_update_tensors, num_summands = acc.result()
+
+    self.assertIsInstance(part_decoded_sum['x'], np.ndarray)
+    self.assertAllClose(np.sum(values, axis=0), part_decoded_sum['x'])
+    self.assertLen(state_update_tensors, 4)
+    self.assertAllClose(np.sum(values, axis=0), state_update_tensors[0])
+    self.assertAllClose(np.amin(values, axis=0), state_update_tensors[1])
+    self.assertAllClose(np.amax(values, axis=0), state_update_tensors[2])
+    self.assertAllClose(values, state_update_tensors[3])
+    self.assertEqual(5, num_summands)
+    # The result can be computed repeatedly.
+    self.assertAllClose(values, acc.result()[1][3])
+
+  def test_empty_result_raises(self):
+    acc = accumulator.Accumulator(_NumpyIdentityEncoder([]), None)
+    with self.assertRaisesRegex(ValueError, 'No value'):
+      acc.result()
+
+  def test_merge_different_modes_raises(self):
+    acc = accumulator.Accumulator(
+        _NumpyIdentityEncoder([encoding_stage.StateAggregationMode.SUM]), None)
+    other_acc = accumulator.Accumulator(
+        _NumpyIdentityEncoder([encoding_stage.StateAggregationMode.MAX]), None)
+    with self.assertRaisesRegex(ValueError, 'state_update_aggregation_modes'):
+      acc.merge(other_acc)
+
+
+if __name__ == '__main__':
+  tf.test.main()
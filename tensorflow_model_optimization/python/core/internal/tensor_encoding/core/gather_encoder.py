@@ -20,6 +20,7 @@ from __future__ import print_function
 import tensorflow as tf
 
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import core_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import trace_cache
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils import py_utils
 
 _PARAMS = 'params'
@@ -27,6 +28,11 @@ _SHAPES = 'shapes'
 _TENSORS = 'tensors'
 
 
+def _batched_spec(spec):
+  """Returns `spec` extended with a leading dimension of unknown size."""
+  return tf.TensorSpec([None] + spec.shape.as_list(), spec.dtype)
+
+
 class GatherEncoder(object):
   """A class for a gather-like operations with encoding.
 
@@ -77,6 +83,10 @@ class GatherEncoder(object):
   part decoded representations. These would be then summed again at the
   `server`, which would finish the decoding.
 
+  NOTE The steps 6, 7 and 9 can be realized by an `Accumulator`, which
+  aggregates the values as they arrive, and can be merged with accumulators of
+  other intermediary nodes.
+
   NOTE The use of the `state` is optional. It is needed only when the encoding
   mechanism should adapt based on the values being encoded during an iterative
   execution.
@@ -85,7 +95,7 @@ class GatherEncoder(object):
   def __init__(self, tensorspec, commuting_structure,
                state_update_aggregation_modes, initial_state_fn, get_params_fn,
                encode_fn, decode_before_sum_fn, decode_after_sum_fn,
-               update_state_fn):
+               update_state_fn, encode_batch_fn, decode_before_sum_batch_fn):
     """Creates a `GatherEncoder` for encoding `tensorspec`-like values.
 
     This class should not be instantiated directly. Instead, use the
@@ -103,6 +113,8 @@ class GatherEncoder(object):
       decode_before_sum_fn: A `tf.function`.
       decode_after_sum_fn: A `tf.function`.
       update_state_fn: A `tf.function`.
+      encode_batch_fn: A `tf.function`.
+      decode_before_sum_batch_fn: A `tf.function`.
 
     Returns:
       A `GatherEncoder`.
@@ -117,6 +129,8 @@ class GatherEncoder(object):
     self._decode_before_sum_fn = decode_before_sum_fn
     self._decode_after_sum_fn = decode_after_sum_fn
     self._update_state_fn = update_state_fn
+    self._encode_batch_fn = encode_batch_fn
+    self._decode_before_sum_batch_fn = decode_before_sum_batch_fn
 
   @classmethod
   def from_encoder(cls, encoder, tensorspec):
@@ -127,6 +141,11 @@ class GatherEncoder(object):
     `tensorspec`. Note that the returned encoder will not accept inputs of other
     properties.
 
+    The traced `tf.function`s are stored in the process-wide cache returned by
+    `trace_cache.default_trace_cache`, and are reused by `GatherEncoder`s
+    created for encoders of the same composition and configuration, and the
+    same shape and dtype.
+
     Args:
       encoder: An `Encoder` object to be used for encoding.
       tensorspec: A `tf.TensorSpec`. The created `GatherEncoder` will be
@@ -147,7 +166,13 @@ class GatherEncoder(object):
     if not tensorspec.shape.is_fully_defined():
       raise TypeError('The shape of provided tensorspec must be fully defined.')
 
-    tensorspec = tensorspec
+    cache = trace_cache.default_trace_cache()
+    cache_key = trace_cache.trace_key('gather_encoder', encoder, tensorspec)
+    if cache_key is not None:
+      cached_fns = cache.get(cache_key)
+      if cached_fns is not None:
+        return cls(tensorspec, *cached_fns)
+
     commuting_structure = encoder.commuting_structure
     state_update_aggregation_modes = tf.nest.flatten(
         encoder.state_update_aggregation_modes)
@@ -289,10 +314,15 @@ class GatherEncoder(object):
           py_utils.flatten_with_joined_string_paths(encoded_structure_tf)),
               tuple(tf.nest.flatten(state_update_tensors)))
 
-    encoded_structure, state_update_tensors = encode_fn(
-        tf.zeros(tensorspec.shape, tensorspec.dtype), encode_params)
-    encoded_structure_spec = tf.nest.map_structure(tf.TensorSpec.from_tensor,
-                                                   encoded_structure)
+    zero_x = tf.zeros(tensorspec.shape, tensorspec.dtype)
+    encoded_structure, state_update_tensors = encode_fn(zero_x, encode_params)
+    # The spec is created from the traced outputs, as the shape of some encoded
+    # values can depend on the values being encoded. In eager mode, the shapes
+    # of the returned values would be only those for the encoded zeros.
+    encoded_structure_spec = tf.nest.map_structure(
+        tf.TensorSpec.from_tensor,
+        encode_fn.get_concrete_function(
+            zero_x, encode_params).structured_outputs[0])
 
     @tf.function
     def decode_before_sum_fn(encoded_structure, params):
@@ -364,9 +394,68 @@ class GatherEncoder(object):
     updated_state = update_state_fn(state, state_update_tensors)
     tf.nest.assert_same_structure(state, updated_state)
 
-    return cls(tensorspec, commuting_structure, state_update_aggregation_modes,
-               initial_state_fn, get_params_fn, encode_fn, decode_before_sum_fn,
-               decode_after_sum_fn, update_state_fn)
+    # The batched functions are traced only when first used. Every stage is
+    # vectorized over the leading dimension by `tf.vectorized_map`. Random
+    # operations seeded in the stages thus generate different values for each
+    # of the encoded values, while operations seeded by the params generate
+    # different values only if the params are batched as well. The stateless
+    # random operations have no vectorized implementation, and with a batched
+    # seed are run by `tf.vectorized_map` in a sequential loop over the batch.
+    # Encoded values whose shape depends on the values being encoded, such as
+    # those of entropy coding stages, cannot be stacked along the batch
+    # dimension, so encoding them in a batch is not supported.
+    batch_x_spec = _batched_spec(tensorspec)
+    batch_encoded_structure_spec = tf.nest.map_structure(
+        _batched_spec, encoded_structure_spec)
+    encoded_shapes_are_fully_defined = all(
+        spec.shape.is_fully_defined()
+        for spec in tf.nest.flatten(encoded_structure_spec))
+    variable_shape_error_msg = (
+        'The shapes of the encoded values depend on the values being encoded, '
+        'and cannot be batched. Use the encode and decode_before_sum methods '
+        'for every value instead.')
+    batch_encode_params_spec = tf.nest.map_structure(_batched_spec,
+                                                     encode_params_spec)
+    batch_decode_before_sum_params_spec = tf.nest.map_structure(
+        _batched_spec, decode_before_sum_params_spec)
+
+    @tf.function
+    def encode_batch_fn(x, params, batched_params):
+      """See the `encode_batch` method of this class."""
+      if not encoded_shapes_are_fully_defined:
+        raise ValueError(variable_shape_error_msg)
+      if not batch_x_spec.is_compatible_with(x):
+        raise ValueError(
+            'The provided x is not compatible with the expected tensorspec, '
+            'extended with a leading batch dimension.')
+      if batched_params:
+        py_utils.assert_compatible(batch_encode_params_spec, params)
+        return tf.vectorized_map(lambda args: encode_fn(*args), (x, params))
+      py_utils.assert_compatible(encode_params_spec, params)
+      return tf.vectorized_map(lambda x_i: encode_fn(x_i, params), x)
+
+    @tf.function
+    def decode_before_sum_batch_fn(encoded_structure, params, batched_params):
+      """See the `decode_before_sum_batch` method of this class."""
+      if not encoded_shapes_are_fully_defined:
+        raise ValueError(variable_shape_error_msg)
+      py_utils.assert_compatible(batch_encoded_structure_spec,
+                                 encoded_structure)
+      if batched_params:
+        py_utils.assert_compatible(batch_decode_before_sum_params_spec, params)
+        return tf.vectorized_map(lambda args: decode_before_sum_fn(*args),
+                                 (encoded_structure, params))
+      py_utils.assert_compatible(decode_before_sum_params_spec, params)
+      return tf.vectorized_map(lambda e_i: decode_before_sum_fn(e_i, params),
+                               encoded_structure)
+
+    fns = (commuting_structure, state_update_aggregation_modes,
+           initial_state_fn, get_params_fn, encode_fn, decode_before_sum_fn,
+           decode_after_sum_fn, update_state_fn, encode_batch_fn,
+           decode_before_sum_batch_fn)
+    if cache_key is not None:
+      cache.put(cache_key, fns)
+    return cls(tensorspec, *fns)
 
   @property
   def input_tensorspec(self):
@@ -486,6 +575,112 @@ class GatherEncoder(object):
           tf.convert_to_tensor, decode_before_sum_params)
       return self._decode_before_sum_fn(encoded_x, decode_before_sum_params)
 
+  def encode_batch(self, x, encode_params, batched_params=False, name=None):
+    """Encodes a batch of inputs, such as the values of many clients.
+
+    This method is equivalent to calling the `encode` method for every `x[i]`,
+    and stacking the results, but all of the values are encoded together. This
+    is useful for simulating the encoding by many clients.
+
+    By default, the same `encode_params` are used for all values in the batch.
+    Stages seeding their random operations by the params, such as the
+    `HadamardEncodingStage`, then generate the same random values for every
+    value. To simulate clients with their own params, call the `get_params`
+    method once for every client, stack the results, and set `batched_params`
+    to `True`. The stateless random operations seeded by such batched params
+    are not vectorized, and are run in a sequential loop over the batch.
+
+    Note that the stages which commute with sum are decoded only after the
+    part-decoded values are summed, using a single `decode_after_sum_params`.
+    Their params must thus be the same for all values in the batch.
+
+    Encoders whose encoded values have shapes depending on the values being
+    encoded, such as those with entropy coding stages, are not supported, as
+    such encoded values cannot be stacked.
+
+    Args:
+      x: A `Tensor` of the shape expected by the `encode` method, extended with
+        a leading batch dimension.
+      encode_params: Parameters controlling the encoding. A tuple, matching the
+        corresponding structure returned by the `get_params` method. If
+        `batched_params` is `True`, every `Tensor` has an additional leading
+        batch dimension, matching that of `x`.
+      batched_params: A Python bool. If `True`, `x[i]` is encoded with the
+        params `encode_params[...][i]`. Otherwise, the same `encode_params` are
+        used for all values in the batch.
+      name: `string`, name of the operation.
+
+    Returns:
+      A `(encoded_x, state_update_tensors)` tuple, with the same structure as
+      the return value of the `encode` method, where every `Tensor` has an
+      additional leading batch dimension. The `state_update_tensors` thus need
+      to be aggregated along the leading dimension before being passed to the
+      `update_state` method.
+
+    Raises:
+      ValueError:
+        If `x` does not have the expected shape or dtype, if `encode_params`
+        does not have the same structure as corresponding return value of the
+        `get_params` method, with a leading batch dimension if
+        `batched_params` is `True`, or if the shapes of the encoded values are
+        not fully defined.
+    """
+    values = [x] + list(encode_params)
+    with tf.compat.v1.name_scope(name, 'gather_encoder_encode_batch', values):
+      x = tf.convert_to_tensor(x)
+      encode_params = tf.nest.map_structure(tf.convert_to_tensor, encode_params)
+      return self._encode_batch_fn(x, encode_params, bool(batched_params))
+
+  def decode_before_sum_batch(self,
+                              encoded_x,
+                              decode_before_sum_params,
+                              batched_params=False,
+                              name=None):
+    """Decodes a batch of encoded values, up to the part commuting with sum.
+
+    This method is equivalent to calling the `decode_before_sum` method for
+    every encoded value in the batch, and stacking the results. See the
+    `encode_batch` method for the use of `batched_params`.
+
+    Args:
+      encoded_x: A dictionary of `Tensor` values to be decoded, as returned by
+        the `encode_batch` method.
+      decode_before_sum_params: Parameters controlling the decoding. A tuple,
+        matching the corresponding structure returned by the `get_params`
+        method. If `batched_params` is `True`, every `Tensor` has an
+        additional leading batch dimension, matching that of `encoded_x`.
+      batched_params: A Python bool. If `True`, the `i`-th encoded value is
+        decoded with the params `decode_before_sum_params[...][i]`. Otherwise,
+        the same `decode_before_sum_params` are used for all values in the
+        batch.
+      name: `string`, name of the operation.
+
+    Returns:
+      A part-decoded structure, with the same structure as the return value of
+      the `decode_before_sum` method, where every `Tensor` has an additional
+      leading batch dimension. The sum along the leading dimension is expected
+      to be passed to the `decode_after_sum` method.
+
+    Raises:
+      ValueError:
+        If `encoded_x` does not have the same structure as corresponding return
+        value of the `encode_batch` method, if `decode_before_sum_params`
+        does not have the same structure as corresponding return value of the
+        `get_params` method, with a leading batch dimension if
+        `batched_params` is `True`, or if the shapes of the encoded values are
+        not fully defined.
+    """
+    values = list(encoded_x.values()) + list(decode_before_sum_params)
+    with tf.compat.v1.name_scope(name,
+                                 'gather_encoder_decode_before_sum_batch',
+                                 values):
+      encoded_x = tf.nest.map_structure(tf.convert_to_tensor, encoded_x)
+      decode_before_sum_params = tf.nest.map_structure(
+          tf.convert_to_tensor, decode_before_sum_params)
+      return self._decode_before_sum_batch_fn(encoded_x,
+                                              decode_before_sum_params,
+                                              bool(batched_params))
+
   def decode_after_sum(self,
                        part_decoded_x,
                        decode_after_sum_params,
@@ -0,0 +1,138 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks for the `gather_encoder` module.
+
+Compares encoding the values of many clients one at a time using the `encode`
+method with encoding all of them at once using the `encode_batch` method. The
+benchmarks run in eager mode, where the cost of calling the `encode` method
+from Python for every client is what limits the simulation of many clients.
+
+The `batched_params` benchmarks use params drawn for every client. The stateless
+random operations seeded by them are run in a sequential loop over the clients,
+as are those seeded in the `encode` method, and regenerated by the
+`decode_before_sum_batch` method.
+
+Run with `--benchmarks=.` to run all benchmarks, or with a regular expression
+matching the names of the benchmarks to run.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import core_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import gather_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.encoders import common_encoders
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.stages.research import quantization
+
+_NUM_ELEMENTS = 1000
+_NUM_CLIENTS = [1, 16, 128, 1024]
+_NUM_ITERS = 5
+
+
+class GatherEncoderBenchmark(tf.test.Benchmark):
+  """Benchmarks for `GatherEncoder`."""
+
+  def _benchmark(self, name, run_fn, encoder=None):
+    """Benchmarks encoding the values of a varying number of clients.
+
+    Args:
+      name: Name of the benchmark.
+      run_fn: A callable which accepts a `GatherEncoder` and the values of the
+        clients, and returns a no-arg callable to be benchmarked.
+      encoder: The `Encoder` to benchmark. Defaults to the hadamard
+        quantization `Encoder`.
+    """
+    if encoder is None:
+      encoder = common_encoders.hadamard_quantization(8)
+    encoder = gather_encoder.GatherEncoder.from_encoder(
+        encoder, tf.TensorSpec((_NUM_ELEMENTS,), tf.float32))
+    for num_clients in _NUM_CLIENTS:
+      x = tf.random.normal((num_clients, _NUM_ELEMENTS))
+      fn = run_fn(encoder, x)
+      # The first call traces the functions for the new number of clients.
+      fn()
+      start = time.time()
+      for _ in range(_NUM_ITERS):
+        fn()
+      wall_time = (time.time() - start) / _NUM_ITERS
+      self.report_benchmark(
+          name='%s_%d_values_per_second' % (name, num_clients),
+          iters=_NUM_ITERS,
+          wall_time=wall_time,
+          throughput=num_clients * _NUM_ELEMENTS / wall_time)
+
+  def benchmark_encode(self):
+
+    def run_fn(encoder, x):
+      encode_params, _, _ = encoder.get_params()
+      return lambda: [encoder.encode(x_i, encode_params) for x_i in x]
+
+    self._benchmark('encode', run_fn)
+
+  def benchmark_encode_batch(self):
+
+    def run_fn(encoder, x):
+      encode_params, _, _ = encoder.get_params()
+      return lambda: encoder.encode_batch(x, encode_params)
+
+    self._benchmark('encode_batch', run_fn)
+
+  def benchmark_encode_batch_batched_params(self):
+
+    def run_fn(encoder, x):
+      encode_params, _, _ = _batched_params(encoder, x.shape[0])
+      return lambda: encoder.encode_batch(
+          x, encode_params, batched_params=True)
+
+    self._benchmark('encode_batch_batched_params', run_fn)
+
+  def benchmark_decode_before_sum(self):
+
+    def run_fn(encoder, x):
+      encode_params, decode_params, _ = encoder.get_params()
+      encoded_x = [encoder.encode(x_i, encode_params)[0] for x_i in x]
+      return lambda: [encoder.decode_before_sum(e, decode_params)
+                      for e in encoded_x]
+
+    self._benchmark('decode_before_sum', run_fn, _prng_quantization())
+
+  def benchmark_decode_before_sum_batch(self):
+
+    def run_fn(encoder, x):
+      encode_params, decode_params, _ = encoder.get_params()
+      encoded_x, _ = encoder.encode_batch(x, encode_params)
+      return lambda: encoder.decode_before_sum_batch(encoded_x, decode_params)
+
+    self._benchmark('decode_before_sum_batch', run_fn, _prng_quantization())
+
+
+def _batched_params(encoder, num_clients):
+  """Returns the params of `encoder` drawn for every client and stacked."""
+  params = [encoder.get_params() for _ in range(num_clients)]
+  return tf.nest.map_structure(lambda *t: tf.stack(t), *params)
+
+
+def _prng_quantization():
+  """Returns an `Encoder` regenerating its random values when decoding."""
+  return core_encoder.EncoderComposer(
+      quantization.PRNGUniformQuantizationEncodingStage(8)).make()
+
+
+if __name__ == '__main__':
+  tf.test.main()
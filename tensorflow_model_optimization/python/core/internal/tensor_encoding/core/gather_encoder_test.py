@@ -240,6 +240,171 @@ class GatherEncoderTest(tf.test.TestCase, parameterized.TestCase):
     # We are not in control of ordering of the elements in state tuple.
     self.assertAllClose(sorted(expected_state), sorted(data.updated_state))
 
+  @tf_test_util.run_all_in_graph_and_eager_modes
+  def test_encode_batch(self):
+    """Tests that encoding a batch is equivalent to encoding each value."""
+    encoder = core_encoder.EncoderComposer(
+        test_utils.SignIntFloatEncodingStage())
+    encoder.add_child(test_utils.TimesTwoEncodingStage(), SIF_SIGNS)
+    encoder.add_child(test_utils.PlusOneOverNEncodingStage(), SIF_INTS)
+    encoder.add_child(test_utils.ReduceMeanEncodingStage(), SIF_FLOATS)
+    encoder = gather_encoder.GatherEncoder.from_encoder(
+        encoder.make(), tf.TensorSpec((2, 3), tf.float32))
+    x = tf.random.uniform((4, 2, 3), minval=-5.0, maxval=5.0)
+
+    encode_params, decode_before_sum_params, decode_after_sum_params = (
+        encoder.get_params())
+    encoded_x, state_update_tensors = encoder.encode_batch(x, encode_params)
+    part_decoded_x = encoder.decode_before_sum_batch(encoded_x,
+                                                     decode_before_sum_params)
+    summed_part_decoded_x = tf.nest.map_structure(
+        lambda t: tf.reduce_sum(t, axis=0), part_decoded_x)
+    decoded_x = encoder.decode_after_sum(summed_part_decoded_x,
+                                         decode_after_sum_params, 4)
+
+    expected_encoded_x, expected_part_decoded_x = [], []
+    for i in range(4):
+      encoded_x_i, _ = encoder.encode(x[i], encode_params)
+      expected_encoded_x.append(encoded_x_i)
+      expected_part_decoded_x.append(
+          encoder.decode_before_sum(encoded_x_i, decode_before_sum_params))
+    expected_encoded_x = tf.nest.map_structure(lambda *t: tf.stack(t),
+                                               *expected_encoded_x)
+    expected_part_decoded_x = tf.nest.map_structure(
+        lambda *t: tf.stack(t), *expected_part_decoded_x)
+
+    data = self.evaluate({
+        'x': x,
+        'encoded_x': encoded_x,
+        'expected_encoded_x': expected_encoded_x,
+        'part_decoded_x': part_decoded_x,
+        'expected_part_decoded_x': expected_part_decoded_x,
+        'decoded_x': decoded_x,
+    })
+    self.assertEqual((), state_update_tensors)
+    self.assertAllClose(data['expected_encoded_x'], data['encoded_x'])
+    self.assertAllClose(data['expected_part_decoded_x'],
+                        data['part_decoded_x'])
+    self.assertEqual(4, len(tf.nest.flatten(data['part_decoded_x'])[0]))
+    # The mean of the fractional parts is lossy, the rest is lossless.
+    expected_decoded_x = np.sum(
+        np.sign(data['x']) * (np.floor(np.abs(data['x'])) + np.mean(
+            np.abs(data['x']) - np.floor(np.abs(data['x'])),
+            axis=(1, 2),
+            keepdims=True)),
+        axis=0)
+    self.assertAllClose(expected_decoded_x, data['decoded_x'])
+
+  @tf_test_util.run_all_in_graph_and_eager_modes
+  def test_encode_batch_state_update_tensors(self):
+    """Tests that batched state update tensors can be aggregated."""
+    encoder = gather_encoder.GatherEncoder.from_encoder(
+        core_encoder.EncoderComposer(
+            test_utils.StateUpdateTensorsEncodingStage()).make(),
+        tf.TensorSpec((5,), tf.float32))
+    x = tf.random.uniform((3, 5))
+
+    state = encoder.initial_state()
+    encode_params, _, _ = encoder.get_params(state)
+    _, state_update_tensors = encoder.encode_batch(x, encode_params)
+    state_update_tensors = _aggregate_structure(
+        [[t[i] for t in state_update_tensors] for i in range(3)],
+        encoder.state_update_aggregation_modes)
+    updated_state = encoder.update_state(state, state_update_tensors)
+    x, updated_state = self.evaluate([x, updated_state])
+
+    expected_state = [np.sum(x), np.amin(x), np.amax(x), 15]
+    # We are not in control of ordering of the elements in state tuple.
+    self.assertAllClose(sorted(expected_state), sorted(updated_state))
+
+  @tf_test_util.run_all_in_graph_and_eager_modes
+  def test_encode_batch_randomness_per_value(self):
+    """Tests that random operations are independent for each value."""
+    encoder = gather_encoder.GatherEncoder.from_encoder(
+        core_encoder.EncoderComposer(
+            test_utils.RandomAddSubtractOneEncodingStage()).make(),
+        tf.TensorSpec((100,), tf.float32))
+    encode_params, _, _ = encoder.get_params()
+    encoded_x, _ = encoder.encode_batch(tf.zeros((2, 100)), encode_params)
+    encoded_x = self.evaluate(list(encoded_x.values())[0])
+
+    self.assertAllEqual(np.ones((2, 100)), np.abs(encoded_x))
+    self.assertNotAllEqual(encoded_x[0], encoded_x[1])
+
+  @tf_test_util.run_all_in_graph_and_eager_modes
+  def test_encode_batch_batched_params(self):
+    """Tests that batched params are used for the corresponding values."""
+    encoder = gather_encoder.GatherEncoder.from_encoder(
+        core_encoder.EncoderComposer(
+            test_utils.PlusRandomNumEncodingStage()).make(),
+        tf.TensorSpec((5,), tf.float32))
+    x = tf.random.uniform((3, 5))
+
+    # The only params are the seeds of the stage, set for every value.
+    encode_params, decode_before_sum_params, _ = tf.nest.map_structure(
+        lambda _: tf.constant([3, 5, 7]), encoder.get_params())
+    encoded_x, _ = encoder.encode_batch(
+        x, encode_params, batched_params=True)
+    part_decoded_x = encoder.decode_before_sum_batch(
+        encoded_x, decode_before_sum_params, batched_params=True)
+
+    expected_encoded_x, expected_part_decoded_x = [], []
+    for i in range(3):
+      encoded_x_i, _ = encoder.encode(x[i], tuple(p[i] for p in encode_params))
+      expected_encoded_x.append(encoded_x_i)
+      expected_part_decoded_x.append(
+          encoder.decode_before_sum(
+              encoded_x_i, tuple(p[i] for p in decode_before_sum_params)))
+    expected_encoded_x = tf.nest.map_structure(lambda *t: tf.stack(t),
+                                               *expected_encoded_x)
+    expected_part_decoded_x = tf.nest.map_structure(
+        lambda *t: tf.stack(t), *expected_part_decoded_x)
+
+    data = self.evaluate({
+        'x': x,
+        'encoded_x': encoded_x,
+        'expected_encoded_x': expected_encoded_x,
+        'part_decoded_x': part_decoded_x,
+        'expected_part_decoded_x': expected_part_decoded_x,
+    })
+    self.assertAllClose(data['expected_encoded_x'], data['encoded_x'])
+    self.assertAllClose(data['expected_part_decoded_x'],
+                        data['part_decoded_x'])
+    # The random values of up to 136 are added and subtracted again.
+    self.assertAllClose(
+        data['x'], tf.nest.flatten(data['part_decoded_x'])[0], atol=1e-4)
+    # The values added for every seed differ.
+    self.assertAllClose(
+        [[4, 52, 128, 20, 123], [6, 78, 55, 30, 116], [8, 104, 119, 40, 109]],
+        tf.nest.flatten(data['encoded_x'])[0] - data['x'],
+        atol=1e-4)
+
+  def test_encode_batch_batched_params_incompatible_raises(self):
+    """Tests that batched params require a leading batch dimension."""
+    encoder = gather_encoder.GatherEncoder.from_encoder(
+        core_encoder.EncoderComposer(
+            test_utils.PlusRandomNumEncodingStage()).make(),
+        tf.TensorSpec((5,), tf.float32))
+    encode_params, decode_before_sum_params, _ = encoder.get_params()
+    encoded_x, _ = encoder.encode_batch(tf.zeros((3, 5)), encode_params)
+
+    with self.assertRaises(ValueError):
+      encoder.encode_batch(
+          tf.zeros((3, 5)), encode_params, batched_params=True)
+    with self.assertRaises(ValueError):
+      encoder.decode_before_sum_batch(
+          encoded_x, decode_before_sum_params, batched_params=True)
+
+  @parameterized.parameters([(3,)], [(2, 4)], [(2, 3, 1)])
+  def test_encode_batch_incompatible_x_raises(self, shape):
+    """Tests that encode_batch requires a leading batch dimension."""
+    encoder = gather_encoder.GatherEncoder.from_encoder(
+        core_encoder.EncoderComposer(test_utils.TimesTwoEncodingStage()).make(),
+        tf.TensorSpec((3,), tf.float32))
+    encode_params, _, _ = encoder.get_params()
+    with self.assertRaisesRegex(ValueError, 'leading batch dimension'):
+      encoder.encode_batch(tf.zeros(shape), encode_params)
+
   def test_input_tensorspec(self):
     """Tests input_tensorspec property."""
     x = tf.constant([[1.0, 2.0], [3.0, 4.0]])
@@ -0,0 +1,651 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Encoder for a nested structure of values in the "many-to-one" case."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import core_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import trace_cache
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils import py_utils
+
+_PARAMS = 'params'
+_SHAPES = 'shapes'
+_TENSORS = 'tensors'
+
+# Tensors with at most this many elements are fused by default.
+_DEFAULT_MAX_FUSED_NUM_ELEMENTS = 1024
+
+# A group of flattened input values encoded together by one `Encoder`.
+# `indices` are the positions of the values in the flattened input structure,
+# `tensorspec` describes the value passed to the `Encoder`, and `encoder` is the
+# `Encoder` itself. If `fused` is True, the values are reshaped to vectors and
+# concatenated.
+_Group = collections.namedtuple('_Group',
+                                ['indices', 'tensorspec', 'encoder', 'fused'])
+
+
+def _group_tensorspecs(flat_tensorspecs, flat_encoders, max_fused_num_elements):
+  """Splits `flat_tensorspecs` into groups to be encoded together.
+
+  Every tensorspec with more than `max_fused_num_elements` elements is a group
+  of its own. The remaining tensorspecs are grouped by dtype and by the
+  configuration of their `Encoder`s, so that only values which would be
+  encoded the same way on their own are fused. Values whose `Encoder`s can not
+  be compared are not fused.
+
+  Args:
+    flat_tensorspecs: A list of `tf.TensorSpec` objects.
+    flat_encoders: A list of the `Encoder` objects for `flat_tensorspecs`.
+    max_fused_num_elements: The maximum number of elements of a fused value.
+
+  Returns:
+    A list of `_Group` tuples.
+  """
+  groups = []
+  fused_indices = collections.OrderedDict()
+  for i, (spec, encoder) in enumerate(zip(flat_tensorspecs, flat_encoders)):
+    key = trace_cache.encoder_key(encoder)
+    if spec.shape.num_elements() > max_fused_num_elements or key is None:
+      groups.append(_Group([i], spec, encoder, False))
+    else:
+      fused_indices.setdefault((spec.dtype, key), []).append(i)
+
+  for (dtype, _), indices in fused_indices.items():
+    # The values have equally configured encoders, of which the first one is
+    # used to encode all of them.
+    encoder = flat_encoders[indices[0]]
+    if len(indices) == 1:
+      groups.append(
+          _Group(indices, flat_tensorspecs[indices[0]], encoder, False))
+    else:
+      num_elements = sum(
+          flat_tensorspecs[i].shape.num_elements() for i in indices)
+      groups.append(
+          _Group(indices, tf.TensorSpec([num_elements], dtype), encoder, True))
+  return groups
+
+
+def _fuse(flat_x, groups):
+  """Returns the values to be encoded by the `Encoder` of each group."""
+  values = []
+  for group in groups:
+    if group.fused:
+      values.append(
+          tf.concat([tf.reshape(flat_x[i], [-1]) for i in group.indices],
+                    axis=0))
+    else:
+      values.append(flat_x[group.indices[0]])
+  return values
+
+
+def _unfuse(values, groups, flat_tensorspecs):
+  """Inverse of `_fuse`, returning the flattened input structure."""
+  flat_x = [None] * len(flat_tensorspecs)
+  for value, group in zip(values, groups):
+    if group.fused:
+      sizes = [flat_tensorspecs[i].shape.num_elements() for i in group.indices]
+      for i, part in zip(group.indices, tf.split(value, sizes)):
+        flat_x[i] = tf.reshape(part, flat_tensorspecs[i].shape)
+    else:
+      flat_x[group.indices[0]] = value
+  return flat_x
+
+
+class NestGatherEncoder(object):
+  """A class for gather-like operations with encoding of nested structures.
+
+  This class provides the same functionality as `GatherEncoder`, for a nested
+  structure of values, such as all `Variable`s of a model, instead of a single
+  `Tensor`. The methods of this class mirror the methods of `GatherEncoder`,
+  and are used in the same pattern, except that `encode` accepts, and
+  `decode_after_sum` returns, a structure of the `tf.TensorSpec`s provided at
+  construction time.
+
+  Unlike creating one `GatherEncoder` for every value, which traces separate
+  `tf.function`s for every value, a `NestGatherEncoder` traces a single
+  `tf.function` for each of its methods, which encodes or decodes all of the
+  values. In addition, small values of the same dtype, for which equally
+  configured `Encoder`s are provided, are reshaped to vectors and concatenated,
+  and the concatenated vector is encoded as a single value. This reduces the
+  number of operations in the encoding and decoding graphs for models with many
+  small `Variable`s, such as biases.
+
+  NOTE The concatenated values share the parameters of a single encoding. For
+  instance, with uniform quantization, they are quantized using the minimum and
+  maximum of all of the concatenated values.
+  """
+
+  def __init__(self, tensorspecs, fully_commutes_with_sum,
+               state_update_aggregation_modes, initial_state_fn, get_params_fn,
+               encode_fn, decode_before_sum_fn, decode_after_sum_fn,
+               update_state_fn):
+    """Creates a `NestGatherEncoder` for encoding `tensorspecs`-like values.
+
+    This class should not be instantiated directly. Instead, use the
+    provided `@classmethod`.
+
+    Args:
+      tensorspecs: A structure of `tf.TensorSpec` objects. The created
+        `NestGatherEncoder` will be constrained to only encode input values
+        compatible with `tensorspecs`.
+      fully_commutes_with_sum: Whether all of the underlying encoders fully
+        commute with sum.
+      state_update_aggregation_modes: The `StageAggregationMode` values to be
+        used to aggregate `state_update_tensors`
+      initial_state_fn: A `tf.function`.
+      get_params_fn: A `tf.function`.
+      encode_fn: A `tf.function`.
+      decode_before_sum_fn: A `tf.function`.
+      decode_after_sum_fn: A `tf.function`.
+      update_state_fn: A `tf.function`.
+
+    Returns:
+      A `NestGatherEncoder`.
+    """
+    self._tensorspecs = tensorspecs
+    self._fully_commutes_with_sum = fully_commutes_with_sum
+    self._state_update_aggregation_modes = state_update_aggregation_modes
+
+    self._initial_state_fn = initial_state_fn
+    self._get_params_fn = get_params_fn
+    self._encode_fn = encode_fn
+    self._decode_before_sum_fn = decode_before_sum_fn
+    self._decode_after_sum_fn = decode_after_sum_fn
+    self._update_state_fn = update_state_fn
+
+  @classmethod
+  def from_encoder_fn(cls,
+                      encoder_fn,
+                      tensorspecs,
+                      max_fused_num_elements=_DEFAULT_MAX_FUSED_NUM_ELEMENTS):
+    """Creates a `NestGatherEncoder` for encoding `tensorspecs`-like values.
+
+    The `encoder_fn` is called for the `tf.TensorSpec` of every value in
+    `tensorspecs`, and every value is encoded as configured by the returned
+    `Encoder`. Values with at most `max_fused_num_elements` elements, of the
+    same dtype and with `Encoder`s composed of the same encoding stages with
+    the same configuration, are reshaped to vectors and concatenated. The
+    concatenated vector is encoded by one of these `Encoder`s, which must thus
+    accept rank 1 values.
+
+    Args:
+      encoder_fn: A Python callable, which accepts a `tf.TensorSpec` and
+        returns an `Encoder` object to be used for encoding values compatible
+        with it.
+      tensorspecs: A structure of `tf.TensorSpec` objects, compatible with
+        `tf.nest`. The created `NestGatherEncoder` will be constrained to only
+        encode input values compatible with `tensorspecs`.
+      max_fused_num_elements: The maximum number of elements of values which
+        are concatenated before encoding. Use 0 to encode every value
+        separately.
+
+    Returns:
+      A `NestGatherEncoder`.
+
+    Raises:
+      TypeError:
+        If `tensorspecs` contains a value which is not a `tf.TensorSpec` or has
+        a shape which is not fully defined, or if `encoder_fn` does not return
+        an `Encoder`.
+    """
+    flat_tensorspecs = tf.nest.flatten(tensorspecs)
+    for spec in flat_tensorspecs:
+      if not isinstance(spec, tf.TensorSpec):
+        raise TypeError('Each value in tensorspecs must be a tf.TensorSpec.')
+      if not spec.shape.is_fully_defined():
+        raise TypeError(
+            'The shape of each provided tensorspec must be fully defined.')
+
+    flat_encoders = [encoder_fn(spec) for spec in flat_tensorspecs]
+    for encoder in flat_encoders:
+      if not isinstance(encoder, core_encoder.Encoder):
+        raise TypeError('The encoder_fn must return an instance of `Encoder`.')
+
+    groups = _group_tensorspecs(flat_tensorspecs, flat_encoders,
+                                max_fused_num_elements)
+    # The encoders and the values of the groups are kept in dictionaries keyed
+    # by zero padded strings, so that their order matches the order of
+    # the keys of flat dictionaries returned to the user.
+    keys = [str(i).zfill(len(str(len(groups)))) for i in range(len(groups))]
+    encoders = {key: group.encoder for key, group in zip(keys, groups)}
+    group_tensorspecs = {
+        key: group.tensorspec for key, group in zip(keys, groups)
+    }
+
+    commuting_structures = {
+        key: encoder.commuting_structure for key, encoder in encoders.items()
+    }
+    fully_commutes_with_sum = all(tf.nest.flatten(commuting_structures))
+    state_update_aggregation_modes = tf.nest.flatten({
+        key: encoder.state_update_aggregation_modes
+        for key, encoder in encoders.items()
+    })
+
+    # Python values are carried between the `tf.function`s created below in
+    # the same way as in `GatherEncoder.from_encoder`, where the motivation for
+    # this pattern is explained in detail.
+    internal_structure = {}
+    internal_py_values = {}
+
+    def _add_to_structure(key, value):
+      if key not in internal_structure:
+        internal_structure[key] = tf.nest.map_structure(lambda _: None, value)
+
+    def _add_to_py_values(key, value):
+      if key not in internal_py_values:
+        internal_py_values[key] = value
+
+    def _zeros():
+      return {
+          key: tf.zeros(spec.shape, spec.dtype)
+          for key, spec in group_tensorspecs.items()
+      }
+
+    @tf.function
+    def initial_state_fn():
+      """See the `initial_state` method of this class."""
+      state = {
+          key: encoder.initial_state() for key, encoder in encoders.items()
+      }
+      _add_to_structure('state', state)
+      return tuple(tf.nest.flatten(state))
+
+    state = initial_state_fn()
+    flat_state_spec = tf.nest.map_structure(tf.TensorSpec.from_tensor, state)
+
+    @tf.function
+    def get_params_fn(flat_state):
+      """See the `get_params` method of this class."""
+      py_utils.assert_compatible(flat_state_spec, flat_state)
+      state = tf.nest.pack_sequence_as(internal_structure['state'], flat_state)
+
+      zeros = _zeros()
+      encode_params = {}
+      decode_before_sum_params = {}
+      decode_after_sum_params = {}
+      for key, encoder in encoders.items():
+        encode_params[key], decode_params = encoder.get_params(state[key])
+        decode_before_sum_params[key], group_decode_after_sum_params = (
+            core_encoder.split_params_by_commuting_structure(
+                decode_params, commuting_structures[key]))
+
+        # Get the portion of input_shapes that will be relevant in the
+        # decode_after_sum method and fold it into the params exposed to user.
+        _, _, input_shapes = encoder.encode(zeros[key], encode_params[key])
+        _, input_shapes_after_sum = (
+            core_encoder.split_shapes_by_commuting_structure(
+                input_shapes, commuting_structures[key]))
+        decode_after_sum_params[key] = {
+            _PARAMS: group_decode_after_sum_params,
+            _SHAPES: input_shapes_after_sum
+        }
+
+      encode_params_py, encode_params_tf = py_utils.split_dict_py_tf(
+          encode_params)
+      decode_before_sum_params_py, decode_before_sum_params_tf = (
+          py_utils.split_dict_py_tf(decode_before_sum_params))
+      decode_after_sum_params_py, decode_after_sum_params_tf = (
+          py_utils.split_dict_py_tf(decode_after_sum_params))
+
+      _add_to_structure('encode_params', encode_params_tf)
+      _add_to_structure('decode_before_sum_params', decode_before_sum_params_tf)
+      _add_to_structure('decode_after_sum_params', decode_after_sum_params_tf)
+      _add_to_py_values('encode_params', encode_params_py)
+      _add_to_py_values('decode_before_sum_params', decode_before_sum_params_py)
+      _add_to_py_values('decode_after_sum_params', decode_after_sum_params_py)
+
+      return (tuple(tf.nest.flatten(encode_params_tf)),
+              tuple(tf.nest.flatten(decode_before_sum_params_tf)),
+              tuple(tf.nest.flatten(decode_after_sum_params_tf)))
+
+    encode_params, decode_before_sum_params, decode_after_sum_params = (
+        get_params_fn(state))
+    encode_params_spec = tf.nest.map_structure(tf.TensorSpec.from_tensor,
+                                               encode_params)
+    decode_before_sum_params_spec = tf.nest.map_structure(
+        tf.TensorSpec.from_tensor, decode_before_sum_params)
+    decode_after_sum_params_spec = tf.nest.map_structure(
+        tf.TensorSpec.from_tensor, decode_after_sum_params)
+
+    @tf.function
+    def encode_fn(x, params):
+      """See the `encode` method of this class."""
+      try:
+        tf.nest.assert_same_structure(tensorspecs, x)
+      except (TypeError, ValueError):
+        raise ValueError(
+            'The provided x is not compatible with the expected tensorspecs.')
+      flat_x = tf.nest.flatten(x)
+      if not all(
+          spec.is_compatible_with(value)
+          for spec, value in zip(flat_tensorspecs, flat_x)):
+        raise ValueError(
+            'The provided x is not compatible with the expected tensorspecs.')
+      py_utils.assert_compatible(encode_params_spec, params)
+
+      x = dict(zip(keys, _fuse(flat_x, groups)))
+      params = py_utils.merge_dicts(
+          tf.nest.pack_sequence_as(internal_structure['encode_params'], params),
+          internal_py_values['encode_params'])
+      encoded_x = {}
+      input_shapes_before_sum = {}
+      state_update_tensors = {}
+      for key, encoder in encoders.items():
+        encoded_x[key], state_update_tensors[key], input_shapes = (
+            encoder.encode(x[key], params[key]))
+        input_shapes_before_sum[key], _ = (
+            core_encoder.split_shapes_by_commuting_structure(
+                input_shapes, commuting_structures[key]))
+
+      encoded_structure = {
+          _TENSORS: encoded_x,
+          _SHAPES: input_shapes_before_sum
+      }
+      encoded_structure_py, encoded_structure_tf = py_utils.split_dict_py_tf(
+          encoded_structure)
+
+      _add_to_structure('encoded_structure', encoded_structure_tf)
+      _add_to_structure('state_update_tensors', state_update_tensors)
+      _add_to_py_values('encoded_structure', encoded_structure_py)
+
+      return (dict(
+          py_utils.flatten_with_joined_string_paths(encoded_structure_tf)),
+              tuple(tf.nest.flatten(state_update_tensors)))
+
+    zero_x = tf.nest.map_structure(lambda s: tf.zeros(s.shape, s.dtype),
+                                   tensorspecs)
+    encoded_structure, state_update_tensors = encode_fn(zero_x, encode_params)
+    # The spec is created from the traced outputs, as the shape of some encoded
+    # values can depend on the values being encoded. In eager mode, the shapes
+    # of the returned values would be only those for the encoded zeros.
+    encoded_structure_spec = tf.nest.map_structure(
+        tf.TensorSpec.from_tensor,
+        encode_fn.get_concrete_function(
+            zero_x, encode_params).structured_outputs[0])
+
+    @tf.function
+    def decode_before_sum_fn(encoded_structure, params):
+      """See the `decode_before_sum` method of this class."""
+      py_utils.assert_compatible(encoded_structure_spec, encoded_structure)
+      py_utils.assert_compatible(decode_before_sum_params_spec, params)
+
+      encoded_structure = py_utils.merge_dicts(
+          tf.nest.pack_sequence_as(internal_structure['encoded_structure'],
+                                   tf.nest.flatten(encoded_structure)),
+          internal_py_values['encoded_structure'])
+      params = py_utils.merge_dicts(
+          tf.nest.pack_sequence_as(
+              internal_structure['decode_before_sum_params'], params),
+          internal_py_values['decode_before_sum_params'])
+
+      part_decoded_structure = {}
+      for key, encoder in encoders.items():
+        part_decoded_structure[key] = encoder.decode_before_sum(
+            encoded_structure[_TENSORS][key], params[key],
+            encoded_structure[_SHAPES][key])
+
+      _add_to_structure('part_decoded_structure', part_decoded_structure)
+      return dict(
+          py_utils.flatten_with_joined_string_paths(part_decoded_structure))
+
+    part_decoded_structure = decode_before_sum_fn(encoded_structure,
+                                                  decode_before_sum_params)
+    part_decoded_structure_spec = tf.nest.map_structure(
+        tf.TensorSpec.from_tensor, part_decoded_structure)
+
+    @tf.function
+    def decode_after_sum_fn(part_decoded_structure, params, num_summands):
+      """See the `decode_after_sum` method of this class."""
+      py_utils.assert_compatible(part_decoded_structure_spec,
+                                 part_decoded_structure)
+      py_utils.assert_compatible(decode_after_sum_params_spec, params)
+
+      part_decoded_structure = tf.nest.pack_sequence_as(
+          internal_structure['part_decoded_structure'],
+          tf.nest.flatten(part_decoded_structure))
+      params = py_utils.merge_dicts(
+          tf.nest.pack_sequence_as(
+              internal_structure['decode_after_sum_params'], params),
+          internal_py_values['decode_after_sum_params'])
+
+      decoded_x = [
+          encoders[key].decode_after_sum(part_decoded_structure[key],
+                                         params[key][_PARAMS], num_summands,
+                                         params[key][_SHAPES]) for key in keys
+      ]
+      flat_x = _unfuse(decoded_x, groups, flat_tensorspecs)
+      return tf.nest.pack_sequence_as(tensorspecs, flat_x)
+
+    # The number of summands is traced as a `Tensor`, as passed by the
+    # `decode_after_sum` method.
+    decoded_x = decode_after_sum_fn(part_decoded_structure,
+                                    decode_after_sum_params, tf.constant(1))
+    assert all(
+        spec.is_compatible_with(value) for spec, value in zip(
+            flat_tensorspecs, tf.nest.flatten(decoded_x)))
+
+    @tf.function
+    def update_state_fn(flat_state, state_update_tensors):
+      """See the `update_state` method of this class."""
+      py_utils.assert_compatible(flat_state_spec, flat_state)
+      state = tf.nest.pack_sequence_as(internal_structure['state'], flat_state)
+      state_update_tensors = tf.nest.pack_sequence_as(
+          internal_structure['state_update_tensors'], state_update_tensors)
+      updated_state = {
+          key: encoder.update_state(state[key], state_update_tensors[key])
+          for key, encoder in encoders.items()
+      }
+      return tuple(tf.nest.flatten(updated_state))
+
+    # Ensures the update_state_fn is traced during initialization.
+    updated_state = update_state_fn(state, state_update_tensors)
+    tf.nest.assert_same_structure(state, updated_state)
+
+    return cls(tensorspecs, fully_commutes_with_sum,
+               state_update_aggregation_modes, initial_state_fn, get_params_fn,
+               encode_fn, decode_before_sum_fn, decode_after_sum_fn,
+               update_state_fn)
+
+  @property
+  def input_tensorspecs(self):
+    """Returns the structure of `tf.TensorSpec`s describing expected input."""
+    return self._tensorspecs
+
+  @property
+  def fully_commutes_with_sum(self):
+    """Returns True if all of the underlying `Encoder`s commute with sum."""
+    return self._fully_commutes_with_sum
+
+  @property
+  def state_update_aggregation_modes(self):
+    """Returns `state_update_aggregation_modes` of the underlying `Encoder`s."""
+    return self._state_update_aggregation_modes
+
+  def initial_state(self, name=None):
+    """Returns the initial state.
+
+    Args:
+      name: `string`, name of the operation.
+
+    Returns:
+      A tuple of `Tensor` values, representing the initial state.
+    """
+    with tf.compat.v1.name_scope(name, 'nest_gather_encoder_initial_state'):
+      return self._initial_state_fn()
+
+  def get_params(self, state=None, name=None):
+    """Returns parameters controlling the behavior of the `NestGatherEncoder`.
+
+    If `state` is not provided, the return value of the `initial_state` method
+    will be used.
+
+    Args:
+      state: The (optional) current state. A tuple, matching the structure
+        returned by the `initial_state` method.
+      name: `string`, name of the operation.
+
+    Returns:
+      A tuple `(encode_params, decode_before_sum_params,
+      decode_after_sum_params)`, where all of these are tuples of `Tensor`
+      values, expected as inputs to the `encode`, `decode_before_sum` and
+      `decode_after_sum` methods, respectively.
+
+    Raises:
+      ValueError:
+        If `state` is not `None` and does not have the same structure as the
+        return value of the `initial_state` method.
+    """
+    if state is None:
+      state = self.initial_state()
+    with tf.compat.v1.name_scope(name, 'nest_gather_encoder_get_params',
+                                 list(state)):
+      state = tf.nest.map_structure(tf.convert_to_tensor, state)
+      return self._get_params_fn(state)
+
+  def encode(self, x, encode_params, name=None):
+    """Encodes the provided input.
+
+    Args:
+      x: A structure of `Tensor` values to be encoded, matching the
+        `input_tensorspecs` property.
+      encode_params: Parameters controlling the encoding. A tuple, matching the
+        corresponding structure returned by the `get_params` method.
+      name: `string`, name of the operation.
+
+    Returns:
+      A `(encoded_x, state_update_tensors)` tuple, where `encoded_x` is a
+      dictionary of `Tensor` values representing the encoded `x`, and
+      `state_update_tensors` is a tuple of `Tensor` values, which are expected
+      to be aggregated according to modes provided by the
+      `state_update_aggregation_modes` property, and afterwards passed to the
+      `update_state` method.
+
+    Raises:
+      ValueError:
+        If `x` does not have the expected structure, shapes or dtypes, or if
+        `encode_params` does not have the same structure as corresponding
+        return value of the `get_params` method.
+    """
+    values = tf.nest.flatten(x) + list(encode_params)
+    with tf.compat.v1.name_scope(name, 'nest_gather_encoder_encode', values):
+      x = tf.nest.map_structure(tf.convert_to_tensor, x)
+      encode_params = tf.nest.map_structure(tf.convert_to_tensor, encode_params)
+      return self._encode_fn(x, encode_params)
+
+  def decode_before_sum(self, encoded_x, decode_before_sum_params, name=None):
+    """Decodes encoded value, up to the point which commutes with sum.
+
+    Args:
+      encoded_x: A dictionary of `Tensor` values to be decoded. Must be of the
+        same structure as the `encoded_x` returned by the `encode` method.
+      decode_before_sum_params: Parameters controlling the decoding. A tuple,
+        matching the corresponding structure returned by the `get_params`
+        method.
+      name: `string`, name of the operation.
+
+    Returns:
+      A dictionary of `Tensor` values, which is expected to be summed before
+      being passed to the `decode_after_sum` method.
+
+    Raises:
+      ValueError:
+        If `encoded_x` does not have the same structure as corresponding return
+        value of the `encode` method, or if `decode_before_sum_params` does not
+        have the same structure as corresponding return value of the
+        `get_params` method.
+    """
+    values = list(encoded_x.values()) + list(decode_before_sum_params)
+    with tf.compat.v1.name_scope(name, 'nest_gather_encoder_decode_before_sum',
+                                 values):
+      encoded_x = tf.nest.map_structure(tf.convert_to_tensor, encoded_x)
+      decode_before_sum_params = tf.nest.map_structure(
+          tf.convert_to_tensor, decode_before_sum_params)
+      return self._decode_before_sum_fn(encoded_x, decode_before_sum_params)
+
+  def decode_after_sum(self,
+                       part_decoded_x,
+                       decode_after_sum_params,
+                       num_summands,
+                       name=None):
+    """Finishes decoding of encoded value, after summing part-decoded values.
+
+    Args:
+      part_decoded_x: A dictionary of `Tensor` values to be decoded. Must be of
+        the same structure as the return value of the `decode_before_sum`
+        method.
+      decode_after_sum_params: Parameters controlling the decoding. A tuple,
+        matching the corresponding structure returned by the `get_params`
+        method.
+      num_summands: A `Tensor` representing the number of `part_decoded_x`
+        values summed before passed into this method.
+      name: `string`, name of the operation.
+
+    Returns:
+      A structure of `Tensor` values matching the `input_tensorspecs` property.
+
+    Raises:
+      ValueError:
+        If `part_decoded_x` does not have the same structure as the return value
+        of the `decode_before_sum` method, or if `decode_after_sum_params` does
+        not have the same structure as corresponding return value of the
+        `get_params` method.
+    """
+    values = (
+        list(part_decoded_x.values()) + list(decode_after_sum_params) +
+        [num_summands])
+    with tf.compat.v1.name_scope(name, 'nest_gather_encoder_decode_after_sum',
+                                 values):
+      part_decoded_x = tf.nest.map_structure(tf.convert_to_tensor,
+                                             part_decoded_x)
+      decode_after_sum_params = tf.nest.map_structure(tf.convert_to_tensor,
+                                                      decode_after_sum_params)
+      num_summands = tf.convert_to_tensor(num_summands)
+      return self._decode_after_sum_fn(part_decoded_x, decode_after_sum_params,
+                                       num_summands)
+
+  def update_state(self, state, state_update_tensors, name=None):
+    """Updates the state of the `NestGatherEncoder`.
+
+    Args:
+      state: The current state. A tuple, matching the structure returned by the
+        `initial_state` method.
+      state_update_tensors: A tuple of `Tensor` values returned by the `encode`
+        method, aggregated according to modes provided by the
+        `state_update_aggregation_modes` property. Note that the tuple has the
+        same structure, but the `Tensor` values it contains do not necessarily
+        have the same shapes.
+      name: `string`, name of the operation.
+
+    Returns:
+      A tuple of `Tensor` values of the same structure as `state`, representing
+      the updated state.
+
+    Raises:
+      ValueError:
+        If `state` does not have the same structure as the return value of the
+        `initial_state` method.
+    """
+    values = list(state) + list(state_update_tensors)
+    with tf.compat.v1.name_scope(name, 'nest_gather_encoder_update_state',
+                                 values):
+      state = tf.nest.map_structure(tf.convert_to_tensor, state)
+      state_update_tensors = tf.nest.map_structure(tf.convert_to_tensor,
+                                                   state_update_tensors)
+      return self._update_state_fn(state, state_update_tensors)
@@ -0,0 +1,125 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks for the `nest_gather_encoder` module.
+
+Compares a `NestGatherEncoder` for all variables of a model with a separate
+`GatherEncoder` for every variable, measuring the time to create the encoders
+and the time to encode all variables once.
+
+Run with `--benchmarks=.` to run all benchmarks, or with a regular expression
+matching the names of the benchmarks to run.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import gather_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import nest_gather_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.encoders import common_encoders
+
+
+if tf.executing_eagerly():
+  tf.compat.v1.disable_eager_execution()
+
+# Variables with fewer elements are not quantized.
+_MIN_QUANTIZED_NUM_ELEMENTS = 10000
+
+
+def _encoder_fn(tensorspec):
+  if tensorspec.shape.num_elements() < _MIN_QUANTIZED_NUM_ELEMENTS:
+    return common_encoders.identity()
+  return common_encoders.hadamard_quantization(8)
+
+
+class NestGatherEncoderBenchmark(tf.test.Benchmark):
+  """Benchmarks for `NestGatherEncoder`."""
+
+  def _benchmark(self, name, create_encode_fn):
+    """Benchmarks encoding the trainable variables of MobileNetV2.
+
+    Args:
+      name: Name of the benchmark.
+      create_encode_fn: A callable which accepts the list of variables, creates
+        the encoders, and returns a callable which encodes all of the
+        variables, returning the encoded values.
+    """
+    with tf.Graph().as_default(), tf.compat.v1.Session() as sess:
+      model = tf.keras.applications.MobileNetV2(weights=None)
+      variables = model.trainable_variables
+      num_elements = sum(v.shape.num_elements() for v in variables)
+
+      start = time.time()
+      encode_fn = create_encode_fn(variables)
+      encoded_x = encode_fn()
+      startup_time = time.time() - start
+      self.report_benchmark(
+          name='%s_startup' % name,
+          iters=1,
+          wall_time=startup_time,
+          extras={'num_variables': len(variables)})
+
+      sess.run(tf.compat.v1.global_variables_initializer())
+      result = self.run_op_benchmark(
+          sess,
+          tf.nest.flatten(encoded_x),
+          min_iters=5,
+          name='%s_encode' % name)
+      self.report_benchmark(
+          name='%s_encode_values_per_second' % name,
+          iters=1,
+          wall_time=result['wall_time'],
+          throughput=num_elements / result['wall_time'])
+
+  def benchmark_gather_encoder_per_variable(self):
+
+    def create_encode_fn(variables):
+      encoders = [
+          gather_encoder.GatherEncoder.from_encoder(
+              _encoder_fn(tf.TensorSpec(v.shape, v.dtype)),
+              tf.TensorSpec(v.shape, v.dtype)) for v in variables
+      ]
+
+      def encode_fn():
+        encoded_x = []
+        for encoder, v in zip(encoders, variables):
+          encode_params, _, _ = encoder.get_params()
+          encoded_x.append(encoder.encode(v, encode_params)[0])
+        return encoded_x
+
+      return encode_fn
+
+    self._benchmark('gather_encoder_per_variable', create_encode_fn)
+
+  def benchmark_nest_gather_encoder(self):
+
+    def create_encode_fn(variables):
+      encoder = nest_gather_encoder.NestGatherEncoder.from_encoder_fn(
+          _encoder_fn, [tf.TensorSpec(v.shape, v.dtype) for v in variables])
+
+      def encode_fn():
+        encode_params, _, _ = encoder.get_params()
+        return encoder.encode(variables, encode_params)[0]
+
+      return encode_fn
+
+    self._benchmark('nest_gather_encoder', create_encode_fn)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,290 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+# TODO(b/139939526): Move to public API.
+from tensorflow.python.framework import test_util as tf_test_util
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import core_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import encoding_stage
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import nest_gather_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.testing import test_utils
+
+
+def _x_fn():
+  return {
+      'a': tf.random.uniform((20,)),
+      'b': [tf.random.uniform((3, 2)), tf.random.uniform((4,))],
+      'c': tf.random.uniform((5,)),
+  }
+
+
+def _tensorspecs():
+  return tf.nest.map_structure(tf.TensorSpec.from_tensor, _x_fn())
+
+
+def _stage_encoder_fn(stage_fn):
+  return lambda _: core_encoder.EncoderComposer(stage_fn()).make()
+
+
+class NestGatherEncoderTest(tf.test.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters(0, 10)
+  @tf_test_util.run_all_in_graph_and_eager_modes
+  def test_commutativity_with_sum(self, max_fused_num_elements):
+    """Tests that a structure is encoded and decoded as expected."""
+    encoder = nest_gather_encoder.NestGatherEncoder.from_encoder_fn(
+        _stage_encoder_fn(test_utils.TimesTwoEncodingStage), _tensorspecs(),
+        max_fused_num_elements)
+    self.assertTrue(encoder.fully_commutes_with_sum)
+
+    iteration = _make_iteration_function(encoder, _x_fn, 3)
+    data = self.evaluate(iteration(encoder.initial_state()))
+
+    tf.nest.assert_same_structure(_tensorspecs(), data.decoded_x)
+    expected_x = tf.nest.map_structure(lambda *x: np.sum(x, axis=0), *data.x)
+    self.assertAllClose(expected_x, data.decoded_x)
+
+  @tf_test_util.run_all_in_graph_and_eager_modes
+  def test_adaptive_encoder(self):
+    """Tests that the state of every underlying `Encoder` is updated."""
+    encoder = nest_gather_encoder.NestGatherEncoder.from_encoder_fn(
+        _stage_encoder_fn(test_utils.PlusOneOverNEncodingStage), _tensorspecs(),
+        max_fused_num_elements=10)
+    self.assertFalse(encoder.fully_commutes_with_sum)
+
+    iteration = _make_iteration_function(encoder, _x_fn, 2)
+    state = encoder.initial_state()
+    for i in range(1, 4):
+      data = self.evaluate(iteration(state))
+      expected_x = tf.nest.map_structure(lambda *x: np.sum(x, axis=0), *data.x)
+      self.assertAllClose(expected_x, data.decoded_x)
+      self.assertAllEqual([i + 1] * len(state), data.updated_state)
+      state = data.updated_state
+
+  @parameterized.parameters((0, 4), (4, 4), (6, 3), (10, 3), (100, 2))
+  def test_fuses_small_values_of_same_dtype(self, max_fused_num_elements,
+                                            num_groups):
+    """Tests that small values of the same dtype share one `Encoder`."""
+    tensorspecs = _tensorspecs()
+    tensorspecs['c'] = tf.TensorSpec((5,), tf.float64)
+    encoded_tensorspecs = []
+
+    def encoder_fn(tensorspec):
+      encoded_tensorspecs.append(tensorspec)
+      return core_encoder.EncoderComposer(
+          test_utils.StateUpdateTensorsEncodingStage()).make()
+
+    encoder = nest_gather_encoder.NestGatherEncoder.from_encoder_fn(
+        encoder_fn, tensorspecs, max_fused_num_elements)
+
+    # The encoder_fn is called for every value, and every group of values
+    # aggregates 4 state update tensors.
+    self.assertEqual(tf.nest.flatten(tensorspecs), encoded_tensorspecs)
+    self.assertLen(encoder.state_update_aggregation_modes, 4 * num_groups)
+    self.assertIs(tensorspecs, encoder.input_tensorspecs)
+
+  @tf_test_util.run_all_in_graph_and_eager_modes
+  def test_fuses_values_with_same_encoder_configuration(self):
+    """Tests that the `Encoder` returned for every value is honoured."""
+    tensorspecs = {
+        'bias_1': tf.TensorSpec((4,), tf.float32),
+        'bias_2': tf.TensorSpec((6,), tf.float32),
+        'kernel_1': tf.TensorSpec((3, 3), tf.float32),
+        'kernel_2': tf.TensorSpec((2, 5), tf.float32),
+    }
+
+    # One is added to values with fewer than 8 elements, and the other values
+    # are multiplied by two, even if the fused values have more elements.
+    def encoder_fn(tensorspec):
+      if tensorspec.shape.num_elements() < 8:
+        return core_encoder.EncoderComposer(
+            test_utils.PlusOneEncodingStage()).make()
+      return core_encoder.EncoderComposer(
+          test_utils.TimesTwoEncodingStage()).make()
+
+    encoder = nest_gather_encoder.NestGatherEncoder.from_encoder_fn(
+        encoder_fn, tensorspecs, max_fused_num_elements=100)
+
+    x = tf.nest.map_structure(lambda s: tf.random.uniform(s.shape), tensorspecs)
+    encode_params, _, _ = encoder.get_params()
+    encoded_x, _ = encoder.encode(x, encode_params)
+    x, encoded_x = self.evaluate([x, encoded_x])
+
+    # The two small values are fused, and so are the two large values.
+    self.assertLen(encoded_x, 2)
+    encoded_values = sorted(encoded_x.values(), key=lambda v: v.size)
+    self.assertAllClose(
+        np.concatenate([x['bias_1'], x['bias_2']]) + 1.0, encoded_values[0])
+    self.assertAllClose(
+        np.concatenate([x['kernel_1'].flatten(), x['kernel_2'].flatten()]) *
+        2.0, encoded_values[1])
+
+  @tf_test_util.run_all_in_graph_and_eager_modes
+  def test_state_aggregation_modes(self):
+    """Tests that all state updates tensors can be aggregated."""
+    encoder = nest_gather_encoder.NestGatherEncoder.from_encoder_fn(
+        _stage_encoder_fn(test_utils.StateUpdateTensorsEncodingStage),
+        _tensorspecs(),
+        max_fused_num_elements=10)
+    self.assertLen(encoder.state_update_aggregation_modes, 4 * 2)
+
+    iteration = _make_iteration_function(encoder, _x_fn, 3)
+    data = self.evaluate(iteration(encoder.initial_state()))
+
+    flat_x = [tf.nest.flatten(x) for x in data.x]
+    expected_state = []
+    for group in [[0], [1, 2, 3]]:
+      values = np.concatenate(
+          [np.reshape(x[i], [-1]) for x in flat_x for i in group])
+      expected_state.extend(
+          [np.sum(values),
+           np.amin(values),
+           np.amax(values), values.size])
+    # We are not in control of ordering of the elements in state tuple.
+    self.assertAllClose(sorted(expected_state), sorted(data.updated_state))
+
+  def test_traces_each_method_once(self):
+    """Tests that a single `tf.function` is traced for each method."""
+    encoder = nest_gather_encoder.NestGatherEncoder.from_encoder_fn(
+        _stage_encoder_fn(test_utils.PlusOneOverNEncodingStage), _tensorspecs())
+
+    state = encoder.initial_state()
+    encode_params, decode_before_sum_params, decode_after_sum_params = (
+        encoder.get_params(state))
+    encoded_x, state_update_tensors = encoder.encode(_x_fn(), encode_params)
+    part_decoded_x = encoder.decode_before_sum(encoded_x,
+                                               decode_before_sum_params)
+    encoder.decode_after_sum(part_decoded_x, decode_after_sum_params, 1)
+    encoder.update_state(state, state_update_tensors)
+
+    # pylint: disable=protected-access
+    for fn in [
+        encoder._initial_state_fn, encoder._get_params_fn, encoder._encode_fn,
+        encoder._decode_before_sum_fn, encoder._decode_after_sum_fn,
+        encoder._update_state_fn
+    ]:
+      self.assertEqual(1, fn._get_tracing_count())
+    # pylint: enable=protected-access
+
+  def test_incompatible_x_raises(self):
+    """Tests that input of other structure or shapes raises."""
+    encoder = nest_gather_encoder.NestGatherEncoder.from_encoder_fn(
+        _stage_encoder_fn(test_utils.TimesTwoEncodingStage), _tensorspecs())
+    encode_params, _, _ = encoder.get_params()
+
+    x = _x_fn()
+    del x['c']
+    with self.assertRaisesRegex(ValueError, 'not compatible'):
+      encoder.encode(x, encode_params)
+    x = _x_fn()
+    x['a'] = tf.zeros((21,))
+    with self.assertRaisesRegex(ValueError, 'not compatible'):
+      encoder.encode(x, encode_params)
+
+  def test_not_fully_defined_shape_raises(self):
+    """Tests tensorspec without fully defined shape."""
+    with self.assertRaisesRegex(TypeError, 'fully defined'):
+      nest_gather_encoder.NestGatherEncoder.from_encoder_fn(
+          _stage_encoder_fn(test_utils.TimesTwoEncodingStage),
+          [tf.TensorSpec((None,), tf.float32)])
+
+  @parameterized.parameters([1.0, 'str', object])
+  def test_not_an_encoder_raises(self, not_an_encoder):
+    """Tests invalid return value of encoder_fn."""
+    with self.assertRaisesRegex(TypeError, 'Encoder'):
+      nest_gather_encoder.NestGatherEncoder.from_encoder_fn(
+          lambda _: not_an_encoder, _tensorspecs())
+
+  @parameterized.parameters([1.0, 'str', object])
+  def test_not_a_tensorspec_raises(self, not_a_tensorspec):
+    """Tests invalid type of tensorspecs argument."""
+    with self.assertRaisesRegex(TypeError, 'TensorSpec'):
+      nest_gather_encoder.NestGatherEncoder.from_encoder_fn(
+          _stage_encoder_fn(test_utils.TimesTwoEncodingStage),
+          {'a': not_a_tensorspec})
+
+
+TestData = collections.namedtuple('TestData', [
+    'x',
+    'decoded_x',
+    'initial_state',
+    'updated_state',
+])
+
+
+def _make_iteration_function(encoder, x_fn, num_summands):
+  """Returns a tf.function utility for testing."""
+
+  assert isinstance(encoder, nest_gather_encoder.NestGatherEncoder)
+
+  @tf.function
+  def iteration(initial_state):
+    x = []
+    part_decoded_x = []
+    state_update_tensors = []
+
+    encode_params, decode_before_sum_params, decode_after_sum_params = (
+        encoder.get_params(initial_state))
+    for _ in range(num_summands):
+      x_value = x_fn()
+      enc_x, sut = encoder.encode(x_value, encode_params)
+      part_dec_x = encoder.decode_before_sum(enc_x, decode_before_sum_params)
+      x.append(x_value)
+      part_decoded_x.append(part_dec_x)
+      state_update_tensors.append(sut)
+
+    summed_part_decoded_x = tf.nest.map_structure(lambda *x: tf.add_n(x),
+                                                  *part_decoded_x)
+    decoded_x = encoder.decode_after_sum(summed_part_decoded_x,
+                                         decode_after_sum_params, num_summands)
+
+    aggregated_state_update_tensors = _aggregate_structure(
+        state_update_tensors, encoder.state_update_aggregation_modes)
+    updated_state = encoder.update_state(initial_state,
+                                         aggregated_state_update_tensors)
+    return TestData(x, decoded_x, initial_state, updated_state)
+
+  return iteration
+
+
+def _aggregate_one(values, mode):
+  if mode == encoding_stage.StateAggregationMode.SUM:
+    return tf.reduce_sum(tf.stack(values), axis=0)
+  elif mode == encoding_stage.StateAggregationMode.MIN:
+    return tf.reduce_min(tf.stack(values), axis=0)
+  elif mode == encoding_stage.StateAggregationMode.MAX:
+    return tf.reduce_max(tf.stack(values), axis=0)
+  elif mode == encoding_stage.StateAggregationMode.STACK:
+    return tf.stack(values)
+
+
+def _aggregate_structure(state_update_tensors, state_update_aggregation_modes):
+  aggregated_state_update_tensors = []
+  for i, mode in enumerate(state_update_aggregation_modes):
+    values = [t[i] for t in state_update_tensors]
+    aggregated_state_update_tensors.append(_aggregate_one(values, mode))
+  return tuple(aggregated_state_update_tensors)
+
+
+if __name__ == '__main__':
+  tf.test.main()
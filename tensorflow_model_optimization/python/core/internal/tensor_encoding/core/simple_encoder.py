@@ -20,6 +20,7 @@ from __future__ import print_function
 import tensorflow as tf
 
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import core_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import trace_cache
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils import py_utils
 
 _TENSORS = 'encoded_tensors'
@@ -54,6 +55,11 @@ class SimpleEncoder(object):
     `tensorspec`. Note that the returned encoder will not accept inputs of other
     properties.
 
+    The traced `tf.function`s are stored in the process-wide cache returned by
+    `trace_cache.default_trace_cache`, and are reused by `SimpleEncoder`s
+    created for encoders of the same composition and configuration, and the
+    same shape and dtype.
+
     Args:
       encoder: An `Encoder` object to be used for encoding.
       tensorspec: A `tf.TensorSpec`. The created `SimpleEncoder` will be
@@ -75,6 +81,14 @@ class SimpleEncoder(object):
       raise TypeError('The shape of provided tensorspec must be fully defined.')
     self._tensorspec = tensorspec
 
+    cache = trace_cache.default_trace_cache()
+    cache_key = trace_cache.trace_key('simple_encoder', encoder, tensorspec)
+    if cache_key is not None:
+      cached_fns = cache.get(cache_key)
+      if cached_fns is not None:
+        self._initial_state_fn, self._encode_fn, self._decode_fn = cached_fns
+        return
+
     # These dictionaries are filled inside of the initial_state_fn and encode_fn
     # methods, to be used in encode_fn and decode_fn methods, respectively.
     # Decorated by tf.function, their necessary side effects are realized during
@@ -144,6 +158,8 @@ class SimpleEncoder(object):
     self._initial_state_fn = initial_state_fn
     self._encode_fn = encode_fn
     self._decode_fn = decode_fn
+    if cache_key is not None:
+      cache.put(cache_key, (initial_state_fn, encode_fn, decode_fn))
 
   @property
   def input_tensorspec(self):
@@ -0,0 +1,188 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Process-wide cache of the `tf.function`s traced by encoders.
+
+`GatherEncoder` and `SimpleEncoder` trace several `tf.function`s for every
+instance. Instances created for `Encoder`s composed of the same encoding stages
+with the same configuration, and for the same shape and dtype, share the
+`tf.function`s, and hence their traces, through the cache in this module.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import threading
+
+import six
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import encoding_stage
+
+_DEFAULT_MAX_SIZE = 256
+
+
+class _NotCacheableError(Exception):
+  """Raised when a configuration value cannot be used in a cache key."""
+
+
+def _config_key(value):
+  """Returns a hashable key identifying `value`, used to configure a stage."""
+  if isinstance(value, (encoding_stage.EncodingStageInterface,
+                        encoding_stage.AdaptiveEncodingStageInterface)):
+    # The decorators and wrappers of stages keep the wrapped stage as an
+    # attribute, so this covers them as well.
+    return (type(value).__module__, type(value).__name__,
+            _config_key(vars(value)))
+  if isinstance(value, dict):
+    return tuple(
+        sorted((k, _config_key(v)) for k, v in six.iteritems(value)))
+  if isinstance(value, (list, tuple)):
+    return (type(value).__name__,) + tuple(_config_key(v) for v in value)
+  if tf.is_tensor(value) or isinstance(value, tf.Variable):
+    # TensorFlow values belong to a graph, and could not be captured by the
+    # `tf.function`s traced in another graph.
+    raise _NotCacheableError()
+  try:
+    hash(value)
+  except TypeError:
+    raise _NotCacheableError()
+  # Other objects, such as functions, only match themselves.
+  return (type(value).__name__, value)
+
+
+def encoder_key(encoder):
+  """Returns a key identifying the composition and configuration of `encoder`.
+
+  Two `Encoder` objects have the same key if they compose encoding stages of
+  the same classes, constructed with equal Python arguments, in the same tree.
+
+  Args:
+    encoder: An `Encoder` object.
+
+  Returns:
+    A hashable key, or `None` if the configuration of a stage contains a value
+    which can not be compared, such as a `Tensor`.
+  """
+  try:
+    return _encoder_key(encoder)
+  except _NotCacheableError:
+    return None
+
+
+def _encoder_key(encoder):
+  children = tuple(
+      sorted((k, _encoder_key(v)) for k, v in six.iteritems(encoder.children)))
+  return (_config_key(encoder.stage), children)
+
+
+class TraceCache(object):
+  """A thread-safe cache with least recently used eviction.
+
+  The number of lookups which found and did not find a value are counted by the
+  `hits` and `misses` properties.
+  """
+
+  def __init__(self, max_size=_DEFAULT_MAX_SIZE):
+    """Creates a `TraceCache`.
+
+    Args:
+      max_size: The maximum number of values in the cache. Use 0 to disable
+        caching.
+    """
+    self._max_size = max_size
+    self._values = collections.OrderedDict()
+    self._lock = threading.Lock()
+    self._hits = 0
+    self._misses = 0
+
+  @property
+  def max_size(self):
+    """The maximum number of values in the cache."""
+    return self._max_size
+
+  @max_size.setter
+  def max_size(self, max_size):
+    with self._lock:
+      self._max_size = max_size
+      self._evict()
+
+  @property
+  def hits(self):
+    """The number of lookups which found a value."""
+    return self._hits
+
+  @property
+  def misses(self):
+    """The number of lookups which did not find a value."""
+    return self._misses
+
+  def __len__(self):
+    return len(self._values)
+
+  def get(self, key):
+    """Returns the value for `key`, or `None` if it is not in the cache."""
+    with self._lock:
+      if key not in self._values:
+        self._misses += 1
+        return None
+      self._hits += 1
+      value = self._values.pop(key)
+      self._values[key] = value
+      return value
+
+  def put(self, key, value):
+    """Stores `value` for `key`, evicting the least recently used values."""
+    with self._lock:
+      self._values.pop(key, None)
+      self._values[key] = value
+      self._evict()
+
+  def clear(self):
+    """Removes all values and resets the counters."""
+    with self._lock:
+      self._values.clear()
+      self._hits = 0
+      self._misses = 0
+
+  def _evict(self):
+    while len(self._values) > max(self._max_size, 0):
+      self._values.popitem(last=False)
+
+
+_default_trace_cache = TraceCache()
+
+
+def default_trace_cache():
+  """Returns the `TraceCache` shared by all encoders in the process."""
+  return _default_trace_cache
+
+
+def trace_key(encoder_type, encoder, tensorspec):
+  """Returns the key of the traced functions of an encoder in the cache.
+
+  Args:
+    encoder_type: A string identifying the class using the traced functions.
+    encoder: An `Encoder` object.
+    tensorspec: A `tf.TensorSpec` with fully defined shape.
+
+  Returns:
+    A hashable key, or `None` if the functions should not be cached.
+  """
+  key = encoder_key(encoder)
+  if key is None:
+    return None
+  return (encoder_type, key, tuple(tensorspec.shape.as_list()),
+          tensorspec.dtype)
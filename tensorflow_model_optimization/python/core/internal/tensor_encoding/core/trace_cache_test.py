@@ -0,0 +1,180 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import core_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import gather_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import simple_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import trace_cache
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.testing import test_utils
+
+T2_VALS = test_utils.TimesTwoEncodingStage.ENCODED_VALUES_KEY
+
+
+def _composite_encoder():
+  return core_encoder.EncoderComposer(
+      test_utils.TimesTwoEncodingStage()).add_child(
+          test_utils.PlusOneOverNEncodingStage(), T2_VALS).make()
+
+
+class _ConfigurableStage(test_utils.PlusOneEncodingStage):
+
+  def __init__(self, value):
+    self._value = value
+
+
+def _configured_encoder(value):
+  return core_encoder.EncoderComposer(_ConfigurableStage(value)).make()
+
+
+class TraceCacheTest(tf.test.TestCase):
+
+  def test_lookups_are_counted(self):
+    cache = trace_cache.TraceCache()
+    self.assertIsNone(cache.get('a'))
+    cache.put('a', 1)
+    self.assertEqual(1, cache.get('a'))
+    self.assertEqual(1, cache.get('a'))
+    self.assertEqual(2, cache.hits)
+    self.assertEqual(1, cache.misses)
+
+    cache.clear()
+    self.assertEmpty(cache)
+    self.assertEqual(0, cache.hits)
+    self.assertEqual(0, cache.misses)
+
+  def test_evicts_least_recently_used(self):
+    cache = trace_cache.TraceCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    self.assertLen(cache, 2)
+    self.assertIsNone(cache.get('b'))
+    self.assertEqual(1, cache.get('a'))
+    self.assertEqual(3, cache.get('c'))
+
+    cache.max_size = 1
+    self.assertLen(cache, 1)
+    self.assertEqual(3, cache.get('c'))
+    cache.max_size = 0
+    cache.put('d', 4)
+    self.assertEmpty(cache)
+
+  def test_encoder_key(self):
+    self.assertEqual(
+        trace_cache.encoder_key(_composite_encoder()),
+        trace_cache.encoder_key(_composite_encoder()))
+    self.assertNotEqual(
+        trace_cache.encoder_key(_composite_encoder()),
+        trace_cache.encoder_key(
+            core_encoder.EncoderComposer(
+                test_utils.TimesTwoEncodingStage()).make()))
+    self.assertEqual(
+        trace_cache.encoder_key(_configured_encoder([1, {'a': 2.0}])),
+        trace_cache.encoder_key(_configured_encoder([1, {'a': 2.0}])))
+    self.assertNotEqual(
+        trace_cache.encoder_key(_configured_encoder(1)),
+        trace_cache.encoder_key(_configured_encoder(2)))
+    self.assertNotEqual(
+        trace_cache.encoder_key(_configured_encoder([1])),
+        trace_cache.encoder_key(_configured_encoder((1,))))
+
+  def test_encoder_key_none_for_tensor_config(self):
+    self.assertIsNone(
+        trace_cache.encoder_key(_configured_encoder(tf.constant(1.0))))
+    self.assertIsNone(
+        trace_cache.encoder_key(_configured_encoder({'a': [tf.constant(1)]})))
+
+
+class EncoderTraceCacheTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(EncoderTraceCacheTest, self).setUp()
+    trace_cache.default_trace_cache().clear()
+
+  def test_gather_encoder_reuses_functions(self):
+    cache = trace_cache.default_trace_cache()
+    spec = tf.TensorSpec((3,), tf.float32)
+    encoder = gather_encoder.GatherEncoder.from_encoder(
+        _composite_encoder(), spec)
+    self.assertEqual(0, cache.hits)
+    self.assertEqual(1, cache.misses)
+
+    same_encoder = gather_encoder.GatherEncoder.from_encoder(
+        _composite_encoder(), tf.TensorSpec((3,), tf.float32, name='x'))
+    self.assertEqual(1, cache.hits)
+    # pylint: disable=protected-access
+    self.assertIs(encoder._encode_fn, same_encoder._encode_fn)
+    # pylint: enable=protected-access
+    self.assertEqual('x', same_encoder.input_tensorspec.name)
+
+    gather_encoder.GatherEncoder.from_encoder(_composite_encoder(),
+                                              tf.TensorSpec((4,), tf.float32))
+    gather_encoder.GatherEncoder.from_encoder(
+        core_encoder.EncoderComposer(
+            test_utils.TimesTwoEncodingStage()).make(), spec)
+    self.assertEqual(1, cache.hits)
+    self.assertEqual(3, cache.misses)
+
+  def test_gather_encoder_from_cache_encodes(self):
+    spec = tf.TensorSpec((3,), tf.float32)
+    gather_encoder.GatherEncoder.from_encoder(_composite_encoder(), spec)
+    encoder = gather_encoder.GatherEncoder.from_encoder(
+        _composite_encoder(), spec)
+    self.assertEqual(1, trace_cache.default_trace_cache().hits)
+
+    x = tf.constant([1.0, 2.0, 3.0])
+    state = encoder.initial_state()
+    encode_params, decode_before_sum_params, decode_after_sum_params = (
+        encoder.get_params(state))
+    encoded_x, state_update_tensors = encoder.encode(x, encode_params)
+    part_decoded_x = encoder.decode_before_sum(encoded_x,
+                                               decode_before_sum_params)
+    decoded_x = encoder.decode_after_sum(part_decoded_x,
+                                         decode_after_sum_params, 1)
+    updated_state = encoder.update_state(state, state_update_tensors)
+    decoded_x, updated_state = self.evaluate([decoded_x, updated_state])
+    self.assertAllClose([1.0, 2.0, 3.0], decoded_x)
+    self.assertAllEqual((2,), updated_state)
+
+  def test_simple_encoder_reuses_functions(self):
+    cache = trace_cache.default_trace_cache()
+    spec = tf.TensorSpec((3,), tf.float32)
+    simple_encoder.SimpleEncoder(_composite_encoder(), spec)
+    encoder = simple_encoder.SimpleEncoder(_composite_encoder(), spec)
+    self.assertEqual(1, cache.hits)
+    self.assertEqual(1, cache.misses)
+
+    x = tf.constant([1.0, 2.0, 3.0])
+    encoded_x, _ = encoder.encode(x)
+    self.assertAllClose([1.0, 2.0, 3.0],
+                        self.evaluate(encoder.decode(encoded_x)))
+
+  def test_tensor_config_not_cached(self):
+    cache = trace_cache.default_trace_cache()
+    spec = tf.TensorSpec((3,), tf.float32)
+    gather_encoder.GatherEncoder.from_encoder(
+        _configured_encoder(tf.constant(1.0)), spec)
+    self.assertEmpty(cache)
+    self.assertEqual(0, cache.misses)
+
+
+if __name__ == '__main__':
+  tf.test.main()
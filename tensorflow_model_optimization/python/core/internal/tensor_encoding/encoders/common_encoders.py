@@ -25,8 +25,11 @@ import tensorflow as tf
 
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import core_encoder
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import gather_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import nest_gather_encoder
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import simple_encoder
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.stages import stages_impl
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.stages.research import entropy_coding as entropy_coding_lib
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.stages.research import misc
 
 
 def as_simple_encoder(encoder, tensorspec):
@@ -73,64 +76,136 @@ def as_gather_encoder(encoder, tensorspec):
   return gather_encoder.GatherEncoder.from_encoder(encoder, tensorspec)
 
 
+def as_nest_gather_encoder(encoder_fn, tensorspecs):
+  """Wraps `Encoder` objects as a `NestGatherEncoder` for a structure of values.
+
+  Args:
+    encoder_fn: A Python callable, which accepts a `TensorSpec` and returns an
+      `Encoder` object to be used for encoding values compatible with it.
+    tensorspecs: A structure of `TensorSpec` objects. The created
+      `NestGatherEncoder` will be constrained to only encode input values
+      compatible with `tensorspecs`.
+
+  Returns:
+    A `NestGatherEncoder`.
+
+  Raises:
+    TypeError:
+      If `encoder_fn` is not callable, or `tensorspecs` contains a value which
+      is not a `TensorSpec`.
+  """
+  if not callable(encoder_fn):
+    raise TypeError('The encoder_fn must be callable.')
+  return nest_gather_encoder.NestGatherEncoder.from_encoder_fn(
+      encoder_fn, tensorspecs)
+
+
 def identity():
   """Returns identity `Encoder`."""
   return core_encoder.EncoderComposer(
       stages_impl.IdentityEncodingStage()).make()
 
 
-def uniform_quantization(bits):
+def _packing_stage(bits, entropy_coding):
+  """Returns the stage encoding `bits`-bit integers into integer values."""
+  if entropy_coding:
+    return entropy_coding_lib.GolombRiceEncodingStage(bits)
+  return stages_impl.BitpackingEncodingStage(bits)
+
+
+def uniform_quantization(bits, entropy_coding=False):
   """Returns uniform quanitzation `Encoder`.
 
   The `Encoder` first reshapes the input to a rank-1 `Tensor`, then applies
   uniform quantization with the extreme values being the minimum and maximum of
   the vector being encoded. Finally, the quantized values are bitpacked to an
-  integer type.
+  integer type, or losslessly compressed if `entropy_coding` is `True`.
 
   The `Encoder` is a composition of the following encoding stages:
   * `FlattenEncodingStage`
   * `UniformQuantizationEncodingStage`
-  * `BitpackingEncodingStage`
+  * `BitpackingEncodingStage` or `GolombRiceEncodingStage`
 
   Args:
     bits: Number of bits to quantize into.
+    entropy_coding: A Python bool. If `True`, the quantized values are encoded
+      using the `GolombRiceEncodingStage` instead of being bitpacked. The size
+      of the encoded values then depends on their distribution.
 
   Returns:
     The quantization `Encoder`.
   """
   return core_encoder.EncoderComposer(
-      stages_impl.BitpackingEncodingStage(bits)).add_parent(
+      _packing_stage(bits, entropy_coding)).add_parent(
           stages_impl.UniformQuantizationEncodingStage(bits), stages_impl
           .UniformQuantizationEncodingStage.ENCODED_VALUES_KEY).add_parent(
               stages_impl.FlattenEncodingStage(),
               stages_impl.FlattenEncodingStage.ENCODED_VALUES_KEY).make()
 
 
-def hadamard_quantization(bits):
+def hadamard_quantization(bits, entropy_coding=False):
   """Returns hadamard quanitzation `Encoder`.
 
   The `Encoder` first reshapes the input to a rank-1 `Tensor`, and applies the
   Hadamard transform (rotation). It then applies uniform quantization with the
   extreme values being the minimum and maximum of the rotated vector being
-  encoded. Finally, the quantized values are bitpacked to an integer type.
+  encoded. Finally, the quantized values are bitpacked to an integer type, or
+  losslessly compressed if `entropy_coding` is `True`.
 
   The `Encoder` is a composition of the following encoding stages:
   * `FlattenEncodingStage` - reshaping the input to a vector.
   * `HadamardEncodingStage` - applying the Hadamard transform.
   * `UniformQuantizationEncodingStage` - applying uniform quantization.
-  * `BitpackingEncodingStage` - bitpacking the result into integer values.
+  * `BitpackingEncodingStage` - bitpacking the result into integer values, or
+    `GolombRiceEncodingStage` - entropy coding the result.
 
   Args:
     bits: Number of bits to quantize into.
+    entropy_coding: A Python bool. If `True`, the quantized values are encoded
+      using the `GolombRiceEncodingStage` instead of being bitpacked. The size
+      of the encoded values then depends on their distribution.
 
   Returns:
     The hadamard quantization `Encoder`.
   """
   return core_encoder.EncoderComposer(
-      stages_impl.BitpackingEncodingStage(bits)).add_parent(
+      _packing_stage(bits, entropy_coding)).add_parent(
           stages_impl.UniformQuantizationEncodingStage(bits), stages_impl
           .UniformQuantizationEncodingStage.ENCODED_VALUES_KEY).add_parent(
               stages_impl.HadamardEncodingStage(),
               stages_impl.HadamardEncodingStage.ENCODED_VALUES_KEY).add_parent(
                   stages_impl.FlattenEncodingStage(),
                   stages_impl.FlattenEncodingStage.ENCODED_VALUES_KEY).make()
+
+
+def top_k_sparsification(fraction, index_bits=12):
+  """Returns top-k sparsification `Encoder`.
+
+  The `Encoder` splits the flattened input into blocks of `2**(index_bits-1)`
+  consecutive elements, and keeps the `fraction` of elements with the largest
+  absolute values in every block. The indices of the kept elements are sorted,
+  encoded as differences between consecutive indices, and bitpacked using
+  `index_bits` bits per index. The size of the encoded values thus depends only
+  on the shape of the input.
+
+  The `Encoder` is a composition of the following encoding stages:
+  * `TopKEncodingStage` - keeping the largest elements in every block.
+  * `DifferenceBetweenIntegersEncodingStage` - applied to the indices.
+  * `BitpackingEncodingStage` - bitpacking the differences of indices.
+
+  Args:
+    fraction: The fraction of elements to keep, in (0, 1].
+    index_bits: Number of bits to represent every index with, between 1 and 16.
+
+  Returns:
+    The top-k sparsification `Encoder`.
+  """
+  return core_encoder.EncoderComposer(
+      stages_impl.BitpackingEncodingStage(index_bits)).add_parent(
+          misc.DifferenceBetweenIntegersEncodingStage(),
+          misc.DifferenceBetweenIntegersEncodingStage.ENCODED_VALUES_KEY
+      ).add_parent(
+          misc.TopKEncodingStage(
+              fraction=fraction, block_size=2**(index_bits - 1)),
+          misc.TopKEncodingStage.ENCODED_INDICES_KEY).make()
+
@@ -17,22 +17,31 @@ from __future__ import division
 from __future__ import print_function
 
 from absl.testing import parameterized
+import numpy as np
 import tensorflow as tf
 
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import core_encoder
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import gather_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import nest_gather_encoder
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import simple_encoder
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.encoders import common_encoders
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.stages.research import quantization
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils import py_utils
 
-_ENCODER_FNS = [
+_FIXED_SHAPE_ENCODER_FNS = [
     common_encoders.identity,
     lambda: common_encoders.uniform_quantization(8),
     lambda: common_encoders.hadamard_quantization(8),
 ]
+# The shapes of the entropy coded values depend on the encoded values.
+_ENTROPY_CODING_ENCODER_FNS = [
+    lambda: common_encoders.uniform_quantization(8, entropy_coding=True),
+    lambda: common_encoders.hadamard_quantization(8, entropy_coding=True),
+]
+_ENCODER_FNS = _FIXED_SHAPE_ENCODER_FNS + _ENTROPY_CODING_ENCODER_FNS
 
 
-class EncoderLibraryTest(parameterized.TestCase):
+class EncoderLibraryTest(tf.test.TestCase, parameterized.TestCase):
   """Tests for the `common_encoders` methods."""
 
   @parameterized.parameters(_ENCODER_FNS)
@@ -59,6 +68,69 @@ class EncoderLibraryTest(parameterized.TestCase):
                                                 tf.TensorSpec((2,), tf.float32))
     self.assertIsInstance(encoder, gather_encoder.GatherEncoder)
 
+  @parameterized.parameters(_FIXED_SHAPE_ENCODER_FNS)
+  def test_as_gather_encoder_encode_batch(self, encoder_fn):
+    encoder = common_encoders.as_gather_encoder(
+        encoder_fn(), tf.TensorSpec((50,), tf.float32))
+    x = tf.random.normal((8, 50))
+
+    encode_params, decode_before_sum_params, decode_after_sum_params = (
+        encoder.get_params())
+    encoded_x, _ = encoder.encode_batch(x, encode_params)
+    part_decoded_x = encoder.decode_before_sum_batch(encoded_x,
+                                                     decode_before_sum_params)
+    summed_part_decoded_x = tf.nest.map_structure(
+        lambda t: tf.reduce_sum(t, axis=0), part_decoded_x)
+    decoded_x = encoder.decode_after_sum(summed_part_decoded_x,
+                                         decode_after_sum_params, 8)
+    x, decoded_x = self.evaluate([x, decoded_x])
+
+    # The error of 8-bit quantization of each value is less than 0.1.
+    self.assertAllClose(x.sum(axis=0), decoded_x, atol=0.8)
+
+  @parameterized.parameters(_ENTROPY_CODING_ENCODER_FNS)
+  def test_as_gather_encoder_encode_batch_raises_entropy_coding(
+      self, encoder_fn):
+    encoder = common_encoders.as_gather_encoder(
+        encoder_fn(), tf.TensorSpec((50,), tf.float32))
+    x = tf.random.normal((8, 50))
+
+    encode_params, decode_before_sum_params, _ = encoder.get_params()
+    with self.assertRaisesRegex(ValueError, 'cannot be batched'):
+      encoder.encode_batch(x, encode_params)
+    encoded_x, _ = encoder.encode(x[0], encode_params)
+    encoded_x = tf.nest.map_structure(lambda t: tf.stack([t, t]), encoded_x)
+    with self.assertRaisesRegex(ValueError, 'cannot be batched'):
+      encoder.decode_before_sum_batch(encoded_x, decode_before_sum_params)
+
+  def test_decode_before_sum_batch_per_value_seeds(self):
+    # The seeds of the stateless random operations are drawn for every value
+    # in the batch, and decoding regenerates the random values of each value.
+    encoder = common_encoders.as_gather_encoder(
+        core_encoder.EncoderComposer(
+            quantization.PRNGUniformQuantizationEncodingStage(2)).make(),
+        tf.TensorSpec((50,), tf.float32))
+    x = tf.random.normal((4, 50))
+
+    encode_params, decode_before_sum_params, _ = encoder.get_params()
+    encoded_x, _ = encoder.encode_batch(x, encode_params)
+    part_decoded_x = encoder.decode_before_sum_batch(encoded_x,
+                                                     decode_before_sum_params)
+    expected_part_decoded_x = tf.stack([
+        encoder.decode_before_sum({k: v[i] for k, v in encoded_x.items()},
+                                  decode_before_sum_params) for i in range(4)
+    ])
+    seed_key = [
+        k for k in encoded_x
+        if k.endswith(quantization.PRNGUniformQuantizationEncodingStage
+                      .SEED_PARAMS_KEY)
+    ][0]
+    seeds, part_decoded_x, expected_part_decoded_x = self.evaluate(
+        [encoded_x[seed_key], part_decoded_x, expected_part_decoded_x])
+
+    self.assertLen(set(map(tuple, seeds)), 4)
+    self.assertAllClose(expected_part_decoded_x, part_decoded_x)
+
   @parameterized.parameters(None, [[]], 2.0, 'string')
   def test_as_gather_encoder_raises_encoder(self, not_an_encoder):
     with self.assertRaises(TypeError):
@@ -71,6 +143,50 @@ class EncoderLibraryTest(parameterized.TestCase):
       common_encoders.as_gather_encoder(common_encoders.identity(),
                                         not_a_tensorspec)
 
+  @parameterized.parameters(_ENCODER_FNS)
+  def test_as_nest_gather_encoder(self, encoder_fn):
+    encoder = common_encoders.as_nest_gather_encoder(
+        lambda _: encoder_fn(),
+        [tf.TensorSpec((2,), tf.float32),
+         tf.TensorSpec((3, 4), tf.float32)])
+    self.assertIsInstance(encoder, nest_gather_encoder.NestGatherEncoder)
+
+  @parameterized.parameters(common_encoders.uniform_quantization,
+                            common_encoders.hadamard_quantization)
+  def test_as_nest_gather_encoder_entropy_coding_decodes(self, encoder_fn):
+    # The shapes of the entropy coded values depend on the encoded values.
+    encoder = common_encoders.as_nest_gather_encoder(
+        lambda _: encoder_fn(8, entropy_coding=True),
+        [tf.TensorSpec((1000,), tf.float32),
+         tf.TensorSpec((20, 50), tf.float32)])
+    x = [tf.random.normal((1000,)), tf.random.normal((20, 50))]
+
+    encode_params, decode_before_sum_params, decode_after_sum_params = (
+        encoder.get_params(encoder.initial_state()))
+    encoded_x, _ = encoder.encode(x, encode_params)
+    part_decoded_x = encoder.decode_before_sum(encoded_x,
+                                               decode_before_sum_params)
+    decoded_x = encoder.decode_after_sum(part_decoded_x,
+                                         decode_after_sum_params, 1)
+    x, decoded_x = self.evaluate([x, decoded_x])
+
+    for value, decoded_value in zip(x, decoded_x):
+      self.assertAllClose(
+          value, decoded_value,
+          atol=(value.max() - value.min()) / 255 * 2)
+
+  @parameterized.parameters(None, [[]], 2.0, 'string')
+  def test_as_nest_gather_encoder_raises_encoder_fn(self, not_an_encoder_fn):
+    with self.assertRaises(TypeError):
+      common_encoders.as_nest_gather_encoder(not_an_encoder_fn,
+                                             [tf.TensorSpec((2,), tf.float32)])
+
+  @parameterized.parameters(None, 2.0, 'string')
+  def test_as_nest_gather_encoder_raises_tensorspecs(self, not_a_tensorspec):
+    with self.assertRaises(TypeError):
+      common_encoders.as_nest_gather_encoder(
+          lambda _: common_encoders.identity(), [not_a_tensorspec])
+
   def test_identity(self):
     encoder = common_encoders.identity()
     self.assertIsInstance(encoder, core_encoder.Encoder)
@@ -104,6 +220,80 @@ class EncoderLibraryTest(parameterized.TestCase):
         'flattened_values/hadamard_values/quantized_values/bitpacked_values'
     ], keys)
 
+  def test_uniform_quantization_entropy_coding(self):
+    encoder = common_encoders.uniform_quantization(8, entropy_coding=True)
+    self.assertIsInstance(encoder, core_encoder.Encoder)
+
+    params, _ = encoder.get_params(encoder.initial_state())
+    encoded_x, _, _ = encoder.encode(tf.constant(1.0), params)
+    keys = [k for k, _ in py_utils.flatten_with_joined_string_paths(encoded_x)]
+    self.assertSameElements([
+        'flattened_values/min_max',
+        'flattened_values/quantized_values/golomb_rice_values',
+        'flattened_values/quantized_values/golomb_rice_params'
+    ], keys)
+
+  @parameterized.parameters(common_encoders.uniform_quantization,
+                            common_encoders.hadamard_quantization)
+  def test_quantization_entropy_coding_decodes(self, encoder_fn):
+    encoder = common_encoders.as_gather_encoder(
+        encoder_fn(8, entropy_coding=True), tf.TensorSpec((1000,), tf.float32))
+    x = tf.random.normal((1000,))
+
+    encode_params, decode_before_sum_params, decode_after_sum_params = (
+        encoder.get_params())
+    encoded_x, _ = encoder.encode(x, encode_params)
+    part_decoded_x = encoder.decode_before_sum(encoded_x,
+                                               decode_before_sum_params)
+    decoded_x = encoder.decode_after_sum(part_decoded_x,
+                                         decode_after_sum_params, 1)
+    x, encoded_x, decoded_x = self.evaluate([x, encoded_x, decoded_x])
+
+    # The quantization error is the same as with bitpacking.
+    self.assertAllClose(x, decoded_x, atol=(x.max() - x.min()) / 255 * 2)
+    # Normally distributed values are encoded in fewer than 8 bits on average.
+    packed_x = [v for k, v in encoded_x.items() if 'golomb_rice_values' in k]
+    self.assertLen(packed_x, 1)
+    self.assertLess(packed_x[0].size * 28, x.size * 8)
+
+  def test_top_k_sparsification(self):
+    encoder = common_encoders.top_k_sparsification(0.1)
+    self.assertIsInstance(encoder, core_encoder.Encoder)
+
+    params, _ = encoder.get_params(encoder.initial_state())
+    encoded_x, _, _ = encoder.encode(tf.constant([1.0]), params)
+    keys = [k for k, _ in py_utils.flatten_with_joined_string_paths(encoded_x)]
+    self.assertSameElements([
+        'top_k_values',
+        'indices/difference_between_integers/bitpacked_values',
+        'indices/difference_between_integers/dummy_type_value'
+    ], keys)
+
+  def test_top_k_sparsification_decodes(self):
+    encoder = common_encoders.as_gather_encoder(
+        common_encoders.top_k_sparsification(0.25, index_bits=4),
+        tf.TensorSpec((10, 5), tf.float32))
+    x = tf.random.normal((10, 5))
+
+    encode_params, decode_before_sum_params, decode_after_sum_params = (
+        encoder.get_params())
+    encoded_x, _ = encoder.encode(x, encode_params)
+    part_decoded_x = encoder.decode_before_sum(encoded_x,
+                                               decode_before_sum_params)
+    decoded_x = encoder.decode_after_sum(part_decoded_x,
+                                         decode_after_sum_params, 1)
+    x, encoded_x, decoded_x = self.evaluate([x, encoded_x, decoded_x])
+
+    # 2 of every 8 elements are kept, with the last block padded with zeros.
+    blocks = np.append(x.flatten(), np.zeros(6)).reshape(7, 8)
+    thresholds = np.sort(np.abs(blocks), axis=1)[:, -2:-1]
+    expected_decoded_x = np.where(np.abs(blocks) >= thresholds, blocks, 0.0)
+    self.assertAllEqual(expected_decoded_x.flatten()[:50].reshape(10, 5),
+                        decoded_x)
+    self.assertEqual((14,), encoded_x['tensors/top_k_values'].shape)
+    # The 14 indices are packed into 4 bits each, fitting in 2 integers.
+    self.assertEqual(2, encoded_x[
+        'tensors/indices/difference_between_integers/bitpacked_values'].size)
 
 if __name__ == '__main__':
   tf.test.main()
@@ -0,0 +1,223 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Implementations of lossless entropy coding."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import encoding_stage
+
+# As in the `BitpackingEncodingStage`, the bits are packed into 28 bits of every
+# integer, ensuring every value is serialized as varint into 4 bytes.
+_BITS_PER_WORD = 28
+# The value of k marking values written using input_bits each.
+_RAW_BITS_K = -1
+
+
+def _pack_bits(bits):
+  """Packs a rank 1 `Tensor` of zeros and ones into `tf.int32` words."""
+  padding = tf.math.floormod(-tf.size(bits), _BITS_PER_WORD)
+  bits = tf.reshape(tf.pad(bits, [[0, padding]]), [-1, _BITS_PER_WORD])
+  shifts = tf.range(_BITS_PER_WORD - 1, -1, -1)
+  return tf.reduce_sum(tf.bitwise.left_shift(bits, shifts), axis=1)
+
+
+def _unpack_bits(words):
+  """Unpacks `tf.int32` words packed by `_pack_bits` into zeros and ones."""
+  shifts = tf.range(_BITS_PER_WORD - 1, -1, -1)
+  bits = tf.bitwise.bitwise_and(
+      tf.bitwise.right_shift(tf.expand_dims(words, 1), shifts), 1)
+  return tf.reshape(bits, [-1])
+
+
+def _to_bits(values, num_bits):
+  """Returns the `num_bits` lowest bits of every value, highest bit first."""
+  bits = tf.bitwise.bitwise_and(
+      tf.bitwise.right_shift(
+          tf.expand_dims(values, 1), tf.range(num_bits - 1, -1, -1)), 1)
+  return tf.reshape(bits, [-1])
+
+
+def _from_bits(bits, num_bits):
+  """Inverse of `_to_bits`, for `bits` of `num_bits` bits per value."""
+  bits = tf.reshape(bits, [-1, num_bits])
+  return tf.reduce_sum(
+      tf.bitwise.left_shift(bits, tf.range(num_bits - 1, -1, -1)), axis=1)
+
+
+@encoding_stage.tf_style_encoding_stage
+class GolombRiceEncodingStage(encoding_stage.EncodingStageInterface):
+  """Encoding stage for lossless entropy coding of integer values.
+
+  This class performs a lossless transformation, and realizes representation
+  savings for values with a non-uniform distribution, such as the output of the
+  `UniformQuantizationEncodingStage` applied to normally distributed values.
+
+  The encode method expects integer values in range `[0, 2**input_bits-1]`, of
+  type `tf.float32`, `tf.float64`, `tf.int32` or `tf.int64`. It maps every
+  value to its distance from the most frequent value, with positive and
+  negative distances interleaved, and encodes the distances using a Golomb-Rice
+  code. The code is a unary encoded quotient and a `k` bit remainder of the
+  division of the distance by `2**k`. The most frequent value and `k` are
+  computed for every input, with `k` minimizing the total number of bits. The
+  quotients and remainders are written to separate streams of bits, which
+  enables both encoding and decoding all values in parallel, and are packed
+  into `tf.int32` values. The number of encoded values thus depends on the
+  input values. If the code would not save any bits, such as for uniformly
+  distributed values, the values are written using `input_bits` bits each, as
+  in the `BitpackingEncodingStage`.
+  """
+
+  ENCODED_VALUES_KEY = 'golomb_rice_values'
+  ENCODED_PARAMS_KEY = 'golomb_rice_params'
+  DUMMY_TYPE_VALUES_KEY = 'dummy_type_value'
+  _ALLOWED_INPUT_BITS_ARG = list(range(1, 17))
+
+  def __init__(self, input_bits):
+    """Initializer for the GolombRiceEncodingStage.
+
+    Args:
+      input_bits: The number of bits expected to represent the input to the
+        `encode` method. Must be between 1 and 16. Cannot be a TensorFlow value.
+
+    Raises:
+      TypeError: If `input_bits` is a TensorFlow value.
+      ValueError: If `input_bits` is not between 1 and 16.
+    """
+    if tf.is_tensor(input_bits):
+      raise TypeError('The input_bits argument cannot be a TensorFlow value.')
+    if input_bits not in self._ALLOWED_INPUT_BITS_ARG:
+      raise ValueError(
+          'The input_bits argument must be an integer between 1 and 16.')
+    self._input_bits = input_bits
+
+  @property
+  def name(self):
+    """See base class."""
+    return 'golomb_rice'
+
+  @property
+  def compressible_tensors_keys(self):
+    """See base class."""
+    return []  # Entropy coded values should not be further modified.
+
+  @property
+  def commutes_with_sum(self):
+    """See base class."""
+    return False
+
+  @property
+  def decode_needs_input_shape(self):
+    """See base class."""
+    return True
+
+  def get_params(self):
+    """See base class."""
+    return {}, {}
+
+  def encode(self, x, encode_params):
+    """See base class."""
+    del encode_params  # Unused.
+    if x.dtype not in [tf.float32, tf.float64, tf.int32, tf.int64]:
+      raise TypeError(
+          'Unsupported input type: %s. Supported types are tf.float32, '
+          'tf.float64, tf.int32 and tf.int64 values' % x.dtype)
+    values = tf.cast(tf.reshape(x, [-1]), tf.int32)
+    num_values = tf.size(values)
+
+    counts = tf.math.bincount(
+        values, minlength=2**self._input_bits, maxlength=2**self._input_bits)
+    center = tf.cast(tf.argmax(counts), tf.int32)
+    # Interleaves the distances from the center as 0, -1, 1, -2, 2, ...
+    diffs = values - center
+    distances = tf.where(diffs >= 0, 2 * diffs, -2 * diffs - 1)
+
+    # The number of bits for every k is num_values * (k + 1) plus the sum of
+    # quotients. Distances are smaller than 2**(input_bits + 1). The sums for
+    # small k can exceed the range of tf.int32 for large inputs.
+    candidate_ks = tf.range(self._input_bits + 1)
+    num_bits = tf.cast(num_values * (candidate_ks + 1), tf.int64) + (
+        tf.reduce_sum(
+            tf.cast(
+                tf.bitwise.right_shift(
+                    tf.expand_dims(distances, 0),
+                    tf.expand_dims(candidate_ks, 1)), tf.int64),
+            axis=1))
+    k = tf.cast(tf.argmin(num_bits), tf.int32)
+
+    def golomb_rice_bits():
+      quotients = tf.bitwise.right_shift(distances, k)
+      remainders = distances - tf.bitwise.left_shift(quotients, k)
+      # Every quotient q is written as q zeros followed by a one.
+      quotient_ends = tf.cumsum(quotients + 1) - 1
+      quotient_bits = tf.scatter_nd(
+          tf.expand_dims(quotient_ends, 1), tf.ones_like(quotient_ends),
+          tf.expand_dims(tf.reduce_sum(quotients + 1), 0))
+      return tf.concat([_to_bits(remainders, k), quotient_bits], 0)
+
+    # Values which are close to uniformly distributed are written using
+    # input_bits each instead, marked by a negative k.
+    use_raw_bits = tf.reduce_min(num_bits) >= tf.cast(
+        num_values * self._input_bits, tf.int64)
+    bits = tf.cond(use_raw_bits,
+                   lambda: _to_bits(values, self._input_bits),
+                   golomb_rice_bits)
+    params = tf.where(use_raw_bits, [0, _RAW_BITS_K], tf.stack([center, k]))
+
+    encoded_tensors = {
+        self.ENCODED_VALUES_KEY: _pack_bits(bits),
+        self.ENCODED_PARAMS_KEY: params,
+    }
+    # As in the `BitpackingEncodingStage`, the type of other than the most
+    # common tf.float32 input is recovered from an extra dummy value.
+    if x.dtype != tf.float32:
+      encoded_tensors[self.DUMMY_TYPE_VALUES_KEY] = tf.constant(0, x.dtype)
+    return encoded_tensors
+
+  def decode(self,
+             encoded_tensors,
+             decode_params,
+             num_summands=None,
+             shape=None):
+    """See base class."""
+    del decode_params, num_summands  # Unused.
+    bits = _unpack_bits(encoded_tensors[self.ENCODED_VALUES_KEY])
+    center = encoded_tensors[self.ENCODED_PARAMS_KEY][0]
+    k = encoded_tensors[self.ENCODED_PARAMS_KEY][1]
+    num_values = tf.reduce_prod(tf.cast(shape, tf.int32))
+
+    def golomb_rice_values():
+      num_remainder_bits = num_values * k
+      remainders = _from_bits(bits[:num_remainder_bits], k)
+      # The padding of the last packed value contains only zeros.
+      quotient_ends = tf.cast(
+          tf.reshape(tf.where(bits[num_remainder_bits:] > 0), [-1]), tf.int32)
+      quotients = quotient_ends - tf.concat([[-1], quotient_ends[:-1]], 0) - 1
+      distances = tf.bitwise.left_shift(quotients, k) + remainders
+      diffs = tf.where(
+          tf.equal(tf.math.floormod(distances, 2), 0), distances // 2,
+          -(distances + 1) // 2)
+      return diffs + center
+
+    values = tf.cond(
+        tf.equal(k, _RAW_BITS_K),
+        lambda: _from_bits(bits[:num_values * self._input_bits],
+                           self._input_bits),
+        golomb_rice_values)
+    dummy_type_value = encoded_tensors.get(self.DUMMY_TYPE_VALUES_KEY)
+    dtype = tf.float32 if dummy_type_value is None else dummy_type_value.dtype
+    return tf.reshape(tf.cast(values, dtype), shape)
@@ -0,0 +1,108 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks for the `entropy_coding` module.
+
+Reports the number of bits per value used by the `GolombRiceEncodingStage` for
+values from different distributions, quantized by the
+`UniformQuantizationEncodingStage`. The bits per value are compared with the
+`input_bits` used by the `BitpackingEncodingStage`, and with the empirical
+entropy of the quantized values, a lower bound for any code of single values.
+
+Run with `--benchmarks=.` to run all benchmarks, or with a regular expression
+matching the names of the benchmarks to run.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.stages import stages_impl
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.stages.research import entropy_coding
+
+
+if tf.executing_eagerly():
+  tf.compat.v1.disable_eager_execution()
+
+_NUM_ELEMENTS = 10**6
+_DISTRIBUTIONS = {
+    'uniform': lambda n: tf.random.uniform([n], -1.0, 1.0),
+    'normal': lambda n: tf.random.normal([n]),
+    'laplace': lambda n: tf.math.log(
+        tf.random.uniform([n])) * tf.sign(tf.random.uniform([n], -1.0, 1.0)),
+    # Mostly zeros, as are for instance sparse gradients.
+    'sparse': lambda n: tf.random.normal([n]) * tf.cast(
+        tf.random.uniform([n]) < 0.1, tf.float32),
+}
+
+
+def _entropy(values):
+  """Returns the empirical entropy of `values` in bits."""
+  _, counts = np.unique(values, return_counts=True)
+  probabilities = counts / values.size
+  return -np.sum(probabilities * np.log2(probabilities))
+
+
+class GolombRiceEncodingStageBenchmark(tf.test.Benchmark):
+  """Benchmarks for `GolombRiceEncodingStage`."""
+
+  def _benchmark(self, distribution, bits):
+    name = 'golomb_rice_%s_%d_bits' % (distribution, bits)
+    with tf.Graph().as_default(), tf.compat.v1.Session() as sess:
+      quantization_stage = stages_impl.UniformQuantizationEncodingStage(bits)
+      quantized_x = quantization_stage.encode(
+          _DISTRIBUTIONS[distribution](_NUM_ELEMENTS),
+          quantization_stage.get_params()[0])[
+              quantization_stage.ENCODED_VALUES_KEY]
+      x = tf.Variable(quantized_x)
+      stage = entropy_coding.GolombRiceEncodingStage(bits)
+      encoded_x = stage.encode(x, {})
+      packed_x = tf.Variable(encoded_x[stage.ENCODED_VALUES_KEY],
+                             validate_shape=False)
+      params = tf.Variable(encoded_x[stage.ENCODED_PARAMS_KEY])
+      decoded_x = stage.decode(
+          {stage.ENCODED_VALUES_KEY: packed_x,
+           stage.ENCODED_PARAMS_KEY: params}, {}, shape=[_NUM_ELEMENTS])
+      sess.run(tf.compat.v1.global_variables_initializer())
+
+      x_value, packed_x_value = sess.run([x, packed_x])
+      extras = {
+          'bits_per_value': packed_x_value.size * 28 / _NUM_ELEMENTS,
+          'bitpacking_bits_per_value': bits,
+          'entropy_bits_per_value': _entropy(x_value),
+      }
+      for op_name, op in [('encode', encoded_x[stage.ENCODED_VALUES_KEY].op),
+                          ('decode', decoded_x.op)]:
+        result = self.run_op_benchmark(
+            sess, op, min_iters=3, name='%s_%s' % (name, op_name))
+        self.report_benchmark(
+            name='%s_%s_values_per_second' % (name, op_name),
+            iters=1,
+            wall_time=result['wall_time'],
+            throughput=_NUM_ELEMENTS / result['wall_time'],
+            extras=extras)
+
+  def benchmark_4_bits(self):
+    for distribution in sorted(_DISTRIBUTIONS):
+      self._benchmark(distribution, 4)
+
+  def benchmark_8_bits(self):
+    for distribution in sorted(_DISTRIBUTIONS):
+      self._benchmark(distribution, 8)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,139 @@
+# Copyright 2019, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import itertools
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.stages.research import entropy_coding
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.testing import test_utils
+
+
+if tf.executing_eagerly():
+  tf.compat.v1.disable_eager_execution()
+
+
+class GolombRiceEncodingStageTest(test_utils.BaseEncodingStageTest):
+
+  def default_encoding_stage(self):
+    """See base class."""
+    return entropy_coding.GolombRiceEncodingStage(8)
+
+  def default_input(self):
+    """See base class."""
+    return tf.clip_by_value(
+        tf.round(tf.random.normal([500], mean=128.0, stddev=5.0)), 0.0, 255.0)
+
+  @property
+  def is_lossless(self):
+    """See base class."""
+    return True
+
+  def common_asserts_for_test_data(self, data):
+    """See base class."""
+    encoded_x = data.encoded_x[
+        entropy_coding.GolombRiceEncodingStage.ENCODED_VALUES_KEY]
+    self.assertAllEqual(data.x, data.decoded_x)
+    self.assertEqual(np.int32, encoded_x.dtype)
+    # The concentrated values take fewer than the 8 input bits per value.
+    self.assertLess(encoded_x.size * 28, data.x.size * 8)
+
+  @parameterized.parameters(
+      itertools.product([1, 2, 4, 8, 16], [(1,), (50,), (5, 5), (5, 6, 4)]))
+  def test_is_lossless(self, bits, shape):
+    # Tests that the encoding is lossless, for a variety of inputs.
+    def x_fn():
+      return tf.cast(
+          tf.random.uniform(shape, minval=0, maxval=2**bits, dtype=tf.int32),
+          tf.float32)
+
+    stage = entropy_coding.GolombRiceEncodingStage(bits)
+    test_data = self.run_one_to_many_encode_decode(stage, x_fn)
+    self.assertAllEqual(test_data.x, test_data.decoded_x)
+
+  @parameterized.parameters([tf.float32, tf.float64, tf.int32, tf.int64])
+  def test_input_types(self, x_dtype):
+    # Tests different input dtypes.
+    stage = self.default_encoding_stage()
+    test_data = self.run_one_to_many_encode_decode(
+        stage, lambda: tf.cast(self.default_input(), x_dtype))
+    self.assertAllEqual(test_data.x, test_data.decoded_x)
+    self.assertEqual(test_data.x.dtype, test_data.decoded_x.dtype)
+
+  def test_encoded_values_as_expected(self):
+    # The most frequent value 2 is the center, and the distances 0, 1 and 2 of
+    # values 2, 1 and 3 are best coded with k = 0, as 1, 01 and 001.
+    stage = entropy_coding.GolombRiceEncodingStage(2)
+    test_data = self.run_one_to_many_encode_decode(
+        stage, lambda: tf.constant([2.0, 1.0, 2.0, 3.0]))
+    self.assertAllEqual(
+        [2, 0], test_data.encoded_x[stage.ENCODED_PARAMS_KEY])
+    self.assertAllEqual(
+        [int('1011001', 2) << 21],
+        test_data.encoded_x[stage.ENCODED_VALUES_KEY])
+
+  def test_constant_input(self):
+    # Every value takes a single bit.
+    stage = self.default_encoding_stage()
+    test_data = self.run_one_to_many_encode_decode(
+        stage, lambda: tf.fill([100], 7.0))
+    self.assertAllEqual(test_data.x, test_data.decoded_x)
+    self.assertLen(test_data.encoded_x[stage.ENCODED_VALUES_KEY], 4)
+
+  def test_uniform_input_uses_input_bits(self):
+    # Values are written using 8 bits each, as with bitpacking.
+    stage = self.default_encoding_stage()
+    test_data = self.run_one_to_many_encode_decode(
+        stage, lambda: tf.cast(tf.range(256), tf.float32))
+    self.assertAllEqual(test_data.x, test_data.decoded_x)
+    self.assertAllEqual([0, -1], test_data.encoded_x[stage.ENCODED_PARAMS_KEY])
+    self.assertLen(test_data.encoded_x[stage.ENCODED_VALUES_KEY], 74)
+
+  def test_remainder_bits_adapt_to_spread(self):
+    stage = self.default_encoding_stage()
+    narrow_data = self.run_one_to_many_encode_decode(
+        stage, lambda: tf.round(tf.random.normal([1000], 128.0, 1.0)))
+    wide_data = self.run_one_to_many_encode_decode(
+        stage, lambda: tf.round(tf.random.normal([1000], 128.0, 16.0)))
+    narrow_k = narrow_data.encoded_x[stage.ENCODED_PARAMS_KEY][1]
+    wide_k = wide_data.encoded_x[stage.ENCODED_PARAMS_KEY][1]
+    self.assertLess(narrow_k, wide_k)
+    self.assertAllEqual(narrow_data.x, narrow_data.decoded_x)
+    self.assertAllEqual(wide_data.x, wide_data.decoded_x)
+
+  @parameterized.parameters([tf.bool, tf.float16, tf.uint8])
+  def test_unsupported_types_raise(self, dtype):
+    stage = self.default_encoding_stage()
+    with self.assertRaisesRegex(TypeError, 'Unsupported input type'):
+      self.run_one_to_many_encode_decode(
+          stage, lambda: tf.cast(self.default_input(), dtype))
+
+  @parameterized.parameters([0, 17, 2.5])
+  def test_bad_input_bits_raises(self, input_bits):
+    with self.assertRaisesRegex(ValueError, 'between 1 and 16'):
+      entropy_coding.GolombRiceEncodingStage(input_bits)
+
+  def test_tensor_input_bits_raises(self):
+    with self.assertRaisesRegex(TypeError, 'TensorFlow value'):
+      entropy_coding.GolombRiceEncodingStage(tf.constant(8))
+
+
+if __name__ == '__main__':
+  tf.test.main()
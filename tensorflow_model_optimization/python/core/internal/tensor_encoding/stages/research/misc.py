@@ -100,6 +100,136 @@ class SplitBySmallValueEncodingStage(encoding_stage.EncodingStageInterface):
     return decoded_x
 
 
+@encoding_stage.tf_style_encoding_stage
+class TopKEncodingStage(encoding_stage.EncodingStageInterface):
+  """Encoding stage keeping the elements with the largest absolute values.
+
+  This encoding stage will split the input into two outputs: the values and the
+  sorted indices in the flattened input of a fixed number of elements with the
+  largest absolute values. The other elements are then decoded to zero. Unlike
+  with `SplitBySmallValueEncodingStage`, the size of the outputs depends only on
+  the shape of the input, which must be statically known.
+
+  If `block_size` is provided, the flattened input is split into blocks of
+  `block_size` consecutive elements, and the elements are selected in every
+  block separately. The difference between consecutive indices is then smaller
+  than `2 * block_size`, and the indices can be compactly represented by the
+  `DifferenceBetweenIntegersEncodingStage` followed by bitpacking.
+  """
+
+  ENCODED_INDICES_KEY = 'indices'
+  ENCODED_VALUES_KEY = 'top_k_values'
+
+  def __init__(self, k=None, fraction=None, block_size=None):
+    """Initializer for the TopKEncodingStage.
+
+    Exactly one of `k` and `fraction` must be provided.
+
+    Args:
+      k: The number of elements to keep in the input, or in every block if
+        `block_size` is provided.
+      fraction: The fraction of elements to keep in the input, or in every
+        block if `block_size` is provided. At least one element is kept.
+      block_size: The (optional) number of consecutive elements from which the
+        elements are selected separately.
+
+    Raises:
+      TypeError: If any of the arguments is a TensorFlow value.
+      ValueError: If not exactly one of `k` and `fraction` is provided, or if
+        `k` or `block_size` is not positive, or `fraction` is not in (0, 1].
+    """
+    if any(tf.is_tensor(arg) for arg in [k, fraction, block_size]):
+      raise TypeError('The arguments cannot be TensorFlow values.')
+    if (k is None) == (fraction is None):
+      raise ValueError('Exactly one of k and fraction must be provided.')
+    if k is not None and k < 1:
+      raise ValueError('The k argument must be positive. Provided: %s' % k)
+    if fraction is not None and not 0.0 < fraction <= 1.0:
+      raise ValueError(
+          'The fraction argument must be in (0, 1]. Provided: %s' % fraction)
+    if block_size is not None and block_size < 1:
+      raise ValueError(
+          'The block_size argument must be positive. Provided: %s' % block_size)
+    self._k = k
+    self._fraction = fraction
+    self._block_size = block_size
+
+  @property
+  def name(self):
+    """See base class."""
+    return 'top_k'
+
+  @property
+  def compressible_tensors_keys(self):
+    """See base class."""
+    return [
+        self.ENCODED_VALUES_KEY,
+        self.ENCODED_INDICES_KEY,
+    ]
+
+  @property
+  def commutes_with_sum(self):
+    """See base class."""
+    return False
+
+  @property
+  def decode_needs_input_shape(self):
+    """See base class."""
+    return True
+
+  def get_params(self):
+    """See base class."""
+    return {}, {}
+
+  def encode(self, x, encode_params):
+    """See base class."""
+    del encode_params  # Unused.
+    num_elements = x.shape.num_elements()
+    if num_elements is None:
+      raise ValueError('The shape of x must be statically known. Shape of x: '
+                       '%s' % x.shape)
+
+    # The flattened input is padded with zeros to a whole number of blocks.
+    # Padded elements can be selected only if the last block has fewer elements
+    # than are kept in every block, and are dropped in the decode method.
+    block_size = max(1, min(self._block_size or num_elements, num_elements))
+    num_blocks = -(-num_elements // block_size)
+    padding = num_blocks * block_size - num_elements
+    blocks = tf.reshape(
+        tf.pad(tf.reshape(x, [-1]), [[0, padding]]), [num_blocks, block_size])
+
+    if self._k is not None:
+      k = min(self._k, block_size)
+    else:
+      k = max(1, int(round(self._fraction * block_size)))
+    _, indices = tf.math.top_k(tf.abs(blocks), k=k, sorted=False)
+    indices = tf.sort(indices, axis=1)
+    values = tf.gather(blocks, indices, batch_dims=1)
+    indices += tf.expand_dims(tf.range(num_blocks) * block_size, 1)
+    return {
+        self.ENCODED_INDICES_KEY: tf.reshape(indices, [-1]),
+        self.ENCODED_VALUES_KEY: tf.reshape(values, [-1]),
+    }
+
+  def decode(self,
+             encoded_tensors,
+             decode_params,
+             num_summands=None,
+             shape=None):
+    """See base class."""
+    del decode_params, num_summands  # Unused.
+    indices = encoded_tensors[self.ENCODED_INDICES_KEY]
+    values = encoded_tensors[self.ENCODED_VALUES_KEY]
+
+    num_elements = tf.reduce_prod(tf.cast(shape, indices.dtype))
+    padded_num_elements = tf.maximum(num_elements, tf.reduce_max(indices) + 1)
+    decoded_x = tf.scatter_nd(
+        indices=tf.expand_dims(indices, 1),
+        updates=values,
+        shape=tf.expand_dims(padded_num_elements, 0))
+    return tf.reshape(decoded_x[:num_elements], shape)
+
+
 @encoding_stage.tf_style_encoding_stage
 class DifferenceBetweenIntegersEncodingStage(
     encoding_stage.EncodingStageInterface):
@@ -108,8 +238,8 @@ class DifferenceBetweenIntegersEncodingStage(
   This encoding stage can be useful when the original integers can be large, but
   the difference of the integers are much smaller values and have a more compact
   representation. For example, it can be combined with the
-  `SplitBySmallValueEncodingStage` to further compress the increasing sequence
-  of indices.
+  `SplitBySmallValueEncodingStage` or the `TopKEncodingStage` to further
+  compress the increasing sequence of indices.
 
   The encode method expects a tensor with 1 dimension and with integer dtype.
   """
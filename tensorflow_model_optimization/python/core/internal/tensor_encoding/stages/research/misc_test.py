@@ -108,6 +108,113 @@ class SplitBySmallValueEncodingStageTest(test_utils.BaseEncodingStageTest):
                         np.zeros([50], dtype=x.dtype.as_numpy_dtype))
 
 
+class TopKEncodingStageTest(test_utils.BaseEncodingStageTest):
+
+  def default_encoding_stage(self):
+    """See base class."""
+    return misc.TopKEncodingStage(k=10)
+
+  def default_input(self):
+    """See base class."""
+    return tf.random.uniform([50], minval=-1.0, maxval=1.0)
+
+  @property
+  def is_lossless(self):
+    """See base class."""
+    return False
+
+  def common_asserts_for_test_data(self, data):
+    """See base class."""
+    indices = data.encoded_x[misc.TopKEncodingStage.ENCODED_INDICES_KEY]
+    values = data.encoded_x[misc.TopKEncodingStage.ENCODED_VALUES_KEY]
+    self.assertEqual(np.int32, indices.dtype)
+    self.assertLen(values, 10)
+    self.assertAllEqual(np.sort(indices), indices)
+    self.assertAllEqual(data.x[indices], values)
+    # The kept elements are the largest in absolute value.
+    self.assertAllEqual(
+        np.sort(np.abs(data.x))[-10:], np.sort(np.abs(values)))
+    expected_decoded_x = np.zeros_like(data.x)
+    expected_decoded_x[indices] = values
+    self.assertAllEqual(expected_decoded_x, data.decoded_x)
+
+  @parameterized.parameters([tf.float32, tf.float64])
+  def test_input_types(self, x_dtype):
+    # Tests different input dtypes.
+    x = tf.constant([[0.1, -2.0, 0.3], [4.0, 0.0, -0.5]], dtype=x_dtype)
+    stage = misc.TopKEncodingStage(k=3)
+    encode_params, decode_params = stage.get_params()
+    encoded_x, decoded_x = self.encode_decode_x(stage, x, encode_params,
+                                                decode_params)
+    test_data = test_utils.TestData(x, encoded_x, decoded_x)
+    test_data = self.evaluate_test_data(test_data)
+
+    expected_encoded_values = np.array([-2.0, 4.0, -0.5],
+                                       dtype=x_dtype.as_numpy_dtype)
+    expected_encoded_indices = np.array([1, 3, 5], dtype=np.int32)
+    expected_decoded_x = np.array([[0.0, -2.0, 0.0], [4.0, 0.0, -0.5]],
+                                  dtype=x_dtype.as_numpy_dtype)
+    self.assertAllEqual(test_data.encoded_x[stage.ENCODED_VALUES_KEY],
+                        expected_encoded_values)
+    self.assertAllEqual(test_data.encoded_x[stage.ENCODED_INDICES_KEY],
+                        expected_encoded_indices)
+    self.assertAllEqual(test_data.decoded_x, expected_decoded_x)
+
+  @parameterized.parameters([(0.1, 5), (0.01, 1), (0.5, 25), (1.0, 50)])
+  def test_fraction(self, fraction, expected_k):
+    stage = misc.TopKEncodingStage(fraction=fraction)
+    test_data = self.run_one_to_many_encode_decode(stage, self.default_input)
+    self.assertLen(test_data.encoded_x[stage.ENCODED_VALUES_KEY], expected_k)
+
+  def test_k_larger_than_input_is_lossless(self):
+    stage = misc.TopKEncodingStage(k=100)
+    test_data = self.run_one_to_many_encode_decode(stage, self.default_input)
+    self.assertAllEqual(test_data.x, test_data.decoded_x)
+    self.assertAllEqual(
+        np.arange(50), test_data.encoded_x[stage.ENCODED_INDICES_KEY])
+
+  def test_block_size(self):
+    # The last block contains only 2 elements, and 3 are kept in every block.
+    x = tf.constant([5.0, 1.0, -4.0, 2.0, 0.0, 3.0, -1.0, 6.0, 0.5, 0.0])
+    stage = misc.TopKEncodingStage(k=3, block_size=4)
+    encode_params, decode_params = stage.get_params()
+    encoded_x, decoded_x = self.encode_decode_x(stage, x, encode_params,
+                                                decode_params)
+    test_data = self.evaluate_test_data(
+        test_utils.TestData(x, encoded_x, decoded_x))
+
+    indices = test_data.encoded_x[stage.ENCODED_INDICES_KEY]
+    self.assertLen(indices, 9)
+    self.assertAllEqual([0, 2, 3, 5, 6, 7], indices[:6])
+    self.assertAllEqual([8, 9], indices[6:8])
+    self.assertAllEqual(
+        [5.0, 0.0, -4.0, 2.0, 0.0, 3.0, -1.0, 6.0, 0.5, 0.0],
+        test_data.decoded_x)
+    self.assertAllLess(np.diff(np.concatenate([[0], indices])), 2 * 4)
+
+  def test_unknown_shape_raises(self):
+    stage = self.default_encoding_stage()
+    x = tf.compat.v1.placeholder(tf.float32, [None])
+    params, _ = stage.get_params()
+    with self.assertRaisesRegexp(ValueError, 'statically known'):
+      stage.encode(x, params)
+
+  @parameterized.parameters(
+      ({}, 'Exactly one'),
+      ({'k': 1, 'fraction': 0.5}, 'Exactly one'),
+      ({'k': 0}, 'must be positive'),
+      ({'fraction': 0.0}, r'\(0, 1\]'),
+      ({'fraction': 1.5}, r'\(0, 1\]'),
+      ({'k': 1, 'block_size': 0}, 'must be positive'))
+  def test_bad_arguments_raise(self, kwargs, regexp):
+    with self.assertRaisesRegexp(ValueError, regexp):
+      misc.TopKEncodingStage(**kwargs)
+
+  def test_tensor_argument_raises(self):
+    with self.assertRaisesRegexp(TypeError, 'TensorFlow values'):
+      misc.TopKEncodingStage(k=tf.constant(1))
+
+
 class DifferenceBetweenIntegersEncodingStageTest(
     test_utils.BaseEncodingStageTest):
 
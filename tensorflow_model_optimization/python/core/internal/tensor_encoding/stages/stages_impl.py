@@ -393,7 +393,8 @@ class BitpackingEncodingStage(encoding_stage.EncodingStageInterface):
   savings.
 
   The encode method expects integer values in range `[0, 2**input_bits-1]` in a
-  floating point type (`tf.float32` or `tf.float64`). It packs the values to
+  floating point type (`tf.float32` or `tf.float64`), or in an integer type
+  (`tf.int32` or `tf.int64`), such as indices. It packs the values to
   `tf.int32` type, and returns a rank 1 `Tensor` of packed values. The packed
   values are in the range `[0, 2**28-1]`, as the serialization in protocol
   buffer for this type is varint, and this thus ensures every element fits into
@@ -404,12 +405,15 @@ class BitpackingEncodingStage(encoding_stage.EncodingStageInterface):
   DUMMY_TYPE_VALUES_KEY = 'dummy_type_value'
   _ALLOWED_INPUT_BITS_ARG = list(range(1, 17))
 
-  def __init__(self, input_bits):
+  def __init__(self, input_bits, use_bitwise_ops=True):
     """Initializer for the UniformQuantizationEncodingStage.
 
     Args:
       input_bits: The number of bits expected to represent the input to the
         `encode` method. Must be between 1 and 16. Cannot be a TensorFlow value.
+      use_bitwise_ops: A bool. If False, the values are packed with basic math
+        operations only, for environments where bitwise ops are not available.
+        The encoded values are the same either way.
 
     Raises:
       TypeError: If `input_bits` is a TensorFlow value.
@@ -421,6 +425,7 @@ class BitpackingEncodingStage(encoding_stage.EncodingStageInterface):
       raise ValueError(
           'The input_bits argument must be an integer between 1 and 16.')
     self._input_bits = input_bits
+    self._use_bitwise_ops = use_bitwise_ops
 
     # Because the proto serialization format for integers is varint, we pack to
     # 28 bits, ensuring each serialized value is represented by 4 bytes.
@@ -455,20 +460,21 @@ class BitpackingEncodingStage(encoding_stage.EncodingStageInterface):
     del encode_params
     flat_x = tf.reshape(x, [-1])
     packed_x = tf_utils.pack_into_int(
-        tf.cast(flat_x, tf.int32), self._input_bits, self._target_bitrange)
+        tf.cast(flat_x, tf.int32), self._input_bits, self._target_bitrange,
+        self._use_bitwise_ops)
 
     # The most common type will be tf.float32, which we keep as default.
     # If another type is provided, return a Tensor with a single value of that
     # type to be able to recover the type from encoded_tensors in decode method.
     if x.dtype == tf.float32:
       return {self.ENCODED_VALUES_KEY: packed_x}
-    elif x.dtype == tf.float64:
+    elif x.dtype in [tf.float64, tf.int32, tf.int64]:
       return {self.ENCODED_VALUES_KEY: packed_x,
-              self.DUMMY_TYPE_VALUES_KEY: tf.constant(0.0, dtype=tf.float64)}
+              self.DUMMY_TYPE_VALUES_KEY: tf.constant(0, dtype=x.dtype)}
     else:
       raise TypeError(
-          'Unsupported packing type: %s. Supported types are tf.float32 and '
-          'tf.float64 values' % x.dtype)
+          'Unsupported packing type: %s. Supported types are tf.float32, '
+          'tf.float64, tf.int32 and tf.int64 values' % x.dtype)
 
   def decode(self,
              encoded_tensors,
@@ -479,7 +485,7 @@ class BitpackingEncodingStage(encoding_stage.EncodingStageInterface):
     del decode_params, num_summands  # Unused.
     unpacked_x = tf_utils.unpack_from_int(
         encoded_tensors[self.ENCODED_VALUES_KEY], self._input_bits,
-        self._target_bitrange, shape)
+        self._target_bitrange, shape, self._use_bitwise_ops)
 
     dummy_type_value = encoded_tensors.get(self.DUMMY_TYPE_VALUES_KEY)
     if dummy_type_value is not None:
@@ -0,0 +1,72 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks for the `stages_impl` module.
+
+Run with `--benchmarks=.` to run all benchmarks, or with a regular expression
+matching the names of the benchmarks to run.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.stages import stages_impl
+
+
+if tf.executing_eagerly():
+  tf.compat.v1.disable_eager_execution()
+
+
+class BitpackingEncodingStageBenchmark(tf.test.Benchmark):
+  """Benchmarks for `BitpackingEncodingStage`."""
+
+  def _benchmark(self, input_bits, use_bitwise_ops, num_elements=10**7):
+    name = 'bitpacking_%d_bits%s' % (
+        input_bits, '' if use_bitwise_ops else '_without_bitwise_ops')
+    with tf.Graph().as_default(), tf.compat.v1.Session() as sess:
+      x = tf.Variable(
+          tf.cast(
+              tf.random.uniform([num_elements], maxval=2**input_bits,
+                                dtype=tf.int32), tf.float32))
+      stage = stages_impl.BitpackingEncodingStage(input_bits, use_bitwise_ops)
+      encoded_x = stage.encode(x, {})
+      encoded_values = encoded_x[stage.ENCODED_VALUES_KEY]
+      packed_x = tf.Variable(encoded_values)
+      decoded_x = stage.decode(
+          {stage.ENCODED_VALUES_KEY: packed_x}, {}, shape=[num_elements])
+      sess.run(tf.compat.v1.global_variables_initializer())
+
+      for op_name, op in [('encode', encoded_values.op),
+                          ('decode', decoded_x.op)]:
+        result = self.run_op_benchmark(
+            sess, op, min_iters=3, name='%s_%s' % (name, op_name))
+        self.report_benchmark(
+            name='%s_%s_values_per_second' % (name, op_name),
+            iters=1,
+            wall_time=result['wall_time'],
+            throughput=num_elements / result['wall_time'])
+
+  def benchmark_bitwise_ops(self):
+    for input_bits in [1, 4, 8, 13, 16]:
+      self._benchmark(input_bits, use_bitwise_ops=True)
+
+  def benchmark_without_bitwise_ops(self):
+    for input_bits in [1, 8, 16]:
+      self._benchmark(input_bits, use_bitwise_ops=False)
+
+
+if __name__ == '__main__':
+  tf.test.main()
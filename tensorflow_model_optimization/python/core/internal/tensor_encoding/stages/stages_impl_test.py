@@ -412,6 +412,26 @@ class BitpackingEncodingStageTest(test_utils.BaseEncodingStageTest):
         expected_bitpacked_values, test_data.encoded_x[
             stages_impl.BitpackingEncodingStage.ENCODED_VALUES_KEY])
 
+  @parameterized.parameters([1, 5, 8, 16])
+  def test_encoded_values_same_without_bitwise_ops(self, bits):
+    x = tf.cast(
+        tf.random.uniform([100], minval=0, maxval=2**bits, dtype=tf.int32),
+        tf.float32)
+    stage = stages_impl.BitpackingEncodingStage(bits)
+    fallback_stage = stages_impl.BitpackingEncodingStage(
+        bits, use_bitwise_ops=False)
+    encoded_x = stage.encode(x, {})
+    fallback_encoded_x = fallback_stage.encode(x, {})
+    decoded_x = fallback_stage.decode(fallback_encoded_x, {}, shape=[100])
+    encoded_x, fallback_encoded_x = [
+        encoded[stages_impl.BitpackingEncodingStage.ENCODED_VALUES_KEY]
+        for encoded in (encoded_x, fallback_encoded_x)
+    ]
+    x, encoded_x, fallback_encoded_x, decoded_x = self.evaluate(
+        [x, encoded_x, fallback_encoded_x, decoded_x])
+    self.assertAllEqual(encoded_x, fallback_encoded_x)
+    self.assertAllEqual(x, decoded_x)
+
   def test_float_types(self):
     # Tests that both float32 and float64 type work correctly.
     stage = self.default_encoding_stage()
@@ -425,6 +445,15 @@ class BitpackingEncodingStageTest(test_utils.BaseEncodingStageTest):
     self.assertAllClose(test_data.x, test_data.decoded_x)
     self.assertEqual(np.float64, test_data.decoded_x.dtype)
 
+  @parameterized.parameters([tf.int32, tf.int64])
+  def test_integer_types(self, dtype):
+    # Tests that integer types, such as indices, are packed as well.
+    stage = self.default_encoding_stage()
+    test_data = self.run_one_to_many_encode_decode(
+        stage, lambda: tf.cast(self.default_input(), dtype))
+    self.assertAllEqual(test_data.x, test_data.decoded_x)
+    self.assertEqual(dtype.as_numpy_dtype, test_data.decoded_x.dtype)
+
   def test_bad_input_executes(self):
     # Test that if input to encode is outside of the expected range, everything
     # still executes, but the result is not correct.
@@ -434,7 +463,7 @@ class BitpackingEncodingStageTest(test_utils.BaseEncodingStageTest):
         stage, lambda: tf.constant(x, tf.float32))
     self.assertNotAllClose(x, test_data.decoded_x.astype(np.int32))
 
-  @parameterized.parameters([tf.bool, tf.int32])
+  @parameterized.parameters([tf.bool, tf.float16, tf.uint8])
   def test_encode_unsupported_type_raises(self, dtype):
     stage = self.default_encoding_stage()
     with self.assertRaisesRegexp(TypeError, 'Unsupported packing type'):
@@ -17,6 +17,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.testing.aggregation_tree import AggregationTree
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.testing.aggregation_tree import RoundStats
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.testing.test_utils import AdaptiveNormalizeEncodingStage
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.testing.test_utils import aggregate_state_update_tensors
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.testing.test_utils import BaseEncodingStageTest
@@ -0,0 +1,263 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Local simulation of the aggregation of encoded values in a tree.
+
+`AggregationTree` runs the pattern of usage described in the `GatherEncoder`
+class in a single process: many clients encode their values, intermediary
+nodes of a multi-tier tree partially decode and sum the encoded values of their
+children, and a server finishes the decoding and updates the state. Clients and
+nodes of the same tier run in parallel on a thread pool, and all values are
+communicated between them as numpy arrays.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+from multiprocessing.pool import ThreadPool
+import threading
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import accumulator
+
+
+def _nbytes(structure):
+  """Returns the number of bytes of all numpy arrays in `structure`."""
+  return sum(value.nbytes for value in tf.nest.flatten(structure))
+
+
+def _to_numpy(structure):
+  return tf.nest.map_structure(np.asarray, structure)
+
+
+class _Runner(object):
+  """Calls a TensorFlow function with numpy values, returning numpy values.
+
+  In eager mode, the function is called directly. In graph mode, a graph is
+  built for every combination of shapes and dtypes of the arguments, and run
+  in a session.
+  """
+
+  def __init__(self, fn, session):
+    self._fn = fn
+    self._session = session
+    self._callables = {}
+    self._lock = threading.Lock()
+
+  def __call__(self, *args):
+    if self._session is None:
+      return _to_numpy(self._fn(*args))
+
+    flat_args = tf.nest.flatten(args)
+    key = tuple((arg.shape, arg.dtype) for arg in flat_args)
+    with self._lock:
+      if key not in self._callables:
+        with self._session.graph.as_default():
+          placeholders = [
+              tf.compat.v1.placeholder(arg.dtype, arg.shape)
+              for arg in flat_args
+          ]
+          outputs = self._fn(*tf.nest.pack_sequence_as(args, placeholders))
+          self._callables[key] = (outputs,
+                                  self._session.make_callable(
+                                      tf.nest.flatten(outputs),
+                                      feed_list=placeholders))
+    outputs, fetch = self._callables[key]
+    return tf.nest.pack_sequence_as(outputs, fetch(*flat_args))
+
+
+class _LocalEncoder(object):
+  """Exposes the methods of an encoder on numpy values."""
+
+  def __init__(self, encoder, session):
+    self.state_update_aggregation_modes = (
+        encoder.state_update_aggregation_modes)
+    self.initial_state = _Runner(encoder.initial_state, session)
+    self.get_params = _Runner(encoder.get_params, session)
+    self.encode = _Runner(encoder.encode, session)
+    self.decode_before_sum = _Runner(encoder.decode_before_sum, session)
+    self.decode_after_sum = _Runner(encoder.decode_after_sum, session)
+    self.update_state = _Runner(encoder.update_state, session)
+
+
+class RoundStats(
+    collections.namedtuple('RoundStats', [
+        'num_clients', 'num_elements', 'encode_seconds', 'aggregate_seconds',
+        'decode_seconds', 'uplink_bytes', 'downlink_bytes'
+    ])):
+  """Measurements of a single round of `AggregationTree.run_round`.
+
+  Fields:
+    num_clients: The number of clients.
+    num_elements: The number of elements of the value of a client.
+    encode_seconds: Wall time of encoding the values of all clients.
+    aggregate_seconds: Wall time of partially decoding and summing the encoded
+      values, and aggregating the state update tensors, in the tree.
+    decode_seconds: Wall time of finishing the decoding and updating the state
+      at the server.
+    uplink_bytes: A list of the total number of bytes sent to their parents by
+      the clients, followed by the nodes of each tier from the bottom of the
+      tree. The last value are the bytes received by the server.
+    downlink_bytes: The total number of bytes of parameters sent by the server
+      to the clients and to the nodes which partially decode.
+  """
+  __slots__ = ()
+
+  @property
+  def encode_values_per_second(self):
+    return self.num_clients * self.num_elements / self.encode_seconds
+
+  @property
+  def aggregate_values_per_second(self):
+    return self.num_clients * self.num_elements / self.aggregate_seconds
+
+  @property
+  def decode_values_per_second(self):
+    return self.num_elements / self.decode_seconds
+
+
+class AggregationTree(object):
+  """Simulates aggregation of encoded values from clients in a tree.
+
+  The tree is described by `fan_outs`, the number of children of every node in
+  each tier, starting with the server. For instance, `fan_outs=[4, 10]` creates
+  a server with 4 intermediary nodes, each aggregating the values of 10
+  clients, for a total of 40 clients.
+
+  In each round:
+  1.  The server computes the parameters from the current state, and sends the
+      `encode_params` to the clients and the `decode_before_sum_params` to the
+      nodes in the lowest tier.
+  2.  Every client encodes its value.
+  3.  Every node in the lowest tier accumulates the encoded values of its
+      children in an `Accumulator`, and sends it to its parent. Every node in
+      a higher tier merges the accumulators of its children.
+  4.  The server finishes the decoding of the sum, and updates the state.
+  """
+
+  def __init__(self, encoder, fan_outs, num_threads=None):
+    """Creates an `AggregationTree`.
+
+    Args:
+      encoder: A `GatherEncoder` or `NestGatherEncoder`.
+      fan_outs: A non-empty list of positive integers, the number of children
+        of the nodes in each tier, from the server down to the parents of the
+        clients.
+      num_threads: The number of threads encoding and aggregating values in
+        parallel. Defaults to the number of CPUs.
+
+    Raises:
+      ValueError: If `fan_outs` is empty or contains a value smaller than 1.
+    """
+    fan_outs = list(fan_outs)
+    if not fan_outs or min(fan_outs) < 1:
+      raise ValueError(
+          'The fan_outs must be a non-empty list of positive integers.')
+    self._fan_outs = fan_outs
+    self._pool = ThreadPool(num_threads)
+
+    if tf.executing_eagerly():
+      self._session = None
+    else:
+      self._session = tf.compat.v1.Session(graph=tf.Graph())
+    self._local_encoder = _LocalEncoder(encoder, self._session)
+
+  @property
+  def num_clients(self):
+    """The number of clients in the tree."""
+    return int(np.prod(self._fan_outs))
+
+  def close(self):
+    """Releases the threads and the session of the tree."""
+    self._pool.terminate()
+    if self._session is not None:
+      self._session.close()
+
+  def initial_state(self):
+    """Returns the initial state of the encoder, as numpy values."""
+    return self._local_encoder.initial_state()
+
+  def run_round(self, state, client_value_fn):
+    """Runs a single round of encoded aggregation.
+
+    Args:
+      state: The current state of the encoder, as returned by the
+        `initial_state` method or a previous round.
+      client_value_fn: A Python callable, which accepts the index of a client
+        and returns its value to be encoded, as numpy values. Called from
+        multiple threads.
+
+    Returns:
+      A tuple `(decoded_sum, updated_state, stats)`, where `decoded_sum` is the
+      decoded sum of the values of all clients, `updated_state` is the state
+      for the next round, and `stats` are the `RoundStats` of the round.
+    """
+    state = _to_numpy(state)
+    encode_params, decode_before_sum_params, decode_after_sum_params = (
+        self._local_encoder.get_params(state))
+
+    def client_fn(index):
+      x = _to_numpy(client_value_fn(index))
+      encoded_x, state_update_tensors = self._local_encoder.encode(
+          x, encode_params)
+      num_elements = sum(value.size for value in tf.nest.flatten(x))
+      return (encoded_x, state_update_tensors), num_elements
+
+    start = time.time()
+    results = self._pool.map(client_fn, range(self.num_clients))
+    encode_seconds = time.time() - start
+    values = [value for value, _ in results]
+    num_elements = results[0][1]
+    uplink_bytes = [_nbytes(values)]
+
+    start = time.time()
+    for tier, fan_out in reversed(list(enumerate(self._fan_outs))):
+      is_lowest_tier = tier == len(self._fan_outs) - 1
+
+      def node_fn(children, is_lowest_tier=is_lowest_tier):
+        acc = accumulator.Accumulator(self._local_encoder,
+                                      decode_before_sum_params)
+        for child in children:
+          if is_lowest_tier:
+            acc.accumulate(*child)
+          else:
+            acc.merge(child)
+        return acc
+
+      values = self._pool.map(node_fn, [
+          values[i:i + fan_out] for i in range(0, len(values), fan_out)
+      ])
+      uplink_bytes.append(_nbytes([acc.result()[:2] for acc in values]))
+    aggregate_seconds = time.time() - start
+    summed_x, state_update_tensors, num_summands = values[0].result()
+
+    start = time.time()
+    decoded_sum = self._local_encoder.decode_after_sum(
+        summed_x, decode_after_sum_params, np.int32(num_summands))
+    updated_state = self._local_encoder.update_state(state,
+                                                     state_update_tensors)
+    decode_seconds = time.time() - start
+
+    downlink_bytes = (
+        self.num_clients * _nbytes(encode_params) +
+        self.num_clients // self._fan_outs[-1] *
+        _nbytes(decode_before_sum_params))
+    stats = RoundStats(self.num_clients, num_elements, encode_seconds,
+                       aggregate_seconds, decode_seconds, uplink_bytes,
+                       downlink_bytes)
+    return decoded_sum, updated_state, stats
@@ -0,0 +1,89 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks of encoders aggregated in an `AggregationTree`.
+
+Reports the throughput of encoding, aggregating and decoding in a simulated
+tree of clients, and the number of bytes sent in each direction.
+
+Run with `--benchmarks=.` to run all benchmarks, or with a regular expression
+matching the names of the benchmarks to run.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import gather_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.encoders import common_encoders
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.testing import aggregation_tree
+
+
+if tf.executing_eagerly():
+  tf.compat.v1.disable_eager_execution()
+
+_NUM_ELEMENTS = 2**18
+_FAN_OUTS = [4, 16]
+_NUM_ROUNDS = 3
+
+
+class AggregationTreeBenchmark(tf.test.Benchmark):
+  """Benchmarks for `AggregationTree`."""
+
+  def _benchmark(self, name, encoder):
+    tree = aggregation_tree.AggregationTree(
+        gather_encoder.GatherEncoder.from_encoder(
+            encoder, tf.TensorSpec((_NUM_ELEMENTS,), tf.float32)), _FAN_OUTS)
+    values = np.random.normal(size=(tree.num_clients,
+                                    _NUM_ELEMENTS)).astype(np.float32)
+    state = tree.initial_state()
+    # The first round builds the graphs.
+    _, state, _ = tree.run_round(state, lambda i: values[i])
+    all_stats = []
+    for _ in range(_NUM_ROUNDS):
+      _, state, stats = tree.run_round(state, lambda i: values[i])
+      all_stats.append(stats)
+    tree.close()
+
+    extras = {
+        'uplink_bytes_%d' % i: b for i, b in enumerate(stats.uplink_bytes)
+    }
+    extras['downlink_bytes'] = stats.downlink_bytes
+    for stage in ['encode', 'aggregate', 'decode']:
+      self.report_benchmark(
+          name='%s_%s' % (name, stage),
+          iters=_NUM_ROUNDS,
+          wall_time=np.mean(
+              [getattr(s, '%s_seconds' % stage) for s in all_stats]),
+          throughput=np.mean([
+              getattr(s, '%s_values_per_second' % stage) for s in all_stats
+          ]),
+          extras=extras)
+
+  def benchmark_identity(self):
+    self._benchmark('identity', common_encoders.identity())
+
+  def benchmark_uniform_quantization(self):
+    self._benchmark('uniform_quantization',
+                    common_encoders.uniform_quantization(8))
+
+  def benchmark_hadamard_quantization(self):
+    self._benchmark('hadamard_quantization',
+                    common_encoders.hadamard_quantization(8))
+
+
+if __name__ == '__main__':
+  tf.test.main()
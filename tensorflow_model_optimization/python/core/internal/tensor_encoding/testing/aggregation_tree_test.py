@@ -0,0 +1,141 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import core_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import gather_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.core import nest_gather_encoder
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.testing import aggregation_tree
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.testing import test_utils
+
+
+def _gather_encoder(stage, shape):
+  return gather_encoder.GatherEncoder.from_encoder(
+      core_encoder.EncoderComposer(stage).make(),
+      tf.TensorSpec(shape, tf.float32))
+
+
+def _client_values(num_clients, shape):
+  return np.random.uniform(size=(num_clients,) + shape).astype(np.float32)
+
+
+class AggregationTreeTest(tf.test.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters(([1],), ([6],), ([2, 3],), ([3, 1, 2],))
+  def test_decodes_sum(self, fan_outs):
+    tree = aggregation_tree.AggregationTree(
+        _gather_encoder(test_utils.TimesTwoEncodingStage(), (5,)), fan_outs)
+    self.addCleanup(tree.close)
+    values = _client_values(tree.num_clients, (5,))
+
+    decoded_sum, _, stats = tree.run_round(tree.initial_state(),
+                                           lambda i: values[i])
+
+    self.assertAllClose(np.sum(values, axis=0), decoded_sum)
+    self.assertEqual(int(np.prod(fan_outs)), stats.num_clients)
+    self.assertEqual(5, stats.num_elements)
+    # The clients and the nodes of every tier send float32 vectors.
+    expected_uplink_bytes = [tree.num_clients * 5 * 4]
+    num_nodes = tree.num_clients
+    for fan_out in reversed(fan_outs):
+      num_nodes //= fan_out
+      expected_uplink_bytes.append(num_nodes * 5 * 4)
+    self.assertEqual(expected_uplink_bytes, stats.uplink_bytes)
+    # The factor 2.0 is the only parameter.
+    self.assertEqual(tree.num_clients * 4, stats.downlink_bytes)
+    self.assertGreater(stats.encode_values_per_second, 0)
+    self.assertGreater(stats.aggregate_values_per_second, 0)
+    self.assertGreater(stats.decode_values_per_second, 0)
+
+  def test_decodes_before_sum_in_lowest_tier(self):
+    tree = aggregation_tree.AggregationTree(
+        _gather_encoder(test_utils.SignIntFloatEncodingStage(), (4,)), [2, 3])
+    self.addCleanup(tree.close)
+    values = _client_values(tree.num_clients, (4,))
+
+    decoded_sum, _, stats = tree.run_round(tree.initial_state(),
+                                           lambda i: values[i])
+
+    self.assertAllClose(np.sum(values, axis=0), decoded_sum)
+    # Clients send three encoded vectors, the nodes send decoded vectors.
+    self.assertEqual([6 * 3 * 4 * 4, 2 * 4 * 4, 4 * 4], stats.uplink_bytes)
+
+  def test_aggregates_state_update_tensors(self):
+    tree = aggregation_tree.AggregationTree(
+        _gather_encoder(test_utils.StateUpdateTensorsEncodingStage(), (5,)),
+        [2, 2, 2])
+    self.addCleanup(tree.close)
+    values = _client_values(tree.num_clients, (5,))
+
+    _, updated_state, _ = tree.run_round(tree.initial_state(),
+                                         lambda i: values[i])
+
+    expected_state = [
+        np.sum(values),
+        np.amin(values),
+        np.amax(values), values.size
+    ]
+    # We are not in control of ordering of the elements in state tuple.
+    self.assertAllClose(sorted(expected_state), sorted(updated_state))
+
+  def test_updates_state_between_rounds(self):
+    tree = aggregation_tree.AggregationTree(
+        _gather_encoder(test_utils.PlusOneOverNEncodingStage(), (3,)), [2, 2])
+    self.addCleanup(tree.close)
+
+    state = tree.initial_state()
+    for i in range(1, 4):
+      values = _client_values(tree.num_clients, (3,))
+      decoded_sum, state, _ = tree.run_round(state, lambda j: values[j])  # pylint: disable=cell-var-from-loop
+      self.assertAllClose(np.sum(values, axis=0), decoded_sum)
+      self.assertAllEqual((i + 1,), state)
+
+  def test_nest_gather_encoder(self):
+    tensorspecs = [
+        tf.TensorSpec((20,), tf.float32),
+        tf.TensorSpec((2, 3), tf.float32)
+    ]
+    encoder = nest_gather_encoder.NestGatherEncoder.from_encoder_fn(
+        lambda _: core_encoder.EncoderComposer(  # pylint: disable=g-long-lambda
+            test_utils.TimesTwoEncodingStage()).make(), tensorspecs)
+    tree = aggregation_tree.AggregationTree(encoder, [3, 2])
+    self.addCleanup(tree.close)
+    values = [
+        _client_values(tree.num_clients, (20,)),
+        _client_values(tree.num_clients, (2, 3))
+    ]
+
+    decoded_sum, _, stats = tree.run_round(
+        tree.initial_state(), lambda i: [values[0][i], values[1][i]])
+
+    self.assertAllClose([np.sum(values[0], axis=0),
+                         np.sum(values[1], axis=0)], decoded_sum)
+    self.assertEqual(26, stats.num_elements)
+
+  @parameterized.parameters([[]], [[2, 0]], [[-1]])
+  def test_invalid_fan_outs_raises(self, fan_outs):
+    encoder = _gather_encoder(test_utils.TimesTwoEncodingStage(), (5,))
+    with self.assertRaisesRegex(ValueError, 'fan_outs'):
+      aggregation_tree.AggregationTree(encoder, fan_outs)
+
+
+if __name__ == '__main__':
+  tf.test.main()
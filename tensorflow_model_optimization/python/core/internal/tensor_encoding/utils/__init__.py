@@ -27,6 +27,8 @@ from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils.tf
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils.tf_utils import pack_into_int
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils.tf_utils import random_floats
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils.tf_utils import random_floats_cmwc
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils.tf_utils import random_floats_philox
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils.tf_utils import random_signs
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils.tf_utils import random_signs_cmwc
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils.tf_utils import random_signs_philox
 from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils.tf_utils import unpack_from_int
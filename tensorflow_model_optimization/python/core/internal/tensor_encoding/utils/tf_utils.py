@@ -23,12 +23,31 @@ import numpy as np
 import tensorflow as tf
 
 
+# Base 2 logarithm of the size of the largest Hadamard matrix applied in a
+# single step of `fast_walsh_hadamard_transform`.
+_HADAMARD_BLOCK_LOG2 = 5
+
+
+def _hadamard_matrix(log2):
+  """Returns the Sylvester Hadamard matrix of size `2**log2` as numpy array."""
+  h = np.ones([1, 1])
+  for _ in range(log2):
+    h = np.block([[h, h], [h, -h]])
+  return h
+
+
 def fast_walsh_hadamard_transform(x):
   """Applies the fast Walsh-Hadamard transform to a set of vectors.
 
   This method uses a composition of existing TensorFlow operations to implement
   the transform.
 
+  The Hadamard matrix of size `2**n` is the Kronecker product of Hadamard
+  matrices of size `2**k` with `k` summing to `n`. Each step multiplies blocks
+  of `2**k` consecutive elements by one of these matrices, with `k` at most
+  `_HADAMARD_BLOCK_LOG2`, so the transform makes `n / _HADAMARD_BLOCK_LOG2`
+  passes over `x` rather than `n`.
+
   Args:
     x: A `Tensor`. Must be of shape `[a, b]`, where `a` can be anything (not
       necessarily known), and `b` must be a power of two, not required to be
@@ -78,37 +97,63 @@ def fast_walsh_hadamard_transform(x):
       if dim == 1:  # Equivalent to identity.
         return tf.identity(x)
 
-    h_core = tf.constant([[1., 1.], [1., -1.]],
-                         dtype=x.dtype,
-                         name='hadamard_weights_2x2')
-    permutation = tf.constant([0, 2, 1], name='hadamard_permutation')
-
     # A step of the fast Walsh-Hadamard algorithm.
-    def _hadamard_step(x, dim):
-      """A single step in the fast Walsh-Hadamard transform."""
+    def _hadamard_step(x, dim, block_size, h_block):
+      """Transforms blocks of `block_size` consecutive elements of `x`.
+
+      The result is transposed so that the next step transforms the blocks of
+      the next `block_size` least significant bits of the index. Once the sizes
+      of the blocks multiply to `dim`, the elements are back in their original
+      order.
+
+      Args:
+        x: A `Tensor` of shape `[a, dim]`.
+        dim: The second dimension of `x`.
+        block_size: The size of the blocks.
+        h_block: The normalized Hadamard matrix of size `block_size`.
+
+      Returns:
+        A `Tensor` of shape `[a, dim]`.
+      """
       x_shape = x.shape.as_list()
-      x = tf.reshape(x, [-1, 2])  # Reshape so that we have a matrix.
-      x = tf.matmul(x, h_core)  # Multiply.
-      x = tf.reshape(x, [-1, dim // 2, 2])  # Reshape to rank-3.
-      x = tf.transpose(x, perm=permutation)  # Swap last two dimensions.
+      x = tf.reshape(x, [-1, block_size])  # Reshape so that we have a matrix.
+      x = tf.matmul(x, h_block)  # Multiply.
+      x = tf.reshape(x, [-1, dim // block_size, block_size])
+      x = tf.transpose(x, perm=[0, 2, 1])  # Swap last two dimensions.
+      x = tf.reshape(x, [-1, dim])
       x.set_shape(x_shape)  # Failed shape inference in tf.while_loop.
       return x
 
-    def _fwht(x, dim, log2):
-      x = tf.reshape(x, [-1, 2, dim // 2])
-      # The fast Walsh-Hadamard transform.
-
-      i = tf.constant(0)
-      c = lambda i, x: tf.less(i, log2)
-      b = lambda i, x: [i + 1, _hadamard_step(x, dim)]
-      i, x = tf.while_loop(c, b, [i, x])
+    if isinstance(log2, int):
+      # The steps are unrolled, with constant Hadamard matrices.
+      while log2 > 0:
+        block_log2 = min(log2, _HADAMARD_BLOCK_LOG2)
+        block_size = 2**block_log2
+        h_block = tf.constant(
+            _hadamard_matrix(block_log2) / np.sqrt(block_size),
+            dtype=x.dtype,
+            name='hadamard_weights_%dx%d' % (block_size, block_size))
+        x = _hadamard_step(x, dim, block_size, h_block)
+        log2 -= block_log2
       return x
 
-    x = tf.cond(
-        tf.equal(dim, 1), lambda: tf.identity(x), lambda: _fwht(x, dim, log2))
-
-    x = tf.reshape(x, [-1, dim])
-    x /= tf.sqrt(tf.cast(dim, x.dtype))  # Normalize.
+    # The Sylvester Hadamard matrix of size 2**k is the top left block of the
+    # Hadamard matrix of any larger size.
+    h_core = tf.constant(
+        _hadamard_matrix(_HADAMARD_BLOCK_LOG2),
+        dtype=x.dtype,
+        name='hadamard_weights_%dx%d' % ((2**_HADAMARD_BLOCK_LOG2,) * 2))
+
+    def _step(remaining_log2, x):
+      block_log2 = tf.minimum(remaining_log2, _HADAMARD_BLOCK_LOG2)
+      block_size = tf.bitwise.left_shift(1, block_log2)
+      h_block = h_core[:block_size, :block_size] / tf.sqrt(
+          tf.cast(block_size, x.dtype))
+      return [remaining_log2 - block_log2,
+              _hadamard_step(x, dim, block_size, h_block)]
+
+    c = lambda remaining_log2, x: tf.greater(remaining_log2, 0)
+    _, x = tf.while_loop(c, _step, [log2, x])
     x.set_shape(original_x_shape)  # Failed shape inference after tf.while_loop.
     return x
 
@@ -124,10 +169,10 @@ def _cmwc_random_sequence(num_elements, seed):
   will produce the same sequence when evaluated (assuming the same value of the
   `Tensor` `seed`).
 
-  This method is not particularly efficient, does not come with any guarantee of
-  the period length, and should be replaced by appropriate alternative in
-  TensorFlow 2.x. In a test in general colab runtime, it took ~0.5s to generate
-  1 million values.
+  This method is not particularly efficient, and does not come with any
+  guarantee of the period length. In a test in general colab runtime, it took
+  ~0.5s to generate 1 million values. It is kept to reproduce sequences which
+  were generated with it, and `_philox_random_sequence` should be used instead.
 
   Args:
     num_elements: A Python integer. The number of random values to be generated.
@@ -222,6 +267,126 @@ def _cmwc_random_sequence(num_elements, seed):
   return  values
 
 
+# Constants of the Philox4x32-10 algorithm.
+_PHILOX_M4X32 = (0xD2511F53, 0xCD9E8D57)
+_PHILOX_W32 = (0x9E3779B9, 0xBB67AE85)
+_PHILOX_ROUNDS = 10
+_MASK_32 = 0xFFFFFFFF
+_MASK_16 = 0xFFFF
+
+
+def _mulhilo32(a, b):
+  """Returns the high and low 32 bits of the product of `a` and `b`.
+
+  The product of two 32 bit values does not fit in a signed 64 bit integer, so
+  it is computed from 16 bit limbs. All intermediate values are smaller than
+  2**34, and the result does not depend on how integer overflow is handled.
+
+  Args:
+    a: A `Tensor` of dtype tf.int64, with values in `[0, 2**32)`.
+    b: A Python integer in `[0, 2**32)`.
+
+  Returns:
+    A tuple `(hi, lo)` of `Tensor`s of dtype tf.int64.
+  """
+  b_lo, b_hi = b & _MASK_16, b >> 16
+  a_lo = tf.bitwise.bitwise_and(a, _MASK_16)
+  a_hi = tf.bitwise.right_shift(a, 16)
+  lo_lo = a_lo * b_lo
+  hi_lo = a_hi * b_lo
+  lo_hi = a_lo * b_hi
+  cross = (tf.bitwise.right_shift(lo_lo, 16) +
+           tf.bitwise.bitwise_and(hi_lo, _MASK_16) +
+           tf.bitwise.bitwise_and(lo_hi, _MASK_16))
+  lo = tf.bitwise.bitwise_or(
+      tf.bitwise.left_shift(tf.bitwise.bitwise_and(cross, _MASK_16), 16),
+      tf.bitwise.bitwise_and(lo_lo, _MASK_16))
+  hi = (a_hi * b_hi + tf.bitwise.right_shift(hi_lo, 16) +
+        tf.bitwise.right_shift(lo_hi, 16) + tf.bitwise.right_shift(cross, 16))
+  return hi, lo
+
+
+def _philox4x32(counter, key):
+  """Applies the Philox4x32-10 bijection to a batch of counters.
+
+  See "Parallel Random Numbers: As Easy as 1, 2, 3", Salmon et al., 2011.
+
+  Args:
+    counter: A list of 4 `Tensor`s of dtype tf.int64 and the same shape, with
+      values in `[0, 2**32)`.
+    key: A list of 2 `Tensor`s of dtype tf.int64, with values in `[0, 2**32)`.
+
+  Returns:
+    A list of 4 `Tensor`s of dtype tf.int64, with values in `[0, 2**32)`.
+  """
+  c0, c1, c2, c3 = counter
+  k0, k1 = key
+  for i in range(_PHILOX_ROUNDS):
+    if i > 0:
+      k0 = tf.bitwise.bitwise_and(k0 + _PHILOX_W32[0], _MASK_32)
+      k1 = tf.bitwise.bitwise_and(k1 + _PHILOX_W32[1], _MASK_32)
+    hi0, lo0 = _mulhilo32(c0, _PHILOX_M4X32[0])
+    hi1, lo1 = _mulhilo32(c2, _PHILOX_M4X32[1])
+    c0 = tf.bitwise.bitwise_xor(tf.bitwise.bitwise_xor(hi1, c1), k0)
+    c1 = lo1
+    c2 = tf.bitwise.bitwise_xor(tf.bitwise.bitwise_xor(hi0, c3), k1)
+    c3 = lo0
+  return [c0, c1, c2, c3]
+
+
+def _philox_random_sequence(num_elements, seed):
+  """Implements a deterministic random sequence with the Philox algorithm.
+
+  https://en.wikipedia.org/wiki/Counter-based_random_number_generator
+
+  Similar to `_cmwc_random_sequence`, given a `Tensor` `seed`, this method
+  outputs a `Tensor` with `num_elements` elements, which is the same whenever
+  evaluated with the same value of `seed`. The sequence is fully specified by
+  integer operations in TensorFlow, and is thus the same on any platform and
+  in any version of TensorFlow.
+
+  Element `i` only depends on `seed` and the counter `i // 2`, so all values
+  are generated at once by vectorized operations, with no `tf.while_loop`.
+
+  Args:
+    num_elements: A Python integer. The number of random values to be generated.
+    seed: A scalar `Tensor` of type `tf.int64`.
+
+  Returns:
+    A `Tensor` of shape `(num_elements)` and dtype tf.float64, containing random
+    values in the range `[0, 1)`.
+  """
+  if not isinstance(num_elements, int):
+    raise TypeError('The num_elements argument must be a Python integer.')
+  if num_elements <= 0:
+    raise ValueError('The num_elements argument must be positive.')
+  if not tf.is_tensor(seed) or seed.dtype != tf.int64:
+    raise TypeError('The seed argument must be a tf.int64 Tensor.')
+
+  # Each counter yields 128 random bits, used for two 53 bit values.
+  num_counters = (num_elements + 1) // 2
+  counter = tf.range(num_counters, dtype=tf.int64)
+  zeros = tf.zeros_like(counter)
+  key = [
+      tf.bitwise.bitwise_and(seed, _MASK_32),
+      tf.bitwise.bitwise_and(tf.bitwise.right_shift(seed, 32), _MASK_32)
+  ]
+  r0, r1, r2, r3 = _philox4x32(
+      [tf.bitwise.bitwise_and(counter, _MASK_32),
+       tf.bitwise.right_shift(counter, 32), zeros, zeros], key)
+
+  def _to_float(hi, lo):
+    # 27 + 26 random bits as the mantissa of a value in [0, 1).
+    bits = tf.bitwise.bitwise_or(
+        tf.bitwise.left_shift(tf.bitwise.right_shift(hi, 5), 26),
+        tf.bitwise.right_shift(lo, 6))
+    return tf.cast(bits, tf.float64) * (1 / 2**53)
+
+  values = tf.reshape(
+      tf.stack([_to_float(r0, r1), _to_float(r2, r3)], axis=1), [-1])
+  return values[:num_elements]
+
+
 def random_signs(num_elements, seed, dtype=tf.float32):
   """Returns a Tensor of `num_elements` random +1/-1 values as `dtype`.
 
@@ -230,7 +395,7 @@ def random_signs(num_elements, seed, dtype=tf.float32):
   (and between CPU and GPU), but may change between versions of TensorFlow or
   on non-CPU/GPU hardware.
 
-  If consistency is required, use `random_signs_cmwc` instead.
+  If consistency is required, use `random_signs_philox` instead.
 
   Args:
     num_elements: A Python integer. The number of random values to be generated.
@@ -252,7 +417,7 @@ def random_floats(num_elements, seed, dtype=tf.float32):
   (and between CPU and GPU), but may change between versions of TensorFlow or
   on non-CPU/GPU hardware.
 
-  If consistency is required, use `random_floats_cmwc` instead.
+  If consistency is required, use `random_floats_philox` instead.
 
   Args:
     num_elements: A Python integer. The number of random values to be generated.
@@ -283,7 +448,45 @@ def random_floats_cmwc(num_elements, seed, dtype=tf.float32):
   return tf.cast(_cmwc_random_sequence(num_elements, seed), dtype)
 
 
-def pack_into_int(value, input_bitrange, target_bitrange):
+def random_signs_philox(num_elements, seed, dtype=tf.float32):
+  """Returns a Tensor of `num_elements` random +1/-1 values as `dtype`.
+
+  The values are the same on any platform and in any version of TensorFlow.
+
+  Args:
+    num_elements: A Python integer. The number of random values to be generated.
+    seed: A scalar `Tensor` of type `tf.int64`.
+    dtype: The type of the output.
+
+  Returns:
+    A Tensor of `num_elements` random +1/-1 values as `dtype`.
+  """
+  return tf.cast(
+      tf.sign(_philox_random_sequence(num_elements, seed) - 0.5), dtype)
+
+
+def random_floats_philox(num_elements, seed, dtype=tf.float32):
+  """Returns a Tensor of `num_elements` random values in [0, 1) as `dtype`.
+
+  The values are the same on any platform and in any version of TensorFlow.
+
+  Args:
+    num_elements: A Python integer. The number of random values to be generated.
+    seed: A scalar `Tensor` of type `tf.int64`.
+    dtype: The type of the output.
+
+  Returns:
+    A Tensor of `num_elements` random values in [0, 1) as `dtype`.
+  """
+  if dtype not in [tf.float32, tf.float64]:
+    raise TypeError(
+        'Unsupported type: %s. Supported types are tf.float32 and '
+        'tf.float64 values' % dtype)
+  return tf.cast(_philox_random_sequence(num_elements, seed), dtype)
+
+
+def pack_into_int(value, input_bitrange, target_bitrange,
+                  use_bitwise_ops=True):
   """Pack integers in range [0, 2**`input_bitrange`-1] into integer values.
 
   This utility simply concatenates the relevant bits of the input values into
@@ -293,28 +496,32 @@ def pack_into_int(value, input_bitrange, target_bitrange):
   This can be useful for instance when the resulting values can be serialized as
   a varint. In such case, using only 7 bits per byte could be more desirable.
 
-  NOTE: This only uses basic math operations to implement the bit manipulation,
-  not any bitwise operations, which is relevant in environments where only a
-  subset of TensorFlow ops/kernels are available. If values outside of the
-  expected range are provided at runtime, an error will *not* be raised,
-  possibly returning an incorrect value.
+  NOTE: If values outside of the expected range are provided at runtime, an
+  error will *not* be raised, possibly returning an incorrect value.
 
   Args:
     value: An integer Tensor to be packed.
     input_bitrange: An integer. The number of relevant bits in `value`.
     target_bitrange: An integer. The number of bits to be used in packed
       representation.
+    use_bitwise_ops: A bool. If False, only basic math operations are used to
+      implement the bit manipulation, which is relevant in environments where
+      only a subset of TensorFlow ops/kernels are available. The result is the
+      same either way.
 
   Returns:
     An integer Tensor representing `value` of the same dtype as `value`.
   """
-  if input_bitrange > 1:
-    value = tf.reshape(value, [-1, 1])
-    value = _expand_to_binary_form(value, input_bitrange)
-  return _pack_binary_form(value, target_bitrange)
+  value = tf.reshape(value, [-1])
+  num_packed = (tf.size(value) * input_bitrange + target_bitrange -
+                1) // target_bitrange
+  packed = _regroup_bits(value, input_bitrange, target_bitrange,
+                         use_bitwise_ops)
+  return tf.reshape(packed[:num_packed], [-1, 1])
 
 
-def unpack_from_int(value, original_bitrange, target_bitrange, shape):
+def unpack_from_int(value, original_bitrange, target_bitrange, shape,
+                    use_bitwise_ops=True):
   """Unpack integers into the range of [0, 2**`original_bitrange`-1].
 
   This utility is to be used as the inverse of `pack_into_int` utility.
@@ -330,34 +537,110 @@ def unpack_from_int(value, original_bitrange, target_bitrange, shape):
     target_bitrange: An integer. The number of bits used in the packed
       representation.
     shape: The shape of the original input.
+    use_bitwise_ops: A bool. If False, only basic math operations are used, as
+      in `pack_into_int`.
 
   Returns:
     An integer Tensor representing the unpacked `value` of the same dtype as
     `value`.
   """
-  value = _expand_to_binary_form(value, target_bitrange)
-  value = tf.slice(value, [0], [tf.reduce_prod(shape) * original_bitrange])
-  if original_bitrange > 1:
-    return tf.reshape(_pack_binary_form(value, original_bitrange), shape)
+  value = tf.reshape(value, [-1])
+  unpacked = _regroup_bits(value, target_bitrange, original_bitrange,
+                           use_bitwise_ops)
+  return tf.reshape(unpacked[:tf.reduce_prod(shape)], shape)
+
+
+def _regroup_bits(value, input_bits, output_bits, use_bitwise_ops):
+  """Regroups the bits of a sequence of fields into fields of another width.
+
+  The lowest `input_bits` bits of the elements of `value` are concatenated,
+  starting from the least significant bit of the first element, and the
+  resulting sequence of bits is split into elements of `output_bits` bits.
+
+  The sequence repeats the same pattern every `lcm(input_bits, output_bits)`
+  bits. Within the pattern, every output element is the sum of at most
+  `output_bits // input_bits + 2` shifted and masked input elements, which are
+  gathered and computed for all the patterns at once. The memory used is thus
+  a small multiple of the size of `value`.
+
+  Args:
+    value: A rank 1 integer Tensor.
+    input_bits: The number of relevant bits in each element of `value`.
+    output_bits: The number of bits in each element of the result.
+    use_bitwise_ops: A bool. Whether to use bitwise ops or the equivalent
+      basic math ops.
+
+  Returns:
+    A rank 1 integer Tensor of the same dtype as `value`. The last elements may
+    consist of padding.
+  """
+  pattern_bits = input_bits
+  while pattern_bits % output_bits:
+    pattern_bits += input_bits
+  inputs_per_pattern = pattern_bits // input_bits
+  outputs_per_pattern = pattern_bits // output_bits
+
+  # For every output element of the pattern, the input elements it contains
+  # bits of, their offsets in the input and output elements and the number of
+  # bits. Padding terms have no bits.
+  terms = []
+  for i in range(outputs_per_pattern):
+    start, end = i * output_bits, (i + 1) * output_bits
+    terms.append([])
+    for j in range(start // input_bits, (end - 1) // input_bits + 1):
+      low = max(start, j * input_bits)
+      high = min(end, (j + 1) * input_bits)
+      terms[-1].append((j, low - j * input_bits, low - start, high - low))
+  max_terms = max(len(output_terms) for output_terms in terms)
+  terms = [
+      output_terms + [(0, 0, 0, 0)] * (max_terms - len(output_terms))
+      for output_terms in terms
+  ]
+  indices, input_shifts, output_shifts, num_bits = [
+      [[term[k] for term in output_terms] for output_terms in terms]
+      for k in range(4)
+  ]
+
+  padding = tf.math.mod(-tf.size(value), inputs_per_pattern)
+  value = tf.concat([value, tf.zeros([padding], value.dtype)], 0)
+  if inputs_per_pattern == 1:
+    # Broadcasts against the shifts of the terms of every output element.
+    value = tf.reshape(value, [-1, 1, 1])
+  elif np.array_equal(np.reshape(indices, [-1]), range(inputs_per_pattern)):
+    # Each output element consists of consecutive whole input elements.
+    value = tf.reshape(value, [-1, outputs_per_pattern, max_terms])
   else:
-    return tf.reshape(value, shape)
-
-
-def _pack_binary_form(value, target_bits):
-  # Reshape the binary input to have target_bits columns, padding with zeros if
-  # necessary to fit the dimension. The bitpacked representation is computed
-  # as product with vector [1, 2, 4, ..., 2**target_bits].
-  packing_vector = tf.constant([[2**i] for i in range(target_bits)],
-                               value.dtype)
-  extra_zeros = tf.zeros(
-      tf.math.mod(-tf.shape(value), target_bits), value.dtype)
-  reshaped_x = tf.reshape(tf.concat([value, extra_zeros], 0), [-1, target_bits])
-  return tf.matmul(reshaped_x, packing_vector)
-
-
-def _expand_to_binary_form(value, input_bits):
-  # This operation is inverse of _pack_binary_form, except padded zeros are not
-  # removed.
-  expand_vector = tf.constant([2**i for i in range(input_bits)], value.dtype)
-  bits = tf.math.mod(tf.math.floordiv(value, expand_vector), 2)
-  return tf.reshape(bits, [-1])
+    value = tf.reshape(value, [-1, inputs_per_pattern])
+    value = tf.gather(value, indices, axis=1)
+
+  # Shifts by zero, and masks of input elements which are used whole, are
+  # skipped. The input values are expected to be in range.
+  if np.any(input_shifts):
+    if use_bitwise_ops:
+      value = tf.bitwise.right_shift(
+          value, tf.constant(input_shifts, value.dtype))
+    else:
+      # Division rounding down is equivalent to an arithmetic right shift.
+      value = tf.math.floordiv(
+          value,
+          tf.constant([[2**n for n in row] for row in input_shifts],
+                      value.dtype))
+  if np.any(np.array(num_bits) != input_bits):
+    if use_bitwise_ops:
+      value = tf.bitwise.bitwise_and(
+          value,
+          tf.constant([[2**n - 1 for n in row] for row in num_bits],
+                      value.dtype))
+    else:
+      value = tf.math.floormod(
+          value,
+          tf.constant([[2**n for n in row] for row in num_bits], value.dtype))
+  if np.any(output_shifts):
+    if use_bitwise_ops:
+      value = tf.bitwise.left_shift(
+          value, tf.constant(output_shifts, value.dtype))
+    else:
+      value *= tf.constant([[2**n for n in row] for row in output_shifts],
+                           value.dtype)
+  # The terms have no bits in common, so their sum is their bitwise or.
+  return tf.reshape(tf.reduce_sum(value, axis=2), [-1])
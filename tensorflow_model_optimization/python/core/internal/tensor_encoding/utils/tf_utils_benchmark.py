@@ -0,0 +1,81 @@
+# Copyright 2020, The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks for the `tf_utils` module.
+
+Run with `--benchmarks=.` to run all benchmarks, or with a regular expression
+matching the names of the benchmarks to run.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.internal.tensor_encoding.utils import tf_utils
+
+
+if tf.executing_eagerly():
+  tf.compat.v1.disable_eager_execution()
+
+
+class FastWalshHadamardTransformBenchmark(tf.test.Benchmark):
+  """Benchmarks for `fast_walsh_hadamard_transform`."""
+
+  def _benchmark(self, name, dim, static_shape):
+    with tf.Graph().as_default(), tf.compat.v1.Session() as sess:
+      x = tf.Variable(tf.random.normal([1, dim]))
+      if not static_shape:
+        x = tf.compat.v1.placeholder_with_default(x, shape=[1, None])
+      hx = tf_utils.fast_walsh_hadamard_transform(x)
+      sess.run(tf.compat.v1.global_variables_initializer())
+      self.run_op_benchmark(
+          sess, hx.op, min_iters=5, name='%s_2^%d' % (name, dim.bit_length() - 1))
+
+  def benchmark_static_shape(self):
+    for log2 in range(10, 25, 2):
+      self._benchmark('fwht_static', 2**log2, static_shape=True)
+
+  def benchmark_dynamic_shape(self):
+    for log2 in range(10, 25, 2):
+      self._benchmark('fwht_dynamic', 2**log2, static_shape=False)
+
+
+class RandomSequenceBenchmark(tf.test.Benchmark):
+  """Benchmarks for the deterministic random sequences."""
+
+  def _benchmark(self, name, sequence_fn, num_elements):
+    with tf.Graph().as_default(), tf.compat.v1.Session() as sess:
+      seed = tf.compat.v1.placeholder_with_default(
+          tf.constant(123, tf.int64), shape=())
+      sequence = sequence_fn(num_elements, seed)
+      result = self.run_op_benchmark(
+          sess, sequence.op, min_iters=3,
+          name='%s_%d' % (name, num_elements))
+      self.report_benchmark(
+          name='%s_%d_values_per_second' % (name, num_elements),
+          iters=1,
+          wall_time=result['wall_time'],
+          throughput=num_elements / result['wall_time'])
+
+  def benchmark_philox(self):
+    for num_elements in [10**4, 10**5, 10**6, 10**7]:
+      self._benchmark('philox', tf_utils._philox_random_sequence, num_elements)
+
+  def benchmark_cmwc(self):
+    for num_elements in [10**4, 10**5]:
+      self._benchmark('cmwc', tf_utils._cmwc_random_sequence, num_elements)
+
+if __name__ == '__main__':
+  tf.test.main()
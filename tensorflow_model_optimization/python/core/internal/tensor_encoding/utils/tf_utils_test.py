@@ -119,7 +119,7 @@ class FastWalshHadamardTransformTests(tf.test.TestCase, parameterized.TestCase):
     self.assertAllEqual(x.shape, hhx_tf.shape)
     self.assertAllClose(x, hhx_tf)
 
-  @parameterized.parameters([2, 4, 8, 16])
+  @parameterized.parameters([2, 4, 8, 16, 64, 512, 2048])
   def test_output_same_as_simple_python_implementation(self, dim):
     """Tests result is identical to inefficient implementation using scipy."""
     x = tf.random.normal([3, dim])
@@ -133,6 +133,18 @@ class FastWalshHadamardTransformTests(tf.test.TestCase, parameterized.TestCase):
     self.assertAllClose(hx_py, hx_tf)
     self.assertAllClose(hhx_py, hhx_tf)
 
+  @parameterized.parameters([1, 4, 64, 512, 2048])
+  def test_dynamic_output_same_as_simple_python_implementation(self, dim):
+    """Tests result with dynamic shape is identical to scipy implementation."""
+    x = tf.compat.v1.placeholder_with_default(
+        np.random.normal(size=[3, dim]).astype(np.float32), shape=[3, None])
+    hx_tf = tf_utils.fast_walsh_hadamard_transform(x)
+    x, hx_tf = self.evaluate([x, hx_tf])
+
+    hadamard_matrix = scipy.linalg.hadamard(dim)
+    hx_py = np.dot(x, hadamard_matrix) / np.sqrt(dim)
+    self.assertAllClose(hx_py, hx_tf, atol=1e-5)
+
 
 class CMWCRandomSequenceTests(tf.test.TestCase, parameterized.TestCase):
   """Tests for `_cmwc_random_sequence` method."""
@@ -244,6 +256,121 @@ class RandomFloatsCMWCTests(tf.test.TestCase, parameterized.TestCase):
     self.assertFalse(np.array_equal(floats_1, floats_2))
 
 
+class PhiloxRandomSequenceTests(tf.test.TestCase, parameterized.TestCase):
+  """Tests for `_philox_random_sequence` method."""
+
+  @parameterized.parameters(
+      ([0, 0, 0, 0], [0, 0],
+       [0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8]),
+      ([0xffffffff] * 4, [0xffffffff] * 2,
+       [0x408f276d, 0x41c83b0e, 0xa20bc7c6, 0x6d5451fd]),
+      ([0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344],
+       [0xa4093822, 0x299f31d0],
+       [0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1]),
+  )
+  def test_philox4x32_known_answers(self, counter, key, expected):
+    """Tests against the known answers of the Random123 library."""
+    output = tf_utils._philox4x32(
+        [tf.constant([c], tf.int64) for c in counter],
+        [tf.constant(k, tf.int64) for k in key])
+    output = self.evaluate(output)
+    self.assertAllEqual(expected, np.concatenate(output))
+
+  @parameterized.parameters([1, 2, 99, 100, 101, 12345])
+  def test_expected_output_shape(self, num_elements):
+    sequence = tf_utils._philox_random_sequence(num_elements,
+                                                tf.constant(123, tf.int64))
+    self.assertAllEqual([num_elements], sequence.shape.as_list())
+    self.assertEqual(tf.float64, sequence.dtype)
+    sequence = self.evaluate(sequence)
+    self.assertAllGreaterEqual(sequence, 0.0)
+    self.assertAllLessEqual(sequence, 1.0)
+
+  @parameterized.parameters(
+      (123, [0.0669477462942315, 0.7487886860284895, 0.639649648139325,
+             0.20639569213549325, 0.172292390841693]),
+      (-2**40 - 7, [0.2628132535652351, 0.32994545570447753,
+                    0.5776009022831875]),
+  )
+  def test_expected_output_values(self, seed, expected):
+    """Tests the sequence is exactly the same as when it was introduced."""
+    sequence = tf_utils._philox_random_sequence(len(expected),
+                                                tf.constant(seed, tf.int64))
+    self.assertAllEqual(expected, self.evaluate(sequence))
+
+  def test_deterministic_given_seed(self):
+    sequence_1 = tf_utils._philox_random_sequence(
+        10, tf.constant(123, tf.int64))
+    sequence_2 = tf_utils._philox_random_sequence(
+        10, tf.constant(120 + 3, tf.int64))
+    sequence_1, sequence_2 = self.evaluate([sequence_1, sequence_2])
+    self.assertAllEqual(sequence_1, sequence_2)
+
+  def test_prefix_independent_of_num_elements(self):
+    sequence_1 = tf_utils._philox_random_sequence(
+        7, tf.constant(123, tf.int64))
+    sequence_2 = tf_utils._philox_random_sequence(
+        1000, tf.constant(123, tf.int64))
+    sequence_1, sequence_2 = self.evaluate([sequence_1, sequence_2])
+    self.assertAllEqual(sequence_1, sequence_2[:7])
+
+  def test_differs_given_different_seed(self):
+    sequence_1 = tf_utils._philox_random_sequence(
+        100, tf.constant(123, tf.int64))
+    sequence_2 = tf_utils._philox_random_sequence(
+        100, tf.constant(123 + 2**32, tf.int64))
+    sequence_1, sequence_2 = self.evaluate([sequence_1, sequence_2])
+    self.assertFalse(np.array_equal(sequence_1, sequence_2))
+
+  def test_approximately_uniform_distribution(self):
+    sequence = tf_utils._philox_random_sequence(
+        100000, tf.constant(123, tf.int64))
+    sequence = self.evaluate(sequence)
+    bucket_counts, _ = np.histogram(sequence, bins=10, range=(0, 1))
+    self.assertAllGreaterEqual(bucket_counts, 9750)
+    self.assertAllLessEqual(bucket_counts, 10250)
+
+  def test_tensor_num_elements_raises(self):
+    with self.assertRaisesRegexp(TypeError, 'must be a Python integer'):
+      tf_utils._philox_random_sequence(
+          tf.constant(10), tf.constant(123, tf.int64))
+
+  def test_negative_num_elements_raises(self):
+    with self.assertRaisesRegexp(ValueError, 'must be positive'):
+      tf_utils._philox_random_sequence(-10, tf.constant(123, tf.int64))
+
+  def test_tf_int32_seed_raises(self):
+    with self.assertRaisesRegexp(TypeError, 'tf.int64 Tensor'):
+      tf_utils._philox_random_sequence(10, tf.constant(123, tf.int32))
+
+
+class RandomPhiloxTests(tf.test.TestCase, parameterized.TestCase):
+  """Tests for `random_signs_philox` and `random_floats_philox` methods."""
+
+  @parameterized.parameters([tf.float32, tf.float64, tf.int32, tf.int64])
+  def test_signs_expected_dtype(self, dtype):
+    signs = tf_utils.random_signs_philox(1000, tf.constant(123, tf.int64),
+                                         dtype)
+    self.assertEqual(dtype, signs.dtype)
+    signs = self.evaluate(signs)
+    self.assertAllEqual(np.ones(1000), np.abs(signs))
+    self.assertGreater(sum(signs == 1), 400)
+    self.assertGreater(sum(signs == -1), 400)
+
+  @parameterized.parameters([tf.float32, tf.float64])
+  def test_floats_expected_dtype(self, dtype):
+    floats = tf_utils.random_floats_philox(10, tf.constant(456, tf.int64),
+                                           dtype)
+    self.assertEqual(dtype, floats.dtype)
+
+  @parameterized.parameters([tf.int32, tf.int64])
+  def test_floats_type_error_raises(self, dtype):
+    with self.assertRaisesRegexp(
+        TypeError, 'Supported types are tf.float32 and '
+        'tf.float64 values'):
+      tf_utils.random_floats_philox(10, tf.constant(456, tf.int64), dtype)
+
+
 class RandomSignsTests(tf.test.TestCase, parameterized.TestCase):
   """Tests for `random_signs` method."""
 
@@ -375,6 +502,27 @@ class PackingUtilsTests(tf.test.TestCase, parameterized.TestCase):
         packed_value, original_bitrange=4, target_bitrange=28, shape=(2,))
     self.assertAllEqual([9, 0], self.evaluate(unpacked_value))
 
+  @parameterized.parameters(
+      itertools.product([1, 3, 7, 8, 13, 16], [7, 28, 30], [True, False]))
+  def test_pack_unpack_same_as_simple_python_implementation(
+      self, input_bitrange, target_bitrange, use_bitwise_ops):
+    value = np.random.randint(0, 2**input_bitrange, size=[5, 43])
+    bits = [(v >> i) & 1 for v in value.flatten() for i in range(input_bitrange)]
+    bits += [0] * (-len(bits) % target_bitrange)
+    expected_packed_value = [[
+        sum(bit << i for i, bit in enumerate(bits[j:j + target_bitrange]))
+    ] for j in range(0, len(bits), target_bitrange)]
+
+    packed_value = tf_utils.pack_into_int(
+        tf.constant(value, tf.int32), input_bitrange, target_bitrange,
+        use_bitwise_ops=use_bitwise_ops)
+    unpacked_value = tf_utils.unpack_from_int(
+        packed_value, input_bitrange, target_bitrange, shape=(5, 43),
+        use_bitwise_ops=use_bitwise_ops)
+    packed_value, unpacked_value = self.evaluate([packed_value, unpacked_value])
+    self.assertAllEqual(expected_packed_value, packed_value)
+    self.assertAllEqual(value, unpacked_value)
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -0,0 +1,356 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Search for the weight bit width of each layer of a mixed precision model.
+
+Layers differ in how much accuracy they lose when their weights are quantized
+to fewer bits. The search measures the sensitivity of every layer at several
+bit widths, and then lowers the bit widths of the least sensitive layers until
+the model fits a size or latency budget.
+
+```python
+sensitivity = measure_sensitivity(model, calibration_dataset)
+bit_widths = search_bit_widths(model, sensitivity, budget=100 * 1024)
+quantize_configs = get_quantize_configs(model, bit_widths)
+
+quantized_model = quantize_apply(
+    quantize_annotate_with_configs(model, quantize_configs))
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from multiprocessing import pool
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.quantization.keras import calibration
+from tensorflow_model_optimization.python.core.quantization.keras import quantize_annotate
+from tensorflow_model_optimization.python.core.quantization.keras.tflite import tflite_quantize_registry
+
+keras = tf.keras
+K = tf.keras.backend
+
+_DEFAULT_BIT_WIDTHS = (4, 6, 8)
+
+
+def _get_searchable_layers(model):
+  """Returns the layers with quantized weights, and their `QuantizeConfig`s."""
+  registry = tflite_quantize_registry.TFLiteQuantizeRegistry()
+
+  searchable_layers = []
+  for layer in model.layers:
+    if not registry.supports(layer):
+      continue
+
+    quantize_config = registry.get_quantize_config(layer)
+    # RNN layers quantize the weights of several cells, and are skipped.
+    if type(quantize_config) not in (  # pylint: disable=unidiomatic-typecheck
+        tflite_quantize_registry.TFLiteQuantizeConfig,
+        tflite_quantize_registry.ConvQuantizeConfig):
+      continue
+    if quantize_config.weight_attrs:
+      searchable_layers.append((layer, quantize_config))
+
+  return searchable_layers
+
+
+def _is_per_axis(quantize_config):
+  return isinstance(quantize_config, tflite_quantize_registry.ConvQuantizeConfig)
+
+
+def _quantize_weight(weight, num_bits, per_axis):
+  """Quantizes `weight` as `LastValueQuantizer` does, over its own range."""
+  if per_axis:
+    range_max = np.max(np.abs(weight), axis=tuple(range(weight.ndim - 1)))
+  else:
+    range_max = np.max(np.abs(weight))
+  range_max = np.maximum(range_max, 1e-6).astype(np.float32)
+
+  if per_axis:
+    return tf.quantization.fake_quant_with_min_max_vars_per_channel(
+        weight, -range_max, range_max, num_bits=num_bits,
+        narrow_range=True).numpy()
+  return tf.quantization.fake_quant_with_min_max_vars(
+      weight, -range_max, range_max, num_bits=num_bits,
+      narrow_range=True).numpy()
+
+
+class _LayerSensitivity(object):
+  """Measures the quantization noise in the outputs of a single layer.
+
+  The layer is evaluated on its own, with its recorded inputs, by copies which
+  hold its weights quantized to each bit width.
+  """
+
+  def __init__(self, layer, quantize_config, bit_widths):
+    self.name = layer.name
+
+    weight_indices = [
+        [id(w) for w in layer.weights].index(id(getattr(layer, attr)))
+        for attr in quantize_config.weight_attrs
+    ]
+
+    self._quantized_layers = {}
+    for num_bits in bit_widths:
+      weights = layer.get_weights()
+      for i in weight_indices:
+        weights[i] = _quantize_weight(weights[i], num_bits,
+                                      _is_per_axis(quantize_config))
+
+      quantized_layer = layer.__class__.from_config(layer.get_config())
+      quantized_layer.build(layer.input_shape)
+      quantized_layer.set_weights(weights)
+      self._quantized_layers[num_bits] = quantized_layer
+
+    self._signal_power = 0.
+    self._noise_power = {num_bits: 0. for num_bits in bit_widths}
+
+  def update(self, inputs, outputs):
+    self._signal_power += np.sum(np.square(outputs, dtype=np.float64))
+    for num_bits, quantized_layer in self._quantized_layers.items():
+      noise = outputs - quantized_layer(inputs, training=False).numpy()
+      self._noise_power[num_bits] += np.sum(np.square(noise, dtype=np.float64))
+
+  def sqnr(self):
+    """Returns the signal to quantization noise ratio of each bit width, in dB."""
+    sqnr = {}
+    for num_bits, noise_power in self._noise_power.items():
+      if noise_power == 0:
+        sqnr[num_bits] = float('inf')
+      else:
+        sqnr[num_bits] = float(
+            10 * np.log10(self._signal_power / noise_power))
+    return sqnr
+
+
+def measure_sensitivity(model,
+                        dataset,
+                        bit_widths=_DEFAULT_BIT_WIDTHS,
+                        steps=None,
+                        num_workers=None):
+  """Measures how sensitive each layer is to the bit width of its weights.
+
+  Every layer whose weights are quantized by the TFLite scheme is evaluated
+  with its weights quantized to each bit width, and the rest of the model in
+  float. The sensitivity of a layer is the signal to quantization noise ratio
+  (SQNR) of its outputs.
+
+  A single pass of the float model records the inputs and outputs of all the
+  layers for a batch. The layers are then evaluated on their own, on a pool of
+  `num_workers` threads, rather than running the whole model once per layer
+  and bit width.
+
+  Args:
+    model: Float Sequential or functional `tf.keras.Model`, before any
+      quantization.
+    dataset: `tf.data.Dataset` of batched model inputs, or of `(inputs, ...)`
+      tuples such as the dataset used to train the model.
+    bit_widths: Bit widths to measure.
+    steps: Number of batches to use. Defaults to the whole dataset.
+    num_workers: Number of threads evaluating the layers. Defaults to the
+      number of CPUs.
+
+  Returns:
+    Dictionary mapping layer names to dictionaries from bit widths to the SQNR
+    of the layer, in dB.
+
+  Raises:
+    RuntimeError: if not executing eagerly.
+    ValueError: if `model` does not contain layers with quantized weights.
+  """
+  if not tf.executing_eagerly():
+    raise RuntimeError('`measure_sensitivity` requires eager execution.')
+
+  searchable_layers = _get_searchable_layers(model)
+  if not searchable_layers:
+    raise ValueError('`model` does not contain any layer with quantized '
+                     'weights.')
+
+  capture_model = keras.Model(model.inputs, [
+      tensor for layer, _ in searchable_layers
+      for tensor in (layer.input, layer.output)
+  ])
+  sensitivities = [
+      _LayerSensitivity(layer, quantize_config, bit_widths)
+      for layer, quantize_config in searchable_layers
+  ]
+
+  thread_pool = pool.ThreadPool(num_workers)
+  try:
+    for i, element in enumerate(dataset):
+      if steps is not None and i >= steps:
+        break
+
+      captured = capture_model(
+          calibration._unpack_inputs(element), training=False)  # pylint: disable=protected-access
+      captured = [tensor.numpy() for tensor in captured]
+      thread_pool.map(
+          lambda args: args[0].update(*args[1:]),
+          [(sensitivity, captured[2 * j], captured[2 * j + 1])
+           for j, sensitivity in enumerate(sensitivities)])
+  finally:
+    thread_pool.close()
+
+  return {sensitivity.name: sensitivity.sqnr() for sensitivity in sensitivities}
+
+
+def _get_cost_fn(model, cost):
+  """Returns a function computing the cost of a layer at a bit width."""
+  searchable_layers = dict(
+      (layer.name, (layer, quantize_config))
+      for layer, quantize_config in _get_searchable_layers(model))
+
+  def _num_weights(layer_name):
+    layer, quantize_config = searchable_layers[layer_name]
+    return sum(
+        np.prod(K.int_shape(getattr(layer, attr)))
+        for attr in quantize_config.weight_attrs)
+
+  def _size(layer_name, num_bits):
+    return _num_weights(layer_name) * num_bits / 8.
+
+  def _latency(layer_name, num_bits):
+    # Each weight of a Dense or convolution is used once per output position.
+    layer, _ = searchable_layers[layer_name]
+    num_uses = 1
+    if isinstance(layer, (keras.layers.Conv1D, keras.layers.Conv2D,
+                          keras.layers.Conv3D, keras.layers.Dense)):
+      num_uses = np.prod(layer.output_shape[1:-1])
+    return _num_weights(layer_name) * num_uses * num_bits / 8.
+
+  if cost == 'size':
+    return _size
+  elif cost == 'latency':
+    return _latency
+  raise ValueError('`cost` should be either "size" or "latency", got '
+                   '{}.'.format(cost))
+
+
+def search_bit_widths(model, sensitivity, budget, cost='size'):
+  """Chooses the weight bit width of each layer to fit a budget.
+
+  Starts from the highest measured bit width for all the layers, and lowers
+  one layer at a time to its next bit width, picking the step which increases
+  the quantization noise of the model the least per unit of cost saved. The
+  quantization noise of the model is estimated as the sum of the relative
+  noise power of its layers.
+
+  Args:
+    model: The float `tf.keras.Model` passed to `measure_sensitivity`.
+    sensitivity: Output of `measure_sensitivity`.
+    budget: Maximum total cost of the quantized weights.
+    cost: Either 'size', the number of bytes of the quantized weights, or
+      'latency', an estimate of the compute proportional to the number of
+      multiply-accumulates of each layer and their bit width, in units of 8 bit
+      multiply-accumulates.
+
+  Returns:
+    Dictionary mapping layer names to their weight bit width.
+
+  Raises:
+    ValueError: if `budget` is below the cost of the lowest bit widths.
+  """
+  cost_fn = _get_cost_fn(model, cost)
+
+  def _noise(layer_name, num_bits):
+    return 10**(-sensitivity[layer_name][num_bits] / 10.)
+
+  bit_widths = {
+      layer_name: max(layer_sensitivity)
+      for layer_name, layer_sensitivity in sensitivity.items()
+  }
+  total_cost = sum(cost_fn(*item) for item in bit_widths.items())
+
+  while total_cost > budget:
+    best_step = None
+    for layer_name, num_bits in sorted(bit_widths.items()):
+      lower_bit_widths = [b for b in sensitivity[layer_name] if b < num_bits]
+      if not lower_bit_widths:
+        continue
+
+      next_bits = max(lower_bit_widths)
+      saving = cost_fn(layer_name, num_bits) - cost_fn(layer_name, next_bits)
+      if saving <= 0:
+        continue
+
+      noise_per_cost = (_noise(layer_name, next_bits) -
+                        _noise(layer_name, num_bits)) / saving
+      if best_step is None or noise_per_cost < best_step[0]:
+        best_step = (noise_per_cost, layer_name, next_bits, saving)
+
+    if best_step is None:
+      raise ValueError('No bit widths fit within a budget of {}. The lowest '
+                       'bit widths cost {}.'.format(budget, total_cost))
+
+    _, layer_name, next_bits, saving = best_step
+    bit_widths[layer_name] = next_bits
+    total_cost -= saving
+
+  return bit_widths
+
+
+def get_quantize_configs(model, bit_widths):
+  """Returns the `QuantizeConfig`s which quantize layers to `bit_widths`.
+
+  Args:
+    model: The float `tf.keras.Model` passed to `measure_sensitivity`.
+    bit_widths: Dictionary mapping layer names to their weight bit width, such
+      as the output of `search_bit_widths`.
+
+  Returns:
+    Dictionary mapping layer names to `MixedPrecisionQuantizeConfig`s.
+  """
+  searchable_layers = dict(
+      (layer.name, quantize_config)
+      for layer, quantize_config in _get_searchable_layers(model))
+
+  quantize_configs = {}
+  for layer_name, num_bits in bit_widths.items():
+    quantize_config = searchable_layers[layer_name]
+    quantize_configs[layer_name] = (
+        tflite_quantize_registry.MixedPrecisionQuantizeConfig(
+            quantize_config.weight_attrs,
+            quantize_config.activation_attrs,
+            quantize_config.quantize_output,
+            num_bits=num_bits,
+            per_axis=_is_per_axis(quantize_config)))
+
+  return quantize_configs
+
+
+def quantize_annotate_with_configs(model, quantize_configs):
+  """Annotates all the layers of `model`, with the given `QuantizeConfig`s.
+
+  Layers missing from `quantize_configs` use the default `QuantizeConfig`.
+
+  Args:
+    model: tf.keras model to annotate to be quantized.
+    quantize_configs: Dictionary mapping layer names to `QuantizeConfig`s, such
+      as the output of `get_quantize_configs`.
+
+  Returns:
+    New tf.keras model with each layer in the model wrapped with
+    `QuantizeAnnotate`, ready for `quantize_apply`.
+  """
+
+  def _add_quant_wrapper(layer):
+    return quantize_annotate.QuantizeAnnotate(
+        layer, quantize_config=quantize_configs.get(layer.name))
+
+  return keras.models.clone_model(
+      model, input_tensors=None, clone_function=_add_quant_wrapper)
@@ -0,0 +1,137 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for bit_width_search.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.quantization.keras import bit_width_search
+from tensorflow_model_optimization.python.core.quantization.keras import quantize
+from tensorflow_model_optimization.python.core.quantization.keras import quantize_wrapper
+from tensorflow_model_optimization.python.core.quantization.keras.tflite import tflite_quantize_registry
+
+keras = tf.keras
+layers = keras.layers
+
+
+class BitWidthSearchTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(BitWidthSearchTest, self).setUp()
+    inp = keras.Input((8, 8, 3))
+    x = layers.Conv2D(8, 3, activation='relu', name='conv')(inp)
+    x = layers.Flatten()(x)
+    x = layers.Dense(16, activation='relu', name='dense_1')(x)
+    self.model = keras.Model(inp, layers.Dense(4, name='dense_2')(x))
+
+    self.dataset = tf.data.Dataset.from_tensor_slices(
+        np.random.uniform(-1., 1., size=(32, 8, 8, 3)).astype(
+            np.float32)).batch(8)
+
+  def testMeasureSensitivity_IncreasesWithBitWidth(self):
+    sensitivity = bit_width_search.measure_sensitivity(
+        self.model, self.dataset, num_workers=2)
+
+    self.assertEqual({'conv', 'dense_1', 'dense_2'}, set(sensitivity))
+    for layer_sensitivity in sensitivity.values():
+      self.assertEqual([4, 6, 8], sorted(layer_sensitivity))
+      self.assertLess(layer_sensitivity[4], layer_sensitivity[6])
+      self.assertLess(layer_sensitivity[6], layer_sensitivity[8])
+      # Each extra bit adds roughly 6dB.
+      self.assertGreater(layer_sensitivity[8], 35.)
+
+  def testMeasureSensitivity_DoesNotModifyModel(self):
+    weights = self.model.get_weights()
+
+    bit_width_search.measure_sensitivity(self.model, self.dataset, steps=1)
+
+    for expected, actual in zip(weights, self.model.get_weights()):
+      self.assertAllEqual(expected, actual)
+
+  def testSearchBitWidths_LowersLeastSensitiveLayerFirst(self):
+    sensitivity = {
+        'conv': {4: 10., 6: 20., 8: 30.},
+        'dense_1': {4: 25., 6: 35., 8: 45.},
+        'dense_2': {4: 10., 6: 20., 8: 30.},
+    }
+    # 8 bit sizes are conv: 216 bytes, dense_1: 4608 bytes, dense_2: 64 bytes.
+    budget = 216 + 4608 * 6 / 8 + 64
+
+    bit_widths = bit_width_search.search_bit_widths(
+        self.model, sensitivity, budget)
+
+    self.assertEqual({'conv': 8, 'dense_1': 6, 'dense_2': 8}, bit_widths)
+
+  def testSearchBitWidths_KeepsHighestBitWidthsWithinBudget(self):
+    sensitivity = bit_width_search.measure_sensitivity(
+        self.model, self.dataset, steps=1)
+
+    bit_widths = bit_width_search.search_bit_widths(
+        self.model, sensitivity, budget=1e6)
+
+    self.assertEqual({'conv': 8, 'dense_1': 8, 'dense_2': 8}, bit_widths)
+
+  def testSearchBitWidths_LatencyCountsOutputPositions(self):
+    sensitivity = {
+        'conv': {4: 10., 8: 30.},
+        'dense_1': {4: 10., 8: 30.},
+        'dense_2': {4: 10., 8: 30.},
+    }
+    # 8 bit latencies are conv: 216 * 36, dense_1: 4608 and dense_2: 64.
+    budget = 216 * 36 / 2 + 4608 + 64
+
+    bit_widths = bit_width_search.search_bit_widths(
+        self.model, sensitivity, budget, cost='latency')
+
+    self.assertEqual({'conv': 4, 'dense_1': 8, 'dense_2': 8}, bit_widths)
+
+  def testSearchBitWidths_RaisesWhenBudgetTooSmall(self):
+    sensitivity = {
+        'conv': {4: 10., 8: 30.},
+        'dense_1': {4: 10., 8: 30.},
+        'dense_2': {4: 10., 8: 30.},
+    }
+
+    with self.assertRaises(ValueError):
+      bit_width_search.search_bit_widths(self.model, sensitivity, budget=10)
+
+  def testQuantizeConfigs_AppliedByQuantizeApply(self):
+    quantize_configs = bit_width_search.get_quantize_configs(
+        self.model, {'conv': 4, 'dense_1': 6, 'dense_2': 8})
+
+    self.assertIsInstance(quantize_configs['conv'],
+                          tflite_quantize_registry.MixedPrecisionQuantizeConfig)
+    self.assertTrue(quantize_configs['conv'].per_axis)
+    self.assertFalse(quantize_configs['dense_1'].per_axis)
+
+    with quantize.quantize_scope():
+      quantized_model = quantize.quantize_apply(
+          bit_width_search.quantize_annotate_with_configs(
+              self.model, quantize_configs))
+
+    weight_bits = {}
+    for layer in quantized_model.layers:
+      if isinstance(layer, quantize_wrapper.QuantizeWrapper):
+        for _, quantizer, _ in layer._weight_vars:
+          weight_bits[layer.layer.name] = quantizer.num_bits
+    self.assertEqual({'conv': 4, 'dense_1': 6, 'dense_2': 8}, weight_bits)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,581 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Post-training calibration of quantization ranges.
+
+Quantization aware training learns the `min_var`/`max_var` ranges of each
+quantizer as a side effect of training. `calibrate` instead runs a
+representative dataset through a `quantize_apply`'d model in inference mode,
+collects statistics of every tensor which is quantized using an `Observer`,
+and writes the resulting ranges into the quantizer variables.
+
+Module: tfmot.quantization.keras
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import abc
+import threading
+
+import numpy as np
+import six
+import tensorflow as tf
+
+K = tf.keras.backend
+
+_calibration_state = threading.local()
+
+
+def observe(tensor, quantizer, quantizer_vars, is_weight=False):
+  """Reports a tensor which is about to be quantized to the active calibration.
+
+  Layers which apply quantizers call this with the tensor they pass to the
+  quantizer. It does nothing unless `calibrate` is tracing the model.
+
+  Args:
+    tensor: Tensor which is quantized by `quantizer`.
+    quantizer: `Quantizer` applied to `tensor`.
+    quantizer_vars: Dictionary of quantizer variables containing `min_var` and
+      `max_var`.
+    is_weight: Whether `tensor` is a weight rather than an activation.
+  """
+  calibrator = getattr(_calibration_state, 'calibrator', None)
+  if calibrator is None:
+    return
+
+  calibrator.record(tensor, quantizer, quantizer_vars, is_weight)
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Observer(object):
+  """ABC interface for collecting statistics of a tensor across batches.
+
+  A separate copy of the observer is used for each quantized tensor.
+  `summarize` runs within the calibration graph, and reduces a batch of the
+  tensor to the statistics the observer needs. `update` consumes these
+  statistics as NumPy values, and `compute_range` returns the quantization
+  range once all batches are seen.
+  """
+
+  def summarize(self, tensor):
+    """Reduces `tensor` to the statistics passed to `update`.
+
+    Args:
+      tensor: Tensor which is being quantized.
+
+    Returns: Tensor, or nested structure of tensors.
+    """
+    return tensor
+
+  @abc.abstractmethod
+  def update(self, summary):
+    """Updates the collected statistics with the summary of a new batch.
+
+    Args:
+      summary: NumPy value of the output of `summarize`.
+    """
+
+  @abc.abstractmethod
+  def compute_range(self, num_bits):
+    """Computes the quantization range from the collected statistics.
+
+    Args:
+      num_bits: Number of bits the tensor will be quantized to.
+
+    Returns: Tuple of `(range_min, range_max)` floats.
+    """
+
+  def get_config(self):
+    return {}
+
+  @classmethod
+  def from_config(cls, config):
+    """Instantiates an `Observer` from its config.
+
+    Args:
+        config: Output of `get_config()`.
+
+    Returns:
+        An `Observer` instance.
+    """
+    return cls(**config)
+
+
+class MinMaxObserver(Observer):
+  """Uses the minimum and maximum values seen across all batches."""
+
+  def __init__(self):
+    self._min = None
+    self._max = None
+
+  def summarize(self, tensor):
+    return tf.math.reduce_min(tensor), tf.math.reduce_max(tensor)
+
+  def update(self, summary):
+    batch_min, batch_max = summary
+    if self._min is None:
+      self._min, self._max = batch_min, batch_max
+      return
+
+    self._min = min(self._min, batch_min)
+    self._max = max(self._max, batch_max)
+
+  def compute_range(self, num_bits):
+    return float(self._min), float(self._max)
+
+
+class MovingAverageObserver(Observer):
+  """Uses an exponential moving average of the per batch minimum and maximum."""
+
+  def __init__(self, ema_decay=0.9):
+    """Construct a MovingAverageObserver.
+
+    Args:
+      ema_decay: EMA decay parameter. The first batch initializes the averages.
+    """
+    self.ema_decay = ema_decay
+    self._min = None
+    self._max = None
+
+  def summarize(self, tensor):
+    return tf.math.reduce_min(tensor), tf.math.reduce_max(tensor)
+
+  def update(self, summary):
+    batch_min, batch_max = summary
+    if self._min is None:
+      self._min, self._max = batch_min, batch_max
+      return
+
+    self._min = self.ema_decay * self._min + (1 - self.ema_decay) * batch_min
+    self._max = self.ema_decay * self._max + (1 - self.ema_decay) * batch_max
+
+  def compute_range(self, num_bits):
+    return float(self._min), float(self._max)
+
+  def get_config(self):
+    return {'ema_decay': self.ema_decay}
+
+
+class _HistogramObserver(Observer):
+  """Base class for observers which choose a range from a histogram.
+
+  The histogram is symmetric around zero, and is widened whenever a batch
+  contains values outside of it. Counts of the existing bins are then
+  redistributed into the wider bins.
+  """
+
+  def __init__(self, num_bins=2048):
+    if num_bins % 2:
+      raise ValueError('num_bins should be even, got {}.'.format(num_bins))
+
+    self.num_bins = num_bins
+    self._histogram = None
+    self._max_abs = None
+    self._min = None
+    self._max = None
+
+  def _bin_edges(self):
+    return np.linspace(-self._max_abs, self._max_abs, self.num_bins + 1)
+
+  def _bin_centers(self):
+    edges = self._bin_edges()
+    return (edges[:-1] + edges[1:]) / 2
+
+  def update(self, summary):
+    values = np.asarray(summary).ravel()
+    if not values.size:
+      return
+
+    batch_min, batch_max = values.min(), values.max()
+    # Keep the histogram range non-empty even if all values are zero.
+    max_abs = max(float(np.abs(values).max()), np.finfo(np.float32).tiny)
+
+    if self._histogram is None:
+      self._histogram = np.zeros(self.num_bins)
+      self._max_abs = max_abs
+      self._min, self._max = batch_min, batch_max
+    elif max_abs > self._max_abs:
+      self._histogram, _ = np.histogram(
+          self._bin_centers(),
+          bins=self.num_bins,
+          range=(-max_abs, max_abs),
+          weights=self._histogram)
+      self._max_abs = max_abs
+
+    self._min = min(self._min, batch_min)
+    self._max = max(self._max, batch_max)
+
+    histogram, _ = np.histogram(
+        values, bins=self.num_bins, range=(-self._max_abs, self._max_abs))
+    self._histogram += histogram
+
+  def get_config(self):
+    return {'num_bins': self.num_bins}
+
+
+class PercentileObserver(_HistogramObserver):
+  """Clips the range to a percentile of the observed values."""
+
+  def __init__(self, percentile=99.99, num_bins=2048):
+    """Construct a PercentileObserver.
+
+    Args:
+      percentile: Percentile of values to keep within the range, in (50, 100].
+        Values beyond it are clipped at both ends of the distribution.
+      num_bins: Number of bins of the histogram used to find the percentile.
+    """
+    super(PercentileObserver, self).__init__(num_bins)
+    self.percentile = percentile
+
+  def compute_range(self, num_bits):
+    edges = self._bin_edges()
+    cdf = np.cumsum(self._histogram) / np.sum(self._histogram)
+
+    lower_index = np.searchsorted(cdf, 1. - self.percentile / 100.)
+    upper_index = np.searchsorted(cdf, self.percentile / 100.)
+
+    range_min = max(edges[lower_index], self._min)
+    range_max = min(edges[min(upper_index + 1, self.num_bins)], self._max)
+    return float(range_min), float(range_max)
+
+  def get_config(self):
+    config = super(PercentileObserver, self).get_config()
+    config['percentile'] = self.percentile
+    return config
+
+
+class MseObserver(_HistogramObserver):
+  """Picks the range which minimizes the mean squared quantization error.
+
+  Candidate ranges shrink the observed `[min, max]` range by a constant factor,
+  and the error of each is estimated from the histogram bin centers.
+  """
+
+  def __init__(self, num_candidates=100, num_bins=2048):
+    """Construct a MseObserver.
+
+    Args:
+      num_candidates: Number of candidate ranges to evaluate.
+      num_bins: Number of bins of the histogram used to estimate the error.
+    """
+    super(MseObserver, self).__init__(num_bins)
+    self.num_candidates = num_candidates
+
+  def compute_range(self, num_bits):
+    centers = self._bin_centers()
+    num_levels = 2 ** num_bits - 1
+
+    best_range, best_error = None, None
+    for factor in np.linspace(1., 0., self.num_candidates, endpoint=False):
+      range_min = min(self._min * factor, 0.)
+      range_max = max(self._max * factor, 0.)
+
+      scale = (range_max - range_min) / num_levels
+      if scale > 0:
+        zero_point = np.round(-range_min / scale)
+        quantized = np.clip(
+            np.round(centers / scale) + zero_point, 0, num_levels)
+        dequantized = (quantized - zero_point) * scale
+      else:
+        dequantized = np.zeros_like(centers)
+
+      error = np.sum(self._histogram * (centers - dequantized) ** 2)
+      if best_error is None or error < best_error:
+        best_range, best_error = (range_min, range_max), error
+
+    return float(best_range[0]), float(best_range[1])
+
+  def get_config(self):
+    config = super(MseObserver, self).get_config()
+    config['num_candidates'] = self.num_candidates
+    return config
+
+
+class KLDivergenceObserver(_HistogramObserver):
+  """Picks the range which minimizes the KL divergence to the distribution.
+
+  This is the entropy calibration used by TensorRT. The distribution of
+  absolute values is clipped at each candidate threshold, and compared against
+  the same distribution quantized to `2 ** num_bits` levels. The range is
+  symmetric unless all observed values are non-negative.
+  """
+
+  def compute_range(self, num_bits):
+    half = self.num_bins // 2
+    abs_histogram = self._histogram[half:] + self._histogram[:half][::-1]
+    bin_width = self._max_abs / half
+
+    is_signed = self._min < 0
+    num_quantized_bins = 2 ** (num_bits - 1) if is_signed else 2 ** num_bits
+    if num_quantized_bins >= half:
+      return float(self._min), float(self._max)
+
+    best_threshold, best_divergence = half, None
+    for i in range(num_quantized_bins, half + 1):
+      reference = abs_histogram[:i].copy()
+      # Values beyond the threshold are clipped into the last bin.
+      reference[-1] += np.sum(abs_histogram[i:])
+
+      candidate = abs_histogram[:i]
+      is_nonzero = candidate != 0
+      starts = (np.arange(num_quantized_bins) * i) // num_quantized_bins
+      sums = np.add.reduceat(candidate, starts)
+      counts = np.add.reduceat(is_nonzero.astype(np.float64), starts)
+      averages = sums / np.maximum(counts, 1)
+      expanded = np.repeat(averages, np.diff(np.append(starts, i)))
+      expanded = np.where(is_nonzero, expanded, 0.)
+
+      divergence = self._kl_divergence(reference, expanded)
+      if best_divergence is None or divergence < best_divergence:
+        best_threshold, best_divergence = i, divergence
+
+    threshold = min(best_threshold * bin_width, self._max_abs)
+    if not is_signed:
+      return 0., float(min(threshold, self._max))
+    return float(-threshold), float(threshold)
+
+  @staticmethod
+  def _kl_divergence(p, q):
+    p = p / np.sum(p)
+    q_sum = np.sum(q)
+    if q_sum == 0:
+      return np.inf
+    q = q / q_sum
+
+    mask = p > 0
+    # Smooth empty bins of q which have mass in p, to keep the divergence
+    # finite.
+    q = np.where(mask & (q == 0), 1e-10, q)
+    return np.sum(p[mask] * np.log(p[mask] / q[mask]))
+
+
+class _Calibrator(object):
+  """Collects the quantized tensors of a model and their observers."""
+
+  def __init__(self, observer):
+    self._observer = observer
+    # Quantizer ranges, keyed by id of the `min_var`.
+    self._site_indices = {}
+    self.sites = []
+    # (site_index, tensor) of each recorded tensor in the graph being traced.
+    self._recorded = None
+    self._observe_weights = False
+
+  def record(self, tensor, quantizer, quantizer_vars, is_weight):
+    """Records a quantized tensor while the calibration graph is traced."""
+    if self._recorded is None or (is_weight and not self._observe_weights):
+      return
+
+    min_var, max_var = quantizer_vars['min_var'], quantizer_vars['max_var']
+    key = id(min_var)
+    if key not in self._site_indices:
+      if is_weight:
+        observer = _WeightObserver(getattr(quantizer, 'per_axis', False))
+      else:
+        observer = self._observer.__class__.from_config(
+            self._observer.get_config())
+      self._site_indices[key] = len(self.sites)
+      self.sites.append(_Site(quantizer, min_var, max_var, observer))
+
+    site_index = self._site_indices[key]
+    self._recorded.append(
+        (site_index, self.sites[site_index].observer.summarize(tensor)))
+
+  def trace(self, model, observe_weights):
+    """Returns a function which runs `model` and summarizes recorded tensors.
+
+    The function returns `(site_index, summary)` pairs for the tensors
+    recorded while tracing it.
+
+    Args:
+      model: Quantized model to run.
+      observe_weights: Whether to record weights in addition to activations.
+    """
+    site_indices = []
+
+    @tf.function
+    def calibration_step(inputs):
+      self._recorded = []
+      self._observe_weights = observe_weights
+      _calibration_state.calibrator = self
+      try:
+        model(inputs, training=False)
+      finally:
+        _calibration_state.calibrator = None
+
+      recorded, self._recorded = self._recorded, None
+      site_indices[:] = [site_index for site_index, _ in recorded]
+      return [summary for _, summary in recorded]
+
+    def run_calibration_step(inputs):
+      summaries = calibration_step(inputs)
+      return zip(site_indices, summaries)
+
+    return run_calibration_step
+
+
+class _Site(object):
+  """A quantizer range which is being calibrated."""
+
+  def __init__(self, quantizer, min_var, max_var, observer):
+    self.quantizer = quantizer
+    self.min_var = min_var
+    self.max_var = max_var
+    self.observer = observer
+    self.observed = False
+
+
+class _WeightObserver(Observer):
+  """Uses the minimum and maximum of a weight, per channel if required."""
+
+  def __init__(self, per_axis):
+    self.per_axis = per_axis
+    self._min = None
+    self._max = None
+
+  def summarize(self, tensor):
+    if self.per_axis and tensor.shape.rank >= 2:
+      axis = list(range(tensor.shape.rank - 1))
+    else:
+      axis = None
+    return (tf.math.reduce_min(tensor, axis=axis),
+            tf.math.reduce_max(tensor, axis=axis))
+
+  def update(self, summary):
+    batch_min, batch_max = summary
+    if self._min is None:
+      self._min, self._max = batch_min, batch_max
+      return
+
+    self._min = np.minimum(self._min, batch_min)
+    self._max = np.maximum(self._max, batch_max)
+
+  def compute_range(self, num_bits):
+    return self._min, self._max
+
+  def get_config(self):
+    return {'per_axis': self.per_axis}
+
+
+def _adjust_range(quantizer, range_min, range_max):
+  """Applies the range constraints the quantizer would apply in training."""
+  num_bits = getattr(quantizer, 'num_bits', 8)
+
+  # TFLite requires that 0.0 if always in the [min; max] range.
+  range_min = np.minimum(range_min, 0.)
+  range_max = np.maximum(range_max, 0.)
+
+  if getattr(quantizer, 'symmetric', False):
+    if getattr(quantizer, 'narrow_range', False):
+      min_max_ratio = -1
+    else:
+      # In two's complement notation, the negative range is slightly larger
+      # than the positive range.
+      min_max_ratio = -((1 << num_bits) - 2) / (1 << num_bits)
+
+    range_min, range_max = (
+        np.minimum(range_min, range_max / min_max_ratio),
+        np.maximum(range_max, range_min * min_max_ratio))
+
+  return range_min, range_max
+
+
+def _unpack_inputs(element):
+  """Returns the model inputs from a dataset element."""
+  # Following Keras, tuples are (x, y, sample_weight) while lists and dicts
+  # are model inputs.
+  if isinstance(element, tuple):
+    return element[0]
+  return element
+
+
+def calibrate(model, dataset, observer=None, steps=None):
+  """Calibrates the quantization ranges of a model on a dataset.
+
+  Streams `dataset` through `model` in inference mode, and writes the ranges
+  chosen by `observer` for each quantized activation into the `min_var` and
+  `max_var` variables of its quantizer. Weights always use their own minimum
+  and maximum values, per channel for per-axis quantizers.
+
+  Calibration gives a model quantized with `quantize_apply` usable ranges
+  without quantization aware training, which can then be skipped or shortened.
+
+  ```python
+  quantized_model = quantize_model(model)
+  calibrate(quantized_model, representative_dataset.batch(32).take(100),
+            observer=PercentileObserver(99.99))
+  ```
+
+  Calibration requires eager execution.
+
+  Args:
+    model: A `tf.keras` model which has been quantized with `quantize_apply`.
+    dataset: `tf.data.Dataset` of batched model inputs, or of `(inputs, ...)`
+      tuples such as the dataset used to train the model.
+    observer: `Observer` used to choose activation ranges. A separate copy,
+      created from its config, is used for each quantized tensor. Defaults to
+      `MinMaxObserver`.
+    steps: Number of batches to use. Defaults to the whole dataset.
+
+  Returns:
+    Dictionary mapping the names of the calibrated `min_var` variables to
+    `(range_min, range_max)` NumPy values written to them.
+
+  Raises:
+    RuntimeError: if not executing eagerly.
+    ValueError: if `model` does not contain any quantized tensors.
+  """
+  if not tf.executing_eagerly():
+    raise RuntimeError('`calibrate` requires eager execution.')
+
+  if observer is None:
+    observer = MinMaxObserver()
+
+  calibrator = _Calibrator(observer)
+  first_step = calibrator.trace(model, observe_weights=True)
+  step = calibrator.trace(model, observe_weights=False)
+
+  for i, element in enumerate(dataset):
+    if steps is not None and i >= steps:
+      break
+
+    calibration_step = first_step if i == 0 else step
+    for site_index, summary in calibration_step(_unpack_inputs(element)):
+      site = calibrator.sites[site_index]
+      site.observer.update(tf.nest.map_structure(lambda t: t.numpy(), summary))
+      site.observed = True
+
+  if not calibrator.sites:
+    raise ValueError('`model` does not contain any quantized tensors. Use '
+                     '`quantize_apply` to quantize the model first.')
+
+  ranges = {}
+  assignments = []
+  for site in calibrator.sites:
+    if not site.observed:
+      continue
+
+    range_min, range_max = site.observer.compute_range(
+        getattr(site.quantizer, 'num_bits', 8))
+    range_min, range_max = _adjust_range(site.quantizer, range_min, range_max)
+
+    range_min = np.broadcast_to(range_min, site.min_var.shape)
+    range_max = np.broadcast_to(range_max, site.max_var.shape)
+    assignments.extend([(site.min_var, range_min), (site.max_var, range_max)])
+    ranges[site.min_var.name] = (range_min, range_max)
+
+  K.batch_set_value(assignments)
+  return ranges
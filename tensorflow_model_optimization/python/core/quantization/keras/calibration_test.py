@@ -0,0 +1,196 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for post-training calibration."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.quantization.keras import calibration
+from tensorflow_model_optimization.python.core.quantization.keras import quantize
+from tensorflow_model_optimization.python.core.quantization.keras import quantize_layer
+from tensorflow_model_optimization.python.core.quantization.keras import quantize_wrapper
+
+keras = tf.keras
+K = tf.keras.backend
+
+
+class ObserverTest(tf.test.TestCase, parameterized.TestCase):
+
+  def _observe(self, observer, batches, num_bits=8):
+    for batch in batches:
+      observer.update(
+          tf.nest.map_structure(K.get_value, observer.summarize(batch)))
+    return observer.compute_range(num_bits)
+
+  def testMinMaxObserver_UsesExtremesAcrossBatches(self):
+    range_min, range_max = self._observe(
+        calibration.MinMaxObserver(),
+        [tf.constant([-1., 2.]), tf.constant([-3., 1.])])
+
+    self.assertAllClose([-3., 2.], [range_min, range_max])
+
+  def testMovingAverageObserver_AveragesBatchRanges(self):
+    range_min, range_max = self._observe(
+        calibration.MovingAverageObserver(ema_decay=0.5),
+        [tf.constant([-1., 2.]), tf.constant([-3., 4.])])
+
+    self.assertAllClose([-2., 3.], [range_min, range_max])
+
+  def testPercentileObserver_ClipsOutliers(self):
+    values = np.random.uniform(-1., 1., size=100000).astype(np.float32)
+    values[0] = 100.
+
+    range_min, range_max = self._observe(
+        calibration.PercentileObserver(percentile=99.9), [values])
+
+    self.assertAllClose([-1., 1.], [range_min, range_max], atol=0.1)
+
+  def testPercentileObserver_WidensHistogram(self):
+    range_min, range_max = self._observe(
+        calibration.PercentileObserver(percentile=100.),
+        [np.float32([-1., 1.]), np.float32([-4., 4.])])
+
+    self.assertAllClose([-4., 4.], [range_min, range_max])
+
+  @parameterized.parameters(
+      calibration.MseObserver, calibration.KLDivergenceObserver)
+  def testHistogramObservers_ClipLongTails(self, observer_cls):
+    values = np.random.laplace(size=100000).astype(np.float32)
+
+    range_min, range_max = self._observe(observer_cls(), [values], num_bits=4)
+
+    self.assertLess(range_min, 0.)
+    self.assertGreater(range_min, values.min())
+    self.assertGreater(range_max, 0.)
+    self.assertLess(range_max, values.max())
+
+  def testKLDivergenceObserver_NonNegativeValuesUseUnsignedRange(self):
+    values = np.abs(np.random.normal(size=10000)).astype(np.float32)
+
+    range_min, range_max = self._observe(
+        calibration.KLDivergenceObserver(), [values])
+
+    self.assertEqual(0., range_min)
+    self.assertGreater(range_max, 0.)
+    self.assertLessEqual(range_max, values.max())
+
+  @parameterized.parameters(
+      calibration.MinMaxObserver(),
+      calibration.MovingAverageObserver(ema_decay=0.5),
+      calibration.PercentileObserver(percentile=99., num_bins=128),
+      calibration.MseObserver(num_candidates=10, num_bins=128),
+      calibration.KLDivergenceObserver(num_bins=128))
+  def testSerialization(self, observer):
+    config = observer.get_config()
+    new_observer = observer.__class__.from_config(config)
+
+    self.assertEqual(config, new_observer.get_config())
+
+
+class CalibrateTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(CalibrateTest, self).setUp()
+    self.inputs = np.random.uniform(
+        -2., 3., size=(64, 4)).astype(np.float32)
+    self.dataset = tf.data.Dataset.from_tensor_slices(self.inputs).batch(16)
+
+  def _get_quantized_model(self):
+    inputs = keras.Input(shape=(4,))
+    x = keras.layers.Dense(8, activation='relu')(inputs)
+    model = keras.Model(inputs, keras.layers.Dense(2)(x))
+    return model, quantize.quantize_model(model)
+
+  def _get_quantize_layer(self, model):
+    for layer in model.layers:
+      if isinstance(layer, quantize_layer.QuantizeLayer):
+        return layer
+
+  @staticmethod
+  def _get_weight(layer, name):
+    for weight in layer.weights:
+      if weight.name.split(':')[0].endswith(name):
+        return weight
+
+  def testCalibrate_SetsInputAndWeightRanges(self):
+    model, quantized_model = self._get_quantized_model()
+
+    calibration.calibrate(quantized_model, self.dataset)
+
+    input_vars = self._get_quantize_layer(quantized_model).quantizer_vars
+    self.assertAllClose(
+        [self.inputs.min(), self.inputs.max()],
+        K.batch_get_value([input_vars['min_var'], input_vars['max_var']]))
+
+    dense = quantized_model.layers[2]
+    self.assertIsInstance(dense, quantize_wrapper.QuantizeWrapper)
+    kernel = K.get_value(model.layers[1].kernel)
+    kernel_min, kernel_max = K.batch_get_value([
+        self._get_weight(dense, 'kernel_min'),
+        self._get_weight(dense, 'kernel_max')
+    ])
+    # Dense kernels are quantized symmetrically, with the narrow range.
+    max_abs = np.abs(kernel).max()
+    self.assertAllClose([-max_abs, max_abs], [kernel_min, kernel_max])
+
+  def testCalibrate_SetsActivationRangesFromModelOutputs(self):
+    _, quantized_model = self._get_quantized_model()
+
+    calibration.calibrate(quantized_model, self.dataset)
+
+    relu_layer = quantized_model.layers[2]
+    relu_max = self._get_weight(relu_layer, 'post_activation_max')
+    # ReLU outputs feed the next layer, so their range should cover its inputs.
+    relu_outputs = keras.Model(
+        quantized_model.inputs, relu_layer.output).predict(self.inputs)
+    self.assertAllClose(relu_outputs.max(), K.get_value(relu_max), rtol=0.05)
+
+  def testCalibrate_ReducesQuantizationError(self):
+    model, quantized_model = self._get_quantized_model()
+    expected = model.predict(self.inputs)
+
+    error_before = np.abs(
+        quantized_model.predict(self.inputs) - expected).mean()
+    calibration.calibrate(
+        quantized_model, self.dataset.map(lambda x: (x, x)),
+        observer=calibration.PercentileObserver(percentile=100.))
+    error_after = np.abs(quantized_model.predict(self.inputs) - expected).mean()
+
+    self.assertLess(error_after, error_before)
+
+  def testCalibrate_StopsAfterSteps(self):
+    _, quantized_model = self._get_quantized_model()
+
+    calibration.calibrate(quantized_model, self.dataset, steps=1)
+
+    input_vars = self._get_quantize_layer(quantized_model).quantizer_vars
+    self.assertAllClose(
+        [self.inputs[:16].min(), self.inputs[:16].max()],
+        K.batch_get_value([input_vars['min_var'], input_vars['max_var']]))
+
+  def testCalibrate_RaisesErrorIfModelNotQuantized(self):
+    model = keras.Sequential([keras.layers.Dense(2, input_shape=(4,))])
+
+    with self.assertRaises(ValueError):
+      calibration.calibrate(model, self.dataset)
+
+
+if __name__ == '__main__':
+  tf.test.main()
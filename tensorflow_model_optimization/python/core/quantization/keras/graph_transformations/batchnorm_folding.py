@@ -0,0 +1,180 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Folds BatchNormalization layers into the preceding layers for inference.
+
+Unlike the folded layers used during quantization aware training, the folded
+model contains only standard Keras layers, with the moving statistics of the
+BatchNormalization baked into the kernel and bias. It is meant for float
+serving, and cannot be trained further.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.quantization.keras.graph_transformations import model_transformer
+from tensorflow_model_optimization.python.core.quantization.keras.graph_transformations import transforms
+
+LayerNode = transforms.LayerNode
+LayerPattern = transforms.LayerPattern
+
+K = tf.keras.backend
+
+# Rank of the outputs of each foldable layer. The rank of the outputs of Dense
+# depends on its inputs, and is looked up in the layer metadata.
+_OUTPUT_RANK = {
+    'Conv1D': 3,
+    'Conv2D': 4,
+    'Conv3D': 5,
+    'DepthwiseConv2D': 4,
+    'SeparableConv2D': 4,
+}
+
+# Key of the rank of the outputs of a layer in the layer metadata.
+_OUTPUT_RANK_KEY = 'output_rank'
+
+
+class BatchNormFoldForInference(transforms.Transform):
+  """Folds BatchNormalization into the preceding layer, for inference only.
+
+  Layer -> BatchNormalization => Layer(use_bias=True)
+
+  Supports Dense, Conv1D, Conv2D, Conv3D, DepthwiseConv2D and SeparableConv2D
+  layers without an activation. For SeparableConv2D, the batchnorm is folded
+  into the pointwise kernel. Matches are left unchanged when the batchnorm does
+  not normalize the channels of the layer.
+
+  The rank of the outputs of a Dense layer is read from the `'output_rank'`
+  entry of its metadata. Without it, a Dense layer is only folded if the
+  batchnorm is configured with `axis=-1`.
+  """
+
+  def pattern(self):
+    return LayerPattern('BatchNormalization', inputs=[
+        LayerPattern(
+            'Dense|Conv1D|Conv2D|Conv3D|DepthwiseConv2D|SeparableConv2D',
+            config={'activation': 'linear'})
+    ])
+
+  @staticmethod
+  def _normalizes_channels(layer_node, bn_layer):
+    axis = bn_layer['config']['axis']
+    if isinstance(axis, (list, tuple)):
+      if len(axis) != 1:
+        return False
+      axis = axis[0]
+
+    layer = layer_node.layer
+    if layer['config'].get('data_format') == 'channels_first':
+      return axis == 1
+
+    rank = _OUTPUT_RANK.get(layer['class_name'],
+                            layer_node.metadata.get(_OUTPUT_RANK_KEY))
+    if rank is None:
+      return axis == -1
+    return axis in (-1, rank - 1)
+
+  @staticmethod
+  def _get_multiplier_and_offset(bn_layer_node):
+    """Returns the per-channel scale and shift applied by the batchnorm."""
+    bn_weights = {
+        name.split(':')[0]: K.get_value(value)
+        for name, value in bn_layer_node.weights.items()
+    }
+    bn_config = bn_layer_node.layer['config']
+
+    multiplier = 1. / np.sqrt(
+        bn_weights['moving_variance'] + bn_config['epsilon'])
+    if bn_config['scale']:
+      multiplier *= bn_weights['gamma']
+
+    offset = -bn_weights['moving_mean'] * multiplier
+    if bn_config['center']:
+      offset += bn_weights['beta']
+
+    return multiplier, offset
+
+  def replacement(self, match_layer):
+    bn_layer_node, layer_node = match_layer, match_layer.input_layers[0]
+    layer = layer_node.layer
+
+    if not self._normalizes_channels(layer_node, bn_layer_node.layer):
+      return match_layer
+
+    multiplier, offset = self._get_multiplier_and_offset(bn_layer_node)
+
+    if layer['class_name'] == 'SeparableConv2D':
+      kernel_name = 'pointwise_kernel:0'
+    elif layer['class_name'] == 'DepthwiseConv2D':
+      kernel_name = 'depthwise_kernel:0'
+    else:
+      kernel_name = 'kernel:0'
+
+    weights = collections.OrderedDict()
+    for name, value in layer_node.weights.items():
+      if name == kernel_name:
+        kernel = K.get_value(value)
+        if layer['class_name'] == 'DepthwiseConv2D':
+          # Output channel c * depth_multiplier + m uses kernel[..., c, m].
+          kernel_multiplier = multiplier.reshape(kernel.shape[-2:])
+        else:
+          kernel_multiplier = multiplier
+        weights[name] = (kernel * kernel_multiplier).astype(kernel.dtype)
+      elif name != 'bias:0':
+        weights[name] = value
+
+    bias = offset
+    if layer['config'].get('use_bias'):
+      bias = bias + K.get_value(layer_node.weights['bias:0']) * multiplier
+    weights['bias:0'] = bias.astype(weights[kernel_name].dtype)
+
+    layer['config']['use_bias'] = True
+
+    return LayerNode(layer, weights, [], layer_node.metadata)
+
+
+def fold_batchnorms(model):
+  """Returns a copy of `model` with BatchNormalization folded for inference.
+
+  The batchnorms which follow a Dense, Conv1D, Conv2D, Conv3D, DepthwiseConv2D
+  or SeparableConv2D layer without an activation are removed, and their moving
+  statistics folded into the kernel and bias of that layer. The other
+  batchnorms are kept as is.
+
+  Args:
+    model: Sequential or functional `tf.keras.Model` to fold.
+
+  Returns:
+    A new `tf.keras.Model` with the same inference outputs as `model`.
+  """
+  layer_metadata = {}
+  for layer in model.layers:
+    if isinstance(layer, tf.keras.layers.Dense):
+      try:
+        output_rank = len(layer.output_shape)
+      except AttributeError:
+        # The layer is called on inputs of different ranks, and is not folded.
+        continue
+      layer_metadata[layer.name] = {_OUTPUT_RANK_KEY: output_rank}
+
+  folded_model, _ = model_transformer.ModelTransformer(
+      model, [BatchNormFoldForInference()],
+      layer_metadata=layer_metadata).transform()
+  return folded_model
@@ -0,0 +1,139 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for batchnorm_folding.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.quantization.keras.graph_transformations import batchnorm_folding
+
+keras = tf.keras
+
+
+class BatchNormFoldingTest(tf.test.TestCase, parameterized.TestCase):
+
+  @staticmethod
+  def _get_model(layer, input_shape, bn_axis=-1):
+    inp = keras.Input(input_shape)
+    x = keras.layers.BatchNormalization(axis=bn_axis)(layer(inp))
+    model = keras.Model(inp, keras.layers.ReLU()(x))
+
+    # Use non-default statistics so that the batchnorm is not an identity.
+    bn_layer = model.layers[2]
+    bn_layer.set_weights([
+        np.random.uniform(0.5, 1.5, size=w.shape)
+        for w in bn_layer.get_weights()
+    ])
+    return model
+
+  def _assert_equal_outputs(self, model, folded_model):
+    inputs = np.random.standard_normal(
+        (4,) + model.input_shape[1:]).astype(np.float32)
+    self.assertAllClose(
+        model.predict(inputs), folded_model.predict(inputs),
+        rtol=1e-4, atol=1e-5)
+
+  @parameterized.parameters(
+      (lambda: keras.layers.Dense(3), (5,)),
+      (lambda: keras.layers.Dense(3, use_bias=False), (5,)),
+      (lambda: keras.layers.Conv1D(3, 2), (6, 2)),
+      (lambda: keras.layers.Conv2D(3, 2), (6, 6, 2)),
+      (lambda: keras.layers.Conv2D(3, 2, use_bias=False), (6, 6, 2)),
+      (lambda: keras.layers.Conv3D(3, 2), (4, 4, 4, 2)),
+      (lambda: keras.layers.DepthwiseConv2D(2, depth_multiplier=2), (6, 6, 3)),
+      (lambda: keras.layers.SeparableConv2D(3, 2, depth_multiplier=2),
+       (6, 6, 2)),
+  )
+  def testFoldsBatchNorm(self, layer_fn, input_shape):
+    model = self._get_model(layer_fn(), input_shape)
+
+    folded_model = batchnorm_folding.fold_batchnorms(model)
+
+    self.assertFalse([
+        layer for layer in folded_model.layers
+        if isinstance(layer, keras.layers.BatchNormalization)
+    ])
+    self.assertTrue(folded_model.layers[1].use_bias)
+    self._assert_equal_outputs(model, folded_model)
+
+  def testFoldsBatchNorm_Sequential(self):
+    model = keras.Sequential([
+        keras.layers.Conv2D(3, 2, input_shape=(6, 6, 2)),
+        keras.layers.BatchNormalization(),
+        keras.layers.Flatten(),
+        keras.layers.Dense(4),
+        keras.layers.BatchNormalization(),
+    ])
+    model.layers[1].set_weights(
+        [np.random.uniform(0.5, 1.5, size=(3,)) for _ in range(4)])
+
+    folded_model = batchnorm_folding.fold_batchnorms(model)
+
+    self.assertLen(folded_model.layers, 3)
+    self._assert_equal_outputs(model, folded_model)
+
+  def testDoesNotFoldBatchNormOnOtherAxis(self):
+    model = self._get_model(keras.layers.Conv2D(3, 2), (6, 6, 2), bn_axis=1)
+
+    folded_model = batchnorm_folding.fold_batchnorms(model)
+
+    self.assertIsInstance(
+        folded_model.layers[2], keras.layers.BatchNormalization)
+    self._assert_equal_outputs(model, folded_model)
+
+  def testDoesNotFoldBatchNormOnOtherAxisOfDense(self):
+    # The batchnorm normalizes the time axis of the rank 3 outputs.
+    model = self._get_model(keras.layers.Dense(3), (3, 2), bn_axis=1)
+
+    folded_model = batchnorm_folding.fold_batchnorms(model)
+
+    self.assertIsInstance(
+        folded_model.layers[2], keras.layers.BatchNormalization)
+    self._assert_equal_outputs(model, folded_model)
+
+  def testFoldsBatchNormOnLastAxisOfDense(self):
+    model = self._get_model(keras.layers.Dense(3), (3, 2), bn_axis=2)
+
+    folded_model = batchnorm_folding.fold_batchnorms(model)
+
+    self.assertNotIsInstance(
+        folded_model.layers[2], keras.layers.BatchNormalization)
+    self._assert_equal_outputs(model, folded_model)
+
+  def testDoesNotFoldBatchNormAfterActivation(self):
+    model = self._get_model(
+        keras.layers.Conv2D(3, 2, activation='relu'), (6, 6, 2))
+
+    folded_model = batchnorm_folding.fold_batchnorms(model)
+
+    self.assertIsInstance(
+        folded_model.layers[2], keras.layers.BatchNormalization)
+
+  def testDoesNotModifyOriginalModel(self):
+    model = self._get_model(keras.layers.Conv2D(3, 2), (6, 6, 2))
+    kernel = keras.backend.get_value(model.layers[1].kernel)
+
+    batchnorm_folding.fold_batchnorms(model)
+
+    self.assertAllEqual(kernel, keras.backend.get_value(model.layers[1].kernel))
+
+
+if __name__ == '__main__':
+  tf.test.main()
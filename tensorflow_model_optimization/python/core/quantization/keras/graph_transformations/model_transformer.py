@@ -68,15 +68,61 @@ class ModelTransformer(object):
            and not isinstance(model, keras.Sequential) \
            and model._is_graph_network    # pylint: disable=protected-access
 
+  def _build_layer_indices(self):
+    """Builds the name, consumer and class name indices over `self._config`.
+
+    The indices allow pattern matching to look up layers, their consumers and
+    the candidate layers for a pattern without scanning all the layers in the
+    model. They are kept up to date incrementally as layers are replaced.
+    """
+    # Layer name -> layer config.
+    self._layers_by_name = {}
+    # Layer name -> list of layers consuming its output, one entry for every
+    # connection.
+    self._consumers_by_name = collections.defaultdict(list)
+    # Layer class name -> (layer name -> layer config), in insertion order.
+    self._layers_by_class_name = collections.defaultdict(
+        collections.OrderedDict)
+    # Layer name -> position used to order layers as in `self._config`.
+    self._layer_positions = {}
+    self._next_layer_position = 0
+
+    for layer in self._config['layers']:
+      self._add_layer_to_indices(layer)
+
+  def _add_layer_to_indices(self, layer):
+    layer_name = layer['config']['name']
+    self._layers_by_name[layer_name] = layer
+    self._layers_by_class_name[layer['class_name']][layer_name] = layer
+    self._layer_positions[layer_name] = self._next_layer_position
+    self._next_layer_position += 1
+    self._add_consumer_connections(layer)
+
+  def _remove_layer_from_indices(self, layer):
+    layer_name = layer['config']['name']
+    self._layers_by_name.pop(layer_name, None)
+    self._layers_by_class_name[layer['class_name']].pop(layer_name, None)
+    self._layer_positions.pop(layer_name, None)
+    self._remove_consumer_connections(layer)
+
+  def _add_consumer_connections(self, layer):
+    # Layers of a Sequential model do not have inbound nodes.
+    for inbound_node in layer.get('inbound_nodes', []):
+      for connection_info in inbound_node:
+        self._consumers_by_name[connection_info[0]].append(layer)
+
+  def _remove_consumer_connections(self, layer):
+    for inbound_node in layer.get('inbound_nodes', []):
+      for connection_info in inbound_node:
+        consumers = self._consumers_by_name[connection_info[0]]
+        for i, consumer in enumerate(consumers):
+          if consumer is layer:
+            del consumers[i]
+            break
+
   def _get_consuming_layers(self, check_layer):
     """Returns all the layers which are out nodes from the layer."""
-    consuming_layers = []
-    for layer in self._config['layers']:
-      for inbound_node in layer['inbound_nodes']:
-        for connection_info in inbound_node:
-          if connection_info[0] == check_layer['config']['name']:
-            consuming_layers.append(layer)
-    return consuming_layers
+    return list(self._consumers_by_name.get(check_layer['config']['name'], []))
 
   def _get_output_consumers(self, check_layer):
     """Returns if any tensors from the layer are outputs of the model."""
@@ -87,10 +133,18 @@ class ModelTransformer(object):
     return output_consumers
 
   def _get_layers(self, layer_names):
-    return [
-        layer for layer in self._config['layers']
-        if layer['config']['name'] in layer_names
+    # A layer may appear more than once in `layer_names`, for example when it
+    # feeds both inputs of a Concatenate. Return it only once so that it is
+    # not removed twice.
+    layers = [
+        self._layers_by_name[layer_name]
+        for layer_name in collections.OrderedDict.fromkeys(layer_names)
+        if layer_name in self._layers_by_name
     ]
+    # Keep the order in which the layers appear in the model.
+    return sorted(
+        layers,
+        key=lambda layer: self._layer_positions[layer['config']['name']])
 
   def _get_layer_weights(self, layer_name):
     return self._layer_weights_map.get(layer_name, {})
@@ -99,7 +153,11 @@ class ModelTransformer(object):
     return self._layer_metadata_map.get(layer_name, {})
 
   def _match_pattern(self, target, pattern):
-    return re.match('^' + pattern + '$', target) is not None
+    compiled_pattern = self._compiled_patterns.get(pattern)
+    if compiled_pattern is None:
+      compiled_pattern = re.compile('^' + pattern + '$')
+      self._compiled_patterns[pattern] = compiled_pattern
+    return compiled_pattern.match(target) is not None
 
   def _match_layer(self, layer, pattern):
     """Check if specific layer matches the pattern."""
@@ -170,13 +228,14 @@ class ModelTransformer(object):
       inbound_nodes = layer['inbound_nodes']
       return [connection_info[0] for connection_info in inbound_nodes[0]]
     else:  # Sequential model.
-      layers = self._config['layers']
-      i = layers.index(layer)
+      # Positions of a Sequential model are renumbered on every replacement,
+      # so they match the indices of the layers in the config.
+      i = self._layer_positions[layer['config']['name']]
       if i == 0:
         # First layer has no inputs.
         return []
       else:
-        return [layers[i - 1]['config']['name']]
+        return [self._config['layers'][i - 1]['config']['name']]
 
   def _match_layer_with_inputs(self, layer, pattern, is_head_node):
     """Match pattern at this layer, and continue to match at its inputs."""
@@ -223,16 +282,47 @@ class ModelTransformer(object):
                      input_match_layer_nodes,
                      self._get_layer_metadata(layer['config']['name']))
 
-  def _find_pattern(self, pattern, matched_layers=None):
-    for layer in self._config['layers']:
-      if matched_layers and layer['config']['name'] in matched_layers:
+  def _get_candidate_layers(self, pattern):
+    """Returns layers whose class matches the head of `pattern`, in order."""
+    candidate_layers = []
+    for class_name, layers in self._layers_by_class_name.items():
+      if layers and self._match_pattern(class_name, pattern.class_name):
+        candidate_layers.extend(layers.values())
+    return sorted(
+        candidate_layers,
+        key=lambda layer: self._layer_positions[layer['config']['name']])
+
+  def _find_patterns(self, pattern, matched_layers=None):
+    """Yields the matches of `pattern` in the model.
+
+    Only layers present when the search starts are considered as head nodes,
+    and layers which have been removed by the time they are reached are
+    skipped. This allows a caller to replace each match before requesting the
+    next one, without restarting the search from the first layer.
+
+    Args:
+      pattern: `LayerPattern` to find.
+      matched_layers: Names of layers which should not be matched again.
+
+    Yields:
+      `LayerNode`s for the matched layers.
+    """
+    if matched_layers is None:
+      matched_layers = set()
+
+    for layer in self._get_candidate_layers(pattern):
+      layer_name = layer['config']['name']
+      if self._layers_by_name.get(layer_name) is not layer:
+        continue
+      if layer_name in matched_layers:
         continue
       match_layer = self._match_layer_with_inputs(
           layer, pattern, is_head_node=True)
       if match_layer:
-        return match_layer
+        yield match_layer
 
-    return None
+  def _find_pattern(self, pattern, matched_layers=None):
+    return next(self._find_patterns(pattern, matched_layers), None)
 
   def _get_leaf_layers(self, match_layer):
     """Return leaf layers from this sub-graph tree."""
@@ -259,8 +349,13 @@ class ModelTransformer(object):
 
   def _remove_layers(self, layers_to_remove, layers_to_remove_names):
     # Remove layers.
+    layers_to_remove_ids = set(id(layer) for layer in layers_to_remove)
+    self._config['layers'] = [
+        layer for layer in self._config['layers']
+        if id(layer) not in layers_to_remove_ids
+    ]
     for layer_to_remove in layers_to_remove:
-      self._config['layers'].remove(layer_to_remove)
+      self._remove_layer_from_indices(layer_to_remove)
     # Remove entry from weight and metadata maps,
     # now that layer has been removed.
     for layer_name in layers_to_remove_names:
@@ -286,10 +381,12 @@ class ModelTransformer(object):
 
     consuming_layers = self._get_consuming_layers(match_layer_node.layer)
     for consumer in consuming_layers:
+      self._remove_consumer_connections(consumer)
       for inbound_node in consumer['inbound_nodes']:
         for connection_info in inbound_node:
           if connection_info[0] == match_layer_node.layer['config']['name']:
             connection_info[0] = replacement_layer_node.layer['config']['name']
+      self._add_consumer_connections(consumer)
 
     output_consumers = self._get_output_consumers(match_layer_node.layer)
     for output_consumer in output_consumers:
@@ -354,6 +451,7 @@ class ModelTransformer(object):
     def _add_replacement_layer(layer_node):
       """Recursively add new layers."""
       self._config['layers'].append(layer_node.layer)
+      self._add_layer_to_indices(layer_node.layer)
       if layer_node.weights:
         self._layer_weights_map[layer_node.layer['config']
                                 ['name']] = layer_node.weights
@@ -374,9 +472,9 @@ class ModelTransformer(object):
 
     # These variables are needed when adding the new layers
     # and must be set before _remove_layers removes them.
-    first_layer_removed = layers_to_remove[-1]  # layers_to_remove is reversed.
-    first_layer_removed_index = self._config['layers'].index(
-        first_layer_removed)
+    first_layer_removed = layers_to_remove[0]
+    first_layer_removed_index = self._layer_positions[
+        first_layer_removed['config']['name']]
 
     self._remove_layers(layers_to_remove, layers_to_remove_names)
 
@@ -399,6 +497,7 @@ class ModelTransformer(object):
       i = first_layer_removed_index
       for replacement_node in replacement_nodes:
         self._config['layers'].insert(i, replacement_node.layer)
+        self._add_layer_to_indices(replacement_node.layer)
         if replacement_node.weights:
           self._layer_weights_map[replacement_node.layer['config']
                                   ['name']] = replacement_node.weights
@@ -410,6 +509,13 @@ class ModelTransformer(object):
     replacement_nodes = _get_replacement_nodes(replacement_layer_node)
     _add_replacement_nodes(first_layer_removed_index, replacement_nodes)
 
+    # Layers from the insertion point onwards have moved, so renumber their
+    # positions to keep them equal to the indices in the config.
+    layers = self._config['layers']
+    for i in range(first_layer_removed_index, len(layers)):
+      self._layer_positions[layers[i]['config']['name']] = i
+    self._next_layer_position = len(layers)
+
   @staticmethod
   def _weight_name(name):
     """Extracts the weight name by removing layer from TF variable name.
@@ -425,39 +531,85 @@ class ModelTransformer(object):
     return name.split('/')[-1]
 
   def _get_keras_layer_weights(self, keras_layer):
-    """Returns a map of weight name, weight matrix. Keeps keras ordering."""
+    """Returns a map of weight name, weight variable. Keeps keras ordering.
+
+    The values of the variables are not read here. Weights which are not
+    modified by any transform are copied directly from these variables into
+    the transformed model.
+    """
     weights_map = collections.OrderedDict()
-    for weight_tensor, weight_numpy in \
-        zip(keras_layer.weights, keras_layer.get_weights()):
-      weights_map[self._weight_name(weight_tensor.name)] = weight_numpy
+    for weight_tensor in keras_layer.weights:
+      weights_map[self._weight_name(weight_tensor.name)] = weight_tensor
 
     return weights_map
 
   def _set_layer_weights(self, layer, weights_map):
-    """Sets the values of weights in a Keras layer."""
+    """Sets the values of weights in a Keras layer.
+
+    Values can either be NumPy arrays computed by transforms, or variables of
+    the original model. Variables are assigned without copying their values
+    to the host when executing eagerly.
+    """
 
     weight_value_tuples = []
+    weight_variable_tuples = []
     for weight_tensor in layer.weights:
       weight_name = self._weight_name(weight_tensor.name)
       if weight_name in weights_map:
-        weight_value_tuples.append(
-            (weight_tensor, weights_map[weight_name]))
+        value = weights_map[weight_name]
+        if isinstance(value, tf.Variable):
+          weight_variable_tuples.append((weight_tensor, value))
+        else:
+          weight_value_tuples.append((weight_tensor, value))
+
+    if weight_variable_tuples:
+      if tf.executing_eagerly():
+        for weight_tensor, variable in weight_variable_tuples:
+          weight_tensor.assign(variable)
+      else:
+        variable_values = K.batch_get_value(
+            [variable for _, variable in weight_variable_tuples])
+        for (weight_tensor, _), value in zip(weight_variable_tuples,
+                                             variable_values):
+          weight_value_tuples.append((weight_tensor, value))
 
     K.batch_set_value(weight_value_tuples)
 
+  @staticmethod
+  def _copy_layer_node(layer_node):
+    """Deep copies a `LayerNode`, but shares the weight variables it refers to.
+
+    Transforms may freely modify the copy, including its weight maps, without
+    the variables of the original model being duplicated.
+
+    Args:
+      layer_node: `LayerNode` to copy.
+
+    Returns:
+      Copy of `layer_node`.
+    """
+    memo = {}
+
+    def _share_variables(node):
+      for value in node.weights.values():
+        if isinstance(value, tf.Variable):
+          memo[id(value)] = value
+      for input_layer in node.input_layers:
+        _share_variables(input_layer)
+
+    _share_variables(layer_node)
+    return copy.deepcopy(layer_node, memo)
+
   @staticmethod
   def _name(obj):
     return obj.__class__.__name__
 
   def _get_matched_layers(self, transform):
-    return self._transform_matched_layers_map.get(self._name(transform), [])
+    return self._transform_matched_layers_map.setdefault(
+        self._name(transform), set())
 
   def _store_successful_match(self, transform, layer_node):
-    if self._name(transform) not in self._transform_matched_layers_map:
-      self._transform_matched_layers_map[self._name(transform)] = []
-
-    self._transform_matched_layers_map[self._name(transform)].append(
-        layer_node.layer['config']['name'])
+    self._get_matched_layers(transform).add(layer_node.layer['config']['name'])
 
   def transform(self):
     """Transforms the Keras model by applying all the specified transforms.
@@ -489,7 +641,12 @@ class ModelTransformer(object):
     #
     self._config = self.model.get_config()
 
-    # Stores map of Transform -> List of layer names matched by transform.
+    # Indices over the layers in `self._config` used for pattern matching.
+    # These are updated incrementally as layers are replaced.
+    self._build_layer_indices()
+    self._compiled_patterns = {}
+
+    # Stores map of Transform -> Set of layer names matched by transform.
     # Same transform should not match+replace the same layer more than once
     # to prevent infinite loops.
     self._transform_matched_layers_map = {}
@@ -510,21 +667,18 @@ class ModelTransformer(object):
       match_found = False
       for transform in self.transforms:
         # A transform may find multiple instances of a pattern in the model.
-        # Keep finding and replacing till done.
-        while True:
-          match_layer_node = self._find_pattern(
-              transform.pattern(), self._get_matched_layers(transform))
-
-          # Pattern did not match any layer. Move to next transform.
-          if not match_layer_node:
-            break
-
+        # Keep finding and replacing till done. The search continues after
+        # each replacement instead of starting over, and matches which only
+        # appear due to a replacement are found by the next iteration of the
+        # outer loop.
+        for match_layer_node in self._find_patterns(
+            transform.pattern(), self._get_matched_layers(transform)):
           self._store_successful_match(transform, match_layer_node)
 
           # Copying the match_layer_node ensures the replacement code can
           # freely modify the match.
           replacement_layer_node = transform.replacement(
-              copy.deepcopy(match_layer_node))
+              self._copy_layer_node(match_layer_node))
 
           # If equal, the matched layers are being replaced with exactly the
           # same set of layers that were matched with the same config.
@@ -0,0 +1,139 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Benchmarks for ModelTransformer on synthetic deep and wide graphs.
+
+Run with:
+  python model_transformer_benchmark.py --benchmarks=.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.quantization.keras.graph_transformations import model_transformer
+from tensorflow_model_optimization.python.core.quantization.keras.graph_transformations import transforms
+
+ModelTransformer = model_transformer.ModelTransformer
+LayerNode = transforms.LayerNode
+LayerPattern = transforms.LayerPattern
+
+keras = tf.keras
+
+
+class FuseReLUIntoDense(transforms.Transform):
+  """Fuses a ReLU into the preceding Dense layer."""
+
+  def pattern(self):
+    return LayerPattern('ReLU', inputs=[LayerPattern('Dense')])
+
+  def replacement(self, match_layer):
+    dense_layer_config = match_layer.input_layers[0].layer['config']
+    dense_layer_config['activation'] = 'relu'
+
+    replace_layer = keras.layers.serialize(
+        keras.layers.Dense(**dense_layer_config))
+    replace_layer['name'] = replace_layer['config']['name']
+
+    return LayerNode(replace_layer, match_layer.input_layers[0].weights, [])
+
+
+class NeverMatches(transforms.Transform):
+  """Pattern which is looked up, but never found in the benchmark models."""
+
+  def pattern(self):
+    return LayerPattern('Conv2D|DepthwiseConv2D', inputs=[LayerPattern('.*')])
+
+  def replacement(self, match_layer):
+    return match_layer
+
+
+def _deep_model(num_blocks):
+  """Chain of `num_blocks` Dense -> ReLU blocks."""
+  inp = keras.layers.Input((4,))
+  x = inp
+  for _ in range(num_blocks):
+    x = keras.layers.Dense(4)(x)
+    x = keras.layers.ReLU()(x)
+  return keras.Model(inp, x)
+
+
+def _partially_matching_model(num_blocks):
+  """Chain of blocks where only the second half can be fused.
+
+  The first half has Dense -> Activation -> ReLU blocks, so pattern matching
+  has to reject many ReLU layers before reaching the ones which match.
+  """
+  inp = keras.layers.Input((4,))
+  x = inp
+  for i in range(num_blocks):
+    x = keras.layers.Dense(4)(x)
+    if i < num_blocks // 2:
+      x = keras.layers.Activation('linear')(x)
+    x = keras.layers.ReLU()(x)
+  return keras.Model(inp, x)
+
+
+def _wide_model(num_branches):
+  """`num_branches` parallel Dense -> ReLU branches joined by an Add."""
+  inp = keras.layers.Input((4,))
+  branches = []
+  for _ in range(num_branches):
+    x = keras.layers.Dense(4)(inp)
+    branches.append(keras.layers.ReLU()(x))
+  return keras.Model(inp, keras.layers.Add()(branches))
+
+
+class ModelTransformerBenchmark(tf.test.Benchmark):
+  """Times `ModelTransformer.transform` as the number of layers grows."""
+
+  def _benchmark_transform(self, name, model):
+    transformer = ModelTransformer(model, [NeverMatches(), FuseReLUIntoDense()])
+
+    start = time.time()
+    transformed_model, _ = transformer.transform()
+    wall_time = time.time() - start
+
+    self.report_benchmark(
+        name=name,
+        iters=1,
+        wall_time=wall_time,
+        extras={
+            'num_layers': len(model.layers),
+            'num_transformed_layers': len(transformed_model.layers),
+        })
+
+  def benchmark_deep_graphs(self):
+    for num_blocks in [64, 128, 256]:
+      self._benchmark_transform(
+          'deep_{}_blocks'.format(num_blocks), _deep_model(num_blocks))
+
+  def benchmark_partially_matching_graphs(self):
+    for num_blocks in [64, 128, 256]:
+      self._benchmark_transform(
+          'partially_matching_{}_blocks'.format(num_blocks),
+          _partially_matching_model(num_blocks))
+
+  def benchmark_wide_graphs(self):
+    for num_branches in [64, 256, 512]:
+      self._benchmark_transform(
+          'wide_{}_branches'.format(num_branches), _wide_model(num_branches))
+
+
+if __name__ == '__main__':
+  tf.test.main()
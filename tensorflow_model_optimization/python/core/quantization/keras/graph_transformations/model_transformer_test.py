@@ -410,6 +410,56 @@ class ModelTransformerTest(tf.test.TestCase, parameterized.TestCase):
     self._assert_config(model.get_config(), transformed_model.get_config(),
                         ['build_input_shape'])
 
+  @parameterized.parameters(['sequential', 'functional'])
+  def testReplaceChainOfLayers_ManyOccurrences(self, model_type):
+
+    class FuseReLUIntoDense(transforms.Transform):
+      """Fuse ReLU into Dense layers."""
+
+      def pattern(self):
+        return LayerPattern('ReLU', inputs=[LayerPattern('Dense')])
+
+      def replacement(self, match_layer):
+        dense_layer_config = match_layer.input_layers[0].layer['config']
+        dense_layer_weights = match_layer.input_layers[0].weights
+        dense_layer_config['activation'] = 'relu'
+
+        new_dense_layer = keras.layers.Dense(**dense_layer_config)
+
+        replace_layer = keras.layers.serialize(new_dense_layer)
+        replace_layer['name'] = replace_layer['config']['name']
+
+        return LayerNode(replace_layer, dense_layer_weights, [])
+
+    num_blocks = 20
+    if model_type == 'functional':
+      inp = keras.layers.Input((3,))
+      x = inp
+      for _ in range(num_blocks):
+        x = keras.layers.Dense(3)(x)
+        x = keras.layers.ReLU()(x)
+      model = keras.Model(inp, x)
+    else:
+      model = keras.Sequential([keras.layers.InputLayer((3,))])
+      for _ in range(num_blocks):
+        model.add(keras.layers.Dense(3))
+        model.add(keras.layers.ReLU())
+
+    transformed_model, _ = ModelTransformer(
+        model, [FuseReLUIntoDense()]).transform()
+
+    dense_layers = [
+        layer for layer in transformed_model.layers
+        if isinstance(layer, keras.layers.Dense)
+    ]
+    self.assertLen(dense_layers, num_blocks)
+    self.assertLen(transformed_model.layers,
+                   num_blocks + (1 if model_type == 'functional' else 0))
+    for layer in dense_layers:
+      self.assertEqual('relu', layer.get_config()['activation'])
+
+    self._assert_model_results_equal(model, transformed_model)
+
   def testReplaceTreeOfLayers_WithSingleLayer(self):
     # TODO(pulkitb): Implement
     pass
@@ -559,6 +609,29 @@ class ModelTransformerTest(tf.test.TestCase, parameterized.TestCase):
     ModelTransformer(model, [transform]).transform()
     self.assertFalse(transform.matched())
 
+  def testPatternDoesNotMatch_LayerConsumingSameInputTwice(self):
+    # Dense -> Concat
+    #       -> Concat
+    #
+    # where Dense feeds both inputs of Concat. Dense has multiple connections
+    # to consumers, so it can not be an intermediate node in the pattern,
+    # whether the pattern lists it once or twice.
+    inp = keras.layers.Input(3)
+    x = keras.layers.Dense(2)(inp)
+    out = keras.layers.Concatenate()([x, x])
+    model = keras.Model(inp, out)
+
+    for pattern in [
+        LayerPattern('Concatenate', inputs=[LayerPattern('Dense')]),
+        LayerPattern(
+            'Concatenate',
+            inputs=[LayerPattern('Dense'), LayerPattern('Dense')]),
+    ]:
+      transform = self.VerifyMatch(pattern)
+      transformed_model, _ = ModelTransformer(model, [transform]).transform()
+      self.assertFalse(transform.matched())
+      self._assert_config(model.get_config(), transformed_model.get_config())
+
   @parameterized.parameters(['sequential', 'functional'])
   def testLayerMetadataPassedAndReplacedInTransforms(self, model_type):
 
@@ -20,6 +20,8 @@ from __future__ import print_function
 
 import abc
 import collections
+
+import numpy as np
 import six
 
 
@@ -78,7 +80,8 @@ class LayerNode(object):
 
     Args:
       layer: layer config of this node.
-      weights: An OrderedDict of weight name => value for the layer.
+      weights: An OrderedDict of weight name => value for the layer. Values
+        are either NumPy arrays or variables holding the value.
       input_layers: List of `LayerNode`s that feed into this layer.
       metadata: Dictionary of metadata for a given layer.
     """
@@ -100,13 +103,19 @@ class LayerNode(object):
         ', '.join([str(input_layer) for input_layer in self.input_layers]))
 
   def _eq(self, ordered_dict1, ordered_dict2):
-    """Built-in equality test for OrderedDict fails when value is NP array."""
+    """Built-in equality test for OrderedDict fails when value is NP array.
+
+    Values can also be variables, which are equal if they are the same object
+    or hold the same value.
+    """
 
     if len(ordered_dict1) != len(ordered_dict2):
       return False
 
     for item1, item2 in zip(ordered_dict1.items(), ordered_dict2.items()):
-      if item1[0] != item2[0] or not (item1[1] == item2[1]).all():
+      if item1[0] != item2[0]:
+        return False
+      if item1[1] is not item2[1] and not np.array_equal(item1[1], item2[1]):
         return False
 
     return True
@@ -24,6 +24,7 @@ from tensorflow.python.keras import activations
 from tensorflow.python.keras import backend as K
 from tensorflow.python.keras import initializers
 from tensorflow.python.keras.layers import convolutional
+from tensorflow.python.keras.layers import core
 from tensorflow.python.keras.layers import deserialize as deserialize_layer
 from tensorflow.python.keras.layers import normalization
 from tensorflow.python.keras.utils import conv_utils
@@ -33,22 +34,42 @@ from tensorflow.python.ops import math_ops
 from tensorflow.python.ops import nn
 from tensorflow.python.ops import nn_ops
 
+from tensorflow_model_optimization.python.core.quantization.keras import calibration
 from tensorflow_model_optimization.python.core.quantization.keras import quantizers
 from tensorflow_model_optimization.python.core.quantization.keras.tflite import tflite_quantizers
 
 keras = tf.keras
 
+# Params of the folded layers which are passed to their BatchNormalization.
+_BATCHNORM_PARAMS = (
+    'axis', 'momentum', 'epsilon', 'center', 'scale', 'beta_initializer',
+    'gamma_initializer', 'moving_mean_initializer',
+    'moving_variance_initializer', 'beta_regularizer', 'gamma_regularizer',
+    'beta_constraint', 'gamma_constraint', 'renorm', 'renorm_clipping',
+    'renorm_momentum', 'fused', 'trainable', 'virtual_batch_size', 'adjustment')
+
+
+def _pop_batchnorm_params(kwargs):
+  """Removes the BatchNormalization params from the kwargs of a layer."""
+  return {
+      param: kwargs.pop(param) for param in _BATCHNORM_PARAMS if param in kwargs
+  }
+
 
 class _ConvBatchNormMixin(object):
   """Provides shared functionality between fused batchnorm layers."""
 
+  def _kernel_to_fold(self):
+    """Returns the kernel which the batchnorm is folded into."""
+    return self.weights[0]
+
   def _build_for_quantization(self):
     """All Keras build() logic for quantization for fused layers."""
     if not self.is_quantized:
       return
 
     self._weight_quantizer_vars = self.weight_quantizer.build(
-        self.weights[0].shape, 'weight', self)
+        self._kernel_to_fold().shape, 'weight', self)
 
     self.optimizer_step = self.add_weight(
         'optimizer_step',
@@ -67,42 +88,83 @@ class _ConvBatchNormMixin(object):
         initializer=initializers.Constant(6.0),
         trainable=False)
 
-  def _apply_weight_quantizer(self, training, folded_conv_kernel):
-    """All Keras call() logic for applying weight quantization."""
+  def _build_for_batchnorm_freezing(self):
+    """All Keras build() logic for freezing batchnorm statistics."""
+    if not self.freeze_bn_delay:
+      return
 
-    def make_quantizer_fn(training):
-      """Return quantizer conditioned on whether training or not."""
+    if not tf.compat.v1.executing_eagerly_outside_functions():
+      raise ValueError('freeze_bn_delay is only supported with TF2 behavior. '
+                       'Use freeze_bn_delay=0 to always freeze the batchnorm '
+                       'statistics instead.')
 
-      def quantizer_fn():
-        return self.weight_quantizer(
-            folded_conv_kernel,
-            self.optimizer_step,
-            training,
-            **self._weight_quantizer_vars)  # pylint: disable=protected-access
+    self.batchnorm_step = self.add_weight(
+        'batchnorm_step',
+        initializer=initializers.Constant(0),
+        dtype=dtypes.int64,
+        trainable=False)
 
-      return quantizer_fn
+  def _update_batchnorm(self, inputs, training):
+    """Runs the unfolded convolution to update the batchnorm statistics.
 
-    return tf_utils.smart_cond(training, make_quantizer_fn(True),
-                               make_quantizer_fn(False))
+    The folded convolution only uses the moving statistics of the batchnorm.
+    The unfolded convolution is therefore skipped whenever they aren't updated:
+    during inference, and after `freeze_bn_delay` training steps.
 
-  def _apply_activation_quantizer(self, training, activation_output):
+    Args:
+      inputs: Input tensor of the layer.
+      training: Whether the graph is currently training.
+    """
+    if self.freeze_bn_delay == 0 or tf_utils.constant_value(training) is False:
+      return
+
+    def update_fn(training):
+      conv_out = super(_ConvBatchNormMixin, self).call(inputs)
+      # Not all the computations in the batchnorm need to happen,
+      # but this avoids duplicating code (e.g. moving_average).
+      self.batchnorm.call(conv_out, training=training)
+
+    if self.freeze_bn_delay is None:
+      update_fn(training)
+      return
+
+    def update_and_count_fn():
+      update_fn(True)
+      return self.batchnorm_step.assign_add(1)
+
+    should_update = math_ops.logical_and(
+        training, self.batchnorm_step < self.freeze_bn_delay)
+    tf_utils.smart_cond(should_update, update_and_count_fn,
+                        lambda: array_ops.identity(self.batchnorm_step))
+
+  def _apply_weight_quantizer(self, training, folded_conv_kernel,
+                              quantizer_vars=None, weight_quantizer=None):
     """All Keras call() logic for applying weight quantization."""
+    if quantizer_vars is None:
+      quantizer_vars = self._weight_quantizer_vars  # pylint: disable=protected-access
+    if weight_quantizer is None:
+      weight_quantizer = self.weight_quantizer
 
-    def make_quantizer_fn(training):
-      """Return quantizer conditioned on whether training or not."""
+    calibration.observe(
+        folded_conv_kernel, weight_quantizer, quantizer_vars, is_weight=True)
 
-      def quantizer_fn():
-        return self.activation_quantizer(
-            activation_output,
-            self.optimizer_step,
-            training,
-            min_var=self._activation_min_var,  # pylint: disable=protected-access
-            max_var=self._activation_max_var)  # pylint: disable=protected-access
+    return quantizers.apply_quantizer(
+        weight_quantizer, folded_conv_kernel, self.optimizer_step,
+        training, quantizer_vars)
+
+  def _apply_activation_quantizer(self, training, activation_output):
+    """All Keras call() logic for applying weight quantization."""
+    quantizer_vars = {
+        'min_var': self._activation_min_var,  # pylint: disable=protected-access
+        'max_var': self._activation_max_var,  # pylint: disable=protected-access
+    }
 
-      return quantizer_fn
+    calibration.observe(
+        activation_output, self.activation_quantizer, quantizer_vars)
 
-    return tf_utils.smart_cond(training, make_quantizer_fn(True),
-                               make_quantizer_fn(False))
+    return quantizers.apply_quantizer(
+        self.activation_quantizer, activation_output, self.optimizer_step,
+        training, quantizer_vars)
 
   @staticmethod
   def _from_config(cls_initializer, config):
@@ -141,7 +203,8 @@ class _ConvBatchNormMixin(object):
       serialized_activation = activations.serialize(self.post_activation)
     config = {
         'is_quantized': self.is_quantized,
-        'post_activation': serialized_activation
+        'post_activation': serialized_activation,
+        'freeze_bn_delay': self.freeze_bn_delay,
     }
 
     return dict(
@@ -155,7 +218,10 @@ class _ConvBatchNorm2D(_ConvBatchNormMixin, convolutional.Conv2D):
   Implements the emulation, as described in https://arxiv.org/abs/1712.05877.
   Note that in the
   emulated form, there are two convolutions for each convolution in the original
-  model.
+  model while training. The unfolded convolution only updates the batchnorm
+  statistics, so it is skipped during inference. `freeze_bn_delay` freezes the
+  statistics after the given number of training steps, after which it is skipped
+  while training as well. `freeze_bn_delay=0` never updates them.
 
   Notably, this layer adds the quantization ops  itself, instead of relying on
   the wrapper. The reason is that the weight (folded_conv_kernel) is an
@@ -212,6 +278,7 @@ class _ConvBatchNorm2D(_ConvBatchNormMixin, convolutional.Conv2D):
       post_activation=None,
       # quantization params
       is_quantized=True,
+      freeze_bn_delay=None,
       **kwargs):
     super(_ConvBatchNorm2D, self).__init__(
         filters,
@@ -256,6 +323,8 @@ class _ConvBatchNorm2D(_ConvBatchNormMixin, convolutional.Conv2D):
     # Named as post_activation to not conflict with Layer self.activation.
     self.post_activation = activations.get(post_activation)
 
+    self.freeze_bn_delay = freeze_bn_delay
+
     self.is_quantized = is_quantized
     if self.is_quantized:
       self.weight_quantizer = tflite_quantizers.ConvWeightsQuantizer()
@@ -271,16 +340,13 @@ class _ConvBatchNorm2D(_ConvBatchNormMixin, convolutional.Conv2D):
     self.batchnorm.build(self.compute_output_shape(input_shape))
 
     self._build_for_quantization()
+    self._build_for_batchnorm_freezing()
 
   def call(self, inputs, training=None):
     if training is None:
       training = K.learning_phase()
 
-    conv_out = super(_ConvBatchNorm2D, self).call(inputs)
-
-    # Not all the computations in the batchnorm need to happen,
-    # but this avoids duplicating code (e.g. moving_average).
-    self.batchnorm.call(conv_out)
+    self._update_batchnorm(inputs, training)
 
     folded_conv_kernel_multiplier = self.batchnorm.gamma * math_ops.rsqrt(
         self.batchnorm.moving_variance + self.batchnorm.epsilon)
@@ -397,6 +463,7 @@ class _DepthwiseConvBatchNorm2D(_ConvBatchNormMixin,
       post_activation=None,
       # quantization params
       is_quantized=True,
+      freeze_bn_delay=None,
       **kwargs):
     super(_DepthwiseConvBatchNorm2D, self).__init__(
         kernel_size,
@@ -438,6 +505,8 @@ class _DepthwiseConvBatchNorm2D(_ConvBatchNormMixin,
     )
     self.post_activation = activations.get(post_activation)
 
+    self.freeze_bn_delay = freeze_bn_delay
+
     self.is_quantized = is_quantized
     if self.is_quantized:
       self.weight_quantizer = tflite_quantizers.ConvWeightsQuantizer()
@@ -453,14 +522,13 @@ class _DepthwiseConvBatchNorm2D(_ConvBatchNormMixin,
     self.batchnorm.build(self.compute_output_shape(input_shape))
 
     self._build_for_quantization()
+    self._build_for_batchnorm_freezing()
 
   def call(self, inputs, training=None):
     if training is None:
       training = K.learning_phase()
 
-    conv_out = super(_DepthwiseConvBatchNorm2D, self).call(inputs)
-
-    self.batchnorm.call(conv_out)
+    self._update_batchnorm(inputs, training)
 
     folded_conv_kernel_multiplier = self.batchnorm.gamma * math_ops.rsqrt(
         self.batchnorm.moving_variance + self.batchnorm.epsilon)
@@ -516,3 +584,252 @@ class _DepthwiseConvBatchNorm2D(_ConvBatchNormMixin,
   @classmethod
   def from_config(cls, config):
     return _ConvBatchNormMixin._from_config(cls, config)
+
+
+class _FoldedBatchNormMixin(_ConvBatchNormMixin):
+  """Shared implementation of the folded Dense, Conv1D/3D and SeparableConv.
+
+  Unlike _ConvBatchNorm2D, these layers take the params of their
+  BatchNormalization as keyword arguments, and share their Keras build(),
+  call() and config logic. Subclasses implement `_folded_op`, which applies
+  the layer with the folded kernel.
+  """
+
+  def _init_batchnorm_folding(self, batchnorm_params, post_activation,
+                              is_quantized, freeze_bn_delay, weight_quantizer):
+    """All shared __init__ logic after the underlying layer is constructed."""
+    self.batchnorm = normalization.BatchNormalization(**batchnorm_params)
+    self.post_activation = activations.get(post_activation)
+    self.freeze_bn_delay = freeze_bn_delay
+
+    self.is_quantized = is_quantized
+    if self.is_quantized:
+      self.weight_quantizer = weight_quantizer
+
+      self.activation_quantizer = quantizers.MovingAverageQuantizer(
+          num_bits=8, per_axis=False, symmetric=False, narrow_range=False)
+
+  def build(self, input_shape):
+    # responsible for trainable kernel weights
+    super(_ConvBatchNormMixin, self).build(input_shape)
+
+    # resposible for trainable gamma and beta weights
+    self.batchnorm.build(self.compute_output_shape(input_shape))
+
+    self._build_for_quantization()
+    self._build_for_batchnorm_freezing()
+
+  def _fold_batchnorm(self, kernel):
+    """Returns the kernel and bias with the moving statistics folded in."""
+    multiplier = math_ops.rsqrt(
+        self.batchnorm.moving_variance + self.batchnorm.epsilon)
+    if self.batchnorm.scale:
+      multiplier *= self.batchnorm.gamma
+
+    folded_bias = -self.batchnorm.moving_mean * multiplier
+    if self.batchnorm.center:
+      folded_bias += self.batchnorm.beta
+
+    folded_kernel = math_ops.mul(multiplier, kernel, name='folded_kernel')
+    return folded_kernel, array_ops.identity(folded_bias, name='folded_bias')
+
+  def _folded_op(self, inputs, folded_kernel, training):
+    raise NotImplementedError('Must be implemented in subclasses.')
+
+  def _bias_add(self, outputs, bias):
+    if getattr(self, 'data_format', None) != 'channels_first':
+      return nn.bias_add(outputs, bias, data_format='NHWC')
+
+    # Taken from keras/layers/convolutional.py:210
+    if self.rank == 1:
+      # nn.bias_add does not accept a 1D input tensor.
+      return outputs + array_ops.reshape(bias, (1, self.filters, 1))
+    return nn.bias_add(outputs, bias, data_format='NCHW')
+
+  def call(self, inputs, training=None):
+    if training is None:
+      training = K.learning_phase()
+
+    self._update_batchnorm(inputs, training)
+
+    folded_kernel, folded_bias = self._fold_batchnorm(self._kernel_to_fold())
+    if self.is_quantized:
+      folded_kernel = self._apply_weight_quantizer(training, folded_kernel)
+
+    outputs = self._bias_add(
+        self._folded_op(inputs, folded_kernel, training), folded_bias)
+
+    if self.post_activation is not None:
+      outputs = self.post_activation(outputs)
+    if self.is_quantized:
+      outputs = self._apply_activation_quantizer(training, outputs)
+    return outputs
+
+  def get_config(self):
+    return self._get_config(super(_ConvBatchNormMixin, self).get_config())
+
+  @classmethod
+  def from_config(cls, config):
+    return _ConvBatchNormMixin._from_config(cls, config)
+
+
+class _DenseBatchNorm(_FoldedBatchNormMixin, core.Dense):
+  """Layer for emulating the folding of batch normalization into Dense during serving.
+
+  See _ConvBatchNorm2D for detailed comments.
+  """
+
+  def __init__(
+      self,
+      units,
+      # Post-batchnorm activation.
+      post_activation=None,
+      # quantization params
+      is_quantized=True,
+      freeze_bn_delay=None,
+      **kwargs):
+    batchnorm_params = _pop_batchnorm_params(kwargs)
+    super(_DenseBatchNorm, self).__init__(units, use_bias=False, **kwargs)
+
+    self._init_batchnorm_folding(
+        batchnorm_params, post_activation, is_quantized, freeze_bn_delay,
+        quantizers.LastValueQuantizer(
+            num_bits=8, per_axis=False, symmetric=True, narrow_range=True))
+
+  def _folded_op(self, inputs, folded_kernel, training):
+    return K.dot(inputs, folded_kernel)
+
+
+class _ConvBatchNormND(_FoldedBatchNormMixin):
+  """Folded convolution shared between Conv1D and Conv3D."""
+
+  def _folded_op(self, inputs, folded_kernel, training):
+    # Apply causal padding to inputs for Conv1D.
+    if self.padding == 'causal':
+      inputs = array_ops.pad(inputs, self._compute_causal_padding())
+
+    return nn_ops.convolution_v2(
+        inputs,
+        folded_kernel,
+        strides=self.strides,
+        padding=self._padding_op,
+        data_format=self._conv_op_data_format,
+        dilations=self.dilation_rate,
+        name='folded_conv_out')
+
+
+class _ConvBatchNorm1D(_ConvBatchNormND, convolutional.Conv1D):
+  """Layer for emulating the folding of batch normalization into Conv1D during serving.
+
+  See _ConvBatchNorm2D for detailed comments.
+  """
+
+  def __init__(
+      self,
+      filters,
+      kernel_size,
+      # Post-batchnorm activation.
+      post_activation=None,
+      # quantization params
+      is_quantized=True,
+      freeze_bn_delay=None,
+      **kwargs):
+    batchnorm_params = _pop_batchnorm_params(kwargs)
+    super(_ConvBatchNorm1D, self).__init__(
+        filters, kernel_size, use_bias=False, **kwargs)
+
+    self._init_batchnorm_folding(
+        batchnorm_params, post_activation, is_quantized, freeze_bn_delay,
+        quantizers.LastValueQuantizer(
+            num_bits=8, per_axis=False, symmetric=True, narrow_range=True))
+
+
+class _ConvBatchNorm3D(_ConvBatchNormND, convolutional.Conv3D):
+  """Layer for emulating the folding of batch normalization into Conv3D during serving.
+
+  See _ConvBatchNorm2D for detailed comments.
+  """
+
+  def __init__(
+      self,
+      filters,
+      kernel_size,
+      # Post-batchnorm activation.
+      post_activation=None,
+      # quantization params
+      is_quantized=True,
+      freeze_bn_delay=None,
+      **kwargs):
+    batchnorm_params = _pop_batchnorm_params(kwargs)
+    super(_ConvBatchNorm3D, self).__init__(
+        filters, kernel_size, use_bias=False, **kwargs)
+
+    self._init_batchnorm_folding(
+        batchnorm_params, post_activation, is_quantized, freeze_bn_delay,
+        quantizers.LastValueQuantizer(
+            num_bits=8, per_axis=False, symmetric=True, narrow_range=True))
+
+
+class _SeparableConvBatchNorm2D(_FoldedBatchNormMixin,
+                                convolutional.SeparableConv2D):
+  """Layer for emulating the folding of batch normalization into SeparableConv2D during serving.
+
+  The batchnorm is folded into the pointwise kernel, which is quantized per
+  output channel. The depthwise kernel is quantized as is, per-tensor, since its
+  last axis is the depth multiplier rather than a channel axis. See
+  _ConvBatchNorm2D for detailed comments.
+  """
+
+  def __init__(
+      self,
+      filters,
+      kernel_size,
+      # Post-batchnorm activation.
+      post_activation=None,
+      # quantization params
+      is_quantized=True,
+      freeze_bn_delay=None,
+      **kwargs):
+    batchnorm_params = _pop_batchnorm_params(kwargs)
+    super(_SeparableConvBatchNorm2D, self).__init__(
+        filters, kernel_size, use_bias=False, **kwargs)
+
+    self._init_batchnorm_folding(
+        batchnorm_params, post_activation, is_quantized, freeze_bn_delay,
+        tflite_quantizers.ConvWeightsQuantizer())
+    if self.is_quantized:
+      self.depthwise_quantizer = quantizers.LastValueQuantizer(
+          num_bits=8, per_axis=False, symmetric=True, narrow_range=True)
+
+  def _kernel_to_fold(self):
+    return self.pointwise_kernel
+
+  def build(self, input_shape):
+    super(_SeparableConvBatchNorm2D, self).build(input_shape)
+
+    if self.is_quantized:
+      self._depthwise_quantizer_vars = self.depthwise_quantizer.build(
+          self.depthwise_kernel.shape, 'depthwise_weight', self)
+
+  def _folded_op(self, inputs, folded_kernel, training):
+    depthwise_kernel = self.depthwise_kernel
+    if self.is_quantized:
+      depthwise_kernel = self._apply_weight_quantizer(
+          training, depthwise_kernel, self._depthwise_quantizer_vars,
+          self.depthwise_quantizer)
+
+    # Taken from keras/layers/convolutional.py:1866
+    if self.data_format == 'channels_last':
+      strides = (1,) + self.strides + (1,)
+    else:
+      strides = (1, 1) + self.strides
+
+    return nn.separable_conv2d(
+        inputs,
+        depthwise_kernel,
+        folded_kernel,
+        strides=strides,
+        padding=self.padding.upper(),
+        rate=self.dilation_rate,
+        data_format=conv_utils.convert_data_format(self.data_format, ndim=4),
+        name='folded_conv_out')
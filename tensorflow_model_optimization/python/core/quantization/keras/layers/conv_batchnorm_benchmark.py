@@ -0,0 +1,100 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Benchmarks for training with folded Conv + BatchNorm layers.
+
+Run with:
+  python conv_batchnorm_benchmark.py --benchmarks=.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.quantization.keras.layers import conv_batchnorm
+
+keras = tf.keras
+
+_ConvBatchNorm2D = conv_batchnorm._ConvBatchNorm2D  # pylint: disable=protected-access
+_DepthwiseConvBatchNorm2D = conv_batchnorm._DepthwiseConvBatchNorm2D  # pylint: disable=protected-access
+
+_INPUT_SHAPE = (96, 96, 3)
+_BATCH_SIZE = 16
+_NUM_CLASSES = 10
+
+
+def _mobilenet_model(freeze_bn_delay):
+  """MobileNet v1 style model, with every Conv + BN + ReLU6 folded."""
+
+  def relu6():
+    return keras.layers.ReLU(6.0)
+
+  inp = keras.layers.Input(_INPUT_SHAPE)
+  x = _ConvBatchNorm2D(
+      32, 3, strides=2, padding='same', post_activation=relu6(),
+      freeze_bn_delay=freeze_bn_delay)(inp)
+  for filters, strides in [(64, 1), (128, 2), (128, 1), (256, 2), (256, 1),
+                           (512, 2), (512, 1), (512, 1), (1024, 2)]:
+    x = _DepthwiseConvBatchNorm2D(
+        3, strides=strides, padding='same', post_activation=relu6(),
+        freeze_bn_delay=freeze_bn_delay)(x)
+    x = _ConvBatchNorm2D(
+        filters, 1, padding='same', post_activation=relu6(),
+        freeze_bn_delay=freeze_bn_delay)(x)
+  x = keras.layers.GlobalAveragePooling2D()(x)
+  out = keras.layers.Dense(_NUM_CLASSES)(x)
+  return keras.Model(inp, out)
+
+
+class ConvBatchNormBenchmark(tf.test.Benchmark):
+  """Times training steps of a MobileNet style model with folded BatchNorm."""
+
+  def _benchmark_train_step(self, name, freeze_bn_delay, iters=20):
+    model = _mobilenet_model(freeze_bn_delay)
+    model.compile(
+        loss=keras.losses.SparseCategoricalCrossentropy(from_logits=True),
+        optimizer='sgd')
+
+    x = np.random.uniform(size=(_BATCH_SIZE,) + _INPUT_SHAPE)
+    y = np.random.randint(_NUM_CLASSES, size=(_BATCH_SIZE,))
+
+    # Trace the train function, and pass the freeze delay if there is one.
+    for _ in range(3):
+      model.train_on_batch(x, y)
+
+    start = time.time()
+    for _ in range(iters):
+      model.train_on_batch(x, y)
+    wall_time = (time.time() - start) / iters
+
+    self.report_benchmark(name=name, iters=iters, wall_time=wall_time)
+
+  def benchmark_train_step_batchnorm_updated(self):
+    self._benchmark_train_step('batchnorm_updated', freeze_bn_delay=None)
+
+  def benchmark_train_step_batchnorm_frozen(self):
+    self._benchmark_train_step('batchnorm_frozen', freeze_bn_delay=0)
+
+  def benchmark_train_step_batchnorm_frozen_after_delay(self):
+    self._benchmark_train_step(
+        'batchnorm_frozen_after_delay', freeze_bn_delay=1)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -41,6 +41,10 @@ _ConvBatchNorm2D = conv_batchnorm._ConvBatchNorm2D
 _DepthwiseConvBatchNorm2D = conv_batchnorm._DepthwiseConvBatchNorm2D
 Conv2DModel = conv_batchnorm_test_utils.Conv2DModel
 DepthwiseConv2DModel = conv_batchnorm_test_utils.DepthwiseConv2DModel
+DenseModel = conv_batchnorm_test_utils.DenseModel
+Conv1DModel = conv_batchnorm_test_utils.Conv1DModel
+Conv3DModel = conv_batchnorm_test_utils.Conv3DModel
+SeparableConv2DModel = conv_batchnorm_test_utils.SeparableConv2DModel
 
 
 class FoldedBatchNormTestBase(tf.test.TestCase):
@@ -162,14 +166,66 @@ class FoldedBatchNormTestBase(tf.test.TestCase):
       # https://github.com/tensorflow/tensorflow/blob/master/tensorflow/python/tools/optimize_for_inference_test.py#L230
       self.assertAllClose(model_out, model2_out, rtol=1e-04, atol=1e-06)
 
+  def _fit(self, model, steps):
+    batch_size = self._get_batched_input_shape()[0]
+    input_shape = self._get_batched_input_shape()
+    input_shape[0] *= steps
+    output_shape = self._get_output_shape()
+    output_shape[0] *= steps
+
+    model.fit(
+        np.random.uniform(0, 1, size=input_shape),
+        np.random.uniform(0, 10, size=output_shape),
+        batch_size=batch_size,
+        epochs=1,
+        verbose=0)
+
+  def _get_moving_mean(self, model):
+    return keras.backend.get_value(model.layers[0].batchnorm.moving_mean)
+
+  def _test_batchnorm_frozen_after_delay(self):
+    if compat.is_v1_apis():
+      return
+
+    model = self._get_folded_batchnorm_model(freeze_bn_delay=2)
+    model.compile(loss='mse', optimizer='sgd')
+
+    initial_moving_mean = self._get_moving_mean(model)
+    self._fit(model, steps=2)
+    moving_mean = self._get_moving_mean(model)
+    self.assertNotAllClose(initial_moving_mean, moving_mean)
+
+    self._fit(model, steps=2)
+    self.assertAllClose(moving_mean, self._get_moving_mean(model))
+    self.assertEqual(
+        2, keras.backend.get_value(model.layers[0].batchnorm_step))
+
+  def _test_batchnorm_always_frozen(self):
+    model = self._get_folded_batchnorm_model(freeze_bn_delay=0)
+    model.compile(loss='mse', optimizer='sgd')
+
+    initial_moving_mean = self._get_moving_mean(model)
+    self._fit(model, steps=2)
+    self.assertAllClose(initial_moving_mean, self._get_moving_mean(model))
+
+  def _test_inference_does_not_update_batchnorm(self):
+    model = self._get_folded_batchnorm_model()
+
+    initial_moving_mean = self._get_moving_mean(model)
+    model.predict(np.random.uniform(0, 1, size=self._get_batched_input_shape()))
+    self.assertAllClose(initial_moving_mean, self._get_moving_mean(model))
+
 
 class ConvBatchNorm2DTest(FoldedBatchNormTestBase):
 
   def _get_folded_batchnorm_model(self,
                                   is_quantized=False,
-                                  post_bn_activation=None):
+                                  post_bn_activation=None,
+                                  freeze_bn_delay=None):
     return Conv2DModel.get_folded_batchnorm_model(
-        is_quantized=is_quantized, post_bn_activation=post_bn_activation)
+        is_quantized=is_quantized,
+        post_bn_activation=post_bn_activation,
+        freeze_bn_delay=freeze_bn_delay)
 
   def _get_nonfolded_batchnorm_model(self):
     return Conv2DModel.get_nonfolded_batchnorm_model()
@@ -185,6 +241,15 @@ class ConvBatchNorm2DTest(FoldedBatchNormTestBase):
         self._get_folded_batchnorm_model(is_quantized=False),
         self._get_nonfolded_batchnorm_model())
 
+  def testBatchNormFrozenAfterDelay(self):
+    self._test_batchnorm_frozen_after_delay()
+
+  def testBatchNormAlwaysFrozen(self):
+    self._test_batchnorm_always_frozen()
+
+  def testInferenceDoesNotUpdateBatchNorm(self):
+    self._test_inference_does_not_update_batchnorm()
+
   def testEquivalentToFloatTFLite(self):
     if not compat.is_v1_apis():
       return
@@ -232,9 +297,12 @@ class DepthwiseConvBatchNorm2DTest(FoldedBatchNormTestBase):
 
   def _get_folded_batchnorm_model(self,
                                   is_quantized=False,
-                                  post_bn_activation=None):
+                                  post_bn_activation=None,
+                                  freeze_bn_delay=None):
     return DepthwiseConv2DModel.get_folded_batchnorm_model(
-        is_quantized=is_quantized, post_bn_activation=post_bn_activation)
+        is_quantized=is_quantized,
+        post_bn_activation=post_bn_activation,
+        freeze_bn_delay=freeze_bn_delay)
 
   def _get_nonfolded_batchnorm_model(self):
     return DepthwiseConv2DModel.get_nonfolded_batchnorm_model()
@@ -250,6 +318,15 @@ class DepthwiseConvBatchNorm2DTest(FoldedBatchNormTestBase):
         self._get_folded_batchnorm_model(is_quantized=False),
         self._get_nonfolded_batchnorm_model())
 
+  def testBatchNormFrozenAfterDelay(self):
+    self._test_batchnorm_frozen_after_delay()
+
+  def testBatchNormAlwaysFrozen(self):
+    self._test_batchnorm_always_frozen()
+
+  def testInferenceDoesNotUpdateBatchNorm(self):
+    self._test_inference_does_not_update_batchnorm()
+
   def testEquivalentToFloatTFLite(self):
     if not compat.is_v1_apis():
       return
@@ -289,5 +366,93 @@ class DepthwiseConvBatchNorm2DTest(FoldedBatchNormTestBase):
   #   self._test_equal_tf_and_tflite_outputs(tf_model)
 
 
+class _FoldedLayerBatchNormTests(object):
+  """Test cases shared between the folded Dense, Conv1D/3D and SeparableConv."""
+
+  model_cls = None
+
+  def _get_folded_batchnorm_model(self,
+                                  is_quantized=False,
+                                  post_bn_activation=None,
+                                  freeze_bn_delay=None):
+    return self.model_cls.get_folded_batchnorm_model(
+        is_quantized=is_quantized,
+        post_bn_activation=post_bn_activation,
+        freeze_bn_delay=freeze_bn_delay)
+
+  def _get_batched_input_shape(self):
+    return self.model_cls.get_batched_input_shape()
+
+  def _get_output_shape(self):
+    return self.model_cls.get_output_shape()
+
+  def testEquivalentToNonFoldedBatchNorm(self):
+    folded_model = self._get_folded_batchnorm_model(
+        post_bn_activation=keras.layers.ReLU())
+    nonfolded_model = self.model_cls.get_nonfolded_batchnorm_model(
+        post_bn_activation=keras.layers.ReLU())
+    # Use non-default statistics so that the batchnorm is not an identity.
+    batchnorm_weights = [
+        np.random.uniform(0.5, 1.5, size=w.shape)
+        for w in nonfolded_model.layers[1].get_weights()
+    ]
+    nonfolded_model.layers[1].set_weights(batchnorm_weights)
+    folded_model.layers[0].batchnorm.set_weights(batchnorm_weights)
+
+    self._test_equal_outputs(folded_model, nonfolded_model)
+
+  def testQuantizedModelTrains(self):
+    model = self._get_folded_batchnorm_model(is_quantized=True)
+    model.compile(loss='mse', optimizer='sgd')
+
+    self._fit(model, steps=2)
+
+  def testSerialization(self):
+    layer = self._get_folded_batchnorm_model(
+        is_quantized=True, freeze_bn_delay=2).layers[0]
+
+    config = layer.get_config()
+    new_layer = layer.__class__.from_config(config)
+
+    self.assertEqual(config, new_layer.get_config())
+
+  def testBatchNormFrozenAfterDelay(self):
+    self._test_batchnorm_frozen_after_delay()
+
+  def testBatchNormAlwaysFrozen(self):
+    self._test_batchnorm_always_frozen()
+
+
+class DenseBatchNormTest(_FoldedLayerBatchNormTests, FoldedBatchNormTestBase):
+
+  model_cls = DenseModel
+
+
+class ConvBatchNorm1DTest(_FoldedLayerBatchNormTests, FoldedBatchNormTestBase):
+
+  model_cls = Conv1DModel
+
+
+class ConvBatchNorm3DTest(_FoldedLayerBatchNormTests, FoldedBatchNormTestBase):
+
+  model_cls = Conv3DModel
+
+
+class SeparableConvBatchNorm2DTest(_FoldedLayerBatchNormTests,
+                                   FoldedBatchNormTestBase):
+
+  model_cls = SeparableConv2DModel
+
+  def testDepthwiseKernelQuantizedPerTensor(self):
+    layer = self._get_folded_batchnorm_model(is_quantized=True).layers[0]
+
+    # The folded pointwise kernel is quantized per output channel, and the
+    # depthwise kernel, whose last axis is the depth multiplier, per-tensor.
+    self.assertEqual(
+        (2,), layer._weight_quantizer_vars['min_var'].shape)  # pylint: disable=protected-access
+    for var in layer._depthwise_quantizer_vars.values():  # pylint: disable=protected-access
+      self.assertEqual((), var.shape)
+
+
 if __name__ == '__main__':
   tf.test.main()
@@ -26,6 +26,10 @@ keras = tf.keras
 
 _ConvBatchNorm2D = conv_batchnorm._ConvBatchNorm2D  # pylint: disable=protected-access
 _DepthwiseConvBatchNorm2D = conv_batchnorm._DepthwiseConvBatchNorm2D  # pylint: disable=protected-access
+_ConvBatchNorm1D = conv_batchnorm._ConvBatchNorm1D  # pylint: disable=protected-access
+_ConvBatchNorm3D = conv_batchnorm._ConvBatchNorm3D  # pylint: disable=protected-access
+_DenseBatchNorm = conv_batchnorm._DenseBatchNorm  # pylint: disable=protected-access
+_SeparableConvBatchNorm2D = conv_batchnorm._SeparableConvBatchNorm2D  # pylint: disable=protected-access
 
 
 def _get_conv2d_params():
@@ -47,6 +51,8 @@ def _get_initializer(random_init):
 class Conv2DModel(object):
   """Construct and access Conv + BatchNorm + activation models."""
 
+  folded_layer_class = _ConvBatchNorm2D
+
   params = {
       'filters': 2,
       'kernel_size': (2, 2),
@@ -68,13 +74,15 @@ class Conv2DModel(object):
   @classmethod
   def get_folded_batchnorm_model(cls,
                                  is_quantized=False,
-                                 post_bn_activation=None):
+                                 post_bn_activation=None,
+                                 freeze_bn_delay=None):
     """Return folded Conv2D + BN + optional activation model."""
     return tf.keras.Sequential([
         _ConvBatchNorm2D(
             kernel_initializer=_get_initializer(random_init=False),
             is_quantized=is_quantized,
             post_activation=post_bn_activation,
+            freeze_bn_delay=freeze_bn_delay,
             **cls.params)
     ])
 
@@ -113,6 +121,8 @@ class Conv2DModel(object):
 class DepthwiseConv2DModel(Conv2DModel):
   """Construct and access DepthwiseConv + BatchNorm + activation models."""
 
+  folded_layer_class = _DepthwiseConvBatchNorm2D
+
   params = {
       'kernel_size': (3, 3),
       'input_shape': (10, 10, 3),
@@ -126,12 +136,14 @@ class DepthwiseConv2DModel(Conv2DModel):
   @classmethod
   def get_folded_batchnorm_model(cls,
                                  is_quantized=False,
-                                 post_bn_activation=None):
+                                 post_bn_activation=None,
+                                 freeze_bn_delay=None):
     return tf.keras.Sequential([
         _DepthwiseConvBatchNorm2D(
             depthwise_initializer=_get_initializer(random_init=False),
             is_quantized=is_quantized,
             post_activation=post_bn_activation,
+            freeze_bn_delay=freeze_bn_delay,
             **cls.params)
     ])
 
@@ -163,3 +175,128 @@ class DepthwiseConv2DModel(Conv2DModel):
       if post_bn_activation is not None:
         out = post_bn_activation(out)
       return tf.keras.Model(inp, out)
+
+
+class _FoldedLayerModel(Conv2DModel):
+  """Construct and access Layer + BatchNorm + activation models.
+
+  Subclasses set the unfolded layer class, the folded layer class and the name
+  of the initializer param of the folded kernel.
+  """
+
+  layer_class = None
+  folded_layer_class = None
+  initializer_param = 'kernel_initializer'
+
+  @classmethod
+  def get_folded_batchnorm_model(cls,
+                                 is_quantized=False,
+                                 post_bn_activation=None,
+                                 freeze_bn_delay=None):
+    params = dict(cls.params)
+    params[cls.initializer_param] = _get_initializer(random_init=False)
+    return tf.keras.Sequential([
+        cls.folded_layer_class(
+            is_quantized=is_quantized,
+            post_activation=post_bn_activation,
+            freeze_bn_delay=freeze_bn_delay,
+            **params)
+    ])
+
+  @classmethod
+  def get_nonfolded_batchnorm_model(cls,
+                                    post_bn_activation=None,
+                                    model_type='sequential',
+                                    random_init=False):
+    params = dict(cls.params)
+    params[cls.initializer_param] = _get_initializer(random_init)
+    if model_type == 'sequential':
+      layers = [
+          cls.layer_class(use_bias=False, **params),
+          keras.layers.BatchNormalization(axis=-1),
+      ]
+      if post_bn_activation is not None:
+        layers.append(post_bn_activation)
+      return tf.keras.Sequential(layers)
+    else:
+      inp = keras.layers.Input(params.pop('input_shape'),
+                               params.pop('batch_size'))
+      x = cls.layer_class(use_bias=False, **params)(inp)
+      out = keras.layers.BatchNormalization(axis=-1)(x)
+      if post_bn_activation is not None:
+        out = post_bn_activation(out)
+      return tf.keras.Model(inp, out)
+
+
+class DenseModel(_FoldedLayerModel):
+  """Construct and access Dense + BatchNorm + activation models."""
+
+  layer_class = keras.layers.Dense
+  folded_layer_class = _DenseBatchNorm
+
+  params = {
+      'units': 4,
+      'input_shape': (6,),
+      'batch_size': 8,
+  }
+
+  @classmethod
+  def get_output_shape(cls):
+    return [cls.params['batch_size'], 4]
+
+
+class Conv1DModel(_FoldedLayerModel):
+  """Construct and access Conv1D + BatchNorm + activation models."""
+
+  layer_class = keras.layers.Conv1D
+  folded_layer_class = _ConvBatchNorm1D
+
+  params = {
+      'filters': 2,
+      'kernel_size': 3,
+      'padding': 'causal',
+      'input_shape': (6, 3),
+      'batch_size': 8,
+  }
+
+  @classmethod
+  def get_output_shape(cls):
+    return [cls.params['batch_size'], 6, 2]
+
+
+class Conv3DModel(_FoldedLayerModel):
+  """Construct and access Conv3D + BatchNorm + activation models."""
+
+  layer_class = keras.layers.Conv3D
+  folded_layer_class = _ConvBatchNorm3D
+
+  params = {
+      'filters': 2,
+      'kernel_size': (2, 2, 2),
+      'input_shape': (3, 3, 3, 3),
+      'batch_size': 8,
+  }
+
+  @classmethod
+  def get_output_shape(cls):
+    return [cls.params['batch_size'], 2, 2, 2, 2]
+
+
+class SeparableConv2DModel(_FoldedLayerModel):
+  """Construct and access SeparableConv2D + BatchNorm + activation models."""
+
+  layer_class = keras.layers.SeparableConv2D
+  folded_layer_class = _SeparableConvBatchNorm2D
+  initializer_param = 'pointwise_initializer'
+
+  params = {
+      'filters': 2,
+      'kernel_size': (3, 3),
+      'depthwise_initializer': _get_initializer(random_init=False),
+      'input_shape': (5, 5, 3),
+      'batch_size': 8,
+  }
+
+  @classmethod
+  def get_output_shape(cls):
+    return [cls.params['batch_size'], 3, 3, 2]
@@ -21,8 +21,11 @@ from __future__ import print_function
 import tensorflow as tf
 
 # TODO(b/139939526): move to public API.
+from tensorflow.python.keras.utils import tf_utils
+from tensorflow.python.ops import resource_variable_ops
 from tensorflow.python.training import moving_averages
 from tensorflow_model_optimization.python.core.keras import compat as tf_compat
+from tensorflow_model_optimization.python.core.quantization.keras import range_sync
 
 
 def FixedQuantize(inputs, init_min=-6.0, init_max=6.0, scope=None):
@@ -65,7 +68,8 @@ def LastValueQuantize(inputs,
     init_min: a float scalar, the initial value for variable min.
     init_max: a float scalar, the initial value for variable max.
     name_prefix: name_prefix for created nodes.
-    is_training: Whether the op is applied to a training or eval graph.
+    is_training: Whether the op is applied to a training or eval graph. May
+      also be a boolean tensor.
     num_bits: Number of bits to use for quantization, must be between 2 and 8.
     narrow_range: Whether to use the narrow quantization range
       [1; 2^num_bits - 1] or wide range [0; 2^num_bits - 1].
@@ -78,63 +82,25 @@ def LastValueQuantize(inputs,
     input_shape = inputs.get_shape()
     input_dim = len(input_shape)
 
-    if not is_training:
-      return _FakeQuantWithMinMaxVars(
-          inputs,
-          min_var,
-          max_var,
-          per_channel=per_channel,
-          num_bits=num_bits,
-          narrow_range=narrow_range)
-
-    if per_channel:
-      if input_dim == 2:
-        reduce_dims = [0]
-      elif input_dim == 4:
-        reduce_dims = [0, 1, 2]
-
-    if per_channel:
-      if input_dim >= 2:
-        batch_min = tf.math.reduce_min(
-            inputs, axis=reduce_dims, name='BatchMin')
-      else:
-        batch_min = inputs
-    else:
-      batch_min = tf.math.reduce_min(inputs, name='BatchMin')
-
-    if per_channel:
-      if input_dim >= 2:
-        batch_max = tf.math.reduce_max(
-            inputs, axis=reduce_dims, name='BatchMax')
-      else:
-        batch_max = inputs
-    else:
-      batch_max = tf.math.reduce_max(inputs, name='BatchMax')
-
-    if symmetric:
-      if narrow_range:
-        min_max_ratio = -1
-      else:
-        # In two's complement notation, the negative range is slightly larger
-        # than the positive range.
-        min_max_ratio = -((1 << num_bits) - 2) / (1 << num_bits)
-
-      # TFLite requires that 0.0 if always in the [min; max] range. Because
-      # batch_min <= batch_max, it follows that range_min <= 0 <= range_max.
-      range_min = tf.math.minimum(batch_min, batch_max / min_max_ratio)
-      range_max = tf.math.maximum(batch_max, batch_min * min_max_ratio)
-    else:
-      # TFLite requires that 0.0 if always in the [min; max] range.
-      range_min = tf.math.minimum(batch_min, 0.0)
-      range_max = tf.math.maximum(batch_max, 0.0)
+    def batch_range_fn():
+      return _BatchRange(
+          inputs, input_dim, per_channel, num_bits, narrow_range, symmetric)
+
+    def update_range_fn():
+      range_min, range_max = batch_range_fn()
+      assign_min = tf_compat.assign(min_var, range_min, name='AssignMinLast')
+      assign_max = tf_compat.assign(max_var, range_max, name='AssignMaxLast')
+      return assign_min, assign_max
 
-    assign_min = tf_compat.assign(min_var, range_min, name='AssignMinLast')
-    assign_max = tf_compat.assign(max_var, range_max, name='AssignMaxLast')
+    update_range_fn = _MaybeDeferRangeUpdate(
+        update_range_fn, batch_range_fn, min_var, max_var, is_training)
 
-    return _FakeQuantWithMinMaxVars(
+    return _FakeQuantWithRange(
         inputs,
-        assign_min,
-        assign_max,
+        min_var,
+        max_var,
+        is_training,
+        update_range_fn,
         per_channel=per_channel,
         num_bits=num_bits,
         narrow_range=narrow_range)
@@ -163,7 +129,8 @@ def MovingAvgQuantize(inputs,
     init_max: a float scalar, the initial value for variable max.
     ema_decay: EMA decay parameter.
     name_prefix: name_prefix for created nodes.
-    is_training: Whether the op is applied to a training or eval graph.
+    is_training: Whether the op is applied to a training or eval graph. May
+      also be a boolean tensor.
     num_bits: Number of bits to use for quantization, must be between 2 and 8.
     narrow_range: Whether to use the narrow quantization range
       [1; 2^num_bits - 1] or wide range [0; 2^num_bits - 1].
@@ -176,69 +143,174 @@ def MovingAvgQuantize(inputs,
     input_shape = inputs.get_shape()
     input_dim = len(input_shape)
 
-    if not is_training:
-      return _FakeQuantWithMinMaxVars(
-          inputs,
-          min_var,
-          max_var,
-          per_channel=per_channel,
-          num_bits=num_bits,
-          narrow_range=narrow_range)
-    if per_channel:
-      if input_dim == 2:
-        reduce_dims = [0]
-      elif input_dim == 4:
-        reduce_dims = [0, 1, 2]
-
-    if per_channel:
-      if input_dim >= 2:
-        batch_min = tf.math.reduce_min(
-            inputs, axis=reduce_dims, name='BatchMin')
-      else:
-        batch_min = inputs
-    else:
-      batch_min = tf.math.reduce_min(inputs, name='BatchMin')
-
-    if per_channel:
-      if input_dim >= 2:
-        batch_max = tf.math.reduce_max(
-            inputs, axis=reduce_dims, name='BatchMax')
-      else:
-        batch_max = inputs
-    else:
-      batch_max = tf.math.reduce_max(inputs, name='BatchMax')
-
-    if symmetric:
-      if narrow_range:
-        min_max_ratio = -1
-      else:
-        # In two's complement notation, the negative range is slightly larger
-        # than the positive range.
-        min_max_ratio = -((1 << num_bits) - 2) / (1 << num_bits)
-
-      # TFLite requires that 0.0 if always in the [min; max] range. Because
-      # batch_min <= batch_max, it follows that range_min <= 0 <= range_max.
-      range_min = tf.minimum(batch_min, batch_max / min_max_ratio)
-      range_max = tf.maximum(batch_max, batch_min * min_max_ratio)
-    else:
-      # TFLite requires that 0.0 if always in the [min; max] range.
-      range_min = tf.minimum(batch_min, 0.0)
-      range_max = tf.maximum(batch_max, 0.0)
+    def batch_range_fn():
+      return _BatchRange(
+          inputs, input_dim, per_channel, num_bits, narrow_range, symmetric)
 
-    assign_min = moving_averages.assign_moving_average(
-        min_var, range_min, ema_decay, zero_debias=False, name='AssignMinEma')
-    assign_max = moving_averages.assign_moving_average(
-        max_var, range_max, ema_decay, zero_debias=False, name='AssignMaxEma')
+    def update_range_fn():
+      range_min, range_max = batch_range_fn()
+      assign_min = moving_averages.assign_moving_average(
+          min_var, range_min, ema_decay, zero_debias=False, name='AssignMinEma')
+      assign_max = moving_averages.assign_moving_average(
+          max_var, range_max, ema_decay, zero_debias=False, name='AssignMaxEma')
+      return assign_min, assign_max
 
-    return _FakeQuantWithMinMaxVars(
+    update_range_fn = _MaybeDeferRangeUpdate(
+        update_range_fn, batch_range_fn, min_var, max_var, is_training,
+        ema_decay=ema_decay)
+
+    return _FakeQuantWithRange(
         inputs,
-        assign_min,
-        assign_max,
+        min_var,
+        max_var,
+        is_training,
+        update_range_fn,
         per_channel=per_channel,
         num_bits=num_bits,
         narrow_range=narrow_range)
 
 
+def _BatchRange(inputs, input_dim, per_channel, num_bits, narrow_range,
+                symmetric):
+  """Returns the range of `inputs`, adjusted to what TFLite supports."""
+  if per_channel:
+    if input_dim == 2:
+      reduce_dims = [0]
+    elif input_dim == 4:
+      reduce_dims = [0, 1, 2]
+
+  if per_channel:
+    if input_dim >= 2:
+      batch_min = tf.math.reduce_min(inputs, axis=reduce_dims, name='BatchMin')
+    else:
+      batch_min = inputs
+  else:
+    batch_min = tf.math.reduce_min(inputs, name='BatchMin')
+
+  if per_channel:
+    if input_dim >= 2:
+      batch_max = tf.math.reduce_max(inputs, axis=reduce_dims, name='BatchMax')
+    else:
+      batch_max = inputs
+  else:
+    batch_max = tf.math.reduce_max(inputs, name='BatchMax')
+
+  if symmetric:
+    if narrow_range:
+      min_max_ratio = -1
+    else:
+      # In two's complement notation, the negative range is slightly larger
+      # than the positive range.
+      min_max_ratio = -((1 << num_bits) - 2) / (1 << num_bits)
+
+    # TFLite requires that 0.0 if always in the [min; max] range. Because
+    # batch_min <= batch_max, it follows that range_min <= 0 <= range_max.
+    range_min = tf.math.minimum(batch_min, batch_max / min_max_ratio)
+    range_max = tf.math.maximum(batch_max, batch_min * min_max_ratio)
+  else:
+    # TFLite requires that 0.0 if always in the [min; max] range.
+    range_min = tf.math.minimum(batch_min, 0.0)
+    range_max = tf.math.maximum(batch_max, 0.0)
+
+  return range_min, range_max
+
+
+def _MaybeDeferRangeUpdate(update_range_fn, batch_range_fn, min_var, max_var,
+                           is_training, ema_decay=None):
+  """Defers the range update to the active `synchronize_ranges` scope, if any.
+
+  Args:
+    update_range_fn: Function which updates the range for training, and
+      returns the new (min, max).
+    batch_range_fn: Function which returns the (min, max) of the batch.
+    min_var: a variable containing quantization range lower end(s).
+    max_var: a variable containing quantization range upper end(s).
+    is_training: Python boolean or boolean tensor.
+    ema_decay: EMA decay parameter, or None if the range is the last batch
+      range.
+  Returns:
+    `update_range_fn` when ranges are not synchronized. Otherwise a function
+    which returns the updated range of this replica without assigning it.
+  """
+  synchronizer = range_sync.active_synchronizer()
+  if synchronizer is None or tf_utils.constant_value(is_training) is False:
+    return update_range_fn
+
+  # The synchronizer uses the batch range after the model has run, so it
+  # cannot be computed inside a cond on `is_training`.
+  range_min, range_max = batch_range_fn()
+  synchronizer.defer_update(
+      min_var, max_var, range_min, range_max, is_training, ema_decay)
+
+  if ema_decay is None:
+    return lambda: (range_min, range_max)
+
+  return lambda: (min_var - (min_var - range_min) * (1 - ema_decay),
+                  max_var - (max_var - range_max) * (1 - ema_decay))
+
+
+def _FakeQuantWithRange(inputs, min_var, max_var, is_training, update_range_fn,
+                        per_channel, num_bits, narrow_range):
+  """Fake quantizes `inputs`, first updating the range when training.
+
+  When `is_training` is a tensor, only the range update depends on it. The
+  training and inference paths then share a single fake quant op, instead of
+  each building their own. The cond only signals that the update ran, and the
+  range is read after it, so the graph is smaller than with a cond over the
+  whole quantizer. Synchronized ranges are not assigned by the update, so the
+  cond returns them instead.
+
+  Args:
+    inputs: a tensor containing values to be quantized.
+    min_var: a variable containing quantization range lower end(s).
+    max_var: a variable containing quantization range upper end(s).
+    is_training: Python boolean or boolean tensor.
+    update_range_fn: Function which updates the range for training, and
+      returns the new (min, max).
+    per_channel: a boolean specifying whether to use per-channel quantization.
+    num_bits: Number of bits to use for quantization, must be between 2 and 8.
+    narrow_range: Whether to use the narrow quantization range
+      [1; 2^num_bits - 1] or wide range [0; 2^num_bits - 1].
+  Returns:
+    a tensor containing quantized values.
+  """
+  training_value = tf_utils.constant_value(is_training)
+  if training_value is None and range_sync.active_synchronizer() is None:
+    def update_fn():
+      with tf.control_dependencies(update_range_fn()):
+        return tf.constant(True)
+
+    updated = tf.cond(is_training, update_fn, lambda: tf.constant(False))
+    with tf.control_dependencies([updated]):
+      range_min = _ReadVariable(min_var)
+      range_max = _ReadVariable(max_var)
+  elif training_value is None:
+    range_min, range_max = tf_utils.smart_cond(
+        is_training,
+        lambda: [tf.convert_to_tensor(value) for value in update_range_fn()],
+        lambda: [tf.convert_to_tensor(min_var), tf.convert_to_tensor(max_var)])
+  elif training_value:
+    range_min, range_max = update_range_fn()
+  else:
+    range_min, range_max = min_var, max_var
+
+  return _FakeQuantWithMinMaxVars(
+      inputs,
+      range_min,
+      range_max,
+      per_channel=per_channel,
+      num_bits=num_bits,
+      narrow_range=narrow_range)
+
+
+def _ReadVariable(var):
+  """Reads `var`, after the control dependencies of the current scope."""
+  if resource_variable_ops.is_resource_variable(var):
+    return tf.convert_to_tensor(var)
+  # Converting a reference variable returns a snapshot taken at its creation.
+  return tf.identity(var)
+
+
 def _FakeQuantWithMinMaxVars(inputs, min_var, max_var, per_channel, num_bits,
                              narrow_range):
   """Adds a fake quantization operation.
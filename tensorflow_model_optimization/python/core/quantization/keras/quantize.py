@@ -22,6 +22,7 @@ from tensorflow_model_optimization.python.core.quantization.keras import quantiz
 from tensorflow_model_optimization.python.core.quantization.keras import quantize_layer
 from tensorflow_model_optimization.python.core.quantization.keras import quantize_wrapper
 from tensorflow_model_optimization.python.core.quantization.keras import quantizers
+from tensorflow_model_optimization.python.core.quantization.keras import weight_only_quantize_wrapper
 from tensorflow_model_optimization.python.core.quantization.keras.layers import conv_batchnorm
 from tensorflow_model_optimization.python.core.quantization.keras.tflite import tflite_quantize_layout_transform
 from tensorflow_model_optimization.python.core.quantization.keras.tflite import tflite_quantize_registry
@@ -55,9 +56,15 @@ def quantize_scope(*args):
       'NoOpActivation': quantize_aware_activation.NoOpActivation,
       'QuantizeWrapper': quantize_wrapper.QuantizeWrapper,
       'QuantizeLayer': quantize_layer.QuantizeLayer,
+      'WeightOnlyQuantizeWrapper':
+          weight_only_quantize_wrapper.WeightOnlyQuantizeWrapper,
       # TODO(tf-mot): add way for different quantization schemes to modify this.
       '_DepthwiseConvBatchNorm2D': conv_batchnorm._DepthwiseConvBatchNorm2D,  # pylint: disable=protected-access
-      '_ConvBatchNorm2D': conv_batchnorm._ConvBatchNorm2D  # pylint: disable=protected-access
+      '_ConvBatchNorm2D': conv_batchnorm._ConvBatchNorm2D,  # pylint: disable=protected-access
+      '_ConvBatchNorm1D': conv_batchnorm._ConvBatchNorm1D,  # pylint: disable=protected-access
+      '_ConvBatchNorm3D': conv_batchnorm._ConvBatchNorm3D,  # pylint: disable=protected-access
+      '_DenseBatchNorm': conv_batchnorm._DenseBatchNorm,  # pylint: disable=protected-access
+      '_SeparableConvBatchNorm2D': conv_batchnorm._SeparableConvBatchNorm2D  # pylint: disable=protected-access
   }
   quantization_objects.update(tflite_quantize_registry._types_dict())  # pylint: disable=protected-access
   quantization_objects.update(quantizers._types_dict())  # pylint: disable=protected-access
@@ -66,7 +73,7 @@ def quantize_scope(*args):
 
 
 # TODO(tfmot): link to docs to explain what quantization implementation means.
-def quantize_model(to_quantize):
+def quantize_model(to_quantize, cache_quantized_weights=False):
   """Quantize a whole tf.keras model with the default quantization implementation.
 
   To be more precise, `quantize_model` creates a model that emulates
@@ -90,6 +97,8 @@ def quantize_model(to_quantize):
   Args:
     to_quantize: tf.keras model to be quantized. It can have pre-trained
       weights.
+    cache_quantized_weights: If True, the quantized layers reuse their
+      quantized weights between inference calls. See `quantize_apply`.
 
   Returns:
     Returns a new tf.keras model prepared for quantization.
@@ -105,7 +114,8 @@ def quantize_model(to_quantize):
             input=to_quantize.__class__.__name__))
 
   annotated_model = quantize_annotate_model(to_quantize)
-  return quantize_apply(annotated_model)
+  return quantize_apply(
+      annotated_model, cache_quantized_weights=cache_quantized_weights)
 
 
 def quantize_annotate_model(to_annotate):
@@ -206,7 +216,9 @@ def quantize_annotate_layer(to_annotate, quantize_config=None):
       layer=to_annotate, quantize_config=quantize_config)
 
 
-def quantize_apply(model):
+def quantize_apply(model, cross_layer_equalization=False,
+                   bias_correction=False, freeze_bn_delay=None,
+                   cache_quantized_weights=False):
   """Introduce quantization operations to a tf.keras model.
 
   This function takes a tf.keras model which has been annotated with
@@ -229,6 +241,24 @@ def quantize_apply(model):
   Args:
     model: A tf.keras Sequential or Functional model which has been annotated
     with `quantize_annotate`. It can have pre-trained weights.
+    cross_layer_equalization: If True, rescale the output channels of each
+      annotated layer and the input channels of the next one so their kernels
+      have equal per channel ranges. This does not change the float outputs of
+      the model, and reduces the error of per-tensor weight quantization.
+    bias_correction: If True, subtract the expected error caused by quantizing
+      the kernel of each annotated layer which follows a batchnorm from its
+      bias. Both options need no data, and work best with pre-trained weights.
+    freeze_bn_delay: Number of training steps after which the moving statistics
+      of the batchnorms folded into the preceding layers are frozen, and used
+      in place of the batch statistics. None never freezes them. If not None,
+      batchnorms are also folded into Conv2D and DepthwiseConv2D layers.
+      Freezing requires TF2 behavior.
+    cache_quantized_weights: If True, inference calls of the quantized layers
+      reuse the quantized weights of the previous inference call, until a
+      training call. After writing the weights of the returned model through
+      `Model.set_weights` or `Model.load_weights`, call
+      `invalidate_quantized_weights_cache` on each of its `QuantizeWrapper`
+      layers.
 
   Returns:
     Returns a new tf.keras model in which the annotated layers have been
@@ -259,30 +289,27 @@ def quantize_apply(model):
                      'been built yet. Please call `model.build(input_shape)` '
                      'before quantizing your model.')
 
-  def _clone_model_with_weights(model_to_clone):
-    cloned_model = keras.models.clone_model(model_to_clone)
-    cloned_model.set_weights(model_to_clone.get_weights())
-
-    return cloned_model
-
-  def _extract_original_model(model_to_unwrap):
-    """Extracts original model by removing wrappers."""
+  def _get_layer_quantize_map(annotated_model):
+    """Maps the names of the annotated layers to their quantization metadata."""
     layer_quantize_map = {}
 
-    def _unwrap(layer):
-      if not isinstance(layer, quantize_annotate_mod.QuantizeAnnotate):
-        return layer
-
-      annotate_wrapper = layer
-      layer_quantize_map[annotate_wrapper.layer.name] = {
-          'quantize_config': annotate_wrapper.quantize_config
-      }
-      return annotate_wrapper.layer
+    for layer in annotated_model.layers:
+      if isinstance(layer, quantize_annotate_mod.QuantizeAnnotate):
+        layer_quantize_map[layer.layer.name] = {
+            'quantize_config': layer.quantize_config
+        }
 
-    unwrapped_model = keras.models.clone_model(
-        model_to_unwrap, input_tensors=None, clone_function=_unwrap)
+    # Input layers need to be matched for patterns as well, if they feed into
+    # annotated layers.
+    # pylint: disable=protected-access
+    for input_layer in annotated_model._input_layers:
+      for outbound_node in input_layer._outbound_nodes:
+        if isinstance(outbound_node.outbound_layer,
+                      quantize_annotate_mod.QuantizeAnnotate):
+          layer_quantize_map[input_layer.name] = {}
+    # pylint: enable=protected-access
 
-    return unwrapped_model, layer_quantize_map
+    return layer_quantize_map
 
   def _quantize(layer):  # pylint: disable=missing-docstring
     if layer.name not in layer_quantize_map:
@@ -306,39 +333,93 @@ def quantize_apply(model):
     # `QuantizeAnnotate`. This should generally be fine, but occasionally
     # `QuantizeAnnotate` wrapper may contain `batch_input_shape` like params.
     # TODO(pulkitb): Ensure this does not affect model cloning.
-    return quantize_wrapper.QuantizeWrapper(layer, quantize_config)
-
-  # 1. Create a copy of the model with the same weights. This ensures
-  # modifications don't affect the original model, or its weights.
-  model_copy = _clone_model_with_weights(model)
-
-  # 2. Remove QuantizeAnnotate wrappers from the layers in the model. This
-  # extracts the original model structure (easier to transform), and
-  # stores relevant quantization information in a map.
-  unwrapped_model, layer_quantize_map = _extract_original_model(model_copy)
-  # Model cloning excludes input layers. Add input layers into the map
-  # since they need to be matched for patterns as well.
-  # pylint: disable=protected-access
-  for input_layer in unwrapped_model._input_layers:
-    for outbound_node in input_layer._outbound_nodes:
-      if outbound_node.outbound_layer.name in layer_quantize_map:
-        layer_quantize_map[input_layer.name] = {}
-  # pylint: enable=protected-access
-
-  # 3. Apply the graph transformations required to match model passes on
-  # target device/dialect.
+    return quantize_wrapper.QuantizeWrapper(
+        layer, quantize_config,
+        cache_quantized_weights=cache_quantized_weights)
+
+  # 1. Find the layers to quantize, and any custom `QuantizeConfig`s passed
+  # with them. The model itself is not copied, since the transformations below
+  # rebuild every layer of it from its config.
+  layer_quantize_map = _get_layer_quantize_map(model)
+
+  # 2. Apply the graph transformations required to match model passes on
+  # target device/dialect. This also removes the QuantizeAnnotate wrappers,
+  # and copies the weights of the original model into the new layers.
   quantize_transform = \
-    tflite_quantize_layout_transform.TFLiteQuantizeLayoutTransform()
+    tflite_quantize_layout_transform.TFLiteQuantizeLayoutTransform(
+        cross_layer_equalization=cross_layer_equalization,
+        bias_correction=bias_correction,
+        freeze_bn_delay=freeze_bn_delay)
   # layer_quantize_map gets modified by the transformations.
   transformed_model, layer_quantize_map = quantize_transform.apply(
-      unwrapped_model, layer_quantize_map)
+      model, layer_quantize_map)
 
   # TODO(pulkitb): Think more about how to introduce TFLite specific code.
   quantize_registry = tflite_quantize_registry.TFLiteQuantizeRegistry()
 
-  # 4. Actually quantize all the relevant layers in the model. This is done by
+  # 3. Actually quantize all the relevant layers in the model. This is done by
   # wrapping the layers with QuantizeWrapper, and passing the associated
-  # `QuantizeConfig`.
+  # `QuantizeConfig`. The layers of `transformed_model` are reused rather than
+  # cloned, so no further weights are created or copied.
 
   return keras.models.clone_model(
       transformed_model, input_tensors=None, clone_function=_quantize)
+
+
+def quantize_weights_only(to_quantize, num_bits=8):
+  """Store the weights of a tf.keras model as integers, for inference.
+
+  The weights of all `Dense`, `Conv1D`, `Conv2D`, `Conv3D` and `Embedding`
+  layers are quantized symmetrically with one scale per output channel, or per
+  row for embeddings, and stored as int8 variables. With `num_bits=4`, two
+  values are packed into each int8 element. The weights are dequantized when
+  the layers are called, while activations and all other layers stay in float.
+
+  Unlike `quantize_model`, the float weights are not kept, which reduces the
+  memory used by these weights 4x for 8 bits and 8x for 4 bits, but the
+  quantized weights cannot be trained.
+
+  ```python
+  serving_model = quantize_weights_only(model, num_bits=4)
+  ```
+
+  Args:
+    to_quantize: Built tf.keras Sequential or Functional model, with trained
+      weights.
+    num_bits: Number of bits used to store each weight, 4 or 8.
+
+  Returns:
+    Returns a new tf.keras model with integer weights.
+  """
+  if to_quantize is None:
+    raise ValueError('`to_quantize` cannot be None')
+
+  if not isinstance(to_quantize, keras.Model):
+    raise ValueError(
+        '`to_quantize` can only be a `tf.keras.Model` instance. '
+        'You passed an instance of type: {input}.'.format(
+            input=to_quantize.__class__.__name__))
+
+  if not to_quantize.built:
+    raise ValueError('`to_quantize` must be a built model. Please call '
+                     '`model.build(input_shape)` before quantizing it.')
+
+  def _clone(layer):
+    clone = layer.__class__.from_config(layer.get_config())
+    if weight_only_quantize_wrapper.is_supported(layer):
+      return weight_only_quantize_wrapper.WeightOnlyQuantizeWrapper(
+          clone, num_bits=num_bits)
+    return clone
+
+  quantized_model = keras.models.clone_model(
+      to_quantize, input_tensors=None, clone_function=_clone)
+
+  for layer, quantized_layer in zip(to_quantize.layers,
+                                    quantized_model.layers):
+    if isinstance(quantized_layer,
+                  weight_only_quantize_wrapper.WeightOnlyQuantizeWrapper):
+      quantized_layer.set_float_weights(layer.get_weights())
+    else:
+      quantized_layer.set_weights(layer.get_weights())
+
+  return quantized_model
@@ -20,8 +20,8 @@ from __future__ import print_function
 
 import tensorflow as tf
 
-# TODO(b/139939526): move to public API.
-from tensorflow.python.keras.utils import tf_utils
+from tensorflow_model_optimization.python.core.quantization.keras import calibration
+from tensorflow_model_optimization.python.core.quantization.keras import quantizers
 
 activations = tf.keras.activations
 
@@ -147,32 +147,20 @@ class QuantizeAwareActivation(object):
     return {'min_var': min_var, 'max_var': max_var}
 
   def __call__(self, inputs, *args, **kwargs):
-
-    def make_quantizer_fn(training, x, quantizer_vars):
-      """Use currying to return True/False specialized fns to the cond."""
-
-      def quantizer_fn(x=x,
-                       quantizer=self.quantizer,
-                       quantizer_vars=quantizer_vars):
-        return quantizer(x, self.step, training,
-                         **quantizer_vars)
-
-      return quantizer_fn
-
     x = inputs
     if self._should_pre_quantize():
-      x = tf_utils.smart_cond(
-          self._training,
-          make_quantizer_fn(True, x, self._pre_activation_vars),
-          make_quantizer_fn(False, x, self._pre_activation_vars))
+      calibration.observe(x, self.quantizer, self._pre_activation_vars)
+      x = quantizers.apply_quantizer(
+          self.quantizer, x, self.step, self._training,
+          self._pre_activation_vars)
 
     x = self.activation(x, *args, **kwargs)
 
     if self._should_post_quantize():
-      x = tf_utils.smart_cond(
-          self._training,
-          make_quantizer_fn(True, x, self._post_activation_vars),
-          make_quantizer_fn(False, x, self._post_activation_vars))
+      calibration.observe(x, self.quantizer, self._post_activation_vars)
+      x = quantizers.apply_quantizer(
+          self.quantizer, x, self.step, self._training,
+          self._post_activation_vars)
 
     return x
 
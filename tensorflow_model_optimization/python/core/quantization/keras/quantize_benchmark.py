@@ -0,0 +1,126 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Benchmarks for `quantize_apply` and quantized models on ResNet sized models.
+
+Run with:
+  python quantize_benchmark.py --benchmarks=.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import resource
+import time
+import tracemalloc
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.quantization.keras import quantize
+
+keras = tf.keras
+
+
+class QuantizeApplyBenchmark(tf.test.Benchmark):
+  """Times `quantize_apply` and tracks the memory it allocates."""
+
+  def _benchmark_quantize_apply(self, name, model):
+    annotated_model = quantize.quantize_annotate_model(model)
+
+    tracemalloc.start()
+    start = time.time()
+    quantized_model = quantize.quantize_apply(annotated_model)
+    wall_time = time.time() - start
+    _, peak_python_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    self.report_benchmark(
+        name=name,
+        iters=1,
+        wall_time=wall_time,
+        extras={
+            'num_layers': len(model.layers),
+            'num_quantized_layers': len(quantized_model.layers),
+            'peak_python_memory_mb': peak_python_memory / 2.**20,
+            # ru_maxrss is reported in kilobytes on Linux.
+            'max_rss_mb': resource.getrusage(
+                resource.RUSAGE_SELF).ru_maxrss / 2.**10,
+        })
+
+  def benchmark_resnet50(self):
+    self._benchmark_quantize_apply(
+        'resnet50', keras.applications.ResNet50(weights=None))
+
+  def benchmark_mobilenet_v2(self):
+    self._benchmark_quantize_apply(
+        'mobilenet_v2', keras.applications.MobileNetV2(weights=None))
+
+
+class QuantizedModelGraphBenchmark(tf.test.Benchmark):
+  """Tracks the graph size of quantized models, and their first step time."""
+
+  @staticmethod
+  def _count_ops(graph):
+    """Counts ops of `graph`, including ops in its function library."""
+    op_counts = collections.Counter(op.type for op in graph.get_operations())
+    for function in graph._functions.values():  # pylint: disable=protected-access
+      op_counts.update(node.op for node in function.definition.node_def)
+    return op_counts
+
+  def _benchmark_quantized_model(self, name, model):
+    quantized_model = quantize.quantize_model(model)
+    input_spec = tf.TensorSpec((1,) + model.input_shape[1:])
+
+    # `training` as a tensor traces both the training and inference paths.
+    start = time.time()
+    concrete_function = tf.function(
+        lambda x, training: quantized_model(x, training=training)
+    ).get_concrete_function(input_spec, tf.TensorSpec([], tf.bool))
+    trace_time = time.time() - start
+    op_counts = self._count_ops(concrete_function.graph)
+
+    quantized_model.compile(loss='mse', optimizer='sgd')
+    inputs = np.random.uniform(size=(8,) + model.input_shape[1:])
+    outputs = np.random.uniform(size=(8,) + model.output_shape[1:])
+    start = time.time()
+    quantized_model.train_on_batch(inputs, outputs)
+    first_step_time = time.time() - start
+
+    self.report_benchmark(
+        name=name,
+        iters=1,
+        wall_time=first_step_time,
+        extras={
+            'num_layers': len(model.layers),
+            'num_ops': sum(op_counts.values()),
+            'num_fake_quant_ops': sum(
+                count for op_type, count in op_counts.items()
+                if op_type.startswith('FakeQuant')),
+            'trace_time': trace_time,
+        })
+
+  def benchmark_resnet50(self):
+    self._benchmark_quantized_model(
+        'resnet50', keras.applications.ResNet50(weights=None))
+
+  def benchmark_mobilenet_v2(self):
+    self._benchmark_quantized_model(
+        'mobilenet_v2', keras.applications.MobileNetV2(weights=None))
+
+
+if __name__ == '__main__':
+  tf.test.main()
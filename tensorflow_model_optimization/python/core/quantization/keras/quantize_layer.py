@@ -23,7 +23,7 @@ from __future__ import print_function
 
 import tensorflow as tf
 
-from tensorflow.python.keras.utils import tf_utils
+from tensorflow_model_optimization.python.core.quantization.keras import calibration
 from tensorflow_model_optimization.python.core.quantization.keras import quantizers
 
 serialize_keras_object = tf.keras.utils.serialize_keras_object
@@ -62,16 +62,11 @@ class QuantizeLayer(tf.keras.layers.Layer):
     if training is None:
       training = tf.keras.backend.learning_phase()
 
-    def _make_quantizer_fn(train_var):
-      def quantizer_fn():
-        return self.quantizer(
-            inputs, self.optimizer_step, train_var,
-            **self.quantizer_vars)
+    calibration.observe(inputs, self.quantizer, self.quantizer_vars)
 
-      return quantizer_fn
-
-    return tf_utils.smart_cond(
-        training, _make_quantizer_fn(True), _make_quantizer_fn(False))
+    return quantizers.apply_quantizer(
+        self.quantizer, inputs, self.optimizer_step, training,
+        self.quantizer_vars)
 
   def get_config(self):
     base_config = super(QuantizeLayer, self).get_config()
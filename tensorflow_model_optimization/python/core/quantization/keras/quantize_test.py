@@ -18,15 +18,19 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+from absl.testing import parameterized
 import numpy as np
 import tensorflow as tf
 
+from tensorflow_model_optimization.python.core.keras import compat
 from tensorflow_model_optimization.python.core.keras import test_utils as keras_test_utils
 from tensorflow_model_optimization.python.core.quantization.keras import quantize
 from tensorflow_model_optimization.python.core.quantization.keras import quantize_annotate as quantize_annotate_mod
 from tensorflow_model_optimization.python.core.quantization.keras import quantize_config as quantize_config_mod
 from tensorflow_model_optimization.python.core.quantization.keras import quantize_layer
 from tensorflow_model_optimization.python.core.quantization.keras import quantize_wrapper as quantize_wrapper_mod
+from tensorflow_model_optimization.python.core.quantization.keras import weight_only_quantize_wrapper
+from tensorflow_model_optimization.python.core.quantization.keras.layers import conv_batchnorm_test_utils
 from tensorflow_model_optimization.python.core.quantization.keras.tflite import tflite_quantize_registry
 
 quantize_annotate_layer = quantize.quantize_annotate_layer
@@ -70,6 +74,15 @@ class QuantizeTest(tf.test.TestCase):
 
     quantize.quantize_model(model)
 
+  def testQuantizeModel_CachesQuantizedWeights(self):
+    model = keras.Sequential([keras.layers.Dense(10, input_shape=(5,))])
+
+    quantized_model = quantize.quantize_model(
+        model, cache_quantized_weights=True)
+
+    self.assertIsInstance(quantized_model.layers[-1], QuantizeWrapper)
+    self.assertTrue(quantized_model.layers[-1].cache_quantized_weights)
+
   def testQuantizeLayer_Fails(self):
     layer = keras.layers.Dense(10, input_shape=(5,))
 
@@ -166,7 +179,7 @@ class QuantizeAnnotateTest(tf.test.TestCase):
     self.assertIsNone(annotated_model.optimizer)
 
 
-class QuantizeApplyTest(tf.test.TestCase):
+class QuantizeApplyTest(tf.test.TestCase, parameterized.TestCase):
 
   # Validation tests
 
@@ -367,6 +380,22 @@ class QuantizeApplyTest(tf.test.TestCase):
 
     self._assert_model_quantized(model, quantized_model, ['activation'])
 
+  def testQuantizeApply_DoesNotModifyAnnotatedModel(self):
+    model = self._get_simple_functional_model()
+    annotated_layers = list(model.layers)
+    annotated_weight_values = K.batch_get_value(model.weights)
+
+    quantized_model = quantize_apply(model)
+
+    self.assertEqual(annotated_layers, model.layers)
+    for layer in model.layers:
+      self.assertLen(layer._inbound_nodes, 1)
+    for weight, value in zip(model.weights, annotated_weight_values):
+      self.assertAllEqual(value, K.get_value(weight))
+
+    # Quantized layers hold copies of the original weights, not the originals.
+    self._assert_model_quantized(model, quantized_model, ['activation'])
+
   def testDoesNotQuantizeInputLayer_OutboundLayerNotQuantized(self):
     model = self._get_simple_functional_model()
 
@@ -395,6 +424,169 @@ class QuantizeApplyTest(tf.test.TestCase):
     next_layer = input_layer._outbound_nodes[0].outbound_layer
     self.assertIsInstance(next_layer, quantize_layer.QuantizeLayer)
 
+  def testQuantizeApply_FusesReLUIntoPrecedingLayer(self):
+    inputs = keras.Input(shape=(4,))
+    x = quantize_annotate_layer(keras.layers.Dense(3))(inputs)
+    x = quantize_annotate_layer(keras.layers.ReLU())(x)
+    model = keras.Model(inputs=inputs, outputs=x)
+
+    quantized_model = quantize_apply(model)
+
+    self.assertLen(quantized_model.layers, 3)
+    dense_layer = quantized_model.layers[2]
+    self.assertIsInstance(dense_layer, QuantizeWrapper)
+    self.assertEqual('relu', dense_layer.layer.activation.activation.__name__)
+
+  def testQuantizeApply_EqualizesLayersAndCorrectsBiases(self):
+    inputs = keras.Input(shape=(4,))
+    x = keras.layers.Dense(3)(inputs)
+    x = keras.layers.BatchNormalization()(x)
+    x = keras.layers.ReLU()(x)
+    x = keras.layers.Dense(2, use_bias=False)(x)
+    model = quantize_annotate_model(keras.Model(inputs=inputs, outputs=x))
+    original_kernel = model.layers[-1].layer.get_weights()[0]
+
+    quantized_model = quantize_apply(
+        model, cross_layer_equalization=True, bias_correction=True)
+
+    dense_layer = quantized_model.layers[-1]
+    self.assertIsInstance(dense_layer, QuantizeWrapper)
+    self.assertTrue(dense_layer.layer.use_bias)
+    kernel = dense_layer._weight_vars[0][0]
+    self.assertNotAllClose(original_kernel, kernel)
+
+  def testQuantizeApply_CachesQuantizedWeights(self):
+    model = keras_test_utils.build_simple_dense_model()
+    inputs = np.random.rand(4, *model.input_shape[1:])
+
+    quantized_model = quantize_apply(
+        quantize_annotate_model(model), cache_quantized_weights=True)
+
+    wrappers = [layer for layer in quantized_model.layers
+                if isinstance(layer, QuantizeWrapper)]
+    self.assertNotEmpty(wrappers)
+    for layer in wrappers:
+      self.assertTrue(layer.cache_quantized_weights)
+    self.assertAllClose(
+        quantize_apply(quantize_annotate_model(model)).predict(inputs),
+        quantized_model.predict(inputs))
+
+  @parameterized.parameters(False, True)
+  def testQuantizeApply_CorrectsBiasesAfterFoldedBatchNorm(self, relu):
+    inputs = keras.Input(shape=(4,))
+    x = keras.layers.Dense(3)(inputs)
+    # A tiny gamma makes the inputs of the last Dense close to beta, even
+    # after the ReLU.
+    x = keras.layers.BatchNormalization(
+        beta_initializer=keras.initializers.RandomUniform(0.5, 1.0),
+        gamma_initializer=keras.initializers.Constant(1e-6))(x)
+    if relu:
+      x = keras.layers.ReLU()(x)
+    x = keras.layers.Dense(2, use_bias=False)(x)
+    model = quantize_annotate_model(keras.Model(inputs=inputs, outputs=x))
+    beta = model.layers[2].layer.beta
+    kernel = model.layers[-1].layer.get_weights()[0]
+
+    quantized_model = quantize_apply(model, bias_correction=True)
+
+    self.assertIsInstance(quantized_model.layers[2].layer,
+                          conv_batchnorm_test_utils.DenseModel
+                          .folded_layer_class)
+    dense_layer = quantized_model.layers[-1].layer
+    self.assertTrue(dense_layer.use_bias)
+    # The kernel is quantized per-tensor to 8 bits over a narrow range.
+    scale = np.max(np.abs(kernel)) / 127.
+    error = np.floor(kernel / scale + 0.5) * scale - kernel
+    self.assertAllClose(
+        -np.dot(K.get_value(beta), error), K.get_value(dense_layer.bias),
+        atol=1e-6)
+
+  @parameterized.parameters(
+      conv_batchnorm_test_utils.DenseModel,
+      conv_batchnorm_test_utils.Conv1DModel,
+      conv_batchnorm_test_utils.Conv3DModel,
+      conv_batchnorm_test_utils.SeparableConv2DModel,
+  )
+  def testQuantizeApply_FoldsBatchNormIntoPrecedingLayer(self, model_type):
+    model = model_type.get_nonfolded_batchnorm_model(
+        model_type='functional', random_init=True)
+    inp = np.random.uniform(
+        -1, 1, size=model_type.get_batched_input_shape()).astype(np.float32)
+
+    quantized_model = quantize_apply(quantize_annotate_model(model))
+
+    layers = [
+        layer.layer if isinstance(layer, QuantizeWrapper) else layer
+        for layer in quantized_model.layers
+    ]
+    self.assertIn(model_type.folded_layer_class,
+                  [layer.__class__ for layer in layers])
+    self.assertNotIn(keras.layers.BatchNormalization,
+                     [layer.__class__ for layer in layers])
+    self.assertAllClose(
+        model.predict(inp), quantized_model.predict(inp), atol=0.2)
+
+  def testQuantizeApply_FoldsBiasOfPrecedingLayerIntoBatchNorm(self):
+    inputs = keras.Input(shape=(6,))
+    x = keras.layers.Dense(
+        4, bias_initializer=keras.initializers.RandomUniform())(inputs)
+    x = keras.layers.BatchNormalization()(x)
+    model = keras.Model(inputs=inputs, outputs=x)
+    inp = np.random.uniform(-1, 1, size=(8, 6)).astype(np.float32)
+
+    quantized_model = quantize_apply(quantize_annotate_model(model))
+
+    dense_layer = quantized_model.layers[-1]
+    self.assertIsInstance(dense_layer, QuantizeWrapper)
+    self.assertIsInstance(dense_layer.layer,
+                          conv_batchnorm_test_utils.DenseModel
+                          .folded_layer_class)
+    self.assertAllClose(
+        model.predict(inp), quantized_model.predict(inp), atol=0.2)
+
+  @parameterized.parameters(
+      (conv_batchnorm_test_utils.Conv2DModel, None),
+      (conv_batchnorm_test_utils.Conv2DModel, keras.layers.ReLU(6.0)),
+      (conv_batchnorm_test_utils.DepthwiseConv2DModel, None),
+      (conv_batchnorm_test_utils.DenseModel, None),
+  )
+  def testQuantizeApply_FreezesBatchNormAfterDelay(self, model_type,
+                                                   post_bn_activation):
+    if compat.is_v1_apis():
+      return
+
+    model = model_type.get_nonfolded_batchnorm_model(
+        post_bn_activation=post_bn_activation, model_type='functional')
+
+    quantized_model = quantize_apply(
+        quantize_annotate_model(model), freeze_bn_delay=2)
+
+    fused_layer = quantized_model.layers[-1].layer
+    self.assertIsInstance(fused_layer, model_type.folded_layer_class)
+    self.assertEqual(2, fused_layer.freeze_bn_delay)
+
+    quantized_model.compile(loss='mse', optimizer='sgd')
+    batch_size = model_type.get_batched_input_shape()[0]
+
+    def fit():
+      input_shape = model_type.get_batched_input_shape()
+      output_shape = model_type.get_output_shape()
+      input_shape[0] = output_shape[0] = 2 * batch_size
+      quantized_model.fit(
+          np.random.uniform(0, 1, size=input_shape),
+          np.random.uniform(0, 10, size=output_shape),
+          batch_size=batch_size,
+          epochs=1,
+          verbose=0)
+      return K.get_value(fused_layer.batchnorm.moving_mean)
+
+    initial_moving_mean = K.get_value(fused_layer.batchnorm.moving_mean)
+    moving_mean = fit()
+    self.assertNotAllClose(initial_moving_mean, moving_mean)
+
+    self.assertAllClose(moving_mean, fit())
+    self.assertEqual(2, K.get_value(fused_layer.batchnorm_step))
+
   # TODO(tfmot): this behavior may change in the future. If a user
   # start training a model without quantization and then wants to apply
   # it, not removing the optimizer would allow them to skip recompiling
@@ -411,5 +603,42 @@ class QuantizeApplyTest(tf.test.TestCase):
     self.assertIsNone(quantized_model.optimizer)
 
 
+class QuantizeWeightsOnlyTest(tf.test.TestCase):
+
+  def testQuantizeWeightsOnly_WrapsSupportedLayers(self):
+    model = keras.Sequential([
+        keras.layers.Embedding(20, 6, input_length=4),
+        keras.layers.Conv1D(5, 2),
+        keras.layers.Flatten(),
+        keras.layers.Dense(3),
+        keras.layers.Dropout(0.4),
+    ])
+
+    quantized_model = quantize.quantize_weights_only(model, num_bits=4)
+
+    wrapped = [
+        isinstance(layer,
+                   weight_only_quantize_wrapper.WeightOnlyQuantizeWrapper)
+        for layer in quantized_model.layers
+    ]
+    self.assertEqual([True, True, False, True, False], wrapped)
+    x = np.random.randint(0, 20, size=(8, 4))
+    self.assertAllClose(model.predict(x), quantized_model.predict(x), atol=0.2)
+
+  def testQuantizeWeightsOnly_Functional(self):
+    inp = keras.Input((6,))
+    x = keras.layers.Dense(8, activation='relu')(inp)
+    model = keras.Model(inp, keras.layers.Add()([x, keras.layers.Dense(8)(x)]))
+
+    quantized_model = quantize.quantize_weights_only(model)
+
+    x = np.random.uniform(-1., 1., size=(8, 6)).astype(np.float32)
+    self.assertAllClose(model.predict(x), quantized_model.predict(x), atol=0.02)
+
+  def testQuantizeWeightsOnly_FailsForLayer(self):
+    with self.assertRaises(ValueError):
+      quantize.quantize_weights_only(keras.layers.Dense(10, input_shape=(5,)))
+
+
 if __name__ == '__main__':
   tf.test.main()
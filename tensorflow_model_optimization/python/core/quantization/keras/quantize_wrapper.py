@@ -28,9 +28,12 @@ from __future__ import print_function
 
 import tensorflow as tf
 
-# TODO(b/139939526): move to public API.
+from tensorflow.python.keras.utils import generic_utils
 from tensorflow.python.keras.utils import tf_utils
+from tensorflow.python.training.tracking import base as trackable
+from tensorflow_model_optimization.python.core.quantization.keras import calibration
 from tensorflow_model_optimization.python.core.quantization.keras import quantize_aware_activation
+from tensorflow_model_optimization.python.core.quantization.keras import quantizers
 
 deserialize_keras_object = tf.keras.utils.deserialize_keras_object
 serialize_keras_object = tf.keras.utils.serialize_keras_object
@@ -39,12 +42,23 @@ serialize_keras_object = tf.keras.utils.serialize_keras_object
 class QuantizeWrapper(tf.keras.layers.Wrapper):
   """Quantizes the weights and activations of the keras layer it wraps."""
 
-  def __init__(self, layer, quantize_config, **kwargs):
+  def __init__(self,
+               layer,
+               quantize_config,
+               cache_quantized_weights=False,
+               **kwargs):
     """Create a quantize emulate wrapper for a keras layer.
 
     Args:
       layer: The keras layer to be quantized.
       quantize_config: `QuantizeConfig` to quantize layer.
+      cache_quantized_weights: If True, inference calls reuse the quantized
+        weights computed by the previous inference call, rather than quantizing
+        the weights again. The cache is invalidated by training calls, by
+        changes to the quantization ranges and by `set_weights` on this layer.
+        Writes to the variables which bypass the layer, such as
+        `Model.set_weights`, `Model.load_weights` or `Variable.assign`, must be
+        followed by a call to `invalidate_quantized_weights_cache`.
       **kwargs: Additional keyword arguments to be passed to the keras layer.
     """
 
@@ -57,6 +71,7 @@ class QuantizeWrapper(tf.keras.layers.Wrapper):
 
     super(QuantizeWrapper, self).__init__(layer, **kwargs)
     self.quantize_config = quantize_config
+    self.cache_quantized_weights = cache_quantized_weights
 
     self._track_trackable(layer, name='layer')
 
@@ -111,16 +126,53 @@ class QuantizeWrapper(tf.keras.layers.Wrapper):
       self._output_quantizer_vars = self._output_quantizers[0].build(
           self.layer.compute_output_shape(input_shape), 'output', self)
 
-  def compute_output_shape(self, input_shape):
-    return self.layer.compute_output_shape(self.layer.input_shape)
+    if self.cache_quantized_weights:
+      self._build_quantized_weights_cache()
 
-  def _make_quantizer_fn(self, quantizer, x, training, quantizer_vars):
-    """Use currying to return True/False specialized fns to the cond."""
+  def _build_quantized_weights_cache(self):
+    """Creates the variables holding the cached quantized weights.
 
-    def quantizer_fn():
-      return quantizer(x, self.optimizer_step, training, **quantizer_vars)
+    The cache is derived from the other weights, so its variables are neither
+    layer weights nor part of the checkpoint.
+    """
+    def _cache_variable(name, initial_value):
+      return tf.Variable(
+          initial_value,
+          name='{}/{}'.format(self.name, name),
+          trainable=False,
+          synchronization=tf.VariableSynchronization.ON_READ,
+          aggregation=tf.VariableAggregation.ONLY_FIRST_REPLICA)
+
+    with tf_utils.maybe_init_scope(self), \
+        trackable.no_automatic_dependency_tracking_scope(self):
+      self._cache_valid = _cache_variable('quantized_weights_cache_valid', False)
+      self._cached_weights = []
+      self._cached_ranges = []
+      for weight, _, quantizer_vars in self._weight_vars:
+        name = self._weight_name(weight.name)
+        self._cached_weights.append(_cache_variable(
+            'quantized_{}_cache'.format(name),
+            tf.zeros(weight.shape, weight.dtype)))
+        for var_name, var in sorted(quantizer_vars.items()):
+          self._cached_ranges.append((var, _cache_variable(
+              '{}_{}_cache'.format(name, var_name),
+              tf.zeros(var.shape, var.dtype))))
+
+  def invalidate_quantized_weights_cache(self):
+    """Forces the next inference call to quantize the weights again.
+
+    Writes to the weights which bypass this layer are not detected, as checking
+    the weights on every call would cost about as much as quantizing them.
+    """
+    if self.cache_quantized_weights and self.built:
+      tf.keras.backend.set_value(self._cache_valid, False)
 
-    return quantizer_fn
+  def set_weights(self, weights):
+    super(QuantizeWrapper, self).set_weights(weights)
+    self.invalidate_quantized_weights_cache()
+
+  def compute_output_shape(self, input_shape):
+    return self.layer.compute_output_shape(self.layer.input_shape)
 
   def call(self, inputs, training=None):
     if training is None:
@@ -128,15 +180,18 @@ class QuantizeWrapper(tf.keras.layers.Wrapper):
 
     # Quantize all weights, and replace them in the underlying layer.
 
-    quantized_weights = []
     for unquantized_weight, quantizer, quantizer_vars in self._weight_vars:
-      quantized_weight = tf_utils.smart_cond(
-          training,
-          self._make_quantizer_fn(quantizer, unquantized_weight, True,
-                                  quantizer_vars),
-          self._make_quantizer_fn(quantizer, unquantized_weight, False,
-                                  quantizer_vars))
-      quantized_weights.append(quantized_weight)
+      calibration.observe(
+          unquantized_weight, quantizer, quantizer_vars, is_weight=True)
+
+    if not self.cache_quantized_weights or not self._weight_vars:
+      quantized_weights = self._quantize_weights(training)
+    elif tf_utils.constant_value(training) is False:
+      quantized_weights = self._get_cached_quantized_weights()
+    else:
+      # The weights and ranges may be updated by any training call.
+      with tf.control_dependencies([self._cache_valid.assign(False)]):
+        quantized_weights = self._quantize_weights(training)
 
     self.quantize_config.set_quantize_weights(self.layer, quantized_weights)
 
@@ -149,7 +204,11 @@ class QuantizeWrapper(tf.keras.layers.Wrapper):
     self.quantize_config.set_quantize_activations(self.layer,
                                                   self._quantize_activations)
 
-    outputs = self.layer.call(inputs)
+    # Layers such as the folded batchnorms update state only while training.
+    if generic_utils.has_arg(self.layer.call, 'training'):
+      outputs = self.layer.call(inputs, training=training)
+    else:
+      outputs = self.layer.call(inputs)
 
     if not self._output_quantizers:
       return outputs
@@ -160,16 +219,52 @@ class QuantizeWrapper(tf.keras.layers.Wrapper):
       raise RuntimeError('Multiple output tensors not handled currently.')
 
     output_quantizer = self._output_quantizers[0]
-    return tf_utils.smart_cond(
-        training,
-        self._make_quantizer_fn(output_quantizer, outputs, True,
-                                self._output_quantizer_vars),
-        self._make_quantizer_fn(output_quantizer, outputs, False,
-                                self._output_quantizer_vars))
+    calibration.observe(outputs, output_quantizer, self._output_quantizer_vars)
+    return quantizers.apply_quantizer(
+        output_quantizer, outputs, self.optimizer_step, training,
+        self._output_quantizer_vars)
+
+  def _quantize_weights(self, training):
+    return [
+        quantizers.apply_quantizer(quantizer, unquantized_weight,
+                                   self.optimizer_step, training,
+                                   quantizer_vars)
+        for unquantized_weight, quantizer, quantizer_vars in self._weight_vars
+    ]
+
+  def _get_cached_quantized_weights(self):
+    """Returns the cached quantized weights, refreshing the cache if stale."""
+    cache_valid = self._cache_valid.read_value()
+    for var, cached_var in self._cached_ranges:
+      cache_valid = tf.logical_and(
+          cache_valid, tf.reduce_all(tf.equal(var, cached_var)))
+
+    def _refresh_cache():
+      quantized_weights = self._quantize_weights(False)
+      assign_ops = [
+          cached_weight.assign(quantized_weight)
+          for cached_weight, quantized_weight in zip(self._cached_weights,
+                                                     quantized_weights)
+      ]
+      assign_ops.extend(
+          cached_var.assign(var) for var, cached_var in self._cached_ranges)
+      with tf.control_dependencies(assign_ops):
+        assign_ops.append(self._cache_valid.assign(True))
+      with tf.control_dependencies(assign_ops):
+        return [tf.identity(weight) for weight in quantized_weights]
+
+    def _read_cache():
+      return [cached_weight.read_value()
+              for cached_weight in self._cached_weights]
+
+    return tf.cond(cache_valid, _read_cache, _refresh_cache)
 
   def get_config(self):
     base_config = super(QuantizeWrapper, self).get_config()
-    config = {'quantize_config': serialize_keras_object(self.quantize_config)}
+    config = {
+        'quantize_config': serialize_keras_object(self.quantize_config),
+        'cache_quantized_weights': self.cache_quantized_weights,
+    }
     return dict(list(base_config.items()) + list(config.items()))
 
   @classmethod
@@ -18,6 +18,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
+
 from absl.testing import parameterized
 
 import numpy as np
@@ -182,6 +184,114 @@ class QuantizeWrapperTest(tf.test.TestCase, parameterized.TestCase):
 
   # TODO(pulkitb): Add test to ensure weights are also preserved.
 
+  def _get_cached_model(self, cache_quantized_weights=True):
+    layer = keras.layers.Dense(3)
+    return keras.Sequential([
+        QuantizeWrapper(
+            layer=layer,
+            quantize_config=self.quantize_registry.get_quantize_config(layer),
+            cache_quantized_weights=cache_quantized_weights,
+            input_shape=(2,))
+    ])
+
+  def testCachedQuantizedWeights_MatchUncachedWeights(self):
+    model = self._get_cached_model(cache_quantized_weights=False)
+    cached_model = self._get_cached_model()
+    cached_model.set_weights(model.get_weights())
+
+    inputs = np.random.rand(4, 2)
+    self.assertAllClose(model.predict(inputs), cached_model.predict(inputs))
+    # Second call is served from the cache.
+    self.assertAllClose(model.predict(inputs), cached_model.predict(inputs))
+
+  def testCachedQuantizedWeights_NotLayerWeights(self):
+    model = self._get_cached_model(cache_quantized_weights=False)
+    cached_model = self._get_cached_model()
+
+    self.assertEqual(
+        [w.name.split('/')[-1] for w in model.layers[0].weights],
+        [w.name.split('/')[-1] for w in cached_model.layers[0].weights])
+
+  def testCachedQuantizedWeights_InvalidatedByTraining(self):
+    model = self._get_cached_model()
+    model.compile(optimizer=keras.optimizers.SGD(1.0), loss='mse')
+    inputs, targets = np.random.rand(4, 2), np.random.rand(4, 3)
+
+    stale_outputs = model.predict(inputs)
+    model.train_on_batch(inputs, targets)
+    outputs = model.predict(inputs)
+
+    uncached_model = self._get_cached_model(cache_quantized_weights=False)
+    uncached_model.set_weights(model.get_weights())
+
+    self.assertNotAllClose(stale_outputs, outputs)
+    self.assertAllClose(uncached_model.predict(inputs), outputs)
+
+  def testCachedQuantizedWeights_InvalidatedBySetWeights(self):
+    model = self._get_cached_model()
+    wrapper = model.layers[0]
+    inputs = np.random.rand(4, 2)
+    stale_outputs = model.predict(inputs)
+
+    weights = wrapper.get_weights()
+    weights[0] = weights[0] + 1.0
+    wrapper.set_weights(weights)
+
+    self.assertNotAllClose(stale_outputs, model.predict(inputs))
+
+  def testCachedQuantizedWeights_InvalidatedByRangeChange(self):
+    model = self._get_cached_model()
+    wrapper = model.layers[0]
+    inputs = np.random.rand(4, 2)
+    kernel, _, quantizer_vars = wrapper._weight_vars[0]
+    kernel.assign(np.ones((2, 3)))
+    model.predict(inputs)
+
+    quantizer_vars['max_var'].assign(0.5)
+
+    # The kernel of ones is clamped to the new range.
+    self.assertAllClose(
+        np.sum(inputs, axis=1, keepdims=True) * np.full((1, 3), 0.5),
+        model.predict(inputs), atol=0.1)
+
+  def testCachedQuantizedWeights_KernelAssignRequiresInvalidation(self):
+    model = self._get_cached_model()
+    wrapper = model.layers[0]
+    inputs = np.random.rand(4, 2)
+    stale_outputs = model.predict(inputs)
+
+    kernel, _, _ = wrapper._weight_vars[0]
+    kernel.assign(kernel + 1.0)
+    # The write bypasses the layer, so the cache is not invalidated.
+    self.assertAllClose(stale_outputs, model.predict(inputs))
+
+    wrapper.invalidate_quantized_weights_cache()
+    self.assertNotAllClose(stale_outputs, model.predict(inputs))
+
+  def testCachedQuantizedWeights_InvalidatedAfterLoadWeights(self):
+    cached_model = self._get_cached_model()
+    inputs = np.random.rand(4, 2)
+    stale_outputs = cached_model.predict(inputs)
+
+    # Only the kernel differs, so that the cache is not invalidated by a change
+    # of the quantization ranges.
+    weights = cached_model.get_weights()
+    kernel_index = [
+        w.name.endswith('/kernel:0') for w in cached_model.weights].index(True)
+    weights[kernel_index] = weights[kernel_index] + 1.0
+    model = self._get_cached_model(cache_quantized_weights=False)
+    model.set_weights(weights)
+    path = os.path.join(self.get_temp_dir(), 'weights')
+    model.save_weights(path)
+
+    cached_model.load_weights(path)
+    cached_model.layers[0].invalidate_quantized_weights_cache()
+    outputs = cached_model.predict(inputs)
+
+    self.assertNotAllClose(stale_outputs, outputs)
+    self.assertAllClose(model.predict(inputs), outputs)
+    # Further calls are served from the refreshed cache.
+    self.assertAllClose(outputs, cached_model.predict(inputs))
 
 if __name__ == '__main__':
   tf.test.main()
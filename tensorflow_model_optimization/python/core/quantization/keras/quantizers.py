@@ -26,6 +26,8 @@ import six
 
 import tensorflow as tf
 
+# TODO(b/139939526): move to public API.
+from tensorflow.python.keras.utils import tf_utils
 from tensorflow_model_optimization.python.core.quantization.keras import quant_ops
 
 keras = tf.keras
@@ -87,14 +89,18 @@ class _QuantizeHelper(object):
 
   def _add_range_weights(self, layer, name):
     """Add min and max vars to layer."""
+    # Replicas of a `tf.distribute` strategy update the ranges with the mean of
+    # their batch ranges, unless `synchronize_ranges` is used.
     min_weight = layer.add_weight(
         name + '_min',
         initializer=keras.initializers.Constant(-6.0),
-        trainable=False)
+        trainable=False,
+        aggregation=tf.VariableAggregation.MEAN)
     max_weight = layer.add_weight(
         name + '_max',
         initializer=keras.initializers.Constant(6.0),
-        trainable=False)
+        trainable=False,
+        aggregation=tf.VariableAggregation.MEAN)
 
     return {'min_var': min_weight, 'max_var': max_weight}
 
@@ -131,7 +137,8 @@ class LastValueQuantizer(_QuantizeHelper, Quantizer):
     Args:
       inputs: Input tensor to be quantized.
       step: Current step in graph execution.
-      training: Whether the graph is currently training.
+      training: Whether the graph is currently training. May also be a
+        boolean tensor.
       **kwargs: Contains `min_var` and `max_var` tf variables.
 
     Returns:
@@ -199,7 +206,8 @@ class MovingAverageQuantizer(_QuantizeHelper, Quantizer):
     Args:
       inputs: Input tensor to be quantized.
       step: Current step in graph execution.
-      training: Whether the graph is currently training.
+      training: Whether the graph is currently training. May also be a
+        boolean tensor.
       **kwargs: Contains `min_var` and `max_var` tf variables.
 
     Returns:
@@ -238,6 +246,39 @@ class MovingAverageQuantizer(_QuantizeHelper, Quantizer):
     return not self.__eq__(other)
 
 
+def _accepts_training_tensor(quantizer):
+  """Whether `quantizer` can be called with a tensor for `training`."""
+  return type(quantizer).__call__ in (LastValueQuantizer.__call__,
+                                      MovingAverageQuantizer.__call__)
+
+
+def apply_quantizer(quantizer, inputs, step, training, quantizer_vars):
+  """Applies `quantizer` to `inputs` in training or inference mode.
+
+  If `training` is a tensor, the built-in quantizers branch on it only to
+  update their range. They share one fake quant op between training and
+  inference. Other quantizers get a Python boolean, and are traced once for
+  each branch of a cond on `training`.
+
+  Args:
+    quantizer: `Quantizer` to apply.
+    inputs: Input tensor to be quantized.
+    step: Current step in graph execution.
+    training: Python boolean or boolean tensor.
+    quantizer_vars: Dictionary of variables returned by `quantizer.build()`.
+
+  Returns:
+    Quantized tensor.
+  """
+  if _accepts_training_tensor(quantizer):
+    return quantizer(inputs, step, training, **quantizer_vars)
+
+  return tf_utils.smart_cond(
+      training,
+      lambda: quantizer(inputs, step, True, **quantizer_vars),
+      lambda: quantizer(inputs, step, False, **quantizer_vars))
+
+
 def _types_dict():
   return {
       'LastValueQuantizer': LastValueQuantizer,
@@ -96,5 +96,85 @@ class QuantizersTest(tf.test.TestCase, parameterized.TestCase):
     self.assertEqual(quantizer, quantizer_from_config)
 
 
+class _PythonBoolQuantizer(quantizers.LastValueQuantizer):
+  """Quantizer which records the `training` values it is called with."""
+
+  def __init__(self):
+    super(_PythonBoolQuantizer, self).__init__(8, False, False, False)
+    self.training_values = []
+
+  def __call__(self, inputs, step, training, **kwargs):
+    self.training_values.append(training)
+    return super(_PythonBoolQuantizer, self).__call__(
+        inputs, step, training, **kwargs)
+
+
+class ApplyQuantizerTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(ApplyQuantizerTest, self).setUp()
+    self.inputs = tf.constant([[-1.0, 0.5], [0.0, 1.0]])
+
+  @staticmethod
+  def _get_quantizer_vars():
+    return {'min_var': tf.Variable(-6.0), 'max_var': tf.Variable(6.0)}
+
+  def _get_graph(self, quantizer):
+    quantizer_vars = self._get_quantizer_vars()
+    return tf.function(
+        lambda training: quantizers.apply_quantizer(  # pylint: disable=g-long-lambda
+            quantizer, self.inputs, 0, training, quantizer_vars)
+    ).get_concrete_function(tf.TensorSpec([], tf.bool)).graph
+
+  def testTensorTraining_MatchesPythonBool(self):
+    quantizer = quantizers.MovingAverageQuantizer(8, False, False, False)
+
+    for training in [True, False]:
+      quantizer_vars = self._get_quantizer_vars()
+      outputs = tf.function(
+          lambda training: quantizers.apply_quantizer(  # pylint: disable=g-long-lambda,cell-var-from-loop
+              quantizer, self.inputs, 0, training, quantizer_vars)
+      )(tf.constant(training))
+
+      expected_vars = self._get_quantizer_vars()
+      expected = quantizers.apply_quantizer(
+          quantizer, self.inputs, 0, training, expected_vars)
+
+      self.assertAllClose(expected, outputs)
+      self.assertAllClose(
+          [expected_vars['min_var'], expected_vars['max_var']],
+          [quantizer_vars['min_var'], quantizer_vars['max_var']])
+
+  def testTensorTraining_BuildsSingleFakeQuant(self):
+    graph = self._get_graph(
+        quantizers.LastValueQuantizer(8, False, False, False))
+
+    fake_quant_ops = [
+        op for op in graph.get_operations()
+        if op.type == 'FakeQuantWithMinMaxVars'
+    ]
+    self.assertLen(fake_quant_ops, 1)
+
+  def testTensorTraining_SmallerGraphThanCondOverQuantizer(self):
+    def count_ops(graph):
+      num_ops = len(graph.get_operations())
+      for function in graph._functions.values():  # pylint: disable=protected-access
+        num_ops += len(function.definition.node_def)
+      return num_ops
+
+    # The custom quantizer is traced in both branches of a cond on `training`.
+    self.assertLess(
+        count_ops(self._get_graph(
+            quantizers.LastValueQuantizer(8, False, False, False))),
+        count_ops(self._get_graph(_PythonBoolQuantizer())))
+
+  def testCustomQuantizer_CalledWithPythonBool(self):
+    quantizer = _PythonBoolQuantizer()
+
+    self._get_graph(quantizer)
+
+    self.assertEqual([True, False], quantizer.training_values)
+
+
 if __name__ == '__main__':
   tf.test.main()
@@ -0,0 +1,203 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Synchronization of quantization ranges across replicas.
+
+Under a `tf.distribute` strategy, each `LastValueQuantizer` and
+`MovingAverageQuantizer` updates its `min_var` and `max_var` on every replica
+with a separate reduction, which averages the ranges of the replicas.
+`synchronize_ranges` instead collects the batch ranges of all quantizers
+during a training step, and updates every range with the minimum and maximum
+over all replicas, using a single all-reduce.
+
+Module: tfmot.quantization.keras
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import contextlib
+import threading
+
+import tensorflow as tf
+
+_range_sync_state = threading.local()
+
+
+def active_synchronizer():
+  """Returns the `_RangeSynchronizer` of the enclosing scope, if any."""
+  return getattr(_range_sync_state, 'synchronizer', None)
+
+
+class _PendingUpdate(object):
+  """A range update deferred until the end of the training step."""
+
+  def __init__(self, min_var, max_var, batch_min, batch_max, is_training,
+               ema_decay):
+    self.min_var = min_var
+    self.max_var = max_var
+    self.batch_min = batch_min
+    self.batch_max = batch_max
+    self.is_training = is_training
+    self.ema_decay = ema_decay
+
+  def new_range(self, range_min, range_max):
+    """Returns the updated range, given the range over all replicas."""
+    if self.ema_decay is not None:
+      range_min = self.min_var - (self.min_var - range_min) * (
+          1 - self.ema_decay)
+      range_max = self.max_var - (self.max_var - range_max) * (
+          1 - self.ema_decay)
+
+    if self.is_training is not True:
+      range_min = tf.where(self.is_training, range_min, self.min_var)
+      range_max = tf.where(self.is_training, range_max, self.max_var)
+    return range_min, range_max
+
+
+class _RangeSynchronizer(object):
+  """Collects range updates and applies them with one all-reduce."""
+
+  def __init__(self):
+    self._updates = []
+
+  def defer_update(self, min_var, max_var, batch_min, batch_max, is_training,
+                   ema_decay=None):
+    """Records a range update to apply once all quantizers have run.
+
+    Args:
+      min_var: Variable with the lower end(s) of the range.
+      max_var: Variable with the upper end(s) of the range.
+      batch_min: Lower end(s) of the range of the batch on this replica.
+      batch_max: Upper end(s) of the range of the batch on this replica.
+      is_training: Python boolean or boolean tensor. The range is only updated
+        when training.
+      ema_decay: Decay of the moving average of the range, or None to store
+        the range of the last batch.
+    """
+    self._updates.append(
+        _PendingUpdate(min_var, max_var, batch_min, batch_max, is_training,
+                       ema_decay))
+
+  def apply(self):
+    """Updates the recorded ranges with their range over all replicas."""
+    if not self._updates:
+      return
+
+    replica_context = tf.distribute.get_replica_context()
+    if replica_context is None:
+      raise RuntimeError(
+          '`synchronize_ranges` must be used in a replica context, for '
+          'example inside the function passed to `strategy.run`.')
+
+    # Maximums are negated, so a single minimum reduces both ends.
+    local_values = tf.concat(
+        [tf.reshape(update.batch_min, [-1]) for update in self._updates] +
+        [-tf.reshape(update.batch_max, [-1]) for update in self._updates],
+        axis=0)
+    synced_values = _all_reduce_min(replica_context, local_values)
+
+    variables, new_values = [], []
+    offset = 0
+    num_values = local_values.shape[0] // 2
+    for update in self._updates:
+      shape = update.batch_min.shape
+      size = shape.num_elements()
+      range_min = tf.reshape(synced_values[offset:offset + size], shape)
+      range_max = -tf.reshape(
+          synced_values[num_values + offset:num_values + offset + size], shape)
+      offset += size
+
+      variables.extend([update.min_var, update.max_var])
+      new_values.extend(update.new_range(range_min, range_max))
+
+    # The new values are identical on all replicas, so each replica copy of a
+    # variable is assigned directly rather than through another reduction.
+    def _assign_ranges(strategy, new_values):
+      for variable, value in zip(variables, new_values):
+        for local_variable, local_value in zip(
+            strategy.experimental_local_results(variable),
+            strategy.experimental_local_results(value)):
+          local_variable.assign(local_value)
+
+    replica_context.merge_call(_assign_ranges, args=(new_values,))
+
+
+def _all_reduce_min(replica_context, values):
+  """Returns the elementwise minimum of `values` over all replicas.
+
+  `tf.distribute` only reduces with SUM or MEAN. Each replica instead scatters
+  its values into its own row of a zero matrix, and one SUM all-reduce gathers
+  the rows of all replicas.
+
+  Args:
+    replica_context: The current `tf.distribute.ReplicaContext`.
+    values: 1D tensor.
+
+  Returns:
+    1D tensor with the minimum of `values` over all replicas.
+  """
+  num_replicas = replica_context.num_replicas_in_sync
+  if num_replicas == 1:
+    return values
+
+  rows = tf.scatter_nd(
+      [[replica_context.replica_id_in_sync_group]], values[tf.newaxis],
+      [num_replicas, values.shape[0]])
+  rows = replica_context.all_reduce(tf.distribute.ReduceOp.SUM, rows)
+  return tf.math.reduce_min(rows, axis=0)
+
+
+@contextlib.contextmanager
+def synchronize_ranges():
+  """Synchronizes the quantization ranges updated within a training step.
+
+  Inside this scope, `LastValueQuantizer`s and `MovingAverageQuantizer`s do not
+  update their ranges as they are called. When the scope exits, the batch
+  ranges of all quantizers are reduced over all replicas with a single
+  all-reduce, and every replica stores the same range. The range of the global
+  batch is its minimum and maximum over all replicas, rather than the average
+  of the ranges of each replica.
+
+  While the step runs, each replica quantizes with the range of its own batch.
+
+  The scope must be entered on each replica, for example in the `train_step`
+  of a `tf.keras.Model`:
+
+  ```python
+  class SyncRangesModel(tf.keras.Model):
+
+    def train_step(self, data):
+      with synchronize_ranges():
+        return super(SyncRangesModel, self).train_step(data)
+
+  with strategy.scope():
+    quantized_model = quantize_model(model)
+    sync_model = SyncRangesModel(quantized_model.inputs,
+                                 quantized_model.outputs)
+  ```
+
+  Yields:
+    None.
+  """
+  previous = active_synchronizer()
+  synchronizer = _RangeSynchronizer()
+  _range_sync_state.synchronizer = synchronizer
+  try:
+    yield
+  finally:
+    _range_sync_state.synchronizer = previous
+
+  synchronizer.apply()
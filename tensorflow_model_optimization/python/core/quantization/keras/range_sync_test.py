@@ -0,0 +1,224 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for range_sync.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.quantization.keras import quant_ops
+from tensorflow_model_optimization.python.core.quantization.keras import quantize
+from tensorflow_model_optimization.python.core.quantization.keras import range_sync
+
+keras = tf.keras
+
+
+def setUpModule():
+  cpus = tf.config.list_physical_devices('CPU')
+  try:
+    tf.config.set_logical_device_configuration(
+        cpus[0], [tf.config.LogicalDeviceConfiguration()] * 2)
+  except RuntimeError:
+    # The runtime was already initialized, possibly with a single device.
+    pass
+
+
+class _CountingReductionToOneDevice(tf.distribute.ReductionToOneDevice):
+  """Counts the reductions issued between replicas."""
+
+  def __init__(self):
+    super(_CountingReductionToOneDevice, self).__init__()
+    self.num_reductions = 0
+
+  def reduce(self, *args, **kwargs):
+    self.num_reductions += 1
+    return super(_CountingReductionToOneDevice, self).reduce(*args, **kwargs)
+
+  def batch_reduce(self, *args, **kwargs):
+    self.num_reductions += 1
+    return super(_CountingReductionToOneDevice, self).batch_reduce(
+        *args, **kwargs)
+
+
+class RangeSyncTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(RangeSyncTest, self).setUp()
+    devices = tf.config.list_logical_devices('CPU')
+    if len(devices) < 2:
+      self.skipTest('Requires two virtual CPU devices.')
+
+    self.cross_device_ops = _CountingReductionToOneDevice()
+    self.strategy = tf.distribute.MirroredStrategy(
+        [device.name for device in devices[:2]],
+        cross_device_ops=self.cross_device_ops)
+
+  def _distribute(self, *replica_inputs):
+    """Returns a distributed batch in which replica i gets replica_inputs[i]."""
+    dataset = tf.data.Dataset.from_tensor_slices(
+        np.concatenate(replica_inputs).astype(np.float32)).batch(
+            sum(len(inputs) for inputs in replica_inputs))
+    return next(iter(self.strategy.experimental_distribute_dataset(dataset)))
+
+  def _range_vars(self, shape=()):
+    with self.strategy.scope():
+      return (tf.Variable(tf.fill(shape, -6.),
+                          aggregation=tf.VariableAggregation.MEAN),
+              tf.Variable(tf.fill(shape, 6.),
+                          aggregation=tf.VariableAggregation.MEAN))
+
+  def _local_values(self, variable):
+    return [value.numpy()
+            for value in self.strategy.experimental_local_results(variable)]
+
+  def testLastValue_StoresRangeOverAllReplicas(self):
+    min_var, max_var = self._range_vars()
+    inputs = self._distribute([[-1., 2.]], [[-3., 1.]])
+
+    @tf.function
+    def step(inputs):
+      def replica_step(inputs):
+        with range_sync.synchronize_ranges():
+          return quant_ops.LastValueQuantize(inputs, min_var, max_var)
+      return self.strategy.run(replica_step, args=(inputs,))
+
+    step(inputs)
+
+    self.assertAllClose([-3., -3.], self._local_values(min_var))
+    self.assertAllClose([2., 2.], self._local_values(max_var))
+
+  def testLastValue_WithoutSyncAveragesRanges(self):
+    min_var, max_var = self._range_vars()
+    inputs = self._distribute([[-1., 2.]], [[-3., 1.]])
+
+    @tf.function
+    def step(inputs):
+      return self.strategy.run(
+          lambda x: quant_ops.LastValueQuantize(x, min_var, max_var),
+          args=(inputs,))
+
+    step(inputs)
+
+    self.assertAllClose([-2., -2.], self._local_values(min_var))
+    self.assertAllClose([1.5, 1.5], self._local_values(max_var))
+
+  def testMovingAverage_PerChannelRangeOverAllReplicas(self):
+    min_var, max_var = self._range_vars(shape=(2,))
+    inputs = self._distribute([[-1., 2.], [0., 4.]], [[-2., 1.], [1., -1.]])
+
+    @tf.function
+    def step(inputs):
+      def replica_step(inputs):
+        with range_sync.synchronize_ranges():
+          return quant_ops.MovingAvgQuantize(
+              inputs, min_var, max_var, per_channel=True, ema_decay=0.5)
+      return self.strategy.run(replica_step, args=(inputs,))
+
+    step(inputs)
+
+    # The range over both replicas is [-2, 1] x [-1, 4].
+    self.assertAllClose([[-4., -3.5]] * 2, self._local_values(min_var))
+    self.assertAllClose([[3.5, 5.]] * 2, self._local_values(max_var))
+
+  def testTrainingTensor_UpdatesOnlyWhenTraining(self):
+    min_var, max_var = self._range_vars()
+    inputs = self._distribute([[-1., 2.]], [[-3., 1.]])
+
+    @tf.function
+    def step(inputs, training):
+      def replica_step(inputs):
+        with range_sync.synchronize_ranges():
+          return quant_ops.LastValueQuantize(
+              inputs, min_var, max_var, is_training=training)
+      return self.strategy.run(replica_step, args=(inputs,))
+
+    step(inputs, tf.constant(False))
+    self.assertAllClose([-6., -6.], self._local_values(min_var))
+
+    step(inputs, tf.constant(True))
+    self.assertAllClose([-3., -3.], self._local_values(min_var))
+
+  def testQuantizedModel_UsesSingleReduction(self):
+    with self.strategy.scope():
+      model = quantize.quantize_model(
+          keras.Sequential([
+              keras.layers.Dense(4, activation='relu', input_shape=(3,)),
+              keras.layers.Dense(2),
+          ]))
+    inputs = self._distribute(
+        np.random.uniform(size=(4, 3)), np.random.uniform(size=(4, 3)))
+
+    def count_reductions(synchronized):
+      @tf.function
+      def step(inputs):
+        def replica_step(inputs):
+          if not synchronized:
+            return model(inputs, training=True)
+          with range_sync.synchronize_ranges():
+            return model(inputs, training=True)
+        return self.strategy.run(replica_step, args=(inputs,))
+
+      self.cross_device_ops.num_reductions = 0
+      step(inputs)
+      return self.cross_device_ops.num_reductions
+
+    # One reduction for each of the 8 range variables.
+    self.assertEqual(8, count_reductions(synchronized=False))
+    self.assertEqual(1, count_reductions(synchronized=True))
+    for variable in model.weights:
+      if variable.name.endswith(('_min:0', '_max:0')):
+        values = self._local_values(variable)
+        self.assertAllEqual(values[0], values[1])
+
+  def testKerasFit_SynchronizesRangesInTrainStep(self):
+
+    class SyncRangesModel(keras.Model):
+
+      def train_step(self, data):
+        with range_sync.synchronize_ranges():
+          return super(SyncRangesModel, self).train_step(data)
+
+    with self.strategy.scope():
+      quantized_model = quantize.quantize_model(
+          keras.Sequential([keras.layers.Dense(2, input_shape=(3,))]))
+      model = SyncRangesModel(quantized_model.inputs, quantized_model.outputs)
+      model.compile('sgd', 'mse')
+
+    model.fit(np.random.uniform(size=(16, 3)), np.random.uniform(size=(16, 2)),
+              batch_size=8, epochs=2, verbose=0)
+
+    for variable in model.weights:
+      values = self._local_values(variable)
+      self.assertAllEqual(values[0], values[1])
+
+  def testWithoutStrategy_MatchesUnsynchronizedRange(self):
+    min_var, max_var = tf.Variable(-6.), tf.Variable(6.)
+    inputs = tf.constant([[-1., 2.], [3., -4.]])
+
+    with range_sync.synchronize_ranges():
+      outputs = quant_ops.LastValueQuantize(inputs, min_var, max_var)
+
+    self.assertAllClose(-4., min_var)
+    self.assertAllClose(3., max_var)
+    self.assertAllClose(
+        quant_ops.LastValueQuantize(inputs, tf.Variable(-6.),
+                                    tf.Variable(6.)), outputs)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,595 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Reference integer-only execution of models quantized for TFLite.
+
+`IntegerExecutor` runs a model returned by `quantize_apply` with the arithmetic
+of the TFLite int8 kernels: int8 activations and weights, int32 biases and
+accumulators, and fixed-point requantization of the accumulators into the
+output range. The quantization parameters are derived from the ranges stored
+in the `QuantizeLayer` and `QuantizeWrapper` layers of the model, exactly as
+`tf.quantization.fake_quant_with_min_max_vars` derives them.
+
+It can be used to measure the accuracy of the quantized model, and the error
+each layer accumulates from integer arithmetic, without converting the model
+to TFLite.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.quantization.keras import quantize_layer
+from tensorflow_model_optimization.python.core.quantization.keras import quantize_wrapper
+
+K = tf.keras.backend
+layers = tf.keras.layers
+
+
+def _round_half_away_from_zero(x):
+  return np.sign(x) * np.floor(np.abs(x) + 0.5)
+
+
+class _QuantParams(
+    collections.namedtuple('_QuantParams',
+                           ['scale', 'zero_point', 'quant_min', 'quant_max'])):
+  """Affine mapping between int8 codes and real values.
+
+  A code `q` represents the real value `(q - zero_point) * scale`. Codes are
+  stored in int32 arrays, and lie in `[quant_min, quant_max]`.
+  """
+
+  @classmethod
+  def from_range(cls, range_min, range_max, num_bits, narrow_range):
+    """Returns the parameters `fake_quant_with_min_max_vars` uses for a range.
+
+    Args:
+      range_min: Minimum of the range. Array for per-axis ranges.
+      range_max: Maximum of the range. Array for per-axis ranges.
+      num_bits: Bit width of the codes.
+      narrow_range: Whether the lowest code is left unused.
+
+    Returns:
+      `_QuantParams` with signed codes, e.g. in `[-128, 127]` for 8 bits.
+    """
+    range_min = np.asarray(range_min, np.float32)
+    range_max = np.asarray(range_max, np.float32)
+
+    quant_min = 1 if narrow_range else 0
+    quant_max = 2**num_bits - 1
+    scale = (range_max - range_min) / np.float32(quant_max - quant_min)
+    zero_point = np.clip(
+        _round_half_away_from_zero(quant_min - range_min / scale), quant_min,
+        quant_max)
+
+    offset = 2**(num_bits - 1)
+    return cls(scale, (zero_point - offset).astype(np.int32),
+               quant_min - offset, quant_max - offset)
+
+  @classmethod
+  def from_quantizer(cls, quantizer, quantizer_vars):
+    return cls.from_range(
+        K.get_value(quantizer_vars['min_var']),
+        K.get_value(quantizer_vars['max_var']), quantizer.num_bits,
+        quantizer.narrow_range)
+
+  def quantize(self, x):
+    """Maps real values to codes, as `fake_quant_with_min_max_vars` does."""
+    nudged_min = ((self.quant_min - self.zero_point) * self.scale).astype(
+        np.float32)
+    nudged_max = ((self.quant_max - self.zero_point) * self.scale).astype(
+        np.float32)
+    clamped = np.clip(np.asarray(x, np.float32), nudged_min, nudged_max)
+    codes = np.floor((clamped - nudged_min) * (np.float32(1.) / self.scale) +
+                     np.float32(0.5))
+    return codes.astype(np.int32) + self.quant_min
+
+  def dequantize(self, codes):
+    return ((codes - self.zero_point) * self.scale).astype(np.float32)
+
+
+def _quantize_multiplier(real_multiplier):
+  """Splits positive real multipliers into Q31 fixed-point values and shifts.
+
+  `real_multiplier ~= quantized_multiplier * 2**(shift - 31)`, as computed by
+  `QuantizeMultiplier` in TFLite.
+
+  Args:
+    real_multiplier: Array of positive multipliers.
+
+  Returns:
+    Tuple of int64 arrays `(quantized_multiplier, shift)`.
+  """
+  mantissa, shift = np.frexp(np.asarray(real_multiplier, np.float64))
+  quantized_multiplier = _round_half_away_from_zero(
+      mantissa * (1 << 31)).astype(np.int64)
+
+  overflow = quantized_multiplier == (1 << 31)
+  quantized_multiplier = np.where(overflow, quantized_multiplier // 2,
+                                  quantized_multiplier)
+  shift = np.where(overflow, shift + 1, shift).astype(np.int64)
+  return quantized_multiplier, shift
+
+
+def _multiply_by_quantized_multiplier(x, quantized_multiplier, shift):
+  """Fixed-point multiplication of int32 values, as done by TFLite kernels.
+
+  Emulates `MultiplyByQuantizedMultiplier`, a saturating rounding doubling
+  high multiplication followed by a rounding right shift, with int64 NumPy
+  arrays.
+
+  Args:
+    x: int64 array of values in the int32 range.
+    quantized_multiplier: Q31 multipliers from `_quantize_multiplier`.
+    shift: Shifts from `_quantize_multiplier`.
+
+  Returns:
+    int64 array of `x * real_multiplier`, rounded.
+  """
+  left_shift = np.maximum(shift, 0)
+  right_shift = np.maximum(-shift, 0)
+
+  if np.any(left_shift):
+    x = np.clip(np.left_shift(x, left_shift), -(1 << 31), (1 << 31) - 1)
+
+  # SaturatingRoundingDoublingHighMul rounds `x * multiplier / 2**31` half
+  # away from zero. For both signs, this is a floor after adding 2**30.
+  high = np.right_shift(x * quantized_multiplier + (1 << 30), 31)
+
+  # RoundingDivideByPOT also rounds half away from zero.
+  half = np.right_shift(np.left_shift(1, right_shift), 1)
+  round_down = np.logical_and(high < 0, right_shift > 0)
+  return np.right_shift(high + half - round_down, right_shift)
+
+
+class _Requantizer(object):
+  """Rescales int32 accumulators into the codes of an output range."""
+
+  def __init__(self, real_multiplier, output_params, relu=False):
+    self._quantized_multiplier, self._shift = _quantize_multiplier(
+        real_multiplier)
+    self._output_params = output_params
+
+    self._output_min = output_params.quant_min
+    if relu:
+      self._output_min = np.maximum(self._output_min,
+                                    output_params.zero_point)
+
+  def __call__(self, accumulator):
+    outputs = _multiply_by_quantized_multiplier(
+        accumulator, self._quantized_multiplier, self._shift)
+    outputs += self._output_params.zero_point
+    return np.clip(outputs, self._output_min,
+                   self._output_params.quant_max).astype(np.int32)
+
+
+# Output range of the TFLite int8 softmax kernel.
+_SOFTMAX_PARAMS = _QuantParams(np.float32(1. / 256), np.int32(-128), -128, 127)
+
+
+def _softmax(codes, input_params, axis=-1):
+  """Softmax over dequantized values, requantized into `_SOFTMAX_PARAMS`."""
+  x = input_params.dequantize(codes).astype(np.float64)
+  x = np.exp(x - np.max(x, axis=axis, keepdims=True))
+  x /= np.sum(x, axis=axis, keepdims=True)
+  codes = _round_half_away_from_zero(x / _SOFTMAX_PARAMS.scale)
+  return np.clip(codes + _SOFTMAX_PARAMS.zero_point, _SOFTMAX_PARAMS.quant_min,
+                 _SOFTMAX_PARAMS.quant_max).astype(np.int32)
+
+
+def _activation_name(activation):
+  if hasattr(activation, '__name__'):
+    return activation.__name__
+  return activation.__class__.__name__
+
+
+def _unsupported(layer, reason=''):
+  return ValueError('Layer {} of type {} is not supported by '
+                    '`IntegerExecutor`{}.'.format(layer.name,
+                                                  layer.__class__.__name__,
+                                                  reason))
+
+
+def _output_params(wrapper):
+  # pylint: disable=protected-access
+  return _QuantParams.from_quantizer(wrapper._output_quantizers[0],
+                                     wrapper._output_quantizer_vars)
+
+
+def _compile_weighted_layer(wrapper, input_params):
+  """Returns the output params and op of a wrapped Dense or convolution."""
+  layer = wrapper.layer
+  if getattr(layer, 'data_format', 'channels_last') != 'channels_last':
+    raise _unsupported(layer, ' with data_format channels_first')
+  if getattr(layer, 'padding', 'valid') not in ('valid', 'same'):
+    raise _unsupported(layer, ' with padding {}'.format(layer.padding))
+
+  kernel, weight_quantizer, weight_vars = wrapper._weight_vars[0]  # pylint: disable=protected-access
+  kernel = K.get_value(kernel)
+  weight_params = _QuantParams.from_quantizer(weight_quantizer, weight_vars)
+  weights = weight_params.quantize(kernel) - weight_params.zero_point
+
+  # Floats are much faster than integer matrix multiplication, and exact as
+  # long as every partial sum fits in their mantissa. Float32 is used when the
+  # bound on the accumulators allows, and float64 covers any int32 otherwise.
+  if isinstance(layer, layers.DepthwiseConv2D):
+    weights_l1 = np.sum(np.abs(weights), axis=tuple(range(weights.ndim - 2)))
+  else:
+    weights_l1 = np.sum(np.abs(weights), axis=tuple(range(weights.ndim - 1)))
+  max_input = input_params.quant_max - input_params.quant_min
+  dtype = np.float32 if np.max(weights_l1) * max_input < 2**24 else np.float64
+  weights = weights.astype(dtype)
+
+  if isinstance(layer, layers.DepthwiseConv2D):
+    # Output channel c * depth_multiplier + m uses kernel[..., c, m].
+    weight_scale = np.broadcast_to(weight_params.scale,
+                                   kernel.shape[-2:]).reshape(-1)
+  else:
+    weight_scale = np.broadcast_to(weight_params.scale, kernel.shape[-1:])
+  accumulator_scale = input_params.scale * weight_scale.astype(np.float64)
+
+  bias = 0
+  if layer.use_bias:
+    bias = _round_half_away_from_zero(
+        K.get_value(layer.bias) / accumulator_scale).astype(np.int64)
+
+  quantize_activation = wrapper._quantize_activations[0]  # pylint: disable=protected-access
+  activation = _activation_name(quantize_activation.activation)
+  if activation in ('linear', 'relu'):
+    accumulator_params = _QuantParams.from_quantizer(
+        quantize_activation.quantizer,
+        quantize_activation._post_activation_vars)  # pylint: disable=protected-access
+    output_params = accumulator_params
+  elif activation == 'softmax':
+    accumulator_params = _QuantParams.from_quantizer(
+        quantize_activation.quantizer,
+        quantize_activation._pre_activation_vars)  # pylint: disable=protected-access
+    output_params = _SOFTMAX_PARAMS
+  else:
+    raise _unsupported(layer, ' with activation {}'.format(activation))
+
+  requantize = _Requantizer(accumulator_scale / accumulator_params.scale,
+                            accumulator_params, relu=activation == 'relu')
+
+  if isinstance(layer, layers.Dense):
+    accumulate = lambda x: tf.tensordot(x, weights, 1)
+  elif isinstance(layer, layers.DepthwiseConv2D):
+    accumulate = lambda x: tf.nn.depthwise_conv2d(  # pylint: disable=g-long-lambda
+        x, weights, (1,) + layer.strides + (1,), layer.padding.upper(),
+        dilations=layer.dilation_rate)
+  else:
+    accumulate = lambda x: tf.nn.convolution(  # pylint: disable=g-long-lambda
+        x, weights, layer.strides, layer.padding.upper(),
+        dilations=layer.dilation_rate)
+
+  def op(codes):
+    accumulator = accumulate((codes - input_params.zero_point).astype(dtype))
+    accumulator = np.rint(accumulator.numpy()).astype(np.int64) + bias
+    outputs = requantize(accumulator)
+    if activation == 'softmax':
+      outputs = _softmax(outputs, accumulator_params)
+    return outputs
+
+  return output_params, op
+
+
+def _compile_shape_layer(wrapper, input_params):
+  """Returns the op of a layer which only moves, pads or selects values."""
+  layer = wrapper.layer
+  if isinstance(layer, layers.Dropout):
+    return input_params, lambda codes: codes
+
+  # Zero padding must pad with the code of zero, so the layer runs on values
+  # relative to the zero point.
+  def op(codes):
+    outputs = layer.call(
+        tf.constant(codes - input_params.zero_point, tf.float32))
+    return outputs.numpy().astype(np.int32) + input_params.zero_point
+
+  return input_params, op
+
+
+def _compile_activation_layer(wrapper, input_params):
+  """Returns the output params and op of a ReLU or Activation layer."""
+  layer = wrapper.layer
+  if isinstance(layer, layers.ReLU):
+    if (layer.max_value is not None or K.get_value(layer.negative_slope) or
+        K.get_value(layer.threshold)):
+      raise _unsupported(layer, ' unless it is a plain ReLU')
+    activation = 'relu'
+  elif isinstance(layer, layers.Softmax):
+    activation = 'softmax'
+  else:
+    activation = _activation_name(layer.activation)
+
+  if activation == 'linear':
+    return input_params, lambda codes: codes
+  elif activation == 'softmax':
+    axis = getattr(layer, 'axis', -1)
+    return _SOFTMAX_PARAMS, lambda codes: _softmax(codes, input_params, axis)
+  elif activation != 'relu':
+    raise _unsupported(layer, ' with activation {}'.format(activation))
+
+  output_params = _output_params(wrapper)
+  requantize = _Requantizer(input_params.scale / output_params.scale,
+                            output_params, relu=True)
+  return output_params, lambda codes: requantize(  # pylint: disable=g-long-lambda
+      (codes - input_params.zero_point).astype(np.int64))
+
+
+def _compile_pooling_layer(wrapper, input_params):
+  """Returns the output params and op of an average pooling layer."""
+  layer = wrapper.layer
+  output_params = _output_params(wrapper)
+
+  if isinstance(layer, (layers.GlobalAveragePooling1D,
+                        layers.GlobalAveragePooling2D)):
+    if layer.data_format != 'channels_last':
+      raise _unsupported(layer, ' with data_format channels_first')
+
+    def accumulate(x):
+      axes = tuple(range(1, x.ndim - 1))
+      return np.sum(x, axis=axes), np.prod([x.shape[a] for a in axes])
+  else:
+    if layer.padding != 'valid' or layer.data_format != 'channels_last':
+      raise _unsupported(layer, ' unless padding is valid and channels last')
+    window_size = np.prod(layer.pool_size)
+
+    def accumulate(x):
+      # Float64 represents the window sums exactly.
+      means = layer.call(tf.constant(x, tf.float64)).numpy()
+      return np.rint(means * window_size).astype(np.int64), window_size
+
+  def op(codes):
+    accumulator, count = accumulate(
+        (codes - input_params.zero_point).astype(np.int64))
+    requantize = _Requantizer(
+        input_params.scale / (output_params.scale * count), output_params)
+    return requantize(accumulator)
+
+  return output_params, op
+
+
+def _compile_add_layer(wrapper, input_params_list):
+  """Returns the output params and op of an Add layer, as in TFLite."""
+  output_params = _output_params(wrapper)
+
+  left_shift = 20
+  twice_max_input_scale = 2 * max(
+      np.float64(params.scale) for params in input_params_list)
+  input_multipliers = [
+      _quantize_multiplier(params.scale / twice_max_input_scale)
+      for params in input_params_list
+  ]
+  requantize = _Requantizer(
+      twice_max_input_scale / ((1 << left_shift) * output_params.scale),
+      output_params)
+
+  def op(*codes_list):
+    accumulator = 0
+    for codes, params, (multiplier, shift) in zip(codes_list, input_params_list,
+                                                   input_multipliers):
+      shifted = np.left_shift(
+          (codes - params.zero_point).astype(np.int64), left_shift)
+      accumulator = accumulator + _multiply_by_quantized_multiplier(
+          shifted, multiplier, shift)
+    return requantize(accumulator)
+
+  return output_params, op
+
+
+_WEIGHTED_LAYERS = (layers.Conv1D, layers.Conv2D, layers.Dense,
+                    layers.DepthwiseConv2D)
+_SHAPE_LAYERS = (layers.Dropout, layers.Flatten, layers.GlobalMaxPooling1D,
+                 layers.GlobalMaxPooling2D, layers.MaxPooling1D,
+                 layers.MaxPooling2D, layers.Reshape, layers.ZeroPadding1D,
+                 layers.ZeroPadding2D)
+_ACTIVATION_LAYERS = (layers.Activation, layers.ReLU, layers.Softmax)
+_POOLING_LAYERS = (layers.AveragePooling1D, layers.AveragePooling2D,
+                   layers.GlobalAveragePooling1D, layers.GlobalAveragePooling2D)
+
+
+def _compile_layer(layer, input_params_list):
+  """Returns the output params and integer op of a layer of the model."""
+  if isinstance(layer, quantize_layer.QuantizeLayer):
+    if input_params_list != [None]:
+      raise _unsupported(layer, ' except on float model inputs')
+    output_params = _QuantParams.from_quantizer(layer.quantizer,
+                                                layer.quantizer_vars)
+    return output_params, output_params.quantize
+
+  if not isinstance(layer, quantize_wrapper.QuantizeWrapper):
+    raise _unsupported(layer)
+  if None in input_params_list:
+    raise ValueError(
+        'Layer {} has float inputs. `IntegerExecutor` requires the model '
+        'inputs to be quantized by a `QuantizeLayer`.'.format(layer.name))
+
+  # Subclasses of the supported layers may compute something else entirely.
+  inner_layer = layer.layer
+  layer_type = type(inner_layer)
+  if layer_type is layers.Add:
+    return _compile_add_layer(layer, input_params_list)
+
+  if len(input_params_list) != 1:
+    raise _unsupported(inner_layer, ' with multiple inputs')
+  input_params = input_params_list[0]
+
+  if layer_type in _WEIGHTED_LAYERS:
+    return _compile_weighted_layer(layer, input_params)
+  elif layer_type in _SHAPE_LAYERS:
+    return _compile_shape_layer(layer, input_params)
+  elif layer_type in _ACTIVATION_LAYERS:
+    return _compile_activation_layer(layer, input_params)
+  elif layer_type in _POOLING_LAYERS:
+    return _compile_pooling_layer(layer, input_params)
+
+  raise _unsupported(inner_layer)
+
+
+class IntegerExecutor(object):
+  """Runs a quantized Keras model with TFLite integer arithmetic.
+
+  ```python
+  quantized_model = quantize_model(model)
+  # Train or calibrate `quantized_model`.
+
+  executor = IntegerExecutor(quantized_model)
+  predictions = executor.predict(x_test)
+  ```
+
+  The quantization ranges are read when the executor is created, so it must
+  be created again after further training or calibration of the model.
+
+  Supports the layers of `TFLiteQuantizeRegistry` which TFLite executes with
+  int8 kernels: Dense, Conv1D, Conv2D and DepthwiseConv2D with linear, relu
+  or softmax activations, ReLU, Softmax, Activation, Add, average and max
+  pooling, and layers which only reshape, pad or drop values. Softmax is
+  computed from the dequantized logits, and its outputs quantized to the fixed
+  output range of the TFLite int8 softmax kernel.
+
+  Other layers are not supported, including Concatenate, BatchNormalization
+  and the convolutions `quantize_apply` fuses with a BatchNormalization, as
+  well as shared layers and subclasses of the supported layers. Sequential
+  models are not supported either, since `quantize_apply` only quantizes the
+  inputs of functional models with a `QuantizeLayer`.
+  """
+
+  def __init__(self, model):
+    """Creates the executor, and precomputes the integer weights of `model`.
+
+    Args:
+      model: Functional `tf.keras.Model` quantized with `quantize_apply`.
+
+    Raises:
+      ValueError: if `model` is not a functional model, or contains a layer
+        which is not supported.
+    """
+    is_functional = model._is_graph_network  # pylint: disable=protected-access
+    if isinstance(model, tf.keras.Sequential) or not is_functional:
+      raise ValueError(
+          '`IntegerExecutor` only supports functional models, whose inputs '
+          '`quantize_apply` quantizes with a `QuantizeLayer`.')
+
+    self._model = model
+    self._input_names, graph, self._output_names = self._get_graph(model)
+
+    params = {name: None for name in self._input_names}
+    self._ops = []
+    for layer_name, input_names in graph:
+      layer = model.get_layer(layer_name)
+      params[layer_name], op = _compile_layer(
+          layer, [params[name] for name in input_names])
+      self._ops.append((layer_name, input_names, op))
+
+    self._params = params
+    for name in self._output_names:
+      if self._params[name] is None:
+        raise ValueError('Model output {} is not quantized.'.format(name))
+
+  @staticmethod
+  def _get_graph(model):
+    """Returns the input names, topologically sorted nodes and output names."""
+    config = model.get_config()
+    graph = []
+    for layer_config in config['layers']:
+      inbound_nodes = layer_config['inbound_nodes']
+      if not inbound_nodes:
+        continue
+      if len(inbound_nodes) > 1:
+        raise _unsupported(
+            model.get_layer(layer_config['name']), ' when shared')
+      graph.append((layer_config['name'],
+                    [inbound[0] for inbound in inbound_nodes[0]]))
+
+    return ([name for name, _, _ in config['input_layers']], graph,
+            [name for name, _, _ in config['output_layers']])
+
+  def _run_batch(self, inputs):
+    codes = dict(zip(self._input_names, inputs))
+    for layer_name, input_names, op in self._ops:
+      codes[layer_name] = op(*[codes[name] for name in input_names])
+    return codes
+
+  def _run(self, x, batch_size):
+    """Yields the codes of every layer, one batch of `x` at a time."""
+    inputs = [np.asarray(t, np.float32) for t in tf.nest.flatten(x)]
+    if len(inputs) != len(self._input_names):
+      raise ValueError('Expected {} inputs, got {}.'.format(
+          len(self._input_names), len(inputs)))
+
+    for start in range(0, len(inputs[0]), batch_size):
+      yield self._run_batch([t[start:start + batch_size] for t in inputs])
+
+  def predict(self, x, batch_size=32):
+    """Runs the model on `x` with integer arithmetic.
+
+    Args:
+      x: NumPy array of inputs, or list of arrays for multiple inputs.
+      batch_size: Number of samples per batch.
+
+    Returns:
+      Dequantized outputs of the model, as float32 NumPy arrays. A list is
+      returned for models with multiple outputs.
+    """
+    outputs = [[] for _ in self._output_names]
+    for codes in self._run(x, batch_size):
+      for name, output in zip(self._output_names, outputs):
+        output.append(self._params[name].dequantize(codes[name]))
+
+    outputs = [np.concatenate(output) for output in outputs]
+    return outputs[0] if len(outputs) == 1 else outputs
+
+  def layer_errors(self, x, batch_size=32):
+    """Measures the error of the integer outputs of each layer.
+
+    The dequantized integer outputs of every layer are compared to the
+    outputs of the same layer in the quantized Keras model in inference mode,
+    which emulates quantization in float.
+
+    Args:
+      x: NumPy array of inputs, or list of arrays for multiple inputs.
+      batch_size: Number of samples per batch.
+
+    Returns:
+      `OrderedDict` mapping layer names, in execution order, to the maximum
+      absolute error of their outputs, in units of their quantization scale.
+    """
+    errors = collections.OrderedDict(
+        (layer_name, 0.) for layer_name, _, _ in self._ops)
+    inputs = [np.asarray(t, np.float32) for t in tf.nest.flatten(x)]
+    for start, codes in zip(range(0, len(inputs[0]), batch_size),
+                            self._run(inputs, batch_size)):
+      values = {
+          name: t[start:start + batch_size]
+          for name, t in zip(self._input_names, inputs)
+      }
+      for layer_name, input_names, _ in self._ops:
+        layer_inputs = [values[name] for name in input_names]
+        if len(layer_inputs) == 1:
+          layer_inputs = layer_inputs[0]
+        values[layer_name] = self._model.get_layer(layer_name)(
+            layer_inputs, training=False).numpy()
+
+        params = self._params[layer_name]
+        error = np.abs(params.dequantize(codes[layer_name]) -
+                       values[layer_name]) / params.scale
+        errors[layer_name] = max(errors[layer_name], float(np.max(error)))
+
+    return errors
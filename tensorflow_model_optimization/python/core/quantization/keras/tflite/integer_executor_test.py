@@ -0,0 +1,149 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for integer_executor.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.quantization.keras import calibration
+from tensorflow_model_optimization.python.core.quantization.keras import quantize
+from tensorflow_model_optimization.python.core.quantization.keras.tflite import integer_executor
+
+IntegerExecutor = integer_executor.IntegerExecutor
+
+keras = tf.keras
+layers = keras.layers
+
+
+class IntegerExecutorTest(tf.test.TestCase, parameterized.TestCase):
+
+  @staticmethod
+  def _quantize_and_calibrate(model):
+    quantized_model = quantize.quantize_model(model)
+    inputs = np.random.uniform(
+        -1., 1., size=(64,) + model.input_shape[1:]).astype(np.float32)
+    calibration.calibrate(
+        quantized_model, tf.data.Dataset.from_tensor_slices(inputs).batch(16))
+    return quantized_model, inputs
+
+  @staticmethod
+  def _functional(layers_list, input_shape):
+    inp = keras.Input(input_shape)
+    x = inp
+    for layer in layers_list:
+      x = layer(x)
+    return keras.Model(inp, x)
+
+  def _assert_matches_model(self, quantized_model, inputs):
+    executor = IntegerExecutor(quantized_model)
+
+    # Only rounding differs from the float emulation, so each layer may be off
+    # by a few quantization steps.
+    for layer_name, error in executor.layer_errors(inputs).items():
+      self.assertLessEqual(error, 3., layer_name)
+    self.assertAllClose(
+        quantized_model.predict(inputs),
+        executor.predict(inputs, batch_size=20),
+        atol=0.1)
+
+  @parameterized.parameters(
+      (lambda: layers.Dense(8, activation='relu'), (6,)),
+      (lambda: layers.Conv1D(4, 3, padding='same'), (8, 3)),
+      (lambda: layers.Conv2D(4, 3, strides=2, activation='relu'), (9, 9, 3)),
+      (lambda: layers.DepthwiseConv2D(3, depth_multiplier=2), (6, 6, 3)),
+  )
+  def testMatchesQuantizedModel_WeightedLayers(self, layer_fn, input_shape):
+    model = self._functional([
+        layer_fn(),
+        layers.Flatten(),
+        layers.Dense(5, activation='softmax'),
+    ], input_shape)
+
+    self._assert_matches_model(*self._quantize_and_calibrate(model))
+
+  def testMatchesQuantizedModel_Functional(self):
+    inp = keras.Input((8, 8, 3))
+    x = layers.Conv2D(4, 3, padding='same', activation='relu')(inp)
+    y = layers.Conv2D(4, 3, padding='same')(x)
+    x = layers.ReLU()(layers.Add()([x, y]))
+    x = layers.MaxPooling2D()(layers.ZeroPadding2D()(x))
+    x = layers.AveragePooling2D()(x)
+    x = layers.GlobalAveragePooling2D()(x)
+    model = keras.Model(inp, layers.Dense(3)(x))
+
+    self._assert_matches_model(*self._quantize_and_calibrate(model))
+
+  def testPredict_MultipleBatchesMatchSingleBatch(self):
+    model = self._functional([layers.Dense(4)], (3,))
+    quantized_model, inputs = self._quantize_and_calibrate(model)
+    executor = IntegerExecutor(quantized_model)
+
+    self.assertAllEqual(
+        executor.predict(inputs, batch_size=len(inputs)),
+        executor.predict(inputs, batch_size=7))
+
+  def testPredict_OutputsLieOnQuantizationGrid(self):
+    model = self._functional([layers.Dense(4)], (3,))
+    quantized_model, inputs = self._quantize_and_calibrate(model)
+
+    outputs = IntegerExecutor(quantized_model).predict(inputs)
+
+    self.assertLessEqual(len(np.unique(outputs)), 256)
+
+  def testRaisesForUnsupportedLayers(self):
+    model = self._functional([layers.Conv2D(4, 3), layers.UpSampling2D()],
+                             (6, 6, 3))
+    quantized_model, _ = self._quantize_and_calibrate(model)
+
+    with self.assertRaisesRegexp(ValueError, 'UpSampling2D'):
+      IntegerExecutor(quantized_model)
+
+  def testRaisesForSequentialModels(self):
+    model = keras.Sequential([layers.Dense(4, input_shape=(3,))])
+    quantized_model, _ = self._quantize_and_calibrate(model)
+
+    with self.assertRaisesRegexp(ValueError, 'only supports functional'):
+      IntegerExecutor(quantized_model)
+
+  def testRaisesForUnquantizedInputs(self):
+    inp = keras.Input((3,))
+    out = quantize.quantize_annotate_layer(layers.Dense(4))(inp)
+    quantized_model = quantize.quantize_apply(keras.Model(inp, out))
+    # Drop the `QuantizeLayer` which quantizes the model inputs.
+    model = keras.Model(quantized_model.input,
+                        quantized_model.layers[-1](quantized_model.input))
+
+    with self.assertRaisesRegexp(ValueError, 'float inputs'):
+      IntegerExecutor(model)
+
+  def testMultiplyByQuantizedMultiplier(self):
+    accumulators = np.random.randint(-2**20, 2**20, size=1000).astype(np.int64)
+    real_multipliers = np.exp(np.random.uniform(-12., 1., size=1000))
+
+    multiplier, shift = integer_executor._quantize_multiplier(real_multipliers)
+    outputs = integer_executor._multiply_by_quantized_multiplier(
+        accumulators, multiplier, shift)
+
+    # The high multiplication and the shift both round, as in TFLite.
+    self.assertAllClose(accumulators * real_multipliers, outputs, atol=0.75)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -23,6 +23,7 @@ from __future__ import print_function
 
 import tensorflow as tf
 
+from tensorflow_model_optimization.python.core.quantization.keras import quantize_annotate
 from tensorflow_model_optimization.python.core.quantization.keras import quantize_layout_transform
 from tensorflow_model_optimization.python.core.quantization.keras.graph_transformations import model_transformer
 from tensorflow_model_optimization.python.core.quantization.keras.tflite import tflite_transforms
@@ -34,19 +35,45 @@ class TFLiteQuantizeLayoutTransform(
     quantize_layout_transform.QuantizeLayoutTransform):
   """Model transformations for TFLite."""
 
+  def __init__(self, cross_layer_equalization=False, bias_correction=False,
+               freeze_bn_delay=None):
+    """Construct a TFLiteQuantizeLayoutTransform.
+
+    Args:
+      cross_layer_equalization: If True, equalize the per channel ranges of the
+        kernels of consecutive layers before they are quantized.
+      bias_correction: If True, correct the biases of layers which follow a
+        batchnorm for the expected error of quantizing their kernels.
+      freeze_bn_delay: Number of training steps after which the statistics of
+        the folded batchnorms are frozen. None never freezes them. If not None,
+        BN is also folded into Conv2D and DepthwiseConv2D layers, so their
+        statistics can be frozen as well.
+    """
+    self.cross_layer_equalization = cross_layer_equalization
+    self.bias_correction = bias_correction
+    self.freeze_bn_delay = freeze_bn_delay
+
   def apply(self, model, layer_quantize_map):
     """Implement TFLite transforms.
 
     Currently this means the following.
-      1. Pull activations into layers, and apply fuse activations. (TODO)
+      1. Fuse standalone ReLU activations into the preceding layer.
       2. Modify range in incoming layers for Concat. (TODO)
-      3. Fuse Conv2D/DepthwiseConv2D + BN into single layer.
+      3. Fold BN into a preceding Dense, Conv1D, Conv3D or SeparableConv2D
+         layer, which TFLite does not fuse with BN.
+      4. Fuse Conv2D/DepthwiseConv2D + BN into single layer. With a
+         `freeze_bn_delay`, BN is folded into them as in 3 instead.
+      5. Optionally, equalize the kernels of consecutive layers before 3, and
+         correct biases for the quantization error of the kernels after it.
+
+    `QuantizeAnnotate` wrappers in `model` are removed as part of the
+    transformation, so the annotated model can be passed in directly.
 
     Args:
       model: Keras model to be quantized.
       layer_quantize_map: Map with keys as layer names, and values as dicts
         containing custom `QuantizeConfig`s which may have been passed with
-        layers.
+        layers. Annotated layers are keyed by the name of the wrapped layer.
 
     Returns:
       (Transformed Keras model to better match TensorFlow Lite backend, updated
@@ -54,17 +81,60 @@ class TFLiteQuantizeLayoutTransform(
     """
 
     transforms = [
+        tflite_transforms.QuantizeAnnotateUnwrap(),
         tflite_transforms.InputLayerQuantize(),
+    ]
+    # Runs before the ReLUs are fused into the previous layers, which changes
+    # the patterns it matches.
+    if self.cross_layer_equalization:
+      transforms.extend([
+          tflite_transforms.CrossLayerEqualizationBatchNormReLU(),
+          tflite_transforms.CrossLayerEqualizationBatchNorm(),
+          tflite_transforms.CrossLayerEqualizationReLU(),
+          tflite_transforms.CrossLayerEqualization(),
+      ])
+    # The ReLU6 folds run first, as the other folds would match their
+    # Conv2D + BN without the ReLU6.
+    if self.freeze_bn_delay is not None:
+      transforms.extend([
+          tflite_transforms.Conv2DBatchNormReLU6Fold(self.freeze_bn_delay),
+          tflite_transforms.DepthwiseConv2DBatchNormReLU6Fold(
+              self.freeze_bn_delay),
+          tflite_transforms.Conv2DBatchNormFold(self.freeze_bn_delay),
+          tflite_transforms.DepthwiseConv2DBatchNormFold(self.freeze_bn_delay),
+      ])
+    transforms.extend([
+        tflite_transforms.DenseBatchNormFold(self.freeze_bn_delay),
+        tflite_transforms.Conv1DBatchNormFold(self.freeze_bn_delay),
+        tflite_transforms.Conv3DBatchNormFold(self.freeze_bn_delay),
+        tflite_transforms.SeparableConv2DBatchNormFold(self.freeze_bn_delay),
+    ])
+    # Runs after the batchnorms are folded, which moves the bias of the layer
+    # before them, and before the ReLUs are fused.
+    if self.bias_correction:
+      transforms.extend([
+          tflite_transforms.BiasCorrection(),
+          tflite_transforms.BiasCorrectionBatchNorm(),
+          tflite_transforms.BiasCorrectionFoldedBatchNorm(),
+      ])
+    transforms.extend([
         tflite_transforms.Conv2DBatchNormReLUQuantize(),
         tflite_transforms.Conv2DBatchNormActivationQuantize(),
         tflite_transforms.Conv2DBatchNormQuantize(),
+        tflite_transforms.LayerReLUFuse(),
+        tflite_transforms.LayerActivationReLUFuse(),
         tflite_transforms.ConcatTransform6Inputs(),
         tflite_transforms.ConcatTransform5Inputs(),
         tflite_transforms.ConcatTransform4Inputs(),
         tflite_transforms.ConcatTransform3Inputs(),
         tflite_transforms.ConcatTransform(),
-    ]
+    ])
+
+    candidate_layers = set(layer_quantize_map.keys())
+    for layer in model.layers:
+      if isinstance(layer, quantize_annotate.QuantizeAnnotate):
+        candidate_layers.add(layer.name)
 
     return model_transformer.ModelTransformer(
         model, transforms,
-        layer_quantize_map.keys(), layer_quantize_map).transform()
+        candidate_layers, layer_quantize_map).transform()
@@ -162,8 +162,12 @@ class TFLiteQuantizeRegistry(quantize_registry.QuantizeRegistry, _RNNHelper):
                     ['activation', 'recurrent_activation']),
 
       # TODO(tf-mot): Move layers out once Transforms indicate quantization.
+      _no_quantize(conv_batchnorm._ConvBatchNorm1D),  # pylint: disable=protected-access
       _no_quantize(conv_batchnorm._ConvBatchNorm2D),  # pylint: disable=protected-access
+      _no_quantize(conv_batchnorm._ConvBatchNorm3D),  # pylint: disable=protected-access
+      _no_quantize(conv_batchnorm._DenseBatchNorm),  # pylint: disable=protected-access
       _no_quantize(conv_batchnorm._DepthwiseConvBatchNorm2D),  # pylint: disable=protected-access
+      _no_quantize(conv_batchnorm._SeparableConvBatchNorm2D),  # pylint: disable=protected-access
   ]
 
   def __init__(self):
@@ -486,12 +490,52 @@ class ConvQuantizeConfig(TFLiteQuantizeConfig):
     self.weight_quantizer = tflite_quantizers.ConvWeightsQuantizer()
 
 
+class MixedPrecisionQuantizeConfig(TFLiteQuantizeConfig):
+  """QuantizeConfig which quantizes the weights of a layer to `num_bits` bits.
+
+  Activations keep the 8 bit quantization of `TFLiteQuantizeConfig`.
+  """
+
+  def __init__(self,
+               weight_attrs,
+               activation_attrs,
+               quantize_output,
+               num_bits,
+               per_axis=False):
+    """Construct a MixedPrecisionQuantizeConfig.
+
+    Args:
+      weight_attrs: List of quantizable weight attributes of layer.
+      activation_attrs: List of quantizable activation attributes of layer.
+      quantize_output: Bool. Should we quantize the output of the layer.
+      num_bits: Number of bits used to quantize the weights.
+      per_axis: Whether to quantize the weights per output channel, as for
+        Conv2D and DepthwiseConv2D layers.
+    """
+    super(MixedPrecisionQuantizeConfig, self).__init__(
+        weight_attrs, activation_attrs, quantize_output)
+
+    self.num_bits = num_bits
+    self.per_axis = per_axis
+    if per_axis:
+      self.weight_quantizer = tflite_quantizers.ConvWeightsQuantizer(num_bits)
+    else:
+      self.weight_quantizer = quantizers.LastValueQuantizer(
+          num_bits=num_bits, per_axis=False, symmetric=True, narrow_range=True)
+
+  def get_config(self):
+    config = super(MixedPrecisionQuantizeConfig, self).get_config()
+    config.update({'num_bits': self.num_bits, 'per_axis': self.per_axis})
+    return config
+
+
 def _types_dict():
   return {
       'TFLiteQuantizeConfig': TFLiteQuantizeConfig,
       'TFLiteQuantizeConfigRNN': TFLiteQuantizeConfigRNN,
       'ActivationQuantizeConfig': ActivationQuantizeConfig,
       'ConvQuantizeConfig': ConvQuantizeConfig,
+      'MixedPrecisionQuantizeConfig': MixedPrecisionQuantizeConfig,
       'NoOpQuantizeConfig': tflite_quantize_configs.NoOpQuantizeConfig,
       'OutputQuantizeConfig': tflite_quantize_configs.OutputQuantizeConfig
   }
@@ -476,6 +476,48 @@ class TFLiteQuantizeConfigRNNTest(tf.test.TestCase, _TestHelper):
     self.assertEqual(self.quantize_config, quantize_config_from_config)
 
 
+class MixedPrecisionQuantizeConfigTest(tf.test.TestCase, _TestHelper):
+
+  def testGetsWeightQuantizersWithNumBits(self):
+    layer = l.Conv2D(2, 2)
+    layer.build(input_shape=(None, 4, 4, 3))
+
+    quantize_config = tflite_quantize_registry.MixedPrecisionQuantizeConfig(
+        ['kernel'], ['activation'], False, num_bits=4, per_axis=True)
+    (weights, weight_quantizers) = self._convert_list(
+        quantize_config.get_weights_and_quantizers(layer))
+
+    self._assert_weight_quantizers(weight_quantizers)
+    self.assertEqual([layer.kernel], weights)
+    self.assertEqual(4, weight_quantizers[0].num_bits)
+    self.assertTrue(weight_quantizers[0].per_axis)
+
+  def testSerialization(self):
+    quantize_config = tflite_quantize_registry.MixedPrecisionQuantizeConfig(
+        ['kernel'], ['activation'], False, num_bits=6)
+
+    expected_config = {
+        'class_name': 'MixedPrecisionQuantizeConfig',
+        'config': {
+            'weight_attrs': ['kernel'],
+            'activation_attrs': ['activation'],
+            'quantize_output': False,
+            'num_bits': 6,
+            'per_axis': False
+        }
+    }
+    serialized_quantize_config = serialize_keras_object(quantize_config)
+
+    self.assertEqual(expected_config, serialized_quantize_config)
+
+    quantize_config_from_config = deserialize_keras_object(
+        serialized_quantize_config,
+        module_objects=globals(),
+        custom_objects=tflite_quantize_registry._types_dict())
+
+    self.assertEqual(quantize_config, quantize_config_from_config)
+
+
 class ActivationQuantizeConfigTest(tf.test.TestCase):
 
   def testRaisesErrorUnsupportedActivation(self):
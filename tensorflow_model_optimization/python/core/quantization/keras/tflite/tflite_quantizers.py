@@ -25,11 +25,16 @@ from tensorflow_model_optimization.python.core.quantization.keras import quantiz
 class ConvWeightsQuantizer(quantizers.LastValueQuantizer):
   """Quantizer for handling weights in Conv2D/DepthwiseConv2D layers."""
 
-  def __init__(self):
-    """Construct LastValueQuantizer with params specific for TFLite Convs."""
+  def __init__(self, num_bits=8):
+    """Construct LastValueQuantizer with params specific for TFLite Convs.
+
+    Args:
+      num_bits: Number of bits for quantization. TFLite kernels use 8 bits,
+        lower bit widths emulate mixed precision models.
+    """
 
     super(ConvWeightsQuantizer, self).__init__(
-        num_bits=8,
+        num_bits=num_bits,
         per_axis=True,
         symmetric=True,
         narrow_range=True)
@@ -47,3 +52,6 @@ class ConvWeightsQuantizer(quantizers.LastValueQuantizer):
         trainable=False)
 
     return {'min_var': min_weight, 'max_var': max_weight}
+
+  def get_config(self):
+    return {'num_bits': self.num_bits}
@@ -16,6 +16,9 @@
 
 import collections
 import inspect
+import math
+
+import numpy as np
 import tensorflow as tf
 
 from tensorflow_model_optimization.python.core.quantization.keras import quantize_aware_activation
@@ -29,10 +32,15 @@ from tensorflow_model_optimization.python.core.quantization.keras.tflite import
 LayerNode = transforms.LayerNode
 LayerPattern = transforms.LayerPattern
 
+_ConvBatchNorm1D = conv_batchnorm._ConvBatchNorm1D  # pylint: disable=protected-access
 _ConvBatchNorm2D = conv_batchnorm._ConvBatchNorm2D  # pylint: disable=protected-access
+_ConvBatchNorm3D = conv_batchnorm._ConvBatchNorm3D  # pylint: disable=protected-access
+_DenseBatchNorm = conv_batchnorm._DenseBatchNorm  # pylint: disable=protected-access
 _DepthwiseConvBatchNorm2D = conv_batchnorm._DepthwiseConvBatchNorm2D  # pylint: disable=protected-access
+_SeparableConvBatchNorm2D = conv_batchnorm._SeparableConvBatchNorm2D  # pylint: disable=protected-access
 
 keras = tf.keras
+K = keras.backend
 
 
 def _get_conv_bn_layers(bn_layer_node):
@@ -73,6 +81,54 @@ def _get_params(conv_layer, bn_layer, relu_layer=None):
   return params
 
 
+def _folds_into_channels(layer, bn_layer):
+  """Returns whether `bn_layer` normalizes the output channels of `layer`."""
+  axis = bn_layer['config']['axis']
+  if isinstance(axis, (list, tuple)):
+    if len(axis) != 1:
+      return False
+    axis = axis[0]
+
+  # The rank of the output of Dense is not part of its config, and a built
+  # BatchNormalization stores a positive axis. Dense is folded only when its
+  # output is assumed to be rank 2.
+  if layer['class_name'] == 'Dense':
+    return axis in (-1, 1)
+  if _is_channels_last(layer):
+    return _normalizes_last_axis(bn_layer, _output_rank(layer))
+  return axis == 1
+
+
+def _can_fold(bn_layer_node):
+  """Returns whether the batchnorm can be folded into the preceding layer."""
+  conv_layer_node = bn_layer_node.input_layers[0]
+  for layer_node in (bn_layer_node, conv_layer_node):
+    if layer_node.metadata.get('quantize_config') is not None:
+      return False
+  return _folds_into_channels(conv_layer_node.layer, bn_layer_node.layer)
+
+
+def _fold_bias_into_batchnorm(bn_layer_node):
+  """Moves the bias of the layer preceding a batchnorm into its moving mean.
+
+  BatchNormalization(x + b) has the same outputs as BatchNormalization(x) with
+  the moving mean reduced by b, both with batch and with moving statistics. The
+  bias is thus redundant, and the folded layers have none.
+
+  Args:
+    bn_layer_node: LayerNode of the batchnorm.
+  """
+  conv_layer_node = bn_layer_node.input_layers[0]
+  if not conv_layer_node.layer['config'].get('use_bias'):
+    return
+
+  conv_layer_node.layer['config']['use_bias'] = False
+  bn_layer_node.weights['moving_mean:0'] = (
+      _get_value(bn_layer_node, 'moving_mean:0') -
+      _get_value(conv_layer_node, 'bias:0'))
+  del conv_layer_node.weights['bias:0']
+
+
 def _get_layer_node(fused_layer, weights):
   layer_config = keras.layers.serialize(fused_layer)
   layer_config['name'] = layer_config['config']['name']
@@ -83,24 +139,106 @@ def _get_layer_node(fused_layer, weights):
   return LayerNode(layer_config, weights, metadata=layer_metadata)
 
 
+class QuantizeAnnotateUnwrap(transforms.Transform):
+  """Replaces `QuantizeAnnotate` wrappers with the layers they wrap.
+
+  QuantizeAnnotate(Layer) => Layer
+
+  This lets the other transforms match the original layers of an annotated
+  model directly, without first cloning the model to remove the wrappers. The
+  weights of the wrapper are the weights of the wrapped layer.
+  """
+
+  def pattern(self):
+    return LayerPattern('QuantizeAnnotate')
+
+  def replacement(self, match_layer):
+    layer_config = match_layer.layer['config']['layer']
+    layer_config['name'] = layer_config['config']['name']
+
+    return LayerNode(layer_config, match_layer.weights, [],
+                     match_layer.metadata)
+
+
 class Conv2DBatchNormFold(transforms.Transform):
-  """Conv2DBatchNormFold."""
+  """Conv2DBatchNormFold.
+
+  Subclasses fold BatchNormalization into other layers by overriding
+  `_layer_type` and `_fused_layer`.
+  """
+
+  _layer_type = 'Conv2D'
+  _fused_layer = _ConvBatchNorm2D
+
+  def __init__(self, freeze_bn_delay=None):
+    """Construct the transform.
+
+    Args:
+      freeze_bn_delay: Number of training steps after which the batchnorm
+        statistics of the fused layers are frozen. None never freezes them.
+    """
+    self.freeze_bn_delay = freeze_bn_delay
 
   def pattern(self):
-    return LayerPattern('BatchNormalization', {},
-                        [LayerPattern('Conv2D', {}, [])])
+    # The fused layers apply the activation after the batchnorm, which is only
+    # the same as the unfused layers when there is none in between.
+    return LayerPattern('BatchNormalization', {}, [
+        LayerPattern(self._layer_type, {'activation': 'linear'}, [])])
 
   def replacement(self, match_layer):
+    if not _can_fold(match_layer):
+      return match_layer
+
+    _fold_bias_into_batchnorm(match_layer)
     conv_layer, bn_layer = _get_conv_bn_layers(match_layer)
 
     fused_params = _get_params(conv_layer, bn_layer)
-    fused_layer = _ConvBatchNorm2D(**fused_params)
+    fused_layer = self._fused_layer(
+        freeze_bn_delay=self.freeze_bn_delay, **fused_params)
 
     weights = _get_weights(match_layer)
     return _get_layer_node(fused_layer, weights)
 
   def custom_objects(self):
-    return {'_ConvBatchNorm2D': _ConvBatchNorm2D}
+    return {self._fused_layer.__name__: self._fused_layer}
+
+
+class DepthwiseConv2DBatchNormFold(Conv2DBatchNormFold):
+  """DepthwiseConv2DBatchNormFold."""
+
+  _layer_type = 'DepthwiseConv2D'
+  _fused_layer = _DepthwiseConvBatchNorm2D
+
+
+class Conv1DBatchNormFold(Conv2DBatchNormFold):
+  """Conv1DBatchNormFold."""
+
+  _layer_type = 'Conv1D'
+  _fused_layer = _ConvBatchNorm1D
+
+
+class Conv3DBatchNormFold(Conv2DBatchNormFold):
+  """Conv3DBatchNormFold."""
+
+  _layer_type = 'Conv3D'
+  _fused_layer = _ConvBatchNorm3D
+
+
+class DenseBatchNormFold(Conv2DBatchNormFold):
+  """DenseBatchNormFold."""
+
+  _layer_type = 'Dense'
+  _fused_layer = _DenseBatchNorm
+
+
+class SeparableConv2DBatchNormFold(Conv2DBatchNormFold):
+  """SeparableConv2DBatchNormFold.
+
+  The batchnorm is folded into the pointwise kernel of the SeparableConv2D.
+  """
+
+  _layer_type = 'SeparableConv2D'
+  _fused_layer = _SeparableConvBatchNorm2D
 
 
 class Conv2DBatchNormReLU6Fold(Conv2DBatchNormFold):
@@ -113,11 +251,18 @@ class Conv2DBatchNormReLU6Fold(Conv2DBatchNormFold):
     ])
 
   def replacement(self, match_layer):
+    bn_layer_node = match_layer.input_layers[0]
+    if match_layer.metadata.get('quantize_config') is not None or \
+        not _can_fold(bn_layer_node):
+      return match_layer
+
+    _fold_bias_into_batchnorm(bn_layer_node)
     relu_layer = match_layer.layer
-    conv_layer, bn_layer = _get_conv_bn_layers(match_layer.input_layers[0])
+    conv_layer, bn_layer = _get_conv_bn_layers(bn_layer_node)
 
     fused_params = _get_params(conv_layer, bn_layer, relu_layer)
-    fused_layer = _ConvBatchNorm2D(**fused_params)
+    fused_layer = _ConvBatchNorm2D(
+        freeze_bn_delay=self.freeze_bn_delay, **fused_params)
 
     weights = _get_weights(match_layer.input_layers[0])
     return _get_layer_node(fused_layer, weights)
@@ -126,6 +271,15 @@ class Conv2DBatchNormReLU6Fold(Conv2DBatchNormFold):
 class DepthwiseConv2DBatchNormReLU6Fold(transforms.Transform):
   """DepthwiseConv2DBatchNormReLU6Fold."""
 
+  def __init__(self, freeze_bn_delay=None):
+    """Construct the transform.
+
+    Args:
+      freeze_bn_delay: Number of training steps after which the batchnorm
+        statistics of the fused layers are frozen. None never freezes them.
+    """
+    self.freeze_bn_delay = freeze_bn_delay
+
   def pattern(self):
     return LayerPattern('ReLU', {'max_value': 6}, [
         LayerPattern('BatchNormalization', {},
@@ -133,11 +287,18 @@ class DepthwiseConv2DBatchNormReLU6Fold(transforms.Transform):
     ])
 
   def replacement(self, match_layer):
+    bn_layer_node = match_layer.input_layers[0]
+    if match_layer.metadata.get('quantize_config') is not None or \
+        not _can_fold(bn_layer_node):
+      return match_layer
+
+    _fold_bias_into_batchnorm(bn_layer_node)
     relu_layer = match_layer.layer
-    conv_layer, bn_layer = _get_conv_bn_layers(match_layer.input_layers[0])
+    conv_layer, bn_layer = _get_conv_bn_layers(bn_layer_node)
 
     fused_params = _get_params(conv_layer, bn_layer, relu_layer)
-    fused_layer = _DepthwiseConvBatchNorm2D(**fused_params)
+    fused_layer = _DepthwiseConvBatchNorm2D(
+        freeze_bn_delay=self.freeze_bn_delay, **fused_params)
 
     weights = _get_weights(match_layer.input_layers[0])
     return _get_layer_node(fused_layer, weights)
@@ -147,13 +308,18 @@ class DepthwiseConv2DBatchNormReLU6Fold(transforms.Transform):
 
 
 class Conv2DBatchNormQuantize(transforms.Transform):
-  """Ensure FQ does not get placed between Conv and BatchNorm."""
+  """Ensure FQ does not get placed between Conv and BatchNorm.
+
+  Also applies to the other layers BatchNormalization is folded into, when it
+  is not folded by `Conv2DBatchNormFold` and its subclasses.
+  """
 
   def pattern(self):
     return LayerPattern(
         'BatchNormalization',
         inputs=[LayerPattern(
-            'Conv2D|DepthwiseConv2D', config={'activation': 'linear'})])
+            'Conv1D|Conv2D|Conv3D|DepthwiseConv2D|SeparableConv2D|Dense',
+            config={'activation': 'linear'})])
 
   @staticmethod
   def _get_quantize_config(layer_node):
@@ -227,6 +393,396 @@ class Conv2DBatchNormActivationQuantize(Conv2DBatchNormReLUQuantize):
         inputs=[Conv2DBatchNormQuantize.pattern(self)])
 
 
+class LayerReLUFuse(transforms.Transform):
+  """Fuses a ReLU into the activation of the preceding layer.
+
+  Layer -> ReLU => Layer(activation='relu')
+
+  The layer then quantizes its output once, after the activation, instead of
+  having a separate quantize operation before and after the ReLU. This matches
+  TFLite, which fuses the ReLU into the kernel of the layer.
+  """
+
+  def pattern(self):
+    return LayerPattern(
+        'ReLU',
+        config={'max_value': None, 'negative_slope': 0., 'threshold': 0.},
+        inputs=[LayerPattern(
+            'Dense|Conv1D|Conv2D|Conv3D|DepthwiseConv2D',
+            config={'activation': 'linear'})])
+
+  def replacement(self, match_layer):
+    relu_layer_node, layer_node = match_layer, match_layer.input_layers[0]
+
+    for node in (relu_layer_node, layer_node):
+      if node.metadata.get('quantize_config') is not None:
+        return match_layer
+
+    layer_node.layer['config']['activation'] = \
+      keras.activations.serialize(keras.activations.relu)
+
+    return LayerNode(layer_node.layer, layer_node.weights, [],
+                     layer_node.metadata)
+
+
+class LayerActivationReLUFuse(LayerReLUFuse):
+  """Fuses an Activation('relu') into the activation of the preceding layer.
+
+  Layer -> Activation('relu') => Layer(activation='relu')
+  """
+
+  def pattern(self):
+    return LayerPattern(
+        'Activation',
+        config={'activation': 'relu'},
+        inputs=LayerReLUFuse.pattern(self).inputs)
+
+
+# Layers whose kernels are rescaled by `CrossLayerEqualization` and corrected
+# by `BiasCorrection`.
+_EQUALIZED_LAYERS = 'Conv1D|Conv2D|Conv3D|DepthwiseConv2D|Dense'
+
+# Layers which a batchnorm is folded into by `Conv2DBatchNormFold` and its
+# subclasses.
+_FOLDED_LAYERS = (_ConvBatchNorm1D, _ConvBatchNorm2D, _ConvBatchNorm3D,
+                  _DenseBatchNorm, _DepthwiseConvBatchNorm2D,
+                  _SeparableConvBatchNorm2D)
+_FOLDED_LAYER_NAMES = '|'.join(layer.__name__ for layer in _FOLDED_LAYERS)
+
+# Layers which the TFLite registry quantizes with a range per output channel.
+_PER_AXIS_LAYERS = ('Conv2D', 'DepthwiseConv2D')
+
+_RELU_CONFIG = {'max_value': None, 'negative_slope': 0., 'threshold': 0.}
+
+
+def _kernel_name(layer):
+  if layer['class_name'] in ('DepthwiseConv2D', '_DepthwiseConvBatchNorm2D'):
+    return 'depthwise_kernel:0'
+  return 'kernel:0'
+
+
+def _get_value(layer_node, weight_name):
+  return K.get_value(layer_node.weights[weight_name])
+
+
+def _is_channels_last(layer):
+  return layer['config'].get('data_format') != 'channels_first'
+
+
+def _normalizes_last_axis(bn_layer, rank):
+  axis = bn_layer['config']['axis']
+  if isinstance(axis, (list, tuple)):
+    if len(axis) != 1:
+      return False
+    axis = axis[0]
+  return axis in (-1, rank - 1)
+
+
+def _output_rank(layer):
+  return len(layer['config'].get('kernel_size', ())) + 2
+
+
+def _output_channel_ranges(layer, kernel):
+  """Returns the range of `kernel` for each output channel of `layer`."""
+  if layer['class_name'] == 'DepthwiseConv2D':
+    # Output channel c * depth_multiplier + m uses kernel[:, :, c, m].
+    return np.max(np.abs(kernel), axis=(0, 1)).reshape(-1)
+  return np.max(np.abs(kernel), axis=tuple(range(kernel.ndim - 1)))
+
+
+def _input_channel_ranges(kernel):
+  """Returns the range of `kernel` for each of its input channels."""
+  # Input channels are the second to last axis of all the equalized kernels.
+  return np.max(
+      np.abs(kernel), axis=tuple(range(kernel.ndim - 2)) + (kernel.ndim - 1,))
+
+
+class CrossLayerEqualization(transforms.Transform):
+  """Equalizes the per channel ranges of the kernels of two layers.
+
+  Layer1 -> Layer2 => Layer1' -> Layer2'
+
+  Output channel c of Layer1 is divided by s_c, and the weights of Layer2 for
+  input channel c are multiplied by s_c. As ReLU commutes with positive
+  scales, the outputs of Layer2 are unchanged. With s_c = sqrt(r1_c / r2_c),
+  where r1_c and r2_c are the ranges of the scaled weights, both ranges become
+  sqrt(r1_c * r2_c). Channels then have more similar ranges, which reduces the
+  error of quantizing with one range per tensor, without needing any data.
+
+  When a BatchNormalization follows Layer1, the batchnorm is scaled instead,
+  and r1_c is the range of Layer1 with the batchnorm folded into it.
+
+  See "Data-Free Quantization Through Weight Equalization and Bias Correction",
+  Nagel et al., 2019.
+  """
+
+  def pattern(self):
+    return LayerPattern(_EQUALIZED_LAYERS, inputs=[
+        LayerPattern(_EQUALIZED_LAYERS)])
+
+  @staticmethod
+  def _get_layer_nodes(match_layer):
+    """Returns the nodes of Layer1, the batchnorm or None, and Layer2."""
+    layer_nodes = [match_layer]
+    while layer_nodes[-1].input_layers:
+      layer_nodes.append(layer_nodes[-1].input_layers[0])
+
+    bn_layer_node = None
+    for layer_node in layer_nodes:
+      if layer_node.layer['class_name'] == 'BatchNormalization':
+        bn_layer_node = layer_node
+    return layer_nodes[-1], bn_layer_node, match_layer
+
+  @staticmethod
+  def _is_supported(layer1, bn_layer, layer2):
+    if not _is_channels_last(layer1) or not _is_channels_last(layer2):
+      return False
+
+    if bn_layer is None:
+      return layer1['config']['activation'] in ('linear', 'relu')
+
+    return (layer1['config']['activation'] == 'linear' and
+            bn_layer['config']['scale'] and
+            _normalizes_last_axis(bn_layer, _output_rank(layer1)))
+
+  def replacement(self, match_layer):
+    layer1_node, bn_layer_node, layer2_node = self._get_layer_nodes(
+        match_layer)
+    layer1, layer2 = layer1_node.layer, layer2_node.layer
+    bn_layer = bn_layer_node.layer if bn_layer_node else None
+    if not self._is_supported(layer1, bn_layer, layer2):
+      return match_layer
+
+    kernel1 = _get_value(layer1_node, _kernel_name(layer1))
+    kernel2 = _get_value(layer2_node, _kernel_name(layer2))
+
+    ranges1 = _output_channel_ranges(layer1, kernel1)
+    if bn_layer_node:
+      ranges1 = ranges1 * np.abs(
+          _get_value(bn_layer_node, 'gamma:0') /
+          np.sqrt(_get_value(bn_layer_node, 'moving_variance:0') +
+                  bn_layer['config']['epsilon']))
+    ranges2 = _input_channel_ranges(kernel2)
+    if ranges1.shape != ranges2.shape:
+      return match_layer
+
+    scale = np.ones_like(ranges1)
+    nonzero = (ranges1 > 0) & (ranges2 > 0)
+    scale[nonzero] = np.sqrt(ranges1[nonzero] / ranges2[nonzero])
+
+    if bn_layer_node:
+      for weight_name in ('gamma:0', 'beta:0'):
+        if weight_name in bn_layer_node.weights:
+          bn_layer_node.weights[weight_name] = _get_value(
+              bn_layer_node, weight_name) / scale
+    else:
+      if layer1['class_name'] == 'DepthwiseConv2D':
+        kernel1 = kernel1 / scale.reshape(kernel1.shape[-2:])
+      else:
+        kernel1 = kernel1 / scale
+      layer1_node.weights[_kernel_name(layer1)] = kernel1
+      if layer1['config']['use_bias']:
+        layer1_node.weights['bias:0'] = _get_value(layer1_node,
+                                                   'bias:0') / scale
+
+    layer2_node.weights[_kernel_name(layer2)] = kernel2 * scale.reshape(-1, 1)
+
+    return match_layer
+
+
+class CrossLayerEqualizationReLU(CrossLayerEqualization):
+  """Equalizes the kernels of two layers separated by a ReLU.
+
+  Layer1 -> ReLU -> Layer2 => Layer1' -> ReLU -> Layer2'
+  """
+
+  def pattern(self):
+    return LayerPattern(_EQUALIZED_LAYERS, inputs=[
+        LayerPattern('ReLU', _RELU_CONFIG, [
+            LayerPattern(_EQUALIZED_LAYERS)])])
+
+
+class CrossLayerEqualizationBatchNorm(CrossLayerEqualization):
+  """Equalizes the kernels of two layers separated by a batchnorm.
+
+  Layer1 -> BatchNormalization -> Layer2 =>
+    Layer1 -> BatchNormalization' -> Layer2'
+  """
+
+  def pattern(self):
+    return LayerPattern(_EQUALIZED_LAYERS, inputs=[
+        LayerPattern('BatchNormalization', {}, [
+            LayerPattern(_EQUALIZED_LAYERS)])])
+
+
+class CrossLayerEqualizationBatchNormReLU(CrossLayerEqualization):
+  """Equalizes the kernels of two layers separated by a batchnorm and ReLU.
+
+  Layer1 -> BatchNormalization -> ReLU -> Layer2 =>
+    Layer1 -> BatchNormalization' -> ReLU -> Layer2'
+  """
+
+  def pattern(self):
+    return LayerPattern(_EQUALIZED_LAYERS, inputs=[
+        LayerPattern('ReLU', _RELU_CONFIG, [
+            LayerPattern('BatchNormalization', {}, [
+                LayerPattern(_EQUALIZED_LAYERS)])])])
+
+
+def _relu_mean(mean, std):
+  """Returns E[max(x, 0)] for x ~ N(mean, std^2)."""
+  ratio = mean / std
+  normal_cdf = 0.5 * (1. + np.vectorize(math.erf)(ratio / math.sqrt(2.)))
+  normal_pdf = np.exp(-0.5 * ratio**2) / math.sqrt(2. * math.pi)
+  return mean * normal_cdf + std * normal_pdf
+
+
+def _quantization_error(kernel, per_axis):
+  """Returns the error of quantizing `kernel` as the TFLite registry does."""
+  # Symmetric 8 bit quantization over a narrow range.
+  axis = tuple(range(kernel.ndim - 1)) if per_axis else None
+  scale = np.max(np.abs(kernel), axis=axis) / 127.
+  scale = np.where(scale > 0, scale, 1.)
+  return np.floor(kernel / scale + 0.5) * scale - kernel
+
+
+class BiasCorrection(transforms.Transform):
+  """Corrects the bias of a layer for the error of quantizing its kernel.
+
+  BatchNormalization -> ReLU -> Layer =>
+    BatchNormalization -> ReLU -> Layer(bias - dW E[x])
+
+  The batchnorm may also be folded into the layer before it.
+
+  Quantizing the kernel W of Layer to W + dW shifts its expected outputs by
+  dW E[x], which is subtracted from the bias. Each input channel of Layer is
+  assumed to be normal before the ReLU, with the mean beta and standard
+  deviation gamma of the batchnorm, so E[x] is computed without any data.
+
+  dW is the error of the 8 bit kernel quantization of the TFLite registry, so
+  layers with a custom `QuantizeConfig` are not corrected.
+
+  See "Data-Free Quantization Through Weight Equalization and Bias Correction",
+  Nagel et al., 2019.
+  """
+
+  def pattern(self):
+    return LayerPattern(_EQUALIZED_LAYERS, inputs=[
+        LayerPattern('ReLU', {'negative_slope': 0., 'threshold': 0.}, [
+            LayerPattern('BatchNormalization|' + _FOLDED_LAYER_NAMES)])])
+
+  @staticmethod
+  def _get_activation(match_layer):
+    """Returns the batchnorm node and the config of its ReLU, if any.
+
+    Returns:
+      Tuple of the node holding the batchnorm weights, or None if the
+      activation is not a ReLU, and the config of the ReLU or None.
+    """
+    input_node = match_layer.input_layers[0]
+    if input_node.layer['class_name'] == 'ReLU':
+      bn_layer_node, relu_config = BiasCorrection._get_activation(input_node)
+      if bn_layer_node is None or relu_config is not None:
+        return None, None
+      return bn_layer_node, input_node.layer['config']
+    if input_node.layer['class_name'] == 'BatchNormalization':
+      return input_node, None
+
+    # Batchnorm folded into the previous layer by `Conv2DBatchNormFold`.
+    post_activation = input_node.layer['config']['post_activation']
+    if post_activation in (None, 'linear'):
+      return input_node, None
+    if post_activation == 'relu':
+      return input_node, {}
+    if isinstance(post_activation, dict) and \
+        post_activation['class_name'] == 'ReLU':
+      return input_node, post_activation['config']
+    return None, None
+
+  @staticmethod
+  def _input_mean(bn_layer_node, relu_config):
+    """Returns E[x] for each input channel, or None if unknown."""
+    bn_config = bn_layer_node.layer['config']
+    num_channels = _get_value(bn_layer_node, 'moving_mean:0').shape
+    mean = np.zeros(num_channels)
+    std = np.ones(num_channels)
+    if bn_config['center']:
+      mean = mean + _get_value(bn_layer_node, 'beta:0')
+    if bn_config['scale']:
+      std = std * np.abs(_get_value(bn_layer_node, 'gamma:0'))
+
+    if relu_config is None:
+      return mean
+    if relu_config.get('negative_slope') or relu_config.get('threshold'):
+      return None
+
+    std = np.maximum(std, 1e-8)
+    input_mean = _relu_mean(mean, std)
+    max_value = relu_config.get('max_value')
+    if max_value is not None:
+      # min(max(x, 0), m) = max(x, 0) - max(x - m, 0).
+      input_mean -= _relu_mean(mean - float(max_value), std)
+    return input_mean
+
+  def replacement(self, match_layer):
+    layer = match_layer.layer
+    if match_layer.metadata.get('quantize_config') is not None or \
+        not _is_channels_last(layer):
+      return match_layer
+
+    bn_layer_node, relu_config = self._get_activation(match_layer)
+    if bn_layer_node is None or not _normalizes_last_axis(
+        bn_layer_node.layer, _output_rank(layer)):
+      return match_layer
+
+    kernel = _get_value(match_layer, _kernel_name(layer))
+    input_mean = self._input_mean(bn_layer_node, relu_config)
+    if input_mean is None or input_mean.shape != (kernel.shape[-2],):
+      return match_layer
+
+    error = _quantization_error(
+        kernel, per_axis=layer['class_name'] in _PER_AXIS_LAYERS)
+    output_error = error * input_mean.reshape(-1, 1)
+    if layer['class_name'] == 'DepthwiseConv2D':
+      correction = output_error.sum(axis=(0, 1)).reshape(-1)
+    else:
+      correction = output_error.sum(axis=tuple(range(kernel.ndim - 1)))
+
+    if layer['config']['use_bias']:
+      bias = _get_value(match_layer, 'bias:0')
+    else:
+      layer['config']['use_bias'] = True
+      bias = np.zeros(correction.shape, dtype=kernel.dtype)
+    match_layer.weights['bias:0'] = (bias - correction).astype(kernel.dtype)
+
+    return match_layer
+
+  def custom_objects(self):
+    return {layer.__name__: layer for layer in _FOLDED_LAYERS}
+
+
+class BiasCorrectionBatchNorm(BiasCorrection):
+  """Corrects the bias of a layer which follows a batchnorm.
+
+  BatchNormalization -> Layer => BatchNormalization -> Layer(bias - dW E[x])
+  """
+
+  def pattern(self):
+    return LayerPattern(_EQUALIZED_LAYERS, inputs=[
+        LayerPattern('BatchNormalization')])
+
+
+class BiasCorrectionFoldedBatchNorm(BiasCorrection):
+  """Corrects the bias of a layer which follows a folded batchnorm.
+
+  _ConvBatchNorm2D -> Layer => _ConvBatchNorm2D -> Layer(bias - dW E[x])
+  """
+
+  def pattern(self):
+    return LayerPattern(_EQUALIZED_LAYERS, inputs=[
+        LayerPattern(_FOLDED_LAYER_NAMES)])
+
+
 class InputLayerQuantize(transforms.Transform):
   """Quantizes InputLayer, by adding QuantizeLayer after it.
 
@@ -36,6 +36,10 @@ ModelTransformer = model_transformer.ModelTransformer
 
 Conv2DModel = conv_batchnorm_test_utils.Conv2DModel
 DepthwiseConv2DModel = conv_batchnorm_test_utils.DepthwiseConv2DModel
+DenseModel = conv_batchnorm_test_utils.DenseModel
+Conv1DModel = conv_batchnorm_test_utils.Conv1DModel
+Conv3DModel = conv_batchnorm_test_utils.Conv3DModel
+SeparableConv2DModel = conv_batchnorm_test_utils.SeparableConv2DModel
 
 keras = tf.keras
 
@@ -111,6 +115,85 @@ class TFLiteTransformsTest(tf.test.TestCase, parameterized.TestCase):
     for i in range(len(transformed_weights)):
       self.assertAllEqual(transformed_weights[i], model.get_weights()[i])
 
+  def testTransformsConvBNPattern_SetsFreezeBNDelay(self):
+    model = Conv2DModel.get_nonfolded_batchnorm_model(
+        model_type='functional')
+
+    transformed_model, _ = ModelTransformer(
+        model,
+        [tflite_transforms.Conv2DBatchNormFold(freeze_bn_delay=0)]).transform()
+
+    self.assertEqual(0, transformed_model.layers[1].freeze_bn_delay)
+
+  def testTransformsConvBNPattern_DoesNotFoldConvWithActivation(self):
+    inp = keras.layers.Input(Conv2DModel.params['input_shape'])
+    x = keras.layers.Conv2D(2, (2, 2), activation='relu', use_bias=False)(inp)
+    model = keras.Model(inp, keras.layers.BatchNormalization()(x))
+
+    transformed_model, _ = ModelTransformer(
+        model, [tflite_transforms.Conv2DBatchNormFold()]).transform()
+
+    self.assertIsInstance(transformed_model.layers[1], keras.layers.Conv2D)
+
+  @parameterized.parameters(
+      (DenseModel, tflite_transforms.DenseBatchNormFold),
+      (Conv1DModel, tflite_transforms.Conv1DBatchNormFold),
+      (Conv3DModel, tflite_transforms.Conv3DBatchNormFold),
+      (SeparableConv2DModel, tflite_transforms.SeparableConv2DBatchNormFold),
+  )
+  def testTransformsLayerBNPattern(self, model_cls, transform_cls):
+    model = model_cls.get_nonfolded_batchnorm_model(
+        model_type='functional', random_init=True)
+
+    transformed_model, _ = ModelTransformer(
+        model, [transform_cls(freeze_bn_delay=0)]).transform()
+
+    fused_layer = transformed_model.layers[1]
+    self.assertIsInstance(fused_layer, model_cls.folded_layer_class)
+    self.assertEqual(0, fused_layer.freeze_bn_delay)
+
+    # Weights of the original layers are copied into the fused layer.
+    transformed_weights = {
+        weight.name.split('/')[-1]: keras.backend.get_value(weight)
+        for weight in fused_layer.weights
+    }
+    for layer in model.layers[1:]:
+      for weight in layer.weights:
+        self.assertAllEqual(
+            keras.backend.get_value(weight),
+            transformed_weights[weight.name.split('/')[-1]])
+
+  def testTransformsLayerBNPattern_DoesNotFoldNonChannelAxis(self):
+    inp = keras.layers.Input(Conv1DModel.params['input_shape'])
+    x = keras.layers.Conv1D(2, 3, use_bias=False)(inp)
+    model = keras.Model(inp, keras.layers.BatchNormalization(axis=1)(x))
+
+    transformed_model, _ = ModelTransformer(
+        model, [tflite_transforms.Conv1DBatchNormFold()]).transform()
+
+    self.assertIsInstance(transformed_model.layers[1], keras.layers.Conv1D)
+    self.assertIsInstance(transformed_model.layers[2],
+                          keras.layers.BatchNormalization)
+
+  def testTransformsLayerBNPattern_FoldsBiasIntoMovingMean(self):
+    inp = keras.layers.Input(DenseModel.params['input_shape'])
+    x = keras.layers.Dense(
+        DenseModel.params['units'],
+        bias_initializer=keras.initializers.RandomUniform())(inp)
+    model = keras.Model(inp, keras.layers.BatchNormalization()(x))
+
+    transformed_model, _ = ModelTransformer(
+        model, [tflite_transforms.DenseBatchNormFold()]).transform()
+
+    fused_layer = transformed_model.layers[1]
+    self.assertIsInstance(fused_layer, DenseModel.folded_layer_class)
+    self.assertFalse(fused_layer.use_bias)
+    bias = model.layers[1].get_weights()[1]
+    moving_mean = keras.backend.get_value(fused_layer.batchnorm.moving_mean)
+    self.assertAllClose(
+        keras.backend.get_value(model.layers[2].moving_mean) - bias,
+        moving_mean)
+
   def testTransformsDepthwiseConvBNReLUPattern(self):
     model = DepthwiseConv2DModel.get_nonfolded_batchnorm_model(
         post_bn_activation=keras.layers.ReLU(6.0), model_type='functional')
@@ -154,21 +237,27 @@ class TFLiteTransformsTest(tf.test.TestCase, parameterized.TestCase):
     elif activation_type == 'act_relu':
       activation = keras.layers.Activation('relu')
 
-    if layer_type == 'Conv2D':
-      return Conv2DModel.get_nonfolded_batchnorm_model(
-          model_type='functional', post_bn_activation=activation)
-    elif layer_type == 'DepthwiseConv2D':
-      return DepthwiseConv2DModel.get_nonfolded_batchnorm_model(
-          model_type='functional', post_bn_activation=activation)
+    return TFLiteTransformsTest._get_model_cls(
+        layer_type).get_nonfolded_batchnorm_model(
+            model_type='functional', post_bn_activation=activation)
+
+  @staticmethod
+  def _get_model_cls(layer_type):
+    return {
+        'Conv1D': Conv1DModel,
+        'Conv2D': Conv2DModel,
+        'Conv3D': Conv3DModel,
+        'DepthwiseConv2D': DepthwiseConv2DModel,
+        'Dense': DenseModel,
+    }[layer_type]
 
   @staticmethod
   def _get_input_shape(layer_type):
-    if layer_type == 'Conv2D':
-      return Conv2DModel.get_batched_input_shape()
-    elif layer_type == 'DepthwiseConv2D':
-      return DepthwiseConv2DModel.get_batched_input_shape()
+    return TFLiteTransformsTest._get_model_cls(
+        layer_type).get_batched_input_shape()
 
-  @parameterized.parameters('Conv2D', 'DepthwiseConv2D')
+  @parameterized.parameters(
+      'Conv1D', 'Conv2D', 'Conv3D', 'DepthwiseConv2D', 'Dense')
   def testConv2DBatchNormQuantize(self, layer_type):
     model = self._get_model(layer_type, False)
     input_shape = self._get_input_shape(layer_type)
@@ -220,6 +309,157 @@ class TFLiteTransformsTest(tf.test.TestCase, parameterized.TestCase):
     self.assertAllClose(
         transformed_model.predict(inputs), model.predict(inputs))
 
+  @parameterized.parameters(
+      (keras.layers.Dense(3), keras.layers.ReLU(), (4,)),
+      (keras.layers.Dense(3), keras.layers.Activation('relu'), (4,)),
+      (keras.layers.Conv2D(3, 2), keras.layers.ReLU(), (5, 5, 2)),
+      (keras.layers.DepthwiseConv2D(2), keras.layers.Activation('relu'),
+       (5, 5, 2)),
+  )
+  def testLayerReLUFuse(self, layer, activation, input_shape):
+    inp = keras.layers.Input(input_shape)
+    model = keras.Model(inp, activation(layer(inp)))
+
+    transformed_model, _ = ModelTransformer(
+        model,
+        [tflite_transforms.LayerReLUFuse(),
+         tflite_transforms.LayerActivationReLUFuse()],
+    ).transform()
+
+    self.assertLen(transformed_model.layers, 2)
+    self.assertEqual(
+        keras.activations.relu, transformed_model.layers[1].activation)
+
+    inputs = np.random.standard_normal((2,) + input_shape)
+    self.assertAllClose(
+        transformed_model.predict(inputs), model.predict(inputs))
+
+  def testLayerReLUFuse_DoesNotFuseReLU6(self):
+    inp = keras.layers.Input((4,))
+    model = keras.Model(inp, keras.layers.ReLU(6.0)(keras.layers.Dense(3)(inp)))
+
+    transformed_model, _ = ModelTransformer(
+        model, [tflite_transforms.LayerReLUFuse()]).transform()
+
+    self.assertLen(transformed_model.layers, 3)
+
+  def testLayerReLUFuse_DoesNotFuseLayerWithOtherConsumers(self):
+    inp = keras.layers.Input((4,))
+    x = keras.layers.Dense(3)(inp)
+    model = keras.Model(inp, [keras.layers.ReLU()(x), x])
+
+    transformed_model, _ = ModelTransformer(
+        model, [tflite_transforms.LayerReLUFuse()]).transform()
+
+    self.assertLen(transformed_model.layers, 3)
+
+  @staticmethod
+  def _randomize_weights(model):
+    for layer in model.layers:
+      layer.set_weights([
+          np.random.uniform(0.5, 2., size=w.shape) if 'variance' in w.name
+          else np.random.standard_normal(w.shape) for w in layer.weights])
+
+  @parameterized.parameters(
+      ([keras.layers.Dense(4, activation='relu')], (3,)),
+      ([keras.layers.Dense(4), keras.layers.ReLU()], (3,)),
+      ([keras.layers.Conv2D(4, 2), keras.layers.BatchNormalization()],
+       (5, 5, 2)),
+      ([keras.layers.Conv2D(4, 2), keras.layers.BatchNormalization(),
+        keras.layers.ReLU()], (5, 5, 2)),
+      ([keras.layers.DepthwiseConv2D(2, depth_multiplier=2)], (5, 5, 2)),
+  )
+  def testCrossLayerEqualization_PreservesOutputs(self, layers, input_shape):
+    inp = keras.layers.Input(input_shape)
+    x = inp
+    for layer in layers:
+      x = layer(x)
+    model = keras.Model(inp, keras.layers.Dense(3)(x))
+    self._randomize_weights(model)
+
+    transformed_model, _ = ModelTransformer(
+        model,
+        [tflite_transforms.CrossLayerEqualizationBatchNormReLU(),
+         tflite_transforms.CrossLayerEqualizationBatchNorm(),
+         tflite_transforms.CrossLayerEqualizationReLU(),
+         tflite_transforms.CrossLayerEqualization()],
+    ).transform()
+
+    self.assertNotAllClose(model.layers[-1].kernel,
+                           transformed_model.layers[-1].kernel)
+    inputs = np.random.standard_normal((2,) + input_shape)
+    self.assertAllClose(
+        model.predict(inputs), transformed_model.predict(inputs), atol=1e-5)
+
+  def testCrossLayerEqualization_EqualizesChannelRanges(self):
+    inp = keras.layers.Input((3,))
+    x = keras.layers.Dense(4, activation='relu')(inp)
+    model = keras.Model(inp, keras.layers.Dense(2)(x))
+    self._randomize_weights(model)
+    kernel1 = model.layers[1].get_weights()[0]
+    kernel1[:, 0] *= 100.
+    model.layers[1].set_weights([kernel1, model.layers[1].get_weights()[1]])
+
+    transformed_model, _ = ModelTransformer(
+        model, [tflite_transforms.CrossLayerEqualization()]).transform()
+
+    kernel1 = transformed_model.layers[1].kernel.numpy()
+    kernel2 = transformed_model.layers[2].kernel.numpy()
+    self.assertAllClose(
+        np.max(np.abs(kernel1), axis=0), np.max(np.abs(kernel2), axis=1))
+
+  def testCrossLayerEqualization_DoesNotScaleThroughReLU6(self):
+    inp = keras.layers.Input((3,))
+    x = keras.layers.ReLU(6.)(keras.layers.Dense(4)(inp))
+    model = keras.Model(inp, keras.layers.Dense(2)(x))
+
+    transformed_model, _ = ModelTransformer(
+        model, [tflite_transforms.CrossLayerEqualizationReLU()]).transform()
+
+    self.assertAllEqual(model.layers[3].kernel,
+                        transformed_model.layers[3].kernel)
+
+  @parameterized.parameters(
+      (keras.layers.Dense(8), (16,)),
+      (keras.layers.Conv2D(8, 1), (2, 2, 16)),
+  )
+  def testBiasCorrection_RemovesMeanQuantizationError(self, layer,
+                                                      input_shape):
+    inp = keras.layers.Input(input_shape)
+    x = keras.layers.ReLU()(keras.layers.BatchNormalization()(inp))
+    model = keras.Model(inp, layer(x))
+    gamma = np.random.uniform(0.5, 2., size=16)
+    beta = np.random.standard_normal(16)
+    model.layers[1].set_weights([gamma, beta, np.zeros(16), np.ones(16)])
+    kernel = np.random.standard_normal(layer.kernel.shape)
+    kernel.reshape(-1)[0] = 20.
+    layer.set_weights([kernel, np.zeros(8)])
+
+    transformed_model, _ = ModelTransformer(
+        model, [tflite_transforms.BiasCorrection()]).transform()
+
+    samples = np.maximum(
+        0., np.random.standard_normal((100000, 16)) * gamma + beta)
+    kernel = kernel.reshape(16, 8)
+    scale = np.max(np.abs(kernel), axis=0 if layer.name.startswith(
+        'conv') else None) / 127.
+    quantized_kernel = np.round(kernel / scale) * scale
+    error = samples.dot(quantized_kernel - kernel).mean(axis=0)
+    corrected_error = error + transformed_model.layers[-1].bias.numpy()
+    self.assertGreater(np.abs(error).max(), 0.01)
+    self.assertAllClose(np.zeros(8), corrected_error, atol=0.005)
+
+  def testBiasCorrection_SupportsFoldedBatchNorm(self):
+    model = Conv2DModel.get_folded_batchnorm_model(
+        post_bn_activation=keras.layers.ReLU(6.0), is_quantized=True)
+    x = model.layers[-1].output
+    model = keras.Model(model.inputs, keras.layers.Conv2D(2, 1)(x))
+
+    transformed_model, _ = ModelTransformer(
+        model, [tflite_transforms.BiasCorrectionFoldedBatchNorm()]).transform()
+
+    self.assertNotAllClose(np.zeros(2), transformed_model.layers[-1].bias)
+
   def testAddsQuantizeLayerAfterInputLayer(self):
     inp1 = keras.layers.Input((3,))
     inp2 = keras.layers.Input((3,))
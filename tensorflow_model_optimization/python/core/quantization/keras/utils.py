@@ -15,48 +15,258 @@
 # pylint: disable=protected-access
 """Quantization specific utilities for generating, saving, testing, and evaluating models."""
 
+import hashlib
+import json
+import os
 import tempfile
 
 import tensorflow as tf
 
 from tensorflow_model_optimization.python.core.keras import compat
 
+# Default maximum total size of the models in a `TFLiteConversionCache`.
+_DEFAULT_MAX_CACHE_BYTES = 1 << 30
+
+
+class TFLiteConversionCache(object):
+  """On disk cache of converted TFLite models, with LRU eviction.
+
+  Each model is stored in a file named after the hash of everything which
+  determines the conversion, so identical models share an entry regardless of
+  which process converted them. The modification time of a file records when
+  it was last used, and the least recently used files are deleted when the
+  total size of the cache exceeds `max_bytes`.
+  """
+
+  def __init__(self, cache_dir, max_bytes=_DEFAULT_MAX_CACHE_BYTES):
+    """Create a cache of TFLite models in `cache_dir`.
+
+    Args:
+      cache_dir: Directory of the cache. Created if it does not exist.
+      max_bytes: Maximum total size of the cached models.
+    """
+    self.cache_dir = cache_dir
+    self.max_bytes = max_bytes
+    if not os.path.isdir(cache_dir):
+      os.makedirs(cache_dir)
+
+  def _path(self, key):
+    return os.path.join(self.cache_dir, key + '.tflite')
+
+  def get(self, key):
+    """Returns the cached model for `key`, or None if it is not cached."""
+    path = self._path(key)
+    try:
+      with open(path, 'rb') as f:
+        tflite_model = f.read()
+      os.utime(path, None)
+    except (IOError, OSError):
+      # Missing, or evicted by another process.
+      return None
+    return tflite_model
+
+  def put(self, key, tflite_model):
+    """Stores `tflite_model` for `key`, then evicts entries over the limit."""
+    # Written to a temporary file first, so other processes never read a
+    # partially written model.
+    fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+      f.write(tflite_model)
+    os.replace(temp_path, self._path(key))
+    self._evict()
+
+  def _evict(self):
+    entries = []
+    for name in os.listdir(self.cache_dir):
+      if not name.endswith('.tflite'):
+        continue
+      try:
+        stat = os.stat(os.path.join(self.cache_dir, name))
+      except OSError:
+        continue
+      entries.append((stat.st_mtime, stat.st_size, name))
+
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+      if total_bytes <= self.max_bytes:
+        break
+      try:
+        os.remove(os.path.join(self.cache_dir, name))
+      except OSError:
+        pass
+      total_bytes -= size
+
+
+def _normalize_names(config):
+  """Replaces the layer and model names in a model config by indices.
+
+  Keras generates names like `dense_3` from a global counter, so the configs of
+  two identical models built one after the other only differ in their names.
+
+  Args:
+    config: Model config, as parsed from `model.to_json()`.
+
+  Returns:
+    Copy of `config` in which every name, and every reference to a layer by
+    name in the connections, is replaced by the index of its first
+    occurrence.
+  """
+  names = {}
+
+  def collect(obj):
+    if isinstance(obj, dict):
+      for key, value in sorted(obj.items()):
+        if key == 'name' and isinstance(value, str):
+          names.setdefault(value, 'name_{}'.format(len(names)))
+        else:
+          collect(value)
+    elif isinstance(obj, list):
+      for value in obj:
+        collect(value)
+
+  def rename_references(obj):
+    if isinstance(obj, str):
+      return names.get(obj, obj)
+    elif isinstance(obj, list):
+      return [rename_references(value) for value in obj]
+    return obj
+
+  def normalize(obj):
+    if isinstance(obj, dict):
+      normalized = {}
+      for key, value in obj.items():
+        if key == 'name' and isinstance(value, str):
+          normalized[key] = names[value]
+        elif key in ('inbound_nodes', 'input_layers', 'output_layers'):
+          normalized[key] = rename_references(value)
+        else:
+          normalized[key] = normalize(value)
+      return normalized
+    elif isinstance(obj, list):
+      return [normalize(value) for value in obj]
+    return obj
+
+  collect(config)
+  return normalize(config)
+
+
+def _conversion_key(model, converter_options):
+  """Returns a hash of the model config, weights and converter options.
+
+  Layer and model names are left out, so that identical models share a key
+  even when Keras generated different names for them.
+
+  Args:
+    model: Keras model to convert.
+    converter_options: Tuple of the options which affect the conversion.
+
+  Returns:
+    Hex digest, or None if the model has no serializable config.
+  """
+  try:
+    model_json = model.to_json()
+  except NotImplementedError:
+    # Subclassed models.
+    return None
+
+  key = hashlib.sha256()
+  key.update(tf.__version__.encode('utf-8'))
+  key.update(repr(converter_options).encode('utf-8'))
+  model_config = _normalize_names(json.loads(model_json))
+  key.update(json.dumps(model_config, sort_keys=True).encode('utf-8'))
+  for weight in model.get_weights():
+    key.update(repr((weight.dtype.str, weight.shape)).encode('utf-8'))
+    key.update(weight.tobytes())
+  return key.hexdigest()
+
+
+def _create_converter(model, custom_objects):
+  """Returns a converter for `model`, without saving it when possible."""
+  if not compat.is_v1_apis():
+    return tf.lite.TFLiteConverter.from_keras_model(model), None
+
+  if not tf.executing_eagerly():
+    # The variables of the model live in the Keras session, which the
+    # converter freezes directly.
+    return tf.lite.TFLiteConverter.from_session(
+        tf.keras.backend.get_session(), model.inputs, model.outputs), None
+
+  fd, keras_file = tempfile.mkstemp('.h5')
+  os.close(fd)
+  tf.keras.models.save_model(model, keras_file)
+  return tf.lite.TFLiteConverter.from_keras_model_file(
+      keras_file, custom_objects=custom_objects), keras_file
+
+
+def _convert(model, custom_objects, is_quantized, inference_input_type,
+             input_quant_params):
+  """Converts `model`, returning the serialized TFLite model."""
+  converter, keras_file = _create_converter(model, custom_objects)
+
+  try:
+    converter.experimental_new_converter = True
+
+    if is_quantized:
+      if not compat.is_v1_apis():
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+      else:
+        converter.inference_type = tf.lite.constants.INT8
+        converter.inference_input_type = tf.lite.constants.FLOAT
+        if inference_input_type:
+          converter.inference_input_type = inference_input_type
+
+        input_arrays = converter.get_input_arrays()
+        converter.quantized_input_stats = {
+            input_arrays[0]: input_quant_params
+        }  # mean, std_dev values for float to quantized int8 values.
+
+    return converter.convert()
+  finally:
+    if keras_file is not None:
+      os.remove(keras_file)
+
 
 def convert_keras_to_tflite(model,
                             output_path,
                             custom_objects=None,
                             is_quantized=True,
                             inference_input_type=None,
-                            input_quant_params=(-128., 255.)):
-  """Convert Keras model to TFLite."""
+                            input_quant_params=(-128., 255.),
+                            cache=None):
+  """Convert Keras model to TFLite.
+
+  Args:
+    model: Keras model to convert.
+    output_path: Path to write the TFLite model to, or None.
+    custom_objects: Custom objects needed to load the model under TF 1.X.
+    is_quantized: Whether to quantize the TFLite model.
+    inference_input_type: Type of the input of a quantized model, TF 1.X only.
+    input_quant_params: (mean, std_dev) of the quantized input, TF 1.X only.
+    cache: Optional `TFLiteConversionCache`. Models with the same config,
+      weights and options are only converted once, even if their layers are
+      named differently. The names in a cached TFLite model are those of the
+      model which was converted first.
+
+  Returns:
+    The serialized TFLite model.
+  """
   if custom_objects is None:
     custom_objects = {}
 
-  if not compat.is_v1_apis():
-    converter = tf.lite.TFLiteConverter.from_keras_model(model)
-  else:
-    _, keras_file = tempfile.mkstemp('.h5')
-    tf.keras.models.save_model(model, keras_file)
-    converter = tf.lite.TFLiteConverter.from_keras_model_file(
-        keras_file, custom_objects=custom_objects)
-
-  converter.experimental_new_converter = True
-
-  if is_quantized:
-    if not compat.is_v1_apis():
-      converter.optimizations = [tf.lite.Optimize.DEFAULT]
-    else:
-      converter.inference_type = tf.lite.constants.INT8
-      converter.inference_input_type = tf.lite.constants.FLOAT
-      if inference_input_type:
-        converter.inference_input_type = inference_input_type
-
-      input_arrays = converter.get_input_arrays()
-      converter.quantized_input_stats = {
-          input_arrays[0]: input_quant_params
-      }  # mean, std_dev values for float to quantized int8 values.
-
-  tflite_model = converter.convert()
+  key = None
+  tflite_model = None
+  if cache is not None:
+    key = _conversion_key(
+        model, (compat.is_v1_apis(), is_quantized, inference_input_type,
+                tuple(input_quant_params)))
+    if key is not None:
+      tflite_model = cache.get(key)
+
+  if tflite_model is None:
+    tflite_model = _convert(model, custom_objects, is_quantized,
+                            inference_input_type, input_quant_params)
+    if key is not None:
+      cache.put(key, tflite_model)
 
   if output_path is not None:
     with open(output_path, 'wb') as f:
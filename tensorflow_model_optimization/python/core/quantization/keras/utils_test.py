@@ -0,0 +1,122 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for utils.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import mock
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.quantization.keras import utils
+
+keras = tf.keras
+
+
+class ConvertKerasToTFLiteTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(ConvertKerasToTFLiteTest, self).setUp()
+    self.cache = utils.TFLiteConversionCache(self.get_temp_dir())
+
+  def _model(self):
+    return keras.Sequential([keras.layers.Dense(3, input_shape=(4,))])
+
+  def testConvert_ReusesCachedModel(self):
+    model = self._model()
+    tflite_model = utils.convert_keras_to_tflite(
+        model, None, is_quantized=False, cache=self.cache)
+    output_path = os.path.join(self.get_temp_dir(), 'model.tflite')
+
+    with mock.patch.object(utils, '_convert') as convert:
+      cached_model = utils.convert_keras_to_tflite(
+          model, output_path, is_quantized=False, cache=self.cache)
+
+    convert.assert_not_called()
+    self.assertEqual(tflite_model, cached_model)
+    with open(output_path, 'rb') as f:
+      self.assertEqual(tflite_model, f.read())
+
+  def testConvert_ReusesCachedModelForRebuiltModel(self):
+    model = self._model()
+    utils.convert_keras_to_tflite(
+        model, None, is_quantized=False, cache=self.cache)
+    # Keras generates new layer and model names for the rebuilt model.
+    rebuilt_model = self._model()
+    rebuilt_model.set_weights(model.get_weights())
+
+    with mock.patch.object(utils, '_convert') as convert:
+      utils.convert_keras_to_tflite(
+          rebuilt_model, None, is_quantized=False, cache=self.cache)
+
+    convert.assert_not_called()
+
+  def testConvert_ConvertsModelWithOtherConnections(self):
+    def functional_model(swap_inputs):
+      inp1 = keras.Input((4,))
+      inp2 = keras.Input((4,))
+      x = keras.layers.Dense(3)(inp1)
+      y = keras.layers.Dense(3)(inp2)
+      inputs = [y, x] if swap_inputs else [x, y]
+      return keras.Model([inp1, inp2],
+                         keras.layers.Concatenate()(inputs))
+
+    model = functional_model(swap_inputs=False)
+    utils.convert_keras_to_tflite(
+        model, None, is_quantized=False, cache=self.cache)
+    swapped_model = functional_model(swap_inputs=True)
+    swapped_model.set_weights(model.get_weights())
+
+    with mock.patch.object(utils, '_convert', return_value=b'') as convert:
+      utils.convert_keras_to_tflite(
+          swapped_model, None, is_quantized=False, cache=self.cache)
+
+    convert.assert_called_once()
+
+  def testConvert_ConvertsModelWithOtherWeightsOrOptions(self):
+    model = self._model()
+    utils.convert_keras_to_tflite(
+        model, None, is_quantized=False, cache=self.cache)
+
+    with mock.patch.object(utils, '_convert', return_value=b'') as convert:
+      utils.convert_keras_to_tflite(
+          model, None, is_quantized=True, cache=self.cache)
+      model.set_weights([w + 1. for w in model.get_weights()])
+      utils.convert_keras_to_tflite(
+          model, None, is_quantized=False, cache=self.cache)
+
+    self.assertEqual(2, convert.call_count)
+
+  def testCache_EvictsLeastRecentlyUsedModels(self):
+    cache = utils.TFLiteConversionCache(
+        os.path.join(self.get_temp_dir(), 'lru'), max_bytes=20)
+    for i, key in enumerate(['a', 'b']):
+      cache.put(key, b'0123456789')
+      os.utime(cache._path(key), (i, i))
+    # Using 'a' makes 'b' the least recently used model.
+    self.assertEqual(b'0123456789', cache.get('a'))
+
+    cache.put('c', b'0123456789')
+
+    self.assertIsNone(cache.get('b'))
+    self.assertIsNotNone(cache.get('a'))
+    self.assertIsNotNone(cache.get('c'))
+
+
+if __name__ == '__main__':
+  tf.test.main()
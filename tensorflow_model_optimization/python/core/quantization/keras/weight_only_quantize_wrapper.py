@@ -0,0 +1,235 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Wrapper which stores the weights of a keras layer as integers.
+
+   `WeightOnlyQuantizeWrapper` replaces the float weight of the layer it wraps
+   with an int8 variable, holding either one 8 bit value or two packed 4 bit
+   values per element, and a float scale per channel. The weight is dequantized
+   when the layer is called, and activations stay in float.
+
+   Unlike `QuantizeWrapper`, the float weight is not kept, so the wrapped layer
+   uses 4-8x less memory for the weight but can no longer be trained.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+
+layers = tf.keras.layers
+
+# Maps each supported layer to its quantized weight and the axis of the weight
+# which has one scale per channel.
+_SUPPORTED_LAYERS = {
+    layers.Dense: ('kernel', -1),
+    layers.Conv1D: ('kernel', -1),
+    layers.Conv2D: ('kernel', -1),
+    layers.Conv3D: ('kernel', -1),
+    # One scale per row, so a lookup only needs the scales of its rows.
+    layers.Embedding: ('embeddings', 0),
+}
+
+
+def is_supported(layer):
+  """Returns True if `WeightOnlyQuantizeWrapper` can wrap `layer`."""
+  return layer.__class__ in _SUPPORTED_LAYERS
+
+
+def _quantize(weight, axis, num_bits):
+  """Symmetrically quantizes `weight` with one scale along `axis`.
+
+  Args:
+    weight: Float numpy array.
+    axis: Axis of `weight` with one scale per index.
+    num_bits: Number of bits of the quantized values, 4 or 8.
+
+  Returns:
+    Tuple of the int8 quantized values, packed along the last axis if
+    `num_bits` is 4, and the float scales.
+  """
+  quant_max = 2**(num_bits - 1) - 1
+  axis = axis % weight.ndim
+  reduce_axes = tuple(i for i in range(weight.ndim) if i != axis)
+
+  scale = np.max(np.abs(weight), axis=reduce_axes) / quant_max
+  scale[scale == 0] = 1.
+  broadcast_shape = [1] * weight.ndim
+  broadcast_shape[axis] = -1
+
+  values = np.clip(
+      np.round(weight / scale.reshape(broadcast_shape)), -quant_max, quant_max)
+  values = values.astype(np.int8)
+  if num_bits == 4:
+    values = _pack_int4(values)
+  return values, scale.astype(weight.dtype)
+
+
+def _pack_int4(values):
+  """Packs pairs of 4 bit values along the last axis into one int8 value."""
+  if values.shape[-1] % 2:
+    padding = [(0, 0)] * (values.ndim - 1) + [(0, 1)]
+    values = np.pad(values, padding, mode='constant')
+  low = values[..., 0::2].astype(np.uint8) & 0x0F
+  high = values[..., 1::2].astype(np.uint8) << 4
+  return (low | high).view(np.int8)
+
+
+def _unpack_int4(packed, size):
+  """Inverse of `_pack_int4`, where `size` is the unpacked last dimension."""
+  # Arithmetic right shifts sign extend both halves.
+  low = tf.bitwise.right_shift(tf.bitwise.left_shift(packed, 4), 4)
+  high = tf.bitwise.right_shift(packed, 4)
+  values = tf.stack([low, high], axis=-1)
+  values = tf.reshape(
+      values, tf.concat([tf.shape(packed)[:-1], [-1]], axis=0))[..., :size]
+  values.set_shape(packed.shape[:-1].concatenate([size]))
+  return values
+
+
+class WeightOnlyQuantizeWrapper(layers.Wrapper):
+  """Stores the weight of the keras layer it wraps as integers."""
+
+  def __init__(self, layer, num_bits=8, **kwargs):
+    """Create a weight only quantize wrapper for a keras layer.
+
+    Args:
+      layer: The keras layer to be quantized. Must be a `Dense`, `Conv1D`,
+        `Conv2D`, `Conv3D` or `Embedding` layer.
+      num_bits: Number of bits used to store each weight, 4 or 8.
+      **kwargs: Additional keyword arguments to be passed to the keras layer.
+    """
+    if not is_supported(layer):
+      raise ValueError(
+          'Layer {} of type {} is not supported by weight only '
+          'quantization.'.format(layer.name, layer.__class__.__name__))
+
+    if num_bits not in (4, 8):
+      raise ValueError('num_bits must be 4 or 8, got {}.'.format(num_bits))
+
+    if 'name' not in kwargs:
+      kwargs['name'] = 'weight_only_{}'.format(layer.name)
+
+    super(WeightOnlyQuantizeWrapper, self).__init__(layer, **kwargs)
+    self.num_bits = num_bits
+    self._weight_attr, self._channel_axis = _SUPPORTED_LAYERS[layer.__class__]
+
+  def build(self, input_shape):
+    super(WeightOnlyQuantizeWrapper, self).build(input_shape)
+
+    weight = getattr(self.layer, self._weight_attr)
+    self._weight_shape = weight.shape.as_list()
+    # Position of the weight in the weights of the float layer, to accept
+    # those weights in `set_float_weights`.
+    self._weight_index = [
+        i for i, w in enumerate(self.layer.weights) if w is weight][0]
+    self._untrack_float_weight(weight)
+
+    values_shape = list(self._weight_shape)
+    if self.num_bits == 4:
+      values_shape[-1] = (values_shape[-1] + 1) // 2
+    self.quantized_values = self.add_weight(
+        '{}_values'.format(self._weight_attr),
+        shape=values_shape,
+        initializer='zeros',
+        dtype=tf.int8,
+        trainable=False)
+    self.scale = self.add_weight(
+        '{}_scale'.format(self._weight_attr),
+        shape=[self._weight_shape[self._channel_axis]],
+        initializer='ones',
+        dtype=weight.dtype,
+        trainable=False)
+
+  def _untrack_float_weight(self, weight):
+    """Removes all references the wrapped layer holds to the float weight."""
+    # Deleting the attribute also removes the weight from the layer weights.
+    delattr(self.layer, self._weight_attr)
+    setattr(self.layer, self._weight_attr, None)
+
+    # pylint: disable=protected-access
+    self.layer._unconditional_checkpoint_dependencies[:] = [
+        dependency
+        for dependency in self.layer._unconditional_checkpoint_dependencies
+        if dependency.ref is not weight
+    ]
+    names = self.layer._unconditional_dependency_names
+    for name in [name for name, ref in names.items() if ref is weight]:
+      del names[name]
+    # pylint: enable=protected-access
+
+  def set_float_weights(self, weights):
+    """Quantizes and sets the weights of the float layer.
+
+    Args:
+      weights: List of numpy arrays, in the order of the `weights` of the
+        float layer which was wrapped.
+    """
+    weights = list(weights)
+    values, scale = _quantize(
+        weights.pop(self._weight_index), self._channel_axis, self.num_bits)
+    tf.keras.backend.batch_set_value(
+        [(self.quantized_values, values), (self.scale, scale)])
+    self.layer.set_weights(weights)
+
+  def get_float_weights(self):
+    """Returns the dequantized weights of the float layer.
+
+    Returns:
+      List of numpy arrays, in the order of the `weights` of the float layer
+      which was wrapped.
+    """
+    weights = self.layer.get_weights()
+    weights.insert(self._weight_index,
+                   tf.keras.backend.get_value(self._dequantize_weight()))
+    return weights
+
+  def _dequantize(self, values, scale):
+    if self.num_bits == 4:
+      values = _unpack_int4(values, self._weight_shape[-1])
+    return tf.cast(values, scale.dtype) * scale
+
+  def _dequantize_weight(self):
+    broadcast_shape = [1] * len(self._weight_shape)
+    broadcast_shape[self._channel_axis] = -1
+    return self._dequantize(self.quantized_values,
+                            tf.reshape(self.scale, broadcast_shape))
+
+  def compute_output_shape(self, input_shape):
+    return self.layer.compute_output_shape(input_shape)
+
+  def compute_mask(self, inputs, mask=None):
+    return self.layer.compute_mask(inputs, mask)
+
+  def call(self, inputs):
+    if isinstance(self.layer, layers.Embedding):
+      return self._embedding_lookup(inputs)
+
+    setattr(self.layer, self._weight_attr, self._dequantize_weight())
+    return self.layer.call(inputs)
+
+  def _embedding_lookup(self, inputs):
+    # Only the rows which are looked up are dequantized.
+    if inputs.dtype not in (tf.int32, tf.int64):
+      inputs = tf.cast(inputs, tf.int32)
+    values = tf.gather(self.quantized_values, inputs)
+    scale = tf.expand_dims(tf.gather(self.scale, inputs), -1)
+    return self._dequantize(values, scale)
+
+  def get_config(self):
+    base_config = super(WeightOnlyQuantizeWrapper, self).get_config()
+    config = {'num_bits': self.num_bits}
+    return dict(list(base_config.items()) + list(config.items()))
@@ -0,0 +1,158 @@
+# Copyright 2020 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for WeightOnlyQuantizeWrapper."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import tempfile
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_model_optimization.python.core.quantization.keras import quantize
+from tensorflow_model_optimization.python.core.quantization.keras import weight_only_quantize_wrapper
+
+WeightOnlyQuantizeWrapper = weight_only_quantize_wrapper.WeightOnlyQuantizeWrapper
+
+keras = tf.keras
+layers = keras.layers
+
+
+class WeightOnlyQuantizeWrapperTest(tf.test.TestCase, parameterized.TestCase):
+
+  def _wrap(self, layer, input_shape, num_bits, dtype=tf.float32):
+    float_layer = layer.__class__.from_config(layer.get_config())
+    float_layer.build(input_shape)
+    wrapper = WeightOnlyQuantizeWrapper(layer, num_bits=num_bits)
+    wrapper.build(input_shape)
+    wrapper.set_float_weights(float_layer.get_weights())
+
+    if dtype.is_integer:
+      inputs = np.random.randint(0, input_shape[-1], size=input_shape)
+    else:
+      inputs = np.random.uniform(-1., 1., size=input_shape).astype(np.float32)
+    return float_layer, wrapper, inputs
+
+  @parameterized.parameters(
+      (lambda: layers.Dense(7), (4, 6), 8, 0.02),
+      (lambda: layers.Dense(7), (4, 6), 4, 0.3),
+      (lambda: layers.Conv1D(3, 2), (2, 5, 4), 8, 0.02),
+      (lambda: layers.Conv2D(5, 3, padding='same'), (2, 6, 6, 3), 4, 0.5),
+      (lambda: layers.Conv3D(2, 2), (1, 3, 3, 3, 2), 8, 0.02),
+  )
+  def testCall_MatchesFloatLayer(self, layer_fn, input_shape, num_bits, atol):
+    float_layer, wrapper, inputs = self._wrap(layer_fn(), input_shape, num_bits)
+
+    self.assertAllClose(float_layer(inputs), wrapper(inputs), atol=atol)
+
+  @parameterized.parameters(8, 4)
+  def testEmbeddingLookup_MatchesFloatLayer(self, num_bits):
+    # An odd embedding dimension needs a padded 4 bit value in each row.
+    float_layer, wrapper, inputs = self._wrap(
+        layers.Embedding(30, 5), (4, 30), num_bits, dtype=tf.int32)
+
+    outputs = wrapper(inputs)
+
+    self.assertEqual([4, 30, 5], outputs.shape.as_list())
+    scale = np.max(np.abs(float_layer.get_weights()[0])) / (
+        2**(num_bits - 1) - 1)
+    self.assertAllClose(float_layer(inputs), outputs, atol=scale / 2 + 1e-6)
+
+  def testEmbedding_ComputesMask(self):
+    layer = layers.Embedding(10, 4, mask_zero=True)
+    wrapper = WeightOnlyQuantizeWrapper(layer)
+    wrapper.build((None, 3))
+
+    self.assertAllEqual([[False, True, True]],
+                        wrapper.compute_mask(tf.constant([[0, 1, 2]])))
+
+  @parameterized.parameters(8, 4)
+  def testWeights_StoredAsIntegers(self, num_bits):
+    wrapper = WeightOnlyQuantizeWrapper(layers.Dense(8), num_bits=num_bits)
+    wrapper.build((None, 64))
+
+    self.assertIsNone(wrapper.layer.kernel)
+    self.assertEqual(
+        [(tf.int8, [64, 8 * num_bits // 8]), (tf.float32, [8]),
+         (tf.float32, [8])],
+        sorted([(w.dtype, w.shape.as_list()) for w in wrapper.weights],
+               key=lambda weight: weight[0] != tf.int8))
+    self.assertEmpty(wrapper.trainable_weights[1:])
+    # The float kernel is not saved in checkpoints either.
+    checkpoint_values = [
+        ref for _, ref in
+        wrapper.layer._unconditional_checkpoint_dependencies  # pylint: disable=protected-access
+    ]
+    self.assertFalse(any(
+        isinstance(value, tf.Variable) and value.shape == [64, 8]
+        for value in checkpoint_values))
+
+  def testQuantize_UsesScalePerChannel(self):
+    kernel = np.random.uniform(-1., 1., size=(3, 3, 2, 4)).astype(np.float32)
+    kernel[..., 0] *= 1e-3
+    layer = layers.Conv2D(4, 3, use_bias=False)
+    wrapper = WeightOnlyQuantizeWrapper(layer)
+    wrapper.build((None, 5, 5, 2))
+
+    wrapper.set_float_weights([kernel])
+
+    dequantized = wrapper.get_float_weights()[0]
+    scale = np.max(np.abs(kernel), axis=(0, 1, 2)) / 127
+    self.assertAllLessEqual(np.abs(dequantized - kernel) - scale / 2, 1e-7)
+
+  def testPackInt4_RoundTrips(self):
+    values = np.random.randint(-8, 8, size=(4, 7)).astype(np.int8)
+
+    packed = weight_only_quantize_wrapper._pack_int4(values)
+
+    self.assertEqual((4, 4), packed.shape)
+    self.assertAllEqual(
+        values, weight_only_quantize_wrapper._unpack_int4(tf.constant(packed),
+                                                          7))
+
+  def testRaisesForUnsupportedLayer(self):
+    with self.assertRaises(ValueError):
+      WeightOnlyQuantizeWrapper(layers.DepthwiseConv2D(3))
+
+  def testRaisesForUnsupportedBitWidth(self):
+    with self.assertRaises(ValueError):
+      WeightOnlyQuantizeWrapper(layers.Dense(3), num_bits=6)
+
+  def testSerialization_SavesAndLoadsModel(self):
+    model = keras.Sequential([
+        layers.Embedding(20, 6, input_length=4),
+        layers.Flatten(),
+        layers.Dense(3),
+    ])
+    quantized_model = quantize.quantize_weights_only(model, num_bits=4)
+    _, keras_file = tempfile.mkstemp('.h5')
+
+    try:
+      quantized_model.save(keras_file)
+      with quantize.quantize_scope():
+        loaded_model = keras.models.load_model(keras_file)
+    finally:
+      os.remove(keras_file)
+
+    x = np.random.randint(0, 20, size=(8, 4))
+    self.assertAllEqual(quantized_model.predict(x), loaded_model.predict(x))
+
+
+if __name__ == '__main__':
+  tf.test.main()